@@ -68,13 +68,22 @@ function constructUrl(model, endpoint = "") {
     return url;
 }
 
-function displayStatus(status) {
+function displayStatus(status, preview = null) {
     document.getElementById("output-sample").style.display = "none";
     document.getElementById("output-result-container").style.display = "none";
     document.getElementById("output-loader").style.display = "block";
 
     // Update loader text to current status
     document.getElementById("status").innerText = status;
+
+    // Show the character being generated, if the job has a preview of it
+    const previewImg = document.getElementById("preview");
+    if (preview) {
+        previewImg.src = `data:image/png;base64,${preview.image}`;
+        previewImg.style.display = "block";
+    } else {
+        previewImg.style.display = "none";
+    }
 }
 
 function enableSubmitButton() {
@@ -235,6 +244,7 @@ async function processGenerateRequest(inputText) {
         },
         body: JSON.stringify({
             input_text: inputText,
+            preview: true,
         }),
     });
 
@@ -269,8 +279,8 @@ async function processGenerateRequest(inputText) {
             const positionInQueue = job.job_info.place_in_queue;
             displayStatus(`Waiting in queue at position ${positionInQueue}`);
         } else if (job.job_status === JobStatus.Running) {
-            const runningStateMessage = job.job_info.running_state.message;
-            displayStatus(runningStateMessage);
+            const runningState = job.job_info.running_state;
+            displayStatus(runningState.message, runningState.preview);
         } else {
             console.error("[Generate Text] Unknown job status:", job.job_status);
             return;
@@ -1,60 +1,205 @@
 import asyncio
+import contextlib
+import threading
 from asyncio import Task
 from typing import Callable, Optional, Union
 
+from adapter.data_access.image_encoding_pipeline import ImageEncodingPipeline
+from adapter.data_access.sampling_progress_publisher import SamplingProgressPublisher
 from application.port_out.text_generator_port import TextGeneratorPort
 from domain.value.generated_word import GeneratedWord
+from domain.value.image_encoding import ImageEncoding
 from domain.value.job_info import RunningJob
 from domain.value.job_input import JobInput
+from domain.value.model_readiness import ModelReadiness
+from domain.value.quality_tier import QualityTier
 from domain.value.running_state import RunningState
-from fyp23_model.sample import SampledImage, load_character_data, run_sample
+from fyp23_model.sample import (
+    LoadedModel,
+    SampledImage,
+    SampledPreview,
+    SampledStep,
+    load_character_data,
+    load_model,
+    run_sample,
+)
+from fyp23_model.utils.dpm_solver_pytorch import SamplingCancelled
+from fyp23_model.utils.unet import is_sdpa_available
+
+WARM_UP_CHARACTER = "永"  # generated once when the model is preloaded
+ATTENTION_BACKEND = "sdpa" if is_sdpa_available() else "math"
+
+# The DDIM sampling steps of each quality tier; the standard tier is the
+# timestep_respacing of cfg/test_cfg.yaml
+QUALITY_TIER_TIMESTEP_RESPACING: dict[QualityTier, str] = {
+    QualityTier.Draft: "ddim8",
+    QualityTier.Standard: "ddim25",
+    QualityTier.High: "ddim50",
+}
 
 
 class FontGenerationApplication(TextGeneratorPort):
     __seed: Optional[int]
     __image_save_path: Optional[str] = None
+    __image_encoding: ImageEncoding
+    __vectorize: bool
+    __precision: str
+    __preview_interval: int  # sampling steps between the glyph previews
+    __loaded_model: Optional[LoadedModel] = None  # reused by the jobs once preloaded
+    __model_lock: threading.Lock  # held while the model is being preloaded
+    __readiness: ModelReadiness
+    __preload_thread: Optional[threading.Thread] = None
 
-    def __init__(self, seed: Optional[int], image_save_path: Optional[str]):
+    def __init__(
+        self,
+        seed: Optional[int],
+        image_save_path: Optional[str],
+        image_encoding: ImageEncoding = ImageEncoding(),
+        vectorize: bool = False,
+        precision: str = "fp32",
+        preview_interval: int = 5,
+    ):
         self.__seed = seed
         self.__image_save_path = image_save_path
+        self.__image_encoding = image_encoding
+        self.__vectorize = vectorize
+        self.__precision = precision
+        self.__preview_interval = preview_interval
+        self.__model_lock = threading.Lock()
+        self.__readiness = ModelReadiness.not_loaded()
 
-    async def __generation(
+    def __preload(self):
+        with self.__model_lock:
+            try:
+                self.__readiness = ModelReadiness.loading()
+                loaded_model = load_model(
+                    attention_backend=ATTENTION_BACKEND, precision=self.__precision
+                )
+                # The first run allocates the buffers and selects the kernels
+                self.__readiness = ModelReadiness.warming_up()
+                style_image, character_data = load_character_data(
+                    characters=WARM_UP_CHARACTER
+                )
+                run_sample(
+                    style_image=style_image,
+                    character_data=character_data,
+                    loaded_model=loaded_model,
+                )
+            except Exception as e:
+                # The readiness reports the error, and each job loads the model itself
+                self.__readiness = ModelReadiness.failed(str(e))
+                print(f"Failed to preload the model: {e}")
+                return
+
+            self.__loaded_model = loaded_model
+            self.__readiness = ModelReadiness.ready()
+
+    def __generate_words(
         self,
         job_input: JobInput,
-        job_info: RunningJob,
         on_new_state: Callable[[RunningState], None],
         on_new_word_result: Callable[[GeneratedWord], None],
+        cancel_event: threading.Event,
     ) -> Union[bool, str]:
-        def on_new_result(sample_result: SampledImage):
-            on_new_state(
-                RunningState.generating(
-                    current=sample_result.current, total=sample_result.total
-                )
+        style_image, character_data = load_character_data(
+            characters=job_input.input_text,
+        )
+
+        # Wait for the model if it is being preloaded. Without a preloaded model,
+        # run_sample loads the model for this job.
+        with self.__model_lock:
+            loaded_model = self.__loaded_model
+
+        progress_publisher = SamplingProgressPublisher(
+            preview_interval=self.__preview_interval, on_new_state=on_new_state
+        )
+
+        def on_new_step(sampled_step: SampledStep):
+            progress_publisher.publish_step(
+                step=sampled_step.step,
+                total_steps=sampled_step.total_steps,
+                current=sampled_step.current,
+                total=sampled_step.total,
             )
-            on_new_word_result(
-                GeneratedWord.from_image(
-                    word=sample_result.word,
-                    image=(
-                        sample_result.image if sample_result.image is not None else None
-                    ),
+
+        def on_new_preview(sampled_preview: SampledPreview):
+            progress_publisher.publish_x0_pred(
+                word=sampled_preview.word,
+                step=sampled_preview.step,
+                total_steps=sampled_preview.total_steps,
+                x0_pred=sampled_preview.x0_pred,
+                current=sampled_preview.current,
+                total=sampled_preview.total,
+            )
+
+        # Encode each image while the next character is being generated
+        with ImageEncodingPipeline(
+            image_encoding=self.__image_encoding,
+            on_new_word_result=on_new_word_result,
+            transparent=job_input.transparent,
+            vectorize=self.__vectorize,
+        ) as encoding_pipeline:
+
+            def on_new_result(sample_result: SampledImage):
+                on_new_state(
+                    RunningState.generating(
+                        current=sample_result.current, total=sample_result.total
+                    )
+                )
+                encoding_pipeline.submit(
+                    word=sample_result.word, image=sample_result.image
                 )
+
+            run_sample(
+                style_image=style_image,
+                character_data=character_data,
+                seed=job_input.seed if job_input.seed is not None else self.__seed,
+                img_save_path=self.__image_save_path,
+                attention_backend=ATTENTION_BACKEND,
+                precision=self.__precision,
+                loaded_model=loaded_model,
+                timestep_respacing=QUALITY_TIER_TIMESTEP_RESPACING[
+                    job_input.quality_tier
+                ],
+                on_new_result=on_new_result,
+                on_new_preview=on_new_preview if job_input.preview else None,
+                on_new_step=on_new_step,
+                cancel_event=cancel_event,
             )
 
+            encoding_pipeline.flush()
+
+        return True
+
+    async def __generation(
+        self,
+        job_input: JobInput,
+        job_info: RunningJob,
+        on_new_state: Callable[[RunningState], None],
+        on_new_word_result: Callable[[GeneratedWord], None],
+    ) -> Union[bool, str]:
         if job_input.input_text == "":
             return True
 
-        style_image, character_data = load_character_data(
-            characters=job_input.input_text,
-        )
-        run_sample(
-            style_image=style_image,
-            character_data=character_data,
-            seed=self.__seed,
-            img_save_path=self.__image_save_path,
-            on_new_result=on_new_result,
+        # Sample in a worker thread, so that the job can be cancelled while sampling
+        cancel_event = threading.Event()
+        generation = asyncio.ensure_future(
+            asyncio.to_thread(
+                self.__generate_words,
+                job_input=job_input,
+                on_new_state=on_new_state,
+                on_new_word_result=on_new_word_result,
+                cancel_event=cancel_event,
+            )
         )
-
-        return True
+        try:
+            return await asyncio.shield(generation)
+        except asyncio.CancelledError:
+            # Stop sampling after the current step, and free the model for the next job
+            cancel_event.set()
+            with contextlib.suppress(SamplingCancelled):
+                await generation
+            raise
 
     def generate_text(
         self,
@@ -71,3 +216,18 @@ class FontGenerationApplication(TextGeneratorPort):
                 on_new_word_result=on_new_word_result,
             )
         )
+
+    def estimate_job_cost(self, job_input: JobInput) -> float:
+        timestep_respacing = QUALITY_TIER_TIMESTEP_RESPACING[job_input.quality_tier]
+        num_steps = int(timestep_respacing.removeprefix("ddim"))
+        # The spaces are not generated
+        num_characters = sum(not char.isspace() for char in job_input.input_text)
+        return num_characters * num_steps
+
+    def prepare(self) -> None:
+        if self.__preload_thread is None:
+            self.__preload_thread = threading.Thread(target=self.__preload, daemon=True)
+            self.__preload_thread.start()
+
+    def get_readiness(self) -> ModelReadiness:
+        return self.__readiness
@@ -0,0 +1,91 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from PIL import Image
+
+from adapter.data_access.background_removal import remove_background
+from adapter.data_access.glyph_tracing import trace_glyph
+from domain.value.generated_word import GeneratedWord
+from domain.value.image_encoding import ImageEncoding
+
+
+class ImageEncodingPipeline:
+    """Encodes generated images on worker threads, so that encoding an image
+    overlaps with generating the next one.
+
+    Encoded words are passed to `on_new_word_result` in the order they are submitted,
+    and always on the thread that calls `submit` or `flush`.
+
+    If `transparent` is set, the paper background of each image is removed before encoding.
+    If `vectorize` is set, each image is also traced to an SVG.
+    """
+
+    __image_encoding: ImageEncoding
+    __on_new_word_result: Callable[[GeneratedWord], None]
+    __transparent: bool
+    __vectorize: bool
+    __executor: ThreadPoolExecutor
+    __pending: deque[Future[GeneratedWord]]
+
+    def __init__(
+        self,
+        image_encoding: ImageEncoding,
+        on_new_word_result: Callable[[GeneratedWord], None],
+        max_workers: int = 1,
+        transparent: bool = False,
+        vectorize: bool = False,
+    ):
+        self.__image_encoding = image_encoding
+        self.__on_new_word_result = on_new_word_result
+        self.__transparent = transparent
+        self.__vectorize = vectorize
+        self.__executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="image-encoding"
+        )
+        self.__pending = deque()
+
+    def __enter__(self) -> "ImageEncodingPipeline":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        # Drop queued work if generation failed; otherwise let it finish
+        self.__executor.shutdown(wait=True, cancel_futures=exc_type is not None)
+
+    def submit(
+        self, word: str, image: Optional[Image.Image], nfe: Optional[int] = None
+    ) -> None:
+        """Queue an image for encoding and publish any results that are already done.
+        `nfe` is the number of model evaluations spent on the image, if reported."""
+        future = self.__executor.submit(self.__encode, word=word, image=image, nfe=nfe)
+        self.__pending.append(future)
+        self.__publish(block=False)
+
+    def flush(self) -> None:
+        """Wait for all queued images and publish them."""
+        self.__publish(block=True)
+
+    def __encode(
+        self, word: str, image: Optional[Image.Image], nfe: Optional[int]
+    ) -> GeneratedWord:
+        if image is None:
+            return GeneratedWord(word=word, image=None, nfe=nfe)
+
+        if self.__transparent:
+            image = remove_background(image)
+        if self.__vectorize:
+            vector_image = trace_glyph(image)
+        else:
+            vector_image = None
+
+        return GeneratedWord(
+            word=word,
+            image=self.__image_encoding.encode(image),
+            vector_image=vector_image,
+            nfe=nfe,
+        )
+
+    def __publish(self, block: bool) -> None:
+        while self.__pending and (block or self.__pending[0].done()):
+            generated_word = self.__pending.popleft().result()
+            self.__on_new_word_result(generated_word)
@@ -6,13 +6,18 @@ from application.port_out.image_repository_port import ImageRepositoryPort
 
 class InMemoryResourceStorage(ImageRepositoryPort):
     __files: dict[UUID, bytes]
+    __vector_files: dict[UUID, bytes]
 
     def __init__(self):
         self.__files = {}
+        self.__vector_files = {}
 
     def get_image(self, image_id: UUID) -> Optional[bytes]:
         return self.__files.get(image_id, None)
 
+    def get_vector_image(self, image_id: UUID) -> Optional[bytes]:
+        return self.__vector_files.get(image_id, None)
+
     def save_image(self, image: bytes) -> UUID:
         image_id = uuid4()
         self.__files[image_id] = image
@@ -21,6 +26,11 @@ class InMemoryResourceStorage(ImageRepositoryPort):
     def save_image_to_id(self, image: bytes, image_id: UUID) -> None:
         self.__files[image_id] = image
 
+    def save_vector_image_to_id(self, vector_image: bytes, image_id: UUID) -> None:
+        self.__vector_files[image_id] = vector_image
+
     def delete_image(self, image_id: UUID) -> None:
         if image_id in self.__files:
             del self.__files[image_id]
+        if image_id in self.__vector_files:
+            del self.__vector_files[image_id]
@@ -0,0 +1,83 @@
+from typing import Callable, Optional
+
+import torch
+import torch.nn.functional as F
+from PIL import Image
+
+from domain.value.glyph_preview import GlyphPreview
+from domain.value.running_state import RunningState
+
+PREVIEW_SIZE = 32  # width and height of the previews, in pixels
+
+
+def to_preview_image(x0_pred: torch.Tensor, size: int = PREVIEW_SIZE) -> Image.Image:
+    """Downsample the first glyph of a batch of glyphs predicted by the model, in
+    [-1, 1], to a small grayscale image.
+    """
+    glyph = F.interpolate(x0_pred[:1].float(), size=(size, size), mode="area")
+    gray = ((glyph.mean(dim=1)[0] + 1) * 127.5).clamp(0, 255).to(torch.uint8)
+    return Image.fromarray(gray.cpu().numpy(), mode="L")
+
+
+class SamplingProgressPublisher:
+    """Publish the steps of sampling each glyph as the running state of the job,
+    with a preview of the glyph predicted by the model every few steps.
+    """
+
+    __preview_interval: int
+    __on_new_state: Callable[[RunningState], None]
+    __preview: Optional[GlyphPreview] = None  # the latest preview
+    __preview_current: Optional[int] = None  # the glyph of the latest preview
+    __x0_pred_step: int = 0  # the step of the latest predicted glyph
+    __x0_pred_current: Optional[int] = None  # the glyph of the latest predicted glyph
+
+    def __init__(
+        self, preview_interval: int, on_new_state: Callable[[RunningState], None]
+    ):
+        self.__preview_interval = preview_interval
+        self.__on_new_state = on_new_state
+
+    def publish_step(self, step: int, total_steps: int, current: int, total: int):
+        # Keep the latest preview until the next one, but not on the next glyph
+        preview = self.__preview if self.__preview_current == current else None
+        self.__on_new_state(
+            RunningState.sampling(
+                current=current,
+                total=total,
+                step=step,
+                total_steps=total_steps,
+                preview=preview,
+            )
+        )
+
+    def publish_x0_pred(
+        self,
+        word: str,
+        step: int,
+        total_steps: int,
+        x0_pred: torch.Tensor,
+        current: int,
+        total: int,
+    ):
+        previous_step = self.__x0_pred_step if self.__x0_pred_current == current else 0
+        self.__x0_pred_step = step
+        self.__x0_pred_current = current
+        # The model is evaluated on pure noise at step 0. The steps may skip a
+        # multiple of the interval, e.g. the model evaluations of adaptive steps.
+        if (
+            step == 0
+            or step // self.__preview_interval
+            == previous_step // self.__preview_interval
+        ):
+            return
+
+        self.__preview = GlyphPreview.from_image(
+            word=word,
+            step=step,
+            total_steps=total_steps,
+            image=to_preview_image(x0_pred),
+        )
+        self.__preview_current = current
+        self.publish_step(
+            step=step, total_steps=total_steps, current=current, total=total
+        )
@@ -10,13 +10,23 @@ from application.port_in.image_accessor_port import ImageAccessorPort
 from application.port_in.job_management_port import JobManagementPort
 from application.port_out.image_repository_port import ImageRepositoryPort
 from application.port_out.text_generator_port import TextGeneratorPort
-from domain.value.font_gen_service_config import FontGenServiceConfig
+from domain.value.font_gen_service_config import FontGenServiceConfig, Precision
+from domain.value.image_encoding import ColorMode, ImageEncoding, ImageFormat
 
 ### Constants ###
 
 
 OPERATE_QUEUE_INTERVAL = 2.0  # seconds
 MAX_RETAIN_TIME = 300.0  # seconds
+IMAGE_FORMAT = ImageFormat.PNG  # format of the generated images served to clients
+IMAGE_COMPRESS_LEVEL = 6  # 0 (fastest) to 9 (smallest)
+IMAGE_COLOR_MODE = ColorMode.RGB  # rgb, grayscale or bilevel (1-bit)
+IMAGE_BILEVEL_THRESHOLD = 128  # gray level below which a bilevel pixel is ink
+IMAGE_DITHER = False  # dither bilevel images instead of thresholding
+VECTORIZE_IMAGES = False  # also trace the generated images to SVG
+PRECISION = Precision.FP32  # precision of the font generation model
+PRELOAD_MODEL = True  # load and warm up the model at startup, not in the first job
+PREVIEW_INTERVAL = 5  # solver steps between the glyph previews of a job
 
 
 """Terminology:
@@ -32,16 +42,40 @@ Non-Singleton Dependencies: These are dependencies that create new instances eac
 """
 
 
+def get_font_gen_service_config() -> FontGenServiceConfig:
+    """Non-singleton dependency that returns FontGenServiceConfig."""
+    return FontGenServiceConfig(
+        operate_queue_interval=OPERATE_QUEUE_INTERVAL,
+        max_retain_time=MAX_RETAIN_TIME,
+        precision=PRECISION,
+    )
+
+
 class TextGeneratorPortProvider:
     """Provides a singleton instance of TextGeneratorPort"""
 
     __font_generation_application: Optional[FontGenerationApplication] = None
 
-    def __call__(self) -> TextGeneratorPort:
+    def __call__(
+        self,
+        font_gen_service_config: Annotated[
+            FontGenServiceConfig, Depends(get_font_gen_service_config)
+        ],
+    ) -> TextGeneratorPort:
         if self.__font_generation_application is None:
             self.__font_generation_application = FontGenerationApplication(
                 seed=None,
                 image_save_path=None,
+                image_encoding=ImageEncoding(
+                    image_format=IMAGE_FORMAT,
+                    compress_level=IMAGE_COMPRESS_LEVEL,
+                    color_mode=IMAGE_COLOR_MODE,
+                    bilevel_threshold=IMAGE_BILEVEL_THRESHOLD,
+                    dither=IMAGE_DITHER,
+                ),
+                vectorize=VECTORIZE_IMAGES,
+                precision=font_gen_service_config.precision.value,
+                preview_interval=PREVIEW_INTERVAL,
             )
         return self.__font_generation_application
 
@@ -71,14 +105,6 @@ class ImageRepositoryPortProvider:
 get_image_repository_port = ImageRepositoryPortProvider()
 
 
-def get_font_gen_service_config() -> FontGenServiceConfig:
-    """Non-singleton dependency that returns FontGenServiceConfig."""
-    return FontGenServiceConfig(
-        operate_queue_interval=OPERATE_QUEUE_INTERVAL,
-        max_retain_time=MAX_RETAIN_TIME,
-    )
-
-
 class JobManagementPortProvider:
     """Provides a singleton instance of JobManagementPort"""
 
@@ -136,6 +162,22 @@ class ImageAccessorPortProvider:
 get_image_accessor_port = ImageAccessorPortProvider()
 
 
+def preload_model():
+    """Create the singleton dependencies outside of a request, at startup,
+    and start loading and warming up the model in the background."""
+    if not PRELOAD_MODEL:
+        return
+    font_gen_service_config = get_font_gen_service_config()
+    job_management_port = get_job_management_port(
+        text_generator_port=get_text_generator_port(
+            font_gen_service_config=font_gen_service_config
+        ),
+        image_repository_port=get_image_repository_port(),
+        font_gen_service_config=font_gen_service_config,
+    )
+    job_management_port.prepare_text_generator()
+
+
 def reset_all_dependencies():
     """Reset all singleton instances defined in this file to their initial state."""
     get_text_generator_port.reset()
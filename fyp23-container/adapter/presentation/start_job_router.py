@@ -1,4 +1,4 @@
-from typing import Annotated
+from typing import Annotated, Optional
 
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
@@ -6,12 +6,16 @@ from pydantic import BaseModel
 from adapter.presentation.dependencies import get_job_management_port
 from application.port_in.job_management_port import JobManagementPort
 from domain.value.job_input import JobInput
+from domain.value.quality_tier import QualityTier
 
 start_job_router = APIRouter()
 
 
 class StartJobRequest(BaseModel):
     input_text: str
+    quality_tier: QualityTier = QualityTier.Standard
+    preview: bool = False
+    seed: Optional[int] = None
 
 
 class StartJobResponse(BaseModel):
@@ -22,7 +26,14 @@ class StartJobResponse(BaseModel):
 async def start_job(
     start_job_request: StartJobRequest,
     job_management_port: Annotated[JobManagementPort, Depends(get_job_management_port)],
+    transparent: bool = False,
 ):
-    job_input = JobInput(input_text=start_job_request.input_text)
+    job_input = JobInput(
+        input_text=start_job_request.input_text,
+        transparent=transparent,
+        quality_tier=start_job_request.quality_tier,
+        preview=start_job_request.preview,
+        seed=start_job_request.seed,
+    )
     job_id = job_management_port.start_job(job_input=job_input)
     return StartJobResponse(job_id=str(job_id))
@@ -23,6 +23,7 @@ from domain.value.job_info import (
 )
 from domain.value.job_input import JobInput
 from domain.value.job_status import JobStatus
+from domain.value.model_readiness import ModelReadiness
 from domain.value.running_state import RunningState
 
 
@@ -55,14 +56,18 @@ class JobManagementService(JobManagementPort):
     def start_job(self, job_input: JobInput):
         new_job_id = uuid4()
         queue_size = self.__job_queue.size()
+        job_cost = self.__text_generator_port.estimate_job_cost(job_input=job_input)
         new_job = Job(
             job_id=new_job_id,
             job_input=job_input,
             job_status=JobStatus.Waiting,
-            job_info=WaitingJob.create(place_in_queue=queue_size + 1),
+            job_info=WaitingJob.create(
+                place_in_queue=queue_size + 1,
+                cost_ahead=self.__job_queue.total_cost(),
+            ),
         )
         self.__job_table.add_job(new_job)
-        self.__job_queue.add_job(new_job_id)
+        self.__job_queue.add_job(new_job_id, cost=job_cost)
         return new_job_id
 
     def retrieve_job(self, job_id: UUID) -> Optional[Job]:
@@ -71,6 +76,12 @@ class JobManagementService(JobManagementPort):
     def interrupt_job(self, job_id: UUID) -> None:
         self.__job_table.cancel_job(job_id)
 
+    def prepare_text_generator(self) -> None:
+        self.__text_generator_port.prepare()
+
+    def get_readiness(self) -> ModelReadiness:
+        return self.__text_generator_port.get_readiness()
+
     def continuously_operate_queue(self) -> threading.Thread:
         def on_new_state(job: Job, state: RunningState):
             assert isinstance(
@@ -93,8 +104,15 @@ class JobManagementService(JobManagementPort):
                 # If the image data is available, save it to the file system
                 image_id = self.__image_repository_port.save_image(image=image)
 
+                if generated_word.vector_image is not None:
+                    self.__image_repository_port.save_vector_image_to_id(
+                        vector_image=generated_word.vector_image, image_id=image_id
+                    )
+
             # Add the word result to the job's generation result
-            generated_word_location = GeneratedWordLocation(word, image_id)
+            generated_word_location = GeneratedWordLocation(
+                word, image_id, nfe=generated_word.nfe
+            )
             job.add_generated_word_location(generated_word_location)
 
         async def operate_queue() -> None:
@@ -105,7 +123,9 @@ class JobManagementService(JobManagementPort):
                 return
 
             job_id = self.__job_queue.dequeue_job(
-                shift_queue=lambda: self.__job_table.shift_job_queue()
+                shift_queue=lambda dequeued_job_cost: self.__job_table.shift_job_queue(
+                    dequeued_job_cost=dequeued_job_cost
+                )
             )
 
             job = self.__job_table.get_job(job_id)
@@ -18,3 +18,13 @@ class ImageAccessorPort(ABC):
         :return: The image if found, otherwise None.
         """
         pass
+
+    @abstractmethod
+    def get_vector_image(self, image_id: UUID) -> Optional[bytes]:
+        """
+        Retrieve the vector (SVG) version of an image by the ID of the image.
+
+        :param image_id: The ID of the image.
+        :return: The SVG if found, otherwise None.
+        """
+        pass
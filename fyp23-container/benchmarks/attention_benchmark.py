@@ -0,0 +1,66 @@
+"""Benchmark the attention backends of QKVAttentionLegacy at the attention
+resolutions of the fyp23 UNet (80x80 images, see cfg/test_cfg.yaml).
+
+Run from the container root:
+    python -m benchmarks.attention_benchmark
+"""
+
+import argparse
+import time
+
+import torch
+
+from fyp23_model.utils.unet import (
+    ATTENTION_BACKENDS,
+    QKVAttentionLegacy,
+    is_sdpa_available,
+    set_attention_backend,
+)
+
+NUM_HEADS = 4
+
+# (resolution, channels) of the attention blocks in the UNet
+ATTENTION_LAYERS = [(40, 256), (20, 384), (10, 512)]
+
+
+def time_forward(layer, qkv, repeat: int) -> float:
+    with torch.no_grad():
+        layer(qkv)  # warm up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            layer(qkv)
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--device", type=str, default="cpu")
+    args = parser.parse_args()
+
+    backends = [
+        backend
+        for backend in ATTENTION_BACKENDS
+        if backend != "sdpa" or is_sdpa_available()
+    ]
+
+    print(
+        f"{'layer':<16}" + "".join(f"{backend + ' (ms)':>14}" for backend in backends)
+    )
+    for resolution, channels in ATTENTION_LAYERS:
+        layer = QKVAttentionLegacy(NUM_HEADS)
+        qkv = torch.randn(
+            args.batch_size, 3 * channels, resolution * resolution, device=args.device
+        )
+
+        times = []
+        for backend in backends:
+            set_attention_backend(layer, backend)
+            times.append(time_forward(layer, qkv, args.repeat))
+        name = f"{resolution}x{resolution}"
+        print(f"{name:<16}" + "".join(f"{time:>14.2f}" for time in times))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Benchmark removing the paper background of generated glyphs,
+one pixel at a time against one array operation per glyph and per batch.
+
+Run from the container root:
+    python -m benchmarks.background_removal_benchmark
+"""
+
+import argparse
+import time
+
+import numpy as np
+from PIL import Image
+
+from adapter.data_access.background_removal import (
+    remove_background,
+    remove_background_batch,
+)
+from benchmarks.image_encoding_benchmark import load_glyphs
+
+
+def remove_background_per_pixel(img: Image.Image, threshold: int = 200):
+    """The original per-pixel loop of fyp23_model.sample.remove_background"""
+    img = img.convert("RGBA")
+    width, height = img.size
+    pixels = img.load()
+    for x in range(width):
+        for y in range(height):
+            r, g, b, a = pixels[x, y]
+            if r > threshold or g > threshold or b > threshold:
+                pixels[x, y] = (r, g, b, 0)
+    return img
+
+
+def time_per_glyph(function, repeat: int, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / (repeat * count) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=96)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    glyphs = load_glyphs(args.size)
+    print(f"{args.size}x{args.size} glyphs, {args.repeat} runs")
+    print(f"{'method':<26}{'time per glyph (us)':>22}")
+
+    per_pixel_time = time_per_glyph(
+        lambda: [remove_background_per_pixel(glyph) for glyph in glyphs],
+        args.repeat,
+        len(glyphs),
+    )
+    print(f"{'per-pixel loop':<26}{per_pixel_time:>22.1f}")
+
+    per_glyph_time = time_per_glyph(
+        lambda: [remove_background(glyph) for glyph in glyphs],
+        args.repeat,
+        len(glyphs),
+    )
+    print(f"{'per glyph':<26}{per_glyph_time:>22.1f}")
+
+    for batch_size in args.batch_sizes:
+        batch = np.stack(
+            [np.asarray(glyphs[idx % len(glyphs)]) for idx in range(batch_size)]
+        )
+        batch_time = time_per_glyph(
+            lambda: remove_background_batch(batch), args.repeat, batch_size
+        )
+        print(f"{f'batch of {batch_size}':<26}{batch_time:>22.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Compare DPM-Solver++ with DDIM on the fyp23 UNet: the UNet evaluations and the time
+to sample a glyph, and how far the glyph is from the converged solution of the
+diffusion ODE (a DDIM run with many steps from the same noise).
+
+Run from the container root:
+    python -m benchmarks.dpm_solver_benchmark --model-path fyp23_model/ckpt/ema_0.9999_446000.pt
+
+Without --model-path, the model has random weights, so the distances only show how
+fast each sampler converges, not the glyph quality.
+"""
+
+import argparse
+import time
+
+import torch
+import yaml
+
+from fyp23_model.configs.sample_config import create_sample_cfg, sample_default_args
+from fyp23_model.utils import gaussian_diffusion as gd
+from fyp23_model.utils.dpm_solver_sampling import dpm_solver_sample_loop
+from fyp23_model.utils.script_util import (
+    create_gaussian_diffusion,
+    create_model_and_diffusion,
+    model_and_diffusion_defaults,
+)
+from fyp23_model.utils.unet import set_attention_backend
+
+
+class CountingModel:
+    """Counts the UNet evaluations of a sampler."""
+
+    def __init__(self, model, model_kwargs):
+        self.model = model
+        self.model_kwargs = model_kwargs
+        self.num_calls = 0
+
+    def __call__(self, x_t, t, **kwargs):
+        self.num_calls += 1
+        return self.model(x_t, t, **self.model_kwargs)
+
+
+def sample_ddim(cfg, model, noise, steps: int) -> torch.Tensor:
+    diffusion = create_gaussian_diffusion(
+        steps=cfg["diffusion_steps"],
+        noise_schedule=cfg["noise_schedule"],
+        timestep_respacing=f"ddim{steps}",
+    )
+    return diffusion.ddim_sample_loop(
+        model, noise.shape, noise=noise, clip_denoised=True, device=noise.device
+    )
+
+
+def sample_dpm_solver(cfg, model, noise, steps: int, order: int) -> torch.Tensor:
+    return dpm_solver_sample_loop(
+        model,
+        noise.shape,
+        betas=gd.get_named_beta_schedule(cfg["noise_schedule"], cfg["diffusion_steps"]),
+        steps=steps,
+        order=order,
+        noise=noise,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-path", type=str, default=None)
+    parser.add_argument("--reference-steps", type=int, default=250)
+    parser.add_argument("--ddim-steps", type=int, nargs="+", default=[10, 25])
+    parser.add_argument(
+        "--dpm-solver-steps", type=int, nargs="+", default=[5, 8, 10, 15, 20]
+    )
+    parser.add_argument("--dpm-solver-order", type=int, default=2)
+    args = parser.parse_args()
+
+    with open(sample_default_args.cfg_path, "r", encoding="utf-8") as f:
+        cfg = create_sample_cfg(yaml.load(f, Loader=yaml.FullLoader))
+    model, _ = create_model_and_diffusion(
+        **{key: cfg[key] for key in model_and_diffusion_defaults().keys()}
+    )
+    torch.manual_seed(0)
+    if args.model_path is not None:
+        model.load_state_dict(torch.load(args.model_path, map_location="cpu"))
+    else:
+        # The output layer is zero-initialized before training
+        torch.nn.init.normal_(model.out[-1].weight, std=0.05)
+    model.eval()
+    set_attention_backend(model, "sdpa")
+
+    shape = (1, 3, cfg["image_size"], cfg["image_size"])
+    with torch.no_grad():
+        model_kwargs = {
+            "sty": model.sty_encoder(torch.rand(shape) * 2 - 1),
+            "cont": torch.rand(shape) * 2 - 1,
+        }
+    noise = torch.randn(shape)
+
+    samplers = {f"ddim{steps}": ("ddim", steps) for steps in args.ddim_steps}
+    for steps in args.dpm_solver_steps:
+        samplers[f"dpm_solver++{steps}"] = ("dpm_solver++", steps)
+
+    with torch.no_grad():
+        reference = sample_ddim(
+            cfg, CountingModel(model, model_kwargs), noise, args.reference_steps
+        )
+        print(
+            f"{'sampler':<18}{'UNet evals':>12}{'glyph (s)':>11}"
+            f"{'mean diff':>11}{'max diff':>10}"
+        )
+        for name, (sampler, steps) in samplers.items():
+            counting_model = CountingModel(model, model_kwargs)
+            start = time.perf_counter()
+            if sampler == "ddim":
+                sample = sample_ddim(cfg, counting_model, noise, steps)
+            else:
+                sample = sample_dpm_solver(
+                    cfg, counting_model, noise, steps, args.dpm_solver_order
+                )
+            glyph_time = time.perf_counter() - start
+            # In 8-bit gray levels of the glyph
+            diff = (sample - reference).abs() * 127.5
+            print(
+                f"{name:<18}{counting_model.num_calls:>12}{glyph_time:>11.1f}"
+                f"{diff.mean().item():>11.1f}{diff.max().item():>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
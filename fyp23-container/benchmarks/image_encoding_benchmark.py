@@ -0,0 +1,79 @@
+"""Benchmark the encode time and size of generated glyphs in each image format.
+
+Run from the container root:
+    python -m benchmarks.image_encoding_benchmark
+"""
+
+import argparse
+import glob
+import os
+import time
+
+from PIL import Image
+
+from domain.value.image_encoding import ColorMode, ImageEncoding, ImageFormat
+
+GLYPH_DIRECTORY = "tests/adapter/data_access/test_generate_single_result"
+
+ENCODINGS = [
+    ("png (level 1)", dict(image_format=ImageFormat.PNG, compress_level=1)),
+    ("png (level 6)", dict(image_format=ImageFormat.PNG, compress_level=6)),
+    ("png (level 9)", dict(image_format=ImageFormat.PNG, compress_level=9)),
+    ("webp lossless (level 1)", dict(image_format=ImageFormat.WEBP, compress_level=1)),
+    ("webp lossless (level 6)", dict(image_format=ImageFormat.WEBP, compress_level=6)),
+    ("qoi", dict(image_format=ImageFormat.QOI)),
+    ("raw grayscale", dict(image_format=ImageFormat.RAW_GRAYSCALE)),
+    ("png grayscale", dict(color_mode=ColorMode.GRAYSCALE)),
+    ("png bilevel", dict(color_mode=ColorMode.BILEVEL)),
+    ("png bilevel (dithered)", dict(color_mode=ColorMode.BILEVEL, dither=True)),
+    (
+        "raw bilevel",
+        dict(image_format=ImageFormat.RAW_GRAYSCALE, color_mode=ColorMode.BILEVEL),
+    ),
+]
+
+
+def load_glyphs(size: int) -> list[Image.Image]:
+    paths = sorted(glob.glob(os.path.join(GLYPH_DIRECTORY, "*.png")))
+    glyphs = [Image.open(path).convert("RGB") for path in paths]
+    return [
+        glyph if glyph.size == (size, size) else glyph.resize((size, size))
+        for glyph in glyphs
+    ]
+
+
+def benchmark(image_encoding: ImageEncoding, glyphs: list[Image.Image], repeat: int):
+    total_bytes = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for glyph in glyphs:
+            total_bytes += len(image_encoding.encode(glyph))
+    elapsed = time.perf_counter() - start
+
+    count = repeat * len(glyphs)
+    return elapsed / count * 1e6, total_bytes / count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[96, 80])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        glyphs = load_glyphs(size)
+        print(f"{size}x{size} glyphs ({len(glyphs)} images x {args.repeat} runs)")
+        print(f"{'encoding':<26}{'encode time (us)':>18}{'bytes per glyph':>18}")
+        for name, encoding_options in ENCODINGS:
+            try:
+                image_encoding = ImageEncoding(**encoding_options)
+            except ValueError as e:
+                print(f"{name:<26}{'skipped: ' + str(e):>36}")
+                continue
+            encode_time, size_in_bytes = benchmark(image_encoding, glyphs, args.repeat)
+            print(f"{name:<26}{encode_time:>18.1f}{size_in_bytes:>18.0f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
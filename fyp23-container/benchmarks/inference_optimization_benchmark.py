@@ -0,0 +1,131 @@
+"""Profile the fyp23 UNet layer by layer with and without the inference optimizations:
+the time spent in each block for one denoising step, and how far the predicted noise
+drifts from the unoptimized model.
+
+Run from the container root:
+    python -m benchmarks.inference_optimization_benchmark --model-path fyp23_model/ckpt/ema_0.9999_446000.pt
+
+Without --model-path, the model has random weights.
+"""
+
+import argparse
+import copy
+import time
+from collections import defaultdict
+
+import torch
+import yaml
+
+from fyp23_model.configs.sample_config import create_sample_cfg, sample_default_args
+from fyp23_model.utils.inference_optimization import optimize_for_inference
+from fyp23_model.utils.script_util import (
+    create_model_and_diffusion,
+    model_and_diffusion_defaults,
+)
+from fyp23_model.utils.unet import set_attention_backend
+
+
+def profiled_blocks(model) -> dict:
+    blocks = {"time_embed": model.time_embed}
+    for i, block in enumerate(model.input_blocks):
+        blocks[f"input_blocks.{i}"] = block
+    blocks["middle_block"] = model.middle_block
+    for i, block in enumerate(model.output_blocks):
+        blocks[f"output_blocks.{i}"] = block
+    blocks["out"] = model.out
+    return blocks
+
+
+def profile_step(model, inputs, repeat: int) -> tuple[dict, torch.Tensor]:
+    """Return the milliseconds spent in each block per step, and the output."""
+    x_t, t, sty_feat, con_img = inputs
+    times = defaultdict(float)
+    starts = {}
+    handles = []
+    for name, block in profiled_blocks(model).items():
+
+        def pre_hook(module, args, name=name):
+            starts[name] = time.perf_counter()
+
+        def hook(module, args, output, name=name):
+            times[name] += time.perf_counter() - starts[name]
+
+        handles.append(block.register_forward_pre_hook(pre_hook))
+        handles.append(block.register_forward_hook(hook))
+
+    with torch.no_grad():
+        model(x_t, t, sty=sty_feat, cont=con_img)  # warm up
+        times.clear()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            output = model(x_t, t, sty=sty_feat, cont=con_img)
+        times["total"] = time.perf_counter() - start
+    for handle in handles:
+        handle.remove()
+    return {name: t / repeat * 1e3 for name, t in times.items()}, output
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-path", type=str, default=None)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--optimizations",
+        type=str,
+        nargs="+",
+        default=["channels_last", "fuse", "channels_last,fuse"],
+        help="the sets of optimizations to profile, comma-separated",
+    )
+    args = parser.parse_args()
+
+    with open(sample_default_args.cfg_path, "r", encoding="utf-8") as f:
+        cfg = create_sample_cfg(yaml.load(f, Loader=yaml.FullLoader))
+    model, _ = create_model_and_diffusion(
+        **{key: cfg[key] for key in model_and_diffusion_defaults().keys()}
+    )
+    torch.manual_seed(0)
+    if args.model_path is not None:
+        model.load_state_dict(torch.load(args.model_path, map_location="cpu"))
+    else:
+        # The output layer is zero-initialized before training
+        torch.nn.init.normal_(model.out[-1].weight, std=0.05)
+    model.eval()
+    set_attention_backend(model, "sdpa")
+
+    shape = (args.batch_size, 3, cfg["image_size"], cfg["image_size"])
+    with torch.no_grad():
+        sty_feat = model.sty_encoder(torch.rand(shape) * 2 - 1)
+    inputs = (
+        torch.randn(shape),
+        torch.full((args.batch_size,), 500),
+        sty_feat,
+        torch.rand(shape) * 2 - 1,
+    )
+
+    profiles = {}
+    drifts = {}
+    for optimizations in ["baseline"] + args.optimizations:
+        optimized_model = copy.deepcopy(model)
+        if optimizations != "baseline":
+            optimize_for_inference(optimized_model, optimizations.split(","))
+        profiles[optimizations], output = profile_step(
+            optimized_model, inputs, args.repeat
+        )
+        if optimizations == "baseline":
+            reference = output
+        drifts[optimizations] = (
+            (output - reference).abs().max() / reference.abs().max()
+        ).item()
+
+    print(f"{'block (ms)':<18}" + "".join(f"{name:>20}" for name in profiles))
+    for block in profiles["baseline"]:
+        print(
+            f"{block:<18}"
+            + "".join(f"{profile[block]:>20.1f}" for profile in profiles.values())
+        )
+    print(f"{'drift':<18}" + "".join(f"{drift:>20.1e}" for drift in drifts.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark the precisions of the fyp23 UNet: the latency of one denoising step,
+and how far the predicted noise drifts from fp32.
+
+Run from the container root:
+    python -m benchmarks.precision_benchmark --model-path fyp23_model/ckpt/ema_0.9999_446000.pt
+
+Without --model-path, the model has random weights. The glyph quality of the
+precisions is evaluated with FontMetrics by the benchmark of fyp24.
+"""
+
+import argparse
+import copy
+import time
+
+import torch
+import yaml
+
+from fyp23_model.configs.sample_config import create_sample_cfg, sample_default_args
+from fyp23_model.utils.precision import PRECISIONS, precision_autocast, set_precision
+from fyp23_model.utils.script_util import (
+    create_model_and_diffusion,
+    model_and_diffusion_defaults,
+)
+from fyp23_model.utils.unet import set_attention_backend
+
+
+def time_step(model, inputs, precision: str, repeat: int) -> tuple[float, torch.Tensor]:
+    x_t, t, sty_feat, con_img = inputs
+    with torch.no_grad(), precision_autocast(precision, "cpu"):
+        model(x_t, t, sty=sty_feat, cont=con_img)  # warm up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            output = model(x_t, t, sty=sty_feat, cont=con_img)
+    return (time.perf_counter() - start) / repeat * 1e3, output.float()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-path", type=str, default=None)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(sample_default_args.cfg_path, "r", encoding="utf-8") as f:
+        cfg = create_sample_cfg(yaml.load(f, Loader=yaml.FullLoader))
+    model, _ = create_model_and_diffusion(
+        **{key: cfg[key] for key in model_and_diffusion_defaults().keys()}
+    )
+    torch.manual_seed(0)
+    if args.model_path is not None:
+        model.load_state_dict(torch.load(args.model_path, map_location="cpu"))
+    else:
+        # The output layer is zero-initialized before training
+        torch.nn.init.normal_(model.out[-1].weight, std=0.05)
+    model.eval()
+    set_attention_backend(model, "sdpa")
+
+    shape = (args.batch_size, 3, cfg["image_size"], cfg["image_size"])
+    with torch.no_grad():
+        sty_feat = model.sty_encoder(torch.rand(shape) * 2 - 1)
+    inputs = (
+        torch.randn(shape),
+        torch.full((args.batch_size,), 500),
+        sty_feat,
+        torch.rand(shape) * 2 - 1,
+    )
+
+    print(f"{'precision':<10}{'step (ms)':>12}{'speedup':>9}{'drift':>9}")
+    for precision in PRECISIONS:
+        precision_model = set_precision(copy.deepcopy(model), precision)
+        step_time, output = time_step(precision_model, inputs, precision, args.repeat)
+        if precision == "fp32":
+            fp32_step_time, fp32_output = step_time, output
+        # Mean absolute difference of the predicted noise relative to fp32
+        drift = (output - fp32_output).abs().mean() / fp32_output.abs().mean()
+        print(
+            f"{precision:<10}{step_time:>12.1f}{fp32_step_time / step_time:>9.2f}"
+            f"{drift.item():>9.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
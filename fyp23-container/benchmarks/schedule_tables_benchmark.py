@@ -0,0 +1,78 @@
+"""Profile the overhead of the fyp23 diffusion loops around the UNet: the time of a
+sampling step with a model that costs nothing, with the schedule tables gathered
+on the device, and with the NumPy schedule arrays converted at every step as
+before.
+
+Run from the container root:
+    python -m benchmarks.schedule_tables_benchmark --device cuda
+"""
+
+import argparse
+import time
+
+import torch
+import yaml
+
+from fyp23_model.configs.sample_config import create_sample_cfg, sample_default_args
+from fyp23_model.utils import gaussian_diffusion as gd
+from fyp23_model.utils.script_util import create_gaussian_diffusion
+
+
+def zero_model(x_t, t, **kwargs):
+    return torch.zeros_like(x_t)
+
+
+def extract_from_arrays(diffusion):
+    """Make the diffusion convert its NumPy schedule arrays at every step."""
+
+    def extract(name, timesteps, broadcast_shape):
+        return gd._extract_into_tensor(
+            getattr(diffusion, name), timesteps, broadcast_shape
+        )
+
+    diffusion._extract = extract
+
+
+def time_step(cfg, shape, device: str, tables: bool, repeat: int) -> float:
+    diffusion = create_gaussian_diffusion(
+        steps=cfg["diffusion_steps"],
+        noise_schedule=cfg["noise_schedule"],
+        timestep_respacing=cfg["timestep_respacing"],
+    )
+    if not tables:
+        extract_from_arrays(diffusion)
+    sample_loop = (
+        diffusion.ddim_sample_loop if cfg["use_ddim"] else diffusion.p_sample_loop
+    )
+    noise = torch.randn(shape, device=device)
+
+    sample_loop(zero_model, shape, noise=noise, device=device)  # warm up
+    if device == "cuda":
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        sample_loop(zero_model, shape, noise=noise, device=device)
+    if device == "cuda":
+        torch.cuda.synchronize()
+    return (time.perf_counter() - start) / repeat / diffusion.num_timesteps * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(sample_default_args.cfg_path, "r", encoding="utf-8") as f:
+        cfg = create_sample_cfg(yaml.load(f, Loader=yaml.FullLoader))
+    shape = (args.batch_size, 3, cfg["image_size"], cfg["image_size"])
+
+    print(f"{'schedule':<18}{'step overhead (us)':>20}")
+    for name, tables in [("NumPy arrays", False), ("device tables", True)]:
+        step_time = time_step(cfg, shape, args.device, tables, args.repeat)
+        print(f"{name:<18}{step_time:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
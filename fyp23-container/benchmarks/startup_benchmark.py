@@ -0,0 +1,127 @@
+"""Benchmark the startup of the fyp23 UNet: the time to load the checkpoint into the
+model and the peak memory of the process, for the checkpoint read into bytes and
+loaded from them (as before), the checkpoint loaded from the file, and the
+safetensors checkpoint memory-mapped.
+
+Run from the container root:
+    python -m benchmarks.startup_benchmark --model-path fyp23_model/ckpt/ema_0.9999_446000.pt
+
+Without --model-path, a checkpoint with random weights is saved to a temporary
+directory. Each loader runs in a fresh process, after a first run to warm up the
+page cache. The peak memory is the growth of the resident memory while loading,
+which is read from /proc, so the benchmark runs on Linux only.
+"""
+
+import argparse
+import io
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import torch
+import yaml
+
+from fyp23_model.configs.sample_config import create_sample_cfg, sample_default_args
+from fyp23_model.utils import dist_util
+from fyp23_model.utils.checkpoint import convert_checkpoint
+from fyp23_model.utils.script_util import (
+    create_model_and_diffusion,
+    model_and_diffusion_defaults,
+)
+
+LOADERS = ("bytes", "file", "safetensors")
+
+
+def create_model():
+    with open(sample_default_args.cfg_path, "r", encoding="utf-8") as f:
+        cfg = create_sample_cfg(yaml.load(f, Loader=yaml.FullLoader))
+    model, _ = create_model_and_diffusion(
+        **{key: cfg[key] for key in model_and_diffusion_defaults().keys()}
+    )
+    return model
+
+
+def load_from_bytes(path):
+    """The loader before loading from the file, without the MPI broadcast."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return torch.load(io.BytesIO(data), map_location="cpu")
+
+
+def read_memory(field: str) -> float:
+    """Read a memory field of this process in MB (Linux only)."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1]) / 1024
+    raise KeyError(field)
+
+
+def measure(loader: str, ckpt_dir: str):
+    """Load the model in this process and print the load time and peak memory."""
+    model = create_model()
+    # Reset the peak resident memory, so that the memory of the model is left out
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    start_rss = read_memory("VmRSS")
+    start = time.perf_counter()
+    if loader == "bytes":
+        state_dict = load_from_bytes(f"{ckpt_dir}/model.pt")
+    elif loader == "file":
+        state_dict = dist_util.load_state_dict(
+            f"{ckpt_dir}/model.pt", map_location="cpu"
+        )
+    else:
+        state_dict = dist_util.load_state_dict(
+            f"{ckpt_dir}/model.safetensors", map_location="cpu"
+        )
+    model.load_state_dict(state_dict)
+    load_time = time.perf_counter() - start
+    peak_rss = read_memory("VmHWM")
+    print(f"RESULT {load_time} {peak_rss - start_rss}")
+
+
+def run(loader: str, ckpt_dir: str) -> list[float]:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup_benchmark"]
+        + ["--measure", loader, "--ckpt-dir", ckpt_dir],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    result = next(line for line in output.splitlines() if line.startswith("RESULT"))
+    return [float(value) for value in result.split()[1:]]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-path", type=str, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--measure", type=str, choices=LOADERS, default=None)
+    parser.add_argument("--ckpt-dir", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure is not None:
+        measure(args.measure, args.ckpt_dir)
+        return
+
+    with tempfile.TemporaryDirectory() as ckpt_dir:
+        if args.model_path is None:
+            torch.manual_seed(0)
+            torch.save(create_model().state_dict(), f"{ckpt_dir}/model.pt")
+        else:
+            shutil.copy(args.model_path, f"{ckpt_dir}/model.pt")
+        convert_checkpoint(f"{ckpt_dir}/model.pt")
+
+        print(f"{'loader':<14}{'load (s)':>10}{'peak memory (MB)':>18}")
+        for loader in LOADERS:
+            run(loader, ckpt_dir)  # warm up the page cache
+            results = [run(loader, ckpt_dir) for _ in range(args.repeat)]
+            load_time, peak = [min(r) for r in zip(*results)]
+            print(f"{loader:<14}{load_time:>10.2f}{peak:>18.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,9 @@
-import io
 from typing import Optional
 
 from PIL import Image
 from pydantic import BaseModel, ConfigDict
 
-IMAGE_FORMAT = "PNG"
+from domain.value.image_encoding import ImageEncoding
 
 
 class GeneratedWord(BaseModel):
@@ -13,23 +12,35 @@ class GeneratedWord(BaseModel):
     word: str
     success: bool
     image: Optional[bytes]
-
-    def __init__(self, word: str, image: Optional[bytes]):
+    vector_image: Optional[bytes] = None  # SVG traced from the image
+    nfe: Optional[int] = None  # model evaluations spent on the image, if reported
+
+    def __init__(
+        self,
+        word: str,
+        image: Optional[bytes],
+        vector_image: Optional[bytes] = None,
+        nfe: Optional[int] = None,
+    ):
         if len(word) != 1:
             raise ValueError("Word must be a single character, got: {}".format(word))
 
         success = image is not None
 
-        super().__init__(word=word, image=image, success=success)
+        super().__init__(
+            word=word, image=image, vector_image=vector_image, success=success, nfe=nfe
+        )
 
     @staticmethod
-    def from_image(word: str, image: Optional[Image.Image]) -> "GeneratedWord":
+    def from_image(
+        word: str,
+        image: Optional[Image.Image],
+        image_encoding: ImageEncoding = ImageEncoding(),
+        nfe: Optional[int] = None,
+    ) -> "GeneratedWord":
         if image is not None:
-            image_stream = io.BytesIO()
-            image.save(image_stream, format=IMAGE_FORMAT)
-            image_stream.seek(0)
-            image_bytes = image_stream.getvalue()
+            image_bytes = image_encoding.encode(image)
         else:
             image_bytes = None
 
-        return GeneratedWord(word=word, image=image_bytes)
+        return GeneratedWord(word=word, image=image_bytes, nfe=nfe)
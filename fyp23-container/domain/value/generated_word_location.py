@@ -10,11 +10,12 @@ class GeneratedWordLocation(BaseModel):
     word: str
     success: bool
     image_id: Optional[UUID]
+    nfe: Optional[int] = None  # model evaluations spent on the image, if reported
 
-    def __init__(self, word: str, image_id: Optional[UUID]):
+    def __init__(self, word: str, image_id: Optional[UUID], nfe: Optional[int] = None):
         if len(word) != 1:
             raise ValueError("Word must be a single character, got: {}".format(word))
 
         success = image_id is not None
 
-        super().__init__(word=word, success=success, image_id=image_id)
+        super().__init__(word=word, success=success, image_id=image_id, nfe=nfe)
@@ -0,0 +1,23 @@
+import io
+
+from PIL import Image
+from pydantic import BaseModel, ConfigDict
+
+
+class GlyphPreview(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    word: str
+    step: int  # the solver step the glyph is predicted at
+    total_steps: int
+    image: bytes  # PNG of the downsampled glyph
+
+    @staticmethod
+    def from_image(
+        word: str, step: int, total_steps: int, image: Image.Image
+    ) -> "GlyphPreview":
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        return GlyphPreview(
+            word=word, step=step, total_steps=total_steps, image=buffer.getvalue()
+        )
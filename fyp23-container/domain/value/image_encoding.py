@@ -0,0 +1,134 @@
+import io
+from enum import Enum
+
+from PIL import Image
+from pydantic import BaseModel, ConfigDict
+
+
+class ImageFormat(Enum):
+    PNG = "png"
+    WEBP = "webp"
+    QOI = "qoi"
+    # Binary PGM/PBM: a short header followed by the raw pixels
+    RAW_GRAYSCALE = "raw-grayscale"
+
+
+class ColorMode(Enum):
+    RGB = "rgb"
+    GRAYSCALE = "grayscale"  # single-channel 8-bit
+    BILEVEL = "bilevel"  # single-channel 1-bit (black ink or white paper)
+
+
+# Pillow image modes of each color mode
+PILLOW_MODES = {
+    ColorMode.RGB: "RGB",
+    ColorMode.GRAYSCALE: "L",
+    ColorMode.BILEVEL: "1",
+}
+
+
+# Pillow format names used to save each image format
+PILLOW_FORMATS = {
+    ImageFormat.PNG: "PNG",
+    ImageFormat.WEBP: "WEBP",
+    ImageFormat.QOI: "QOI",
+    ImageFormat.RAW_GRAYSCALE: "PPM",
+}
+
+# Pillow's PNG encoder uses zlib's default level when none is given
+DEFAULT_COMPRESS_LEVEL = 6
+
+
+def flatten(image: Image.Image) -> Image.Image:
+    """Composite an image with transparency onto white paper."""
+    if "A" not in image.getbands():
+        return image
+    paper = Image.new("RGBA", image.size, color="white")
+    return Image.alpha_composite(paper, image.convert("RGBA")).convert("RGB")
+
+
+class ImageEncoding(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    image_format: ImageFormat = ImageFormat.PNG
+
+    # 0 (fastest) to 9 (smallest); used as the zlib level for PNG and
+    # scaled to the encoder effort for lossless WebP; ignored by other formats
+    compress_level: int = DEFAULT_COMPRESS_LEVEL
+
+    # The models draw black ink on white paper, so a single channel keeps the glyph intact
+    color_mode: ColorMode = ColorMode.RGB
+
+    # For bilevel images: gray levels below the threshold become ink,
+    # unless dithering is used to keep the soft edges of strokes
+    bilevel_threshold: int = 128
+    dither: bool = False
+
+    def __init__(self, **data):
+        super().__init__(**data)
+        if not 0 <= self.compress_level <= 9:
+            raise ValueError("compress_level must be between 0 and 9")
+        if not 0 <= self.bilevel_threshold <= 255:
+            raise ValueError("bilevel_threshold must be between 0 and 255")
+        if self.image_format == ImageFormat.QOI and self.color_mode != ColorMode.RGB:
+            raise ValueError("QOI only supports the rgb color mode")
+        Image.init()
+        if PILLOW_FORMATS[self.image_format] not in Image.SAVE:
+            raise ValueError(
+                f"Image format {self.image_format.value} is not supported by the installed Pillow"
+            )
+
+    def convert(self, image: Image.Image) -> Image.Image:
+        """Convert an image to the color mode of this encoding.
+        Transparency is kept: as an alpha channel for rgb and grayscale,
+        and as transparent paper for bilevel.
+        """
+        has_alpha = "A" in image.getbands()
+        mode = PILLOW_MODES[self.color_mode]
+
+        if self.color_mode != ColorMode.BILEVEL:
+            if has_alpha:
+                mode += "A"
+            return image if image.mode == mode else image.convert(mode)
+
+        if image.mode == mode:
+            return image
+        if has_alpha:
+            image = flatten(image)
+        grayscale = image.convert("L")
+        if self.dither:
+            bilevel = grayscale.convert("1", dither=Image.Dither.FLOYDSTEINBERG)
+        else:
+            threshold_table = [
+                0 if level < self.bilevel_threshold else 255 for level in range(256)
+            ]
+            bilevel = grayscale.point(threshold_table, "1")
+        if has_alpha:
+            bilevel.info["transparency"] = 1  # the paper (white) pixels
+        return bilevel
+
+    def encode(self, image: Image.Image) -> bytes:
+        image = self.convert(image)
+        image_stream = io.BytesIO()
+
+        if self.image_format == ImageFormat.PNG:
+            image.save(image_stream, format="PNG", compress_level=self.compress_level)
+        elif self.image_format == ImageFormat.WEBP:
+            method = round(self.compress_level * 6 / 9)
+            if image.mode == "1" and "transparency" in image.info:
+                # WebP has no palette transparency, so turn the paper into alpha
+                alpha = image.convert("L").point(lambda level: 255 - level)
+                image = image.convert("RGBA")
+                image.putalpha(alpha)
+            image.save(image_stream, format="WEBP", lossless=True, method=method)
+        elif self.image_format == ImageFormat.QOI:
+            image.save(image_stream, format="QOI")
+        elif self.image_format == ImageFormat.RAW_GRAYSCALE:
+            # The format has no alpha channel
+            if image.mode not in ("L", "1"):
+                image = flatten(image).convert("L")
+            image.save(image_stream, format="PPM")
+        else:
+            raise ValueError(f"Unknown image format: {self.image_format}")
+
+        return image_stream.getvalue()
@@ -1,7 +1,17 @@
+from typing import Optional
+
 from pydantic import BaseModel, ConfigDict
 
+from .quality_tier import QualityTier
+
 
 class JobInput(BaseModel):
     model_config = ConfigDict(frozen=True, extra="forbid")
 
     input_text: str
+    transparent: bool = False  # remove the paper background of the glyphs
+    quality_tier: QualityTier = QualityTier.Standard
+    preview: bool = False  # publish previews of the glyphs while they are generated
+    seed: Optional[int] = None  # seed of the noise of the glyphs, random if None
+    # take as few solver steps as each glyph needs, within the budget of the tier
+    adaptive_steps: bool = False
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel, ConfigDict
 
 from domain.value.generated_word_location import GeneratedWordLocation
@@ -14,3 +16,15 @@ class JobResult(BaseModel):
 
     def add_word_location(self, word_location: GeneratedWordLocation) -> None:
         self.generated_word_locations.append(word_location)
+
+    def mean_nfe(self) -> Optional[float]:
+        """The mean model evaluations per generated word, of the words that report
+        them, or None if none does."""
+        nfes = [
+            location.nfe
+            for location in self.generated_word_locations
+            if location.nfe is not None
+        ]
+        if not nfes:
+            return None
+        return sum(nfes) / len(nfes)
@@ -0,0 +1,41 @@
+from pydantic import BaseModel, ConfigDict
+
+
+class ModelReadiness(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    name: str
+    message: str
+    is_ready: bool
+
+    @staticmethod
+    def not_loaded() -> "ModelReadiness":
+        return ModelReadiness(
+            name="not loaded",
+            message="The model will be loaded by the first job",
+            is_ready=False,
+        )
+
+    @staticmethod
+    def loading() -> "ModelReadiness":
+        return ModelReadiness(
+            name="loading", message="Loading the model", is_ready=False
+        )
+
+    @staticmethod
+    def warming_up() -> "ModelReadiness":
+        return ModelReadiness(
+            name="warming up", message="Warming up the model", is_ready=False
+        )
+
+    @staticmethod
+    def ready() -> "ModelReadiness":
+        return ModelReadiness(name="ready", message="The model is ready", is_ready=True)
+
+    @staticmethod
+    def failed(error_message: str) -> "ModelReadiness":
+        return ModelReadiness(
+            name="failed",
+            message=f"Failed to load the model: {error_message}",
+            is_ready=False,
+        )
@@ -0,0 +1,10 @@
+from enum import Enum
+
+
+class QualityTier(Enum):
+    """The quality of the glyphs of a job, traded for the time to generate them.
+    The text generator maps each tier to the sampling steps of its model."""
+
+    Draft = "draft"  # for interactive previews
+    Standard = "standard"
+    High = "high"  # for final renders
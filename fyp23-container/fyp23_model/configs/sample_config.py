@@ -3,7 +3,12 @@ from typing import Optional
 
 from pydantic import BaseModel, ConfigDict
 
+from fyp23_model.utils.inference_optimization import INFERENCE_OPTIMIZATIONS
 from fyp23_model.utils.script_util import model_and_diffusion_defaults
+from fyp23_model.utils.dpm_solver_sampling import SAMPLERS
+from fyp23_model.utils.precision import PRECISIONS
+from fyp23_model.utils.quantization import QUANTIZATION_MODES
+from fyp23_model.utils.unet import ATTENTION_BACKENDS
 
 
 def get_file_path(filename: str):
@@ -30,6 +35,15 @@ class DefaultArguments(BaseModel):
     classifier_free: bool = False  # (unused)
     cont_scale: float = 3.0  # (unused)
     sk_scale: float = 3.0  # (unused)
+    attention_backend: str = "math"
+    inference_optimizations: tuple[str, ...] = ()
+    quantization: str = "none"
+    quantization_calibration_characters: str = "永和九年歲在癸丑"
+    precision: str = "fp32"
+    timestep_respacing: Optional[str] = None  # defaults to the cfg
+    sampler: str = "diffusion"
+    dpm_solver_steps: int = 10
+    dpm_solver_order: int = 2
 
 
 sample_default_args = DefaultArguments()
@@ -99,6 +113,67 @@ def add_sample_arguments(parser):
         type=float,
         default=sample_default_args.sk_scale,
     )
+    parser.add_argument(
+        "--attention_backend",
+        type=str,
+        default=sample_default_args.attention_backend,
+        choices=ATTENTION_BACKENDS,
+        help="attention backend of the UNet; sdpa requires PyTorch 2.0 or above",
+    )
+    parser.add_argument(
+        "--inference_optimizations",
+        type=str,
+        nargs="*",
+        default=list(sample_default_args.inference_optimizations),
+        choices=INFERENCE_OPTIMIZATIONS,
+        help="optimization passes applied to the UNet after loading",
+    )
+    parser.add_argument(
+        "--quantization",
+        type=str,
+        default=sample_default_args.quantization,
+        choices=QUANTIZATION_MODES,
+        help="quantize the UNet to INT8 for inference on the CPU",
+    )
+    parser.add_argument(
+        "--quantization_calibration_characters",
+        type=str,
+        default=sample_default_args.quantization_calibration_characters,
+        help="characters rendered from the TTF to calibrate static quantization",
+    )
+    parser.add_argument(
+        "--precision",
+        type=str,
+        default=sample_default_args.precision,
+        choices=PRECISIONS,
+        help="precision of the UNet; bf16 is fast on CPUs with AVX-512 BF16 or AMX, fp16 is meant for GPUs",
+    )
+    parser.add_argument(
+        "--timestep_respacing",
+        type=str,
+        default=sample_default_args.timestep_respacing,
+        help="sampling steps in place of the timestep_respacing of the cfg, e.g. ddim8",
+    )
+    parser.add_argument(
+        "--sampler",
+        type=str,
+        default=sample_default_args.sampler,
+        choices=SAMPLERS,
+        help="sample with the diffusion of the cfg, or with multistep DPM-Solver++",
+    )
+    parser.add_argument(
+        "--dpm_solver_steps",
+        type=int,
+        default=sample_default_args.dpm_solver_steps,
+        help="number of DPM-Solver++ steps, each evaluating the UNet once",
+    )
+    parser.add_argument(
+        "--dpm_solver_order",
+        type=int,
+        default=sample_default_args.dpm_solver_order,
+        choices=[1, 2, 3],
+        help="order of DPM-Solver++",
+    )
 
 
 def create_sample_cfg(cfg):
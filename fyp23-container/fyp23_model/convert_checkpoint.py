@@ -0,0 +1,29 @@
+import argparse
+
+from fyp23_model.configs.sample_config import sample_default_args
+from fyp23_model.utils.checkpoint import convert_checkpoint
+
+
+def main():
+    """
+    Convert the model checkpoint to safetensors, which sample.py then loads
+    memory-mapped in place of the checkpoint.
+
+    Usage (from the container root):
+        python -m fyp23_model.convert_checkpoint --model_path <checkpoint path>
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--model_path",
+        type=str,
+        default=sample_default_args.model_path,
+        help="path to the model checkpoint",
+    )
+    args = parser.parse_args()
+
+    output_path = convert_checkpoint(args.model_path)
+    print(f"converted the model checkpoint to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
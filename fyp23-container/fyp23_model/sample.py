@@ -2,7 +2,8 @@ import argparse
 import os
 import random
 import shutil
-from typing import Callable, Optional
+import threading
+from typing import Callable, Optional, Sequence
 
 import numpy as np
 import torch as th
@@ -22,11 +23,21 @@ from fyp23_model.configs.sample_config import (
 )
 from fyp23_model.font2img import create_character_images_from_font
 from fyp23_model.utils import dist_util, logger
+from fyp23_model.utils import gaussian_diffusion as gd
+from fyp23_model.utils.checkpoint import find_checkpoint
+from fyp23_model.utils.dpm_solver_sampling import SAMPLERS, dpm_solver_sample_loop
+from fyp23_model.utils.inference_optimization import optimize_for_inference
+from fyp23_model.utils.precision import precision_autocast, set_precision
+from fyp23_model.utils.quantization import calibrate_unet, quantize_model
+from fyp23_model.utils.respace import SpacedDiffusion
 from fyp23_model.utils.script_util import (
     args_to_dict,
+    create_gaussian_diffusion,
     create_model_and_diffusion,
     model_and_diffusion_defaults,
 )
+from fyp23_model.utils.seeding import create_sample_generator
+from fyp23_model.utils.unet import set_attention_backend
 
 
 class CharacterData:
@@ -64,6 +75,56 @@ class SampledImage:
         self.total = total
 
 
+class SampledStep:
+    """
+    The progress of sampling a character, in steps of the sampler.
+    """
+
+    word: str
+    step: int
+    total_steps: int
+    current: int
+    total: int
+
+    def __init__(
+        self, word: str, step: int, total_steps: int, current: int, total: int
+    ):
+        self.word = word
+        self.step = step
+        self.total_steps = total_steps
+        self.current = current
+        self.total = total
+
+
+class SampledPreview:
+    """
+    The x_0 predicted at a step of sampling a character, to preview the character.
+    """
+
+    word: str
+    x0_pred: th.Tensor  # in [-1, 1]
+    step: int
+    total_steps: int
+    current: int
+    total: int
+
+    def __init__(
+        self,
+        word: str,
+        x0_pred: th.Tensor,
+        step: int,
+        total_steps: int,
+        current: int,
+        total: int,
+    ):
+        self.word = word
+        self.x0_pred = x0_pred
+        self.step = step
+        self.total_steps = total_steps
+        self.current = current
+        self.total = total
+
+
 def img_pre_pros(img_path: Image.Image, image_size: tuple[int, int]) -> np.ndarray:
     pil_image = img_path.resize((image_size, image_size))
     pil_image.load()
@@ -95,6 +156,15 @@ def main():
     classifier_free = parser.classifier_free
     cont_gudiance_scale = parser.cont_scale
     sk_gudiance_scale = parser.sk_scale
+    attention_backend = parser.attention_backend
+    inference_optimizations = parser.inference_optimizations
+    quantization = parser.quantization
+    quantization_calibration_characters = parser.quantization_calibration_characters
+    precision = parser.precision
+    timestep_respacing = parser.timestep_respacing
+    sampler = parser.sampler
+    dpm_solver_steps = parser.dpm_solver_steps
+    dpm_solver_order = parser.dpm_solver_order
 
     # read font2img arguments
     ttf_path = parser.ttf_path
@@ -127,6 +197,15 @@ def main():
         classifier_free=classifier_free,
         cont_gudiance_scale=cont_gudiance_scale,
         sk_gudiance_scale=sk_gudiance_scale,
+        attention_backend=attention_backend,
+        inference_optimizations=inference_optimizations,
+        quantization=quantization,
+        quantization_calibration_characters=quantization_calibration_characters,
+        precision=precision,
+        timestep_respacing=timestep_respacing,
+        sampler=sampler,
+        dpm_solver_steps=dpm_solver_steps,
+        dpm_solver_order=dpm_solver_order,
     )
 
 
@@ -199,6 +278,101 @@ def load_character_data(
     return style_image, character_data
 
 
+class LoadedModel:
+    """
+    The UNet and diffusion created by load_model, which run_sample can reuse
+    instead of loading the model again.
+    """
+
+    model: th.nn.Module
+    diffusion: SpacedDiffusion
+    precision: str
+
+    def __init__(self, model: th.nn.Module, diffusion: SpacedDiffusion, precision: str):
+        self.model = model
+        self.diffusion = diffusion
+        self.precision = precision
+
+
+def load_model(
+    cfg_path: str = sample_default_args.cfg_path,
+    model_path: str = sample_default_args.model_path,
+    attention_backend: str = sample_default_args.attention_backend,
+    inference_optimizations: Sequence[
+        str
+    ] = sample_default_args.inference_optimizations,
+    quantization: str = sample_default_args.quantization,
+    quantization_calibration_characters: str = sample_default_args.quantization_calibration_characters,
+    precision: str = sample_default_args.precision,
+    style_image: Optional[Image.Image] = None,
+) -> LoadedModel:
+    """
+    Create the UNet and diffusion and load the checkpoint into the UNet.
+
+    :param style_image: the style image to calibrate static quantization with;
+        defaults to the default style image.
+    """
+    if quantization != "none" and precision != "fp32":
+        raise ValueError("Quantized models can only run in fp32 precision")
+
+    # set up cfg
+    with open(cfg_path, "r", encoding="utf-8") as f:
+        cfg = yaml.load(f, Loader=yaml.FullLoader)
+    cfg = AttrDict(create_sample_cfg(cfg))
+
+    # set up distributed training
+    dist_util.setup_dist()
+
+    # create UNet model and diffusion
+    logger.log("creating model and diffusion...")
+    model, diffusion = create_model_and_diffusion(
+        **args_to_dict(cfg, model_and_diffusion_defaults().keys())
+    )
+
+    # load model
+    model.load_state_dict(
+        dist_util.load_state_dict(find_checkpoint(model_path), map_location="cpu")
+    )
+    model.to(dist_util.dev())
+    if cfg.use_fp16:
+        model.convert_to_fp16()
+    model.eval()
+    set_attention_backend(model, attention_backend)
+    optimize_for_inference(model, inference_optimizations)
+    set_precision(model, precision)
+    if quantization != "none":
+        if style_image is None:
+            style_image = Image.open(sample_default_args.sty_img_path)
+        logger.log(f"quantizing the model in {quantization} mode...")
+        quantize_unet(
+            model=model,
+            diffusion=diffusion,
+            mode=quantization,
+            calibration_characters=quantization_calibration_characters,
+            style_image=img_pre_pros(style_image, cfg.image_size),
+            image_size=cfg.image_size,
+        )
+
+    return LoadedModel(model=model, diffusion=diffusion, precision=precision)
+
+
+def create_respaced_diffusion(cfg, timestep_respacing: str) -> SpacedDiffusion:
+    """
+    Create the diffusion of the cfg with other sampling steps, e.g. "ddim8".
+    The UNet samples with any respacing of the diffusion steps it was trained on.
+    """
+    return create_gaussian_diffusion(
+        steps=cfg.diffusion_steps,
+        learn_sigma=cfg.learn_sigma,
+        noise_schedule=cfg.noise_schedule,
+        use_kl=cfg.use_kl,
+        predict_xstart=cfg.predict_xstart,
+        rescale_timesteps=cfg.rescale_timesteps,
+        rescale_learned_sigmas=cfg.rescale_learned_sigmas,
+        timestep_respacing=timestep_respacing,
+    )
+
+
 def run_sample(
     style_image: Image.Image,
     character_data: CharacterData,
@@ -211,8 +385,26 @@ def run_sample(
     classifier_free: bool = sample_default_args.classifier_free,
     cont_gudiance_scale: float = sample_default_args.cont_scale,
     sk_gudiance_scale: float = sample_default_args.sk_scale,
+    attention_backend: str = sample_default_args.attention_backend,
+    inference_optimizations: Sequence[
+        str
+    ] = sample_default_args.inference_optimizations,
+    quantization: str = sample_default_args.quantization,
+    quantization_calibration_characters: str = sample_default_args.quantization_calibration_characters,
+    precision: str = sample_default_args.precision,
+    loaded_model: Optional[LoadedModel] = None,
+    timestep_respacing: Optional[str] = sample_default_args.timestep_respacing,
+    sampler: str = sample_default_args.sampler,
+    dpm_solver_steps: int = sample_default_args.dpm_solver_steps,
+    dpm_solver_order: int = sample_default_args.dpm_solver_order,
     on_new_result: Callable[[SampledImage], None] = lambda _: None,
+    on_new_preview: Optional[Callable[[SampledPreview], None]] = None,
+    on_new_step: Optional[Callable[[SampledStep], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
 ):
+    if sampler not in SAMPLERS:
+        raise ValueError(f"Unknown sampler: {sampler}")
+
     # set up seed
     if seed is None:
         seed = random.randint(0, 2**32 - 1)
@@ -226,6 +418,7 @@ def run_sample(
     cfg = AttrDict(create_sample_cfg(cfg))
 
     # preprocess style image
+    style_image_pil = style_image
     style_image = img_pre_pros(style_image, cfg.image_size)
 
     # preprocess content images
@@ -272,20 +465,24 @@ def run_sample(
     # set up distributed training
     dist_util.setup_dist()
 
-    # create UNet model and diffusion
-    logger.log("creating model and diffusion...")
-    model, diffusion = create_model_and_diffusion(
-        **args_to_dict(cfg, model_and_diffusion_defaults().keys())
-    )
-
-    # load model
-    model.load_state_dict(dist_util.load_state_dict(model_path, map_location="cpu"))
-    model.to(dist_util.dev())
-    if cfg.use_fp16:
-        model.convert_to_fp16()
-    model.eval()
+    # create and load the model, unless it has been loaded by load_model
+    if loaded_model is None:
+        loaded_model = load_model(
+            cfg_path=cfg_path,
+            model_path=model_path,
+            attention_backend=attention_backend,
+            inference_optimizations=inference_optimizations,
+            quantization=quantization,
+            quantization_calibration_characters=quantization_calibration_characters,
+            precision=precision,
+            style_image=style_image_pil,
+        )
+    model = loaded_model.model
+    diffusion = loaded_model.diffusion
+    precision = loaded_model.precision
+    if timestep_respacing is not None:
+        diffusion = create_respaced_diffusion(cfg, timestep_respacing)
     logger.log("sampling...")
-    noise = None
 
     all_images = []
     all_labels = []
@@ -340,22 +537,88 @@ def run_sample(
             dist_util.dev()
         )
 
+        # The noise of each character only depends on the seed and its index in the
+        # text. The seed set above still drives the noise of ancestral sampling.
+        noise = th.randn(
+            (cfg.batch_size, 3, cfg.image_size, cfg.image_size),
+            generator=create_sample_generator(seed, batch_num),
+        ).to(dist_util.dev())
+
         def model_fn(x_t, ts, **model_kwargs):
-            model_output = model(x_t, ts, **model_kwargs)
-            return model_output
+            with precision_autocast(precision, dist_util.dev()):
+                model_output = model(x_t, ts, **model_kwargs)
+            # The diffusion process runs in fp32
+            return model_output.float()
+
+        def on_x0_pred(step: int, total_steps: int, x0_pred: th.Tensor):
+            on_new_preview(
+                SampledPreview(
+                    word=char,
+                    x0_pred=x0_pred,
+                    step=step,
+                    total_steps=total_steps,
+                    current=batch_num,
+                    total=len(content_text),
+                )
+            )
 
-        sample_fn = (
-            diffusion.p_sample_loop if not cfg.use_ddim else diffusion.ddim_sample_loop
-        )
-        sample = sample_fn(
-            model_fn,
-            (cfg.batch_size, 3, cfg.image_size, cfg.image_size),
-            # con_img = con_img,
-            clip_denoised=cfg.clip_denoised,
-            model_kwargs=model_kwargs,
-            device=dist_util.dev(),
-            noise=noise,
-        )
+        def on_step(step: int, total_steps: int):
+            on_new_step(
+                SampledStep(
+                    word=char,
+                    step=step,
+                    total_steps=total_steps,
+                    current=batch_num,
+                    total=len(content_text),
+                )
+            )
+
+        if sampler == "dpm_solver++":
+            sample = dpm_solver_sample_loop(
+                model_fn,
+                (cfg.batch_size, 3, cfg.image_size, cfg.image_size),
+                # The solver runs on the timesteps the UNet was trained on
+                betas=gd.get_named_beta_schedule(
+                    cfg.noise_schedule, cfg.diffusion_steps
+                ),
+                steps=dpm_solver_steps,
+                order=dpm_solver_order,
+                clip_denoised=cfg.clip_denoised,
+                model_kwargs=model_kwargs,
+                device=dist_util.dev(),
+                noise=noise,
+                predict_xstart=cfg.predict_xstart,
+                x0_pred_callback=(
+                    (lambda step, x0_pred: on_x0_pred(step, dpm_solver_steps, x0_pred))
+                    if on_new_preview is not None
+                    else None
+                ),
+                callback=on_step if on_new_step is not None else None,
+                cancel_event=cancel_event,
+            )
+        else:
+            # The progressive loops also yield the x_0 predicted at each step
+            sample_loop_progressive = (
+                diffusion.p_sample_loop_progressive
+                if not cfg.use_ddim
+                else diffusion.ddim_sample_loop_progressive
+            )
+            for step, out in enumerate(
+                sample_loop_progressive(
+                    model_fn,
+                    (cfg.batch_size, 3, cfg.image_size, cfg.image_size),
+                    # con_img = con_img,
+                    clip_denoised=cfg.clip_denoised,
+                    model_kwargs=model_kwargs,
+                    device=dist_util.dev(),
+                    noise=noise,
+                    callback=on_step if on_new_step is not None else None,
+                    cancel_event=cancel_event,
+                )
+            ):
+                if on_new_preview is not None:
+                    on_x0_pred(step, diffusion.num_timesteps, out["pred_xstart"])
+            sample = out["sample"]
 
         sample = ((sample + 1) * 127.5).clamp(0, 255).to(th.uint8)
         sample = sample.permute(0, 2, 3, 1)
@@ -413,26 +676,46 @@ def run_sample(
     logger.log("sampling complete")
 
 
-def remove_background(img: Image.Image):
-    if img.mode != "RGBA":
-        img = img.convert("RGBA")
-
-    threshold = 200  # Adjust this value according to your image
-
-    width, height = img.size
-    pixels = img.load()
+def quantize_unet(
+    model,
+    diffusion,
+    mode: str,
+    calibration_characters: str,
+    style_image: np.ndarray,
+    image_size: int,
+):
+    """Quantize the UNet. Static quantization is calibrated on the calibration
+    characters rendered from the TTF, in the style image.
+    """
+    if dist_util.dev().type != "cpu":
+        raise ValueError("Quantized models can only run on the CPU")
 
-    for x in range(width):
-        for y in range(height):
-            r, g, b, a = pixels[x, y]
+    def calibrate(_):
+        results, _, _ = create_character_images_from_font(
+            characters=calibration_characters,
+            font_path=font2img_default_args.ttf_path,
+        )
+        content_images = th.tensor(
+            np.stack(
+                [
+                    img_pre_pros(result.image, image_size)
+                    for result in results
+                    if result.image is not None
+                ]
+            )
+        )
+        style_images = th.tensor(style_image).expand_as(content_images)
+        calibrate_unet(model, diffusion, content_images, style_images)
 
-            if r > threshold or g > threshold or b > threshold:
-                pixels[x, y] = (r, g, b, 0)  # Set the pixel to transparent
+    quantize_model(model, mode=mode, calibrate=calibrate)
 
-                # if a != 0:
-                # pixels[x, y] = (0, 0, 0, a)
 
-    return img
+def remove_background(img: Image.Image, threshold: int = 200):
+    """Make the pixels with any channel brighter than the threshold transparent."""
+    pixels = np.array(img.convert("RGBA"))
+    is_background = (pixels[..., :3] > threshold).any(axis=-1)
+    pixels[is_background, 3] = 0  # Set the pixels to transparent
+    return Image.fromarray(pixels)
 
 
 if __name__ == "__main__":
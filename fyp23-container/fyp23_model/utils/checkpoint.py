@@ -0,0 +1,42 @@
+import os
+
+import torch as th
+
+
+def find_checkpoint(model_path):
+    """
+    Return the safetensors conversion of a checkpoint if it exists next to it,
+    as it can be memory-mapped, and the checkpoint itself otherwise.
+    """
+    safetensors_path = os.path.splitext(model_path)[0] + ".safetensors"
+    if os.path.exists(safetensors_path):
+        return safetensors_path
+    return model_path
+
+
+def load_safetensors(path):
+    """
+    Load a safetensors checkpoint on the CPU. The file is memory-mapped, so the
+    tensors are read without copying the whole file into memory first.
+    """
+    from safetensors.torch import load_file
+
+    return load_file(path, device="cpu")
+
+
+def convert_checkpoint(model_path):
+    """
+    Convert a .pt checkpoint to a .safetensors checkpoint next to it.
+
+    :return: the path of the converted checkpoint.
+    """
+    from safetensors.torch import save_file
+
+    state_dict = th.load(model_path, map_location="cpu")
+    output_path = os.path.splitext(model_path)[0] + ".safetensors"
+    # safetensors stores each tensor contiguously, without shared storage
+    save_file(
+        {key: tensor.contiguous().clone() for key, tensor in state_dict.items()},
+        output_path,
+    )
+    return output_path
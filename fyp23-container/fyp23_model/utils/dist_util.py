@@ -8,6 +8,8 @@ import torch as th
 import torch.distributed as dist
 from mpi4py import MPI
 
+from .checkpoint import load_safetensors
+
 # Change this to reflect your cluster layout.
 # The GPU for a given rank is (rank % GPUS_PER_NODE).
 GPUS_PER_NODE = 8
@@ -51,6 +53,19 @@ def dev():
 # load model parameter when sampling
 def load_state_dict(path, **kwargs):
 
+    if path.endswith(".safetensors"):
+        # Each rank memory-maps the file, without broadcasting it
+        state_dict = load_safetensors(path)
+        map_location = kwargs.get("map_location")
+        if map_location is not None:
+            state_dict = {k: v.to(map_location) for k, v in state_dict.items()}
+        return state_dict
+
+    if MPI.COMM_WORLD.Get_size() == 1:
+        # Nothing to broadcast, so load from the file without reading it into bytes
+        with bf.BlobFile(path, "rb") as f:
+            return th.load(f, **kwargs)
+
     chunk_size = 2**30  # MPI has a relatively small size limit
     if MPI.COMM_WORLD.Get_rank() == 0:
         with bf.BlobFile(path, "rb") as f:
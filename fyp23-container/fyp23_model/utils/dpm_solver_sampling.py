@@ -0,0 +1,101 @@
+import numpy as np
+import torch as th
+
+from .dpm_solver_pytorch import DPM_Solver, NoiseScheduleVP, model_wrapper
+
+# "diffusion" samples with the diffusion of the cfg (DDIM if use_ddim is set,
+# otherwise ancestral sampling), and "dpm_solver++" with multistep DPM-Solver++
+SAMPLERS = ("diffusion", "dpm_solver++")
+
+# The noise schedules by their betas. A noise schedule memoizes the plans of the
+# solver, which are then reused by the later samples.
+_noise_schedules = {}
+
+
+def get_noise_schedule(betas):
+    """
+    Get the noise schedule of DPM-Solver for the betas of a diffusion, created
+    the first time the betas are used.
+    """
+    betas = np.asarray(betas, dtype=np.float64)
+    key = betas.tobytes()
+    noise_schedule = _noise_schedules.get(key)
+    if noise_schedule is None:
+        noise_schedule = NoiseScheduleVP(
+            schedule="discrete", betas=th.tensor(betas, dtype=th.float32)
+        )
+        _noise_schedules[key] = noise_schedule
+    return noise_schedule
+
+
+def dpm_solver_sample_loop(
+    model,
+    shape,
+    betas,
+    steps,
+    order=2,
+    clip_denoised=True,
+    model_kwargs=None,
+    device=None,
+    noise=None,
+    predict_xstart=False,
+    x0_pred_callback=None,
+    callback=None,
+    cancel_event=None,
+):
+    """
+    Generate samples from the model with multistep DPM-Solver++, which solves the
+    diffusion ODE in far fewer model evaluations than DDIM.
+
+    :param model: the model function, called as model(x_t, t, **model_kwargs)
+        with the timesteps t of the diffusion the model was trained on.
+    :param shape: the shape of the samples, (N, C, H, W).
+    :param betas: the betas of the diffusion the model was trained on, before
+        any timestep respacing.
+    :param steps: the number of solver steps, each evaluating the model once.
+    :param order: the order of the solver, 1 to 3.
+    :param clip_denoised: if True, clip the predicted x_0 to [-1, 1].
+    :param model_kwargs: the extra keyword arguments of the model.
+    :param device: the device to create the noise on, if noise is not given.
+    :param noise: the noise to start sampling from, of the same shape.
+    :param predict_xstart: if True, the model predicts x_0 instead of the noise.
+    :param x0_pred_callback: if not None, a function called as
+        x0_pred_callback(step, x0_pred) with the predicted x_0 at each step.
+    :param callback: if not None, a function called as callback(step, steps)
+        after each step.
+    :param cancel_event: if not None, a threading.Event. Once it is set, the
+        sampling raises SamplingCancelled after the current step.
+    :return: a non-differentiable batch of samples.
+    """
+
+    def predict(x, t, **kwargs):
+        output = model(x, t, **kwargs)
+        # Drop the variances of a model with learned sigmas
+        return output[:, : x.shape[1]]
+
+    noise_schedule = get_noise_schedule(betas)
+    model_fn = model_wrapper(
+        predict,
+        noise_schedule,
+        model_type="x_start" if predict_xstart else "noise",
+        model_kwargs=model_kwargs or {},
+    )
+    dpm_solver = DPM_Solver(
+        model_fn,
+        noise_schedule,
+        algorithm_type="dpmsolver++",
+        correcting_x0_fn=(lambda x0: x0.clamp(-1, 1)) if clip_denoised else None,
+    )
+    if noise is None:
+        noise = th.randn(*shape, device=device)
+    with th.no_grad():
+        return dpm_solver.sample(
+            noise,
+            steps=steps,
+            order=order,
+            skip_type="time_uniform",
+            method="multistep",
+            x0_pred_callback=x0_pred_callback,
+            callback=callback,
+            cancel_event=cancel_event,
+        )
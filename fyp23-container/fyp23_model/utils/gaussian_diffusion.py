@@ -11,6 +11,7 @@ import math
 import numpy as np
 import torch as th
 
+from .dpm_solver_pytorch import SamplingCancelled
 from .losses import discretized_gaussian_log_likelihood, normal_kl
 from .nn import mean_flat
 
@@ -72,6 +73,29 @@ class LossType(enum.Enum):
         return self == LossType.KL or self == LossType.RESCALED_KL
 
 
+# The arrays of the diffusion schedule that the sampling and training steps index
+# by timestep
+SCHEDULE_TABLES = (
+    "alphas_cumprod",
+    "alphas_cumprod_prev",
+    "one_minus_alphas_cumprod",
+    "log_one_minus_alphas_cumprod",
+    "sqrt_alphas_cumprod",
+    "sqrt_one_minus_alphas_cumprod",
+    "sqrt_recip_alphas_cumprod",
+    "sqrt_recipm1_alphas_cumprod",
+    "log_betas",
+    "posterior_variance",
+    "posterior_log_variance_clipped",
+    "posterior_mean_coef1",
+    "posterior_mean_coef2",
+    "recip_posterior_mean_coef1",
+    "posterior_mean_coef2_over_coef1",
+    "fixed_large_variance",
+    "fixed_large_log_variance",
+)
+
+
 class GaussianDiffusion:
 
     def __init__(
@@ -129,15 +153,50 @@ class GaussianDiffusion:
             / (1.0 - self.alphas_cumprod)
         )
 
+        # derived arrays, so that every array used in sampling is a schedule table
+        self.log_betas = np.log(betas)
+        self.one_minus_alphas_cumprod = 1.0 - self.alphas_cumprod
+        # for fixedlarge, we set the initial (log-)variance like so
+        # to get a better decoder log likelihood.
+        self.fixed_large_variance = np.append(self.posterior_variance[1], betas[1:])
+        self.fixed_large_log_variance = np.log(self.fixed_large_variance)
+        self.recip_posterior_mean_coef1 = 1.0 / self.posterior_mean_coef1
+        self.posterior_mean_coef2_over_coef1 = (
+            self.posterior_mean_coef2 / self.posterior_mean_coef1
+        )
+
+        # the schedule tables as float32 tensors, by device
+        self._device_tables = {}
+
+    def _extract(self, name, timesteps, broadcast_shape):
+        """
+        Extract values from a schedule table for a batch of indices.
+
+        The schedule tables are copied to the device of the timesteps the first time
+        they are used on it, so the sampling steps only gather from them.
+
+        :param name: the name of the schedule table, one of SCHEDULE_TABLES.
+        :param timesteps: a tensor of indices into the table.
+        :param broadcast_shape: a larger shape of K dimensions with the batch
+                                dimension equal to the length of timesteps.
+        :return: a tensor of shape [batch_size, 1, ...] where the shape has K dims.
+        """
+        tables = self._device_tables.get(timesteps.device)
+        if tables is None:
+            tables = {
+                table_name: th.from_numpy(getattr(self, table_name))
+                .float()
+                .to(timesteps.device)
+                for table_name in SCHEDULE_TABLES
+            }
+            self._device_tables[timesteps.device] = tables
+        return _extract_into_tensor(tables[name], timesteps, broadcast_shape)
+
     def q_mean_variance(self, x_start, t):  # q-True distribution
 
-        mean = (
-            _extract_into_tensor(self.sqrt_alphas_cumprod, t, x_start.shape) * x_start
-        )
-        variance = _extract_into_tensor(1.0 - self.alphas_cumprod, t, x_start.shape)
-        log_variance = _extract_into_tensor(
-            self.log_one_minus_alphas_cumprod, t, x_start.shape
-        )
+        mean = self._extract("sqrt_alphas_cumprod", t, x_start.shape) * x_start
+        variance = self._extract("one_minus_alphas_cumprod", t, x_start.shape)
+        log_variance = self._extract("log_one_minus_alphas_cumprod", t, x_start.shape)
         return mean, variance, log_variance
 
     def q_sample(self, x_start, t, noise=None):
@@ -146,21 +205,20 @@ class GaussianDiffusion:
             noise = th.randn_like(x_start)
         assert noise.shape == x_start.shape
         return (
-            _extract_into_tensor(self.sqrt_alphas_cumprod, t, x_start.shape) * x_start
-            + _extract_into_tensor(self.sqrt_one_minus_alphas_cumprod, t, x_start.shape)
-            * noise
+            self._extract("sqrt_alphas_cumprod", t, x_start.shape) * x_start
+            + self._extract("sqrt_one_minus_alphas_cumprod", t, x_start.shape) * noise
         )
 
     def q_posterior_mean_variance(self, x_start, x_t, t):
 
         assert x_start.shape == x_t.shape
         posterior_mean = (
-            _extract_into_tensor(self.posterior_mean_coef1, t, x_t.shape) * x_start
-            + _extract_into_tensor(self.posterior_mean_coef2, t, x_t.shape) * x_t
+            self._extract("posterior_mean_coef1", t, x_t.shape) * x_start
+            + self._extract("posterior_mean_coef2", t, x_t.shape) * x_t
         )
-        posterior_variance = _extract_into_tensor(self.posterior_variance, t, x_t.shape)
-        posterior_log_variance_clipped = _extract_into_tensor(
-            self.posterior_log_variance_clipped, t, x_t.shape
+        posterior_variance = self._extract("posterior_variance", t, x_t.shape)
+        posterior_log_variance_clipped = self._extract(
+            "posterior_log_variance_clipped", t, x_t.shape
         )
         assert (
             posterior_mean.shape[0]
@@ -188,29 +246,25 @@ class GaussianDiffusion:
                 model_log_variance = model_var_values
                 model_variance = th.exp(model_log_variance)
             else:
-                min_log = _extract_into_tensor(
-                    self.posterior_log_variance_clipped, t, x.shape
-                )
-                max_log = _extract_into_tensor(np.log(self.betas), t, x.shape)
+                min_log = self._extract("posterior_log_variance_clipped", t, x.shape)
+                max_log = self._extract("log_betas", t, x.shape)
                 # The model_var_values is [-1, 1] for [min_var, max_var].
                 frac = (model_var_values + 1) / 2
                 model_log_variance = frac * max_log + (1 - frac) * min_log
                 model_variance = th.exp(model_log_variance)
         else:
             model_variance, model_log_variance = {
-                # for fixedlarge, we set the initial (log-)variance like so
-                # to get a better decoder log likelihood.
                 ModelVarType.FIXED_LARGE: (
-                    np.append(self.posterior_variance[1], self.betas[1:]),
-                    np.log(np.append(self.posterior_variance[1], self.betas[1:])),
+                    "fixed_large_variance",
+                    "fixed_large_log_variance",
                 ),
                 ModelVarType.FIXED_SMALL: (
-                    self.posterior_variance,
-                    self.posterior_log_variance_clipped,
+                    "posterior_variance",
+                    "posterior_log_variance_clipped",
                 ),
             }[self.model_var_type]
-            model_variance = _extract_into_tensor(model_variance, t, x.shape)
-            model_log_variance = _extract_into_tensor(model_log_variance, t, x.shape)
+            model_variance = self._extract(model_variance, t, x.shape)
+            model_log_variance = self._extract(model_log_variance, t, x.shape)
 
         def process_xstart(x):
             if denoised_fn is not None:
@@ -250,26 +304,22 @@ class GaussianDiffusion:
     def _predict_xstart_from_eps(self, x_t, t, eps):
         assert x_t.shape == eps.shape
         return (
-            _extract_into_tensor(self.sqrt_recip_alphas_cumprod, t, x_t.shape) * x_t
-            - _extract_into_tensor(self.sqrt_recipm1_alphas_cumprod, t, x_t.shape) * eps
+            self._extract("sqrt_recip_alphas_cumprod", t, x_t.shape) * x_t
+            - self._extract("sqrt_recipm1_alphas_cumprod", t, x_t.shape) * eps
         )
 
     def _predict_xstart_from_xprev(self, x_t, t, xprev):
         assert x_t.shape == xprev.shape
         return (  # (xprev - coef2*x_t) / coef1
-            _extract_into_tensor(1.0 / self.posterior_mean_coef1, t, x_t.shape) * xprev
-            - _extract_into_tensor(
-                self.posterior_mean_coef2 / self.posterior_mean_coef1, t, x_t.shape
-            )
-            * x_t
+            self._extract("recip_posterior_mean_coef1", t, x_t.shape) * xprev
+            - self._extract("posterior_mean_coef2_over_coef1", t, x_t.shape) * x_t
         )
 
     def _predict_eps_from_xstart(self, x_t, t, pred_xstart):
 
         return (
-            _extract_into_tensor(self.sqrt_recip_alphas_cumprod, t, x_t.shape) * x_t
-            - pred_xstart
-        ) / _extract_into_tensor(self.sqrt_recipm1_alphas_cumprod, t, x_t.shape)
+            self._extract("sqrt_recip_alphas_cumprod", t, x_t.shape) * x_t - pred_xstart
+        ) / self._extract("sqrt_recipm1_alphas_cumprod", t, x_t.shape)
 
     def _scale_timesteps(self, t):
         if self.rescale_timesteps:
@@ -286,7 +336,7 @@ class GaussianDiffusion:
 
     def condition_score(self, cond_fn, p_mean_var, x, t, model_kwargs=None):
 
-        alpha_bar = _extract_into_tensor(self.alphas_cumprod, t, x.shape)
+        alpha_bar = self._extract("alphas_cumprod", t, x.shape)
 
         eps = self._predict_eps_from_xstart(x, t, p_mean_var["pred_xstart"])
         eps = eps - (1 - alpha_bar).sqrt() * cond_fn(
@@ -343,6 +393,8 @@ class GaussianDiffusion:
         model_kwargs=None,
         device=None,
         progress=False,
+        callback=None,
+        cancel_event=None,
     ):
         final = None
 
@@ -358,6 +410,8 @@ class GaussianDiffusion:
             model_kwargs=model_kwargs,
             device=device,
             progress=progress,
+            callback=callback,
+            cancel_event=cancel_event,
         ):
             final = sample
         return final["sample"]
@@ -375,7 +429,14 @@ class GaussianDiffusion:
         model_kwargs=None,
         device=None,
         progress=False,
+        callback=None,
+        cancel_event=None,
     ):
+        """
+        Yield the output of p_sample at each step. If not None, callback is called
+        as callback(step, num_steps) after each step, and once the threading.Event
+        cancel_event is set, the loop raises SamplingCancelled after the step.
+        """
 
         if device is None:
             device = next(model.parameters()).device
@@ -411,6 +472,10 @@ class GaussianDiffusion:
                 yield out
                 # img = out["sample"][:, 3:, :, :]
                 img = out["sample"]
+            if callback is not None:
+                callback(self.num_timesteps - i, self.num_timesteps)
+            if cancel_event is not None and cancel_event.is_set():
+                raise SamplingCancelled()
 
     def ddim_sample(
         self,
@@ -439,8 +504,8 @@ class GaussianDiffusion:
         # in case we used x_start or x_prev prediction.
         eps = self._predict_eps_from_xstart(x, t, out["pred_xstart"])
 
-        alpha_bar = _extract_into_tensor(self.alphas_cumprod, t, x.shape)
-        alpha_bar_prev = _extract_into_tensor(self.alphas_cumprod_prev, t, x.shape)
+        alpha_bar = self._extract("alphas_cumprod", t, x.shape)
+        alpha_bar_prev = self._extract("alphas_cumprod_prev", t, x.shape)
         sigma = (
             eta
             * th.sqrt((1 - alpha_bar_prev) / (1 - alpha_bar))
@@ -472,6 +537,8 @@ class GaussianDiffusion:
         device=None,
         progress=False,
         eta=0.0,
+        callback=None,
+        cancel_event=None,
     ):
 
         final = None
@@ -489,6 +556,8 @@ class GaussianDiffusion:
             device=device,
             progress=progress,
             eta=eta,
+            callback=callback,
+            cancel_event=cancel_event,
         ):
             final = sample
         return final["sample"]
@@ -507,7 +576,13 @@ class GaussianDiffusion:
         device=None,
         progress=False,
         eta=0.0,
+        callback=None,
+        cancel_event=None,
     ):
+        """
+        Yield the output of ddim_sample at each step, with the callback and the
+        cancel_event of p_sample_loop_progressive.
+        """
 
         if device is None:
             device = next(model.parameters()).device
@@ -543,6 +618,10 @@ class GaussianDiffusion:
                 yield out
                 # img = out["sample"][:, 3:, :, :]
                 img = out["sample"]
+            if callback is not None:
+                callback(self.num_timesteps - i, self.num_timesteps)
+            if cancel_event is not None and cancel_event.is_set():
+                raise SamplingCancelled()
 
     def _vb_terms_bpd(
         self, model, x_start, x_t, t, clip_denoised=True, model_kwargs=None
@@ -637,7 +716,9 @@ class GaussianDiffusion:
 
 def _extract_into_tensor(arr, timesteps, broadcast_shape):
 
-    res = th.from_numpy(arr).to(device=timesteps.device)[timesteps].float()
+    if isinstance(arr, np.ndarray):
+        arr = th.from_numpy(arr).to(device=timesteps.device)
+    res = arr[timesteps].float()
     while len(res.shape) < len(broadcast_shape):
         res = res[..., None]
     return res.expand(broadcast_shape)
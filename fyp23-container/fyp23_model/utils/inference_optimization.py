@@ -0,0 +1,68 @@
+import torch as th
+import torch.nn as nn
+
+from .unet import AttentionBlock
+
+# "channels_last" stores the convolution weights and activations in NHWC, which
+# the oneDNN convolutions prefer. "fuse" folds the affine parameters of the
+# normalizations into the projections that follow them.
+INFERENCE_OPTIMIZATIONS = ("channels_last", "fuse")
+
+
+def fold_norm_affine(norm, projection):
+    """
+    Fold the affine parameters of a GroupNorm into the 1x1 convolution that
+    consumes its output, and remove them from the normalization.
+
+    :return: False if the normalization has no affine parameters.
+    """
+    if norm.weight is None:
+        return False
+    with th.no_grad():
+        shift = projection.weight.flatten(1) @ norm.bias
+        if projection.bias is None:
+            projection.bias = nn.Parameter(shift)
+        else:
+            projection.bias += shift
+        projection.weight *= norm.weight.view(
+            1, -1, *[1] * (projection.weight.dim() - 2)
+        )
+    norm.register_parameter("weight", None)
+    norm.register_parameter("bias", None)
+    norm.affine = False
+    return True
+
+
+def fold_normalizations(model):
+    """
+    Fold the normalizations of the attention blocks into their QKV projections,
+    in place. The normalizations of the residual blocks are followed by an
+    activation, so they cannot be folded.
+
+    :return: the number of folded normalizations.
+    """
+    num_folded = 0
+    for module in model.modules():
+        if isinstance(module, AttentionBlock):
+            num_folded += fold_norm_affine(module.norm, module.qkv)
+    return num_folded
+
+
+def optimize_for_inference(model, optimizations):
+    """
+    Apply the given INFERENCE_OPTIMIZATIONS to the model, in place.
+
+    :return: the number of folded normalizations.
+    """
+    num_folded = 0
+    for optimization in optimizations:
+        if optimization not in INFERENCE_OPTIMIZATIONS:
+            raise ValueError(
+                f"Unknown inference optimization {optimization}, "
+                f"expected one of {INFERENCE_OPTIMIZATIONS}"
+            )
+        if optimization == "fuse":
+            num_folded += fold_normalizations(model)
+        elif optimization == "channels_last":
+            model.to(memory_format=th.channels_last)
+    return num_folded
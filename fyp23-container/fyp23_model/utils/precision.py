@@ -0,0 +1,33 @@
+import torch as th
+
+# "fp32" keeps full precision, "bf16" runs the matrix multiplications and
+# convolutions in bfloat16 under autocast, and "fp16" converts the convolution
+# weights of the UNet blocks to float16 as in mixed precision training
+PRECISIONS = ("fp32", "bf16", "fp16")
+
+
+def set_precision(model, precision):
+    """
+    Prepare UNetWithStyEncoderModel to run in one of PRECISIONS, in place.
+
+    The numerically sensitive parts stay in fp32 in every precision: the
+    timestep embedding, the normalizations (GroupNorm32), the output layer and
+    the diffusion process that consumes the model output.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision {precision}, expected one of {PRECISIONS}")
+    if precision == "fp16":
+        model.dtype = th.float16
+        model.convert_to_fp16()
+    return model
+
+
+def precision_autocast(precision, device):
+    """
+    The autocast context to run the model in, which is only enabled for bf16.
+    """
+    return th.autocast(
+        device_type=th.device(device).type,
+        dtype=th.bfloat16,
+        enabled=precision == "bf16",
+    )
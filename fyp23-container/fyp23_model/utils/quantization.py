@@ -0,0 +1,118 @@
+from typing import Callable
+
+import torch as th
+import torch.nn as nn
+from torch.ao import quantization
+
+# "none" keeps fp32, "dynamic" quantizes the Linear layers with activation ranges
+# computed on the fly, and "static" quantizes the convolutions with activation
+# ranges recorded in a calibration pass
+QUANTIZATION_MODES = ("none", "dynamic", "static")
+
+
+class QuantizedConv(nn.Module):
+    """
+    A convolution that runs in INT8 between float layers.
+
+    Eager mode static quantization needs the quantization boundaries to be
+    explicit, so each convolution quantizes its input and dequantizes its
+    output, and the surrounding normalizations and activations stay in float.
+    """
+
+    def __init__(self, conv):
+        super().__init__()
+        self.quant = quantization.QuantStub()
+        self.conv = conv
+        self.dequant = quantization.DeQuantStub()
+
+    def forward(self, x):
+        return self.dequant(self.conv(self.quant(x)))
+
+
+def wrap_convolutions(module):
+    """
+    Wrap the 1D and 2D convolutions of a module in QuantizedConv.
+
+    :return: the number of wrapped convolutions.
+    """
+    num_wrapped = 0
+    for name, child in module.named_children():
+        if type(child) in (nn.Conv1d, nn.Conv2d):
+            setattr(module, name, QuantizedConv(child))
+            num_wrapped += 1
+        elif not isinstance(child, QuantizedConv):
+            num_wrapped += wrap_convolutions(child)
+    return num_wrapped
+
+
+def quantize_dynamic(module):
+    """
+    Quantize the weights of the Linear layers to INT8, in place.
+    Their activations are quantized on the fly at every forward pass.
+    """
+    return quantization.quantize_dynamic(
+        module, {nn.Linear}, dtype=th.qint8, inplace=True
+    )
+
+
+def quantize_static(module, calibrate):
+    """
+    Quantize the convolutions to INT8 with static activation ranges, in place.
+
+    :param calibrate: runs the module on representative inputs, so that the
+                      observers can record the activation ranges of the convolutions.
+    """
+    module.eval()
+    wrap_convolutions(module)
+    for child in module.modules():
+        if isinstance(child, QuantizedConv):
+            child.qconfig = quantization.get_default_qconfig(
+                th.backends.quantized.engine
+            )
+    quantization.prepare(module, inplace=True)
+    with th.no_grad():
+        calibrate(module)
+    quantization.convert(module, inplace=True)
+    return module
+
+
+def quantize_model(
+    module, mode, calibrate: Callable[[nn.Module], None] = lambda _: None
+):
+    """
+    Quantize a module for inference in one of QUANTIZATION_MODES, in place.
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(
+            f"Unknown quantization mode {mode}, expected one of {QUANTIZATION_MODES}"
+        )
+    if mode == "dynamic":
+        return quantize_dynamic(module.eval())
+    if mode == "static":
+        return quantize_static(module, calibrate)
+    return module
+
+
+def calibrate_unet(model, diffusion, content_images, style_images, num_timesteps=4):
+    """
+    Run UNetWithStyEncoderModel on noised content glyphs at timesteps spread
+    over the sampling schedule, as the inputs of the denoising steps would be.
+
+    :param content_images: normalized content glyphs of shape (N, 3, H, W).
+    :param style_images: normalized style images of shape (N, 3, H, W).
+    """
+    generator = th.Generator().manual_seed(0)
+    batch_size = content_images.shape[0]
+    # Spaced diffusions (e.g. DDIM) sample at a subset of the original timesteps
+    timestep_map = getattr(diffusion, "timestep_map", range(diffusion.num_timesteps))
+    with th.no_grad():
+        sty_feat = model.sty_encoder(style_images)
+        for t in th.linspace(0, diffusion.num_timesteps - 1, num_timesteps).long():
+            noise = th.randn(content_images.shape, generator=generator)
+            x_t = diffusion.q_sample(
+                content_images,
+                t.expand(batch_size).to(content_images.device),
+                noise=noise.to(content_images.device),
+            )
+            model_t = th.tensor(timestep_map[t], device=content_images.device)
+            model(x_t, model_t.expand(batch_size), sty=sty_feat, cont=content_images)
@@ -57,6 +57,8 @@ class SpacedDiffusion(GaussianDiffusion):
                 self.timestep_map.append(i)
         kwargs["betas"] = np.array(new_betas)
         super().__init__(**kwargs)
+        # the timestep_map as tensors, by device and dtype
+        self._timestep_map_tensors = {}
 
     def p_mean_variance(  # get (predicted) mean and var from model
         self, model, *args, **kwargs
@@ -78,7 +80,11 @@ class SpacedDiffusion(GaussianDiffusion):
         if isinstance(model, _WrappedModel):
             return model
         return _WrappedModel(
-            model, self.timestep_map, self.rescale_timesteps, self.original_num_steps
+            model,
+            self.timestep_map,
+            self.rescale_timesteps,
+            self.original_num_steps,
+            self._timestep_map_tensors,
         )
 
     def _scale_timesteps(self, t):
@@ -87,14 +93,29 @@ class SpacedDiffusion(GaussianDiffusion):
 
 
 class _WrappedModel:
-    def __init__(self, model, timestep_map, rescale_timesteps, original_num_steps):
+    def __init__(
+        self,
+        model,
+        timestep_map,
+        rescale_timesteps,
+        original_num_steps,
+        timestep_map_tensors=None,
+    ):
         self.model = model
         self.timestep_map = timestep_map
         self.rescale_timesteps = rescale_timesteps
         self.original_num_steps = original_num_steps
+        # Shared with the diffusion, so the map is only copied to a device once
+        self.timestep_map_tensors = (
+            timestep_map_tensors if timestep_map_tensors is not None else {}
+        )
 
     def __call__(self, x, ts, **kwargs):
-        map_tensor = th.tensor(self.timestep_map, device=ts.device, dtype=ts.dtype)
+        key = (ts.device, ts.dtype)
+        map_tensor = self.timestep_map_tensors.get(key)
+        if map_tensor is None:
+            map_tensor = th.tensor(self.timestep_map, device=ts.device, dtype=ts.dtype)
+            self.timestep_map_tensors[key] = map_tensor
         new_ts = map_tensor[ts]
         if self.rescale_timesteps:
             new_ts = new_ts.float() * (1000.0 / self.original_num_steps)
@@ -0,0 +1,12 @@
+import torch as th
+
+
+def create_sample_generator(seed, index):
+    """
+    Create the random number generator of the sample at an index of a job, such
+    as a character of the input text. The noise of the sample then only depends on
+    the seed of the job and the index, not on the other samples in its batch.
+    The sample at index 0 is seeded with the seed of the job.
+    """
+    # Spread the seeds of the samples with the golden ratio increment of SplitMix64
+    return th.Generator().manual_seed((seed + index * 0x9E3779B97F4A7C15) % 2**64)
@@ -1,4 +1,5 @@
 import math
+import warnings
 from abc import abstractmethod
 
 import numpy as np
@@ -19,6 +20,52 @@ from .nn import (
 )
 from .StyleEnc import StyleEncoder
 
+# "math" computes the attention weights explicitly with einsum and softmax.
+# "sdpa" uses the fused scaled_dot_product_attention of PyTorch 2.0+,
+# which picks a flash or memory-efficient kernel when the inputs allow it.
+ATTENTION_BACKENDS = ("math", "sdpa")
+
+
+def is_sdpa_available():
+    return hasattr(F, "scaled_dot_product_attention")
+
+
+def set_attention_backend(module, backend):
+    """
+    Set the attention backend of all QKV attention layers in a module.
+    Falls back to "math" if "sdpa" is not supported by the installed PyTorch.
+
+    :return: the number of layers updated.
+    """
+    if backend not in ATTENTION_BACKENDS:
+        raise ValueError(f"Unknown attention backend: {backend}")
+    if backend == "sdpa" and not is_sdpa_available():
+        warnings.warn(
+            "scaled_dot_product_attention requires PyTorch 2.0 or above, "
+            "falling back to the math attention backend"
+        )
+        backend = "math"
+
+    num_layers = 0
+    for layer in module.modules():
+        if isinstance(layer, (QKVAttention, QKVAttentionLegacy)):
+            layer.attention_backend = backend
+            num_layers += 1
+    return num_layers
+
+
+def sdpa_attention(q, k, v):
+    """
+    Apply scaled_dot_product_attention to channel-first inputs.
+
+    :param q, k, v: [N x C x T] tensors of Qs, Ks, and Vs.
+    :return: an [N x C x T] tensor after attention.
+    """
+    # The fused kernels are much slower on strided (transposed) inputs
+    q, k, v = (x.transpose(1, 2).contiguous() for x in (q, k, v))
+    a = F.scaled_dot_product_attention(q, k, v)
+    return a.transpose(1, 2)
+
 
 class AttentionPool2d(nn.Module):
     """
@@ -307,6 +354,7 @@ class QKVAttentionLegacy(nn.Module):
     def __init__(self, n_heads):
         super().__init__()
         self.n_heads = n_heads
+        self.attention_backend = "math"  # set with set_attention_backend
 
     def forward(self, qkv):
         """
@@ -319,6 +367,8 @@ class QKVAttentionLegacy(nn.Module):
         assert width % (3 * self.n_heads) == 0
         ch = width // (3 * self.n_heads)
         q, k, v = qkv.reshape(bs * self.n_heads, ch * 3, length).split(ch, dim=1)
+        if self.attention_backend == "sdpa":
+            return sdpa_attention(q, k, v).reshape(bs, -1, length)
         scale = 1 / math.sqrt(math.sqrt(ch))
         weight = th.einsum(
             "bct,bcs->bts", q * scale, k * scale
@@ -340,6 +390,7 @@ class QKVAttention(nn.Module):
     def __init__(self, n_heads):
         super().__init__()
         self.n_heads = n_heads
+        self.attention_backend = "math"  # set with set_attention_backend
 
     def forward(self, qkv):
         """
@@ -352,6 +403,13 @@ class QKVAttention(nn.Module):
         assert width % (3 * self.n_heads) == 0
         ch = width // (3 * self.n_heads)
         q, k, v = qkv.chunk(3, dim=1)
+        if self.attention_backend == "sdpa":
+            a = sdpa_attention(
+                q.reshape(bs * self.n_heads, ch, length),
+                k.reshape(bs * self.n_heads, ch, length),
+                v.reshape(bs * self.n_heads, ch, length),
+            )
+            return a.reshape(bs, -1, length)
         scale = 1 / math.sqrt(math.sqrt(ch))
         weight = th.einsum(
             "bct,bcs->bts",
@@ -1,15 +1,33 @@
+import asyncio
+import threading
+import time
 from datetime import datetime
+from typing import Callable, Optional
 from uuid import UUID
 
 import pytest
 import pytest_asyncio  # pytest-asyncio is needed for async tests
+import torch
 from PIL import Image
 
-from adapter.data_access.font_generation_application import FontGenerationApplication
+from adapter.data_access import font_generation_application as font_generation_module
+from adapter.data_access.font_generation_application import (
+    WARM_UP_CHARACTER,
+    FontGenerationApplication,
+)
 from domain.value.generated_word import GeneratedWord
 from domain.value.job_info import RunningJob
 from domain.value.job_input import JobInput
+from domain.value.model_readiness import ModelReadiness
+from domain.value.quality_tier import QualityTier
 from domain.value.running_state import RunningState
+from fyp23_model.sample import (
+    CharacterData,
+    SampledImage,
+    SampledPreview,
+    SampledStep,
+)
+from fyp23_model.utils.dpm_solver_pytorch import SamplingCancelled
 
 ### Fixtures ###
 
@@ -29,6 +47,13 @@ def font_generation_application():
 ### Helper Function ###
 
 
+def wait_until(condition: Callable[[], bool], timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out waiting for the condition"
+        time.sleep(0.01)
+
+
 async def generate_text(
     font_generation_application: FontGenerationApplication, input_text: str
 ):
@@ -59,6 +84,74 @@ async def generate_text(
     return result_list
 
 
+def create_running_job() -> RunningJob:
+    return RunningJob(
+        time_start_to_queue=datetime.now(),
+        time_start_to_run=datetime.now(),
+        running_state=RunningState.not_started(),
+    )
+
+
+def load_character_data_stub(characters: str):
+    return None, characters
+
+
+def create_run_sample_stub(
+    step_time: float = 0.0, steps_run: Optional[list[int]] = None
+):
+    """Create a stub of run_sample that runs the 25 DDIM steps of each character,
+    given as the character_data.
+    """
+
+    def run_sample(
+        style_image,
+        character_data,
+        on_new_result,
+        on_new_preview,
+        on_new_step,
+        cancel_event,
+        **kwargs,
+    ):
+        total = len(character_data)
+        for idx, char in enumerate(character_data):
+            for step in range(25):
+                if on_new_preview is not None:
+                    on_new_preview(
+                        SampledPreview(
+                            word=char,
+                            x0_pred=torch.zeros(1, 3, 80, 80),
+                            step=step,
+                            total_steps=25,
+                            current=idx,
+                            total=total,
+                        )
+                    )
+                time.sleep(step_time)
+                if steps_run is not None:
+                    steps_run.append(step)
+                on_new_step(
+                    SampledStep(
+                        word=char,
+                        step=step + 1,
+                        total_steps=25,
+                        current=idx,
+                        total=total,
+                    )
+                )
+                if cancel_event.is_set():
+                    raise SamplingCancelled()
+            on_new_result(
+                SampledImage(
+                    word=char,
+                    image=Image.new("RGB", (80, 80), color=255),
+                    current=idx,
+                    total=total,
+                )
+            )
+
+    return run_sample
+
+
 ### Tests ###
 
 
@@ -159,3 +252,168 @@ async def test_generate_mixed_text(font_generation_application):
         GeneratedWord.from_image("A", expected_image_3),
         GeneratedWord.from_image("1", expected_image_4),
     ]
+
+
+def test_prepare_loads_and_warms_up_model(monkeypatch, font_generation_application):
+    can_finish_loading = threading.Event()
+    warm_up_characters = []
+
+    def load_model(**kwargs):
+        can_finish_loading.wait(timeout=5)
+        return "model"
+
+    def load_character_data(characters: str):
+        # The glyphs are not rendered, since the fonts are not in the repository
+        return Image.new("RGB", (80, 80)), CharacterData(
+            content_text=characters, content_images=[None] * len(characters)
+        )
+
+    def run_sample(style_image, character_data, loaded_model, **kwargs):
+        assert loaded_model == "model"
+        warm_up_characters.append(character_data.content_text)
+
+    monkeypatch.setattr(font_generation_module, "load_model", load_model)
+    monkeypatch.setattr(
+        font_generation_module, "load_character_data", load_character_data
+    )
+    monkeypatch.setattr(font_generation_module, "run_sample", run_sample)
+
+    assert font_generation_application.get_readiness() == ModelReadiness.not_loaded()
+
+    font_generation_application.prepare()
+    wait_until(
+        lambda: font_generation_application.get_readiness() == ModelReadiness.loading()
+    )
+
+    can_finish_loading.set()
+    wait_until(lambda: font_generation_application.get_readiness().is_ready)
+    assert warm_up_characters == [WARM_UP_CHARACTER]
+
+
+def test_prepare_reports_failure(monkeypatch, font_generation_application):
+    def load_model(**kwargs):
+        raise FileNotFoundError("ema_0.9999_446000.pt")
+
+    monkeypatch.setattr(font_generation_module, "load_model", load_model)
+
+    font_generation_application.prepare()
+    wait_until(
+        lambda: font_generation_application.get_readiness().name
+        == ModelReadiness.failed("").name
+    )
+
+    assert "ema_0.9999_446000.pt" in font_generation_application.get_readiness().message
+
+
+def test_estimate_job_cost_follows_quality_tier(font_generation_application):
+    def estimate_job_cost(input_text: str, quality_tier: QualityTier) -> float:
+        return font_generation_application.estimate_job_cost(
+            JobInput(input_text=input_text, quality_tier=quality_tier)
+        )
+
+    assert estimate_job_cost("中文字", QualityTier.Standard) == 3 * 25
+    # The spaces are not generated
+    assert estimate_job_cost("中 文", QualityTier.Standard) == 2 * 25
+    assert estimate_job_cost("中文字", QualityTier.Draft) < estimate_job_cost(
+        "中文字", QualityTier.Standard
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("preview", [False, True])
+async def test_generate_publishes_steps_and_previews(
+    monkeypatch, font_generation_application, preview
+):
+    monkeypatch.setattr(
+        font_generation_module, "load_character_data", load_character_data_stub
+    )
+    monkeypatch.setattr(font_generation_module, "run_sample", create_run_sample_stub())
+
+    states: list[RunningState] = []
+    await font_generation_application.generate_text(
+        job_input=JobInput(input_text="中文", preview=preview),
+        job_info=create_running_job(),
+        on_new_state=states.append,
+        on_new_word_result=lambda generated_word: None,
+    )
+
+    first_glyph_done = states.index(RunningState.generating(current=0, total=2))
+    steps = [state.step for state in states[:first_glyph_done]]
+    assert list(dict.fromkeys(steps)) == list(range(1, 26))
+    assert states[first_glyph_done - 1].message == "Generating: 0/2 (step 25/25)"
+    previews = [state.preview for state in states if state.preview is not None]
+    if not preview:
+        assert previews == []
+        return
+    # Previewed every 5 steps but the first
+    assert [(p.word, p.step) for p in dict.fromkeys(previews)] == [
+        ("中", 5),
+        ("中", 10),
+        ("中", 15),
+        ("中", 20),
+        ("文", 5),
+        ("文", 10),
+        ("文", 15),
+        ("文", 20),
+    ]
+    assert all(p.total_steps == 25 for p in previews)
+
+
+@pytest.mark.asyncio
+async def test_cancel_stops_sampling_within_a_step(
+    monkeypatch, font_generation_application
+):
+    steps_run: list[int] = []
+    monkeypatch.setattr(
+        font_generation_module, "load_character_data", load_character_data_stub
+    )
+    monkeypatch.setattr(
+        font_generation_module,
+        "run_sample",
+        create_run_sample_stub(step_time=0.01, steps_run=steps_run),
+    )
+
+    task = font_generation_application.generate_text(
+        job_input=JobInput(input_text="中文字"),
+        job_info=create_running_job(),
+        on_new_state=lambda state: None,
+        on_new_word_result=lambda generated_word: None,
+    )
+    await asyncio.sleep(0.1)
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    # The sampling has stopped by the time the job is cancelled
+    num_steps_run = len(steps_run)
+    await asyncio.sleep(0.05)
+    assert len(steps_run) == num_steps_run
+    assert num_steps_run < 25
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("job_seed, expected_seed", [(3, 3), (None, 0)])
+async def test_glyph_noise_is_seeded_by_job_seed(
+    monkeypatch, font_generation_application, job_seed, expected_seed
+):
+    seeds: list[int] = []
+    run_sample = create_run_sample_stub()
+
+    def run_sample_with_seed(style_image, character_data, seed, **kwargs):
+        seeds.append(seed)
+        return run_sample(style_image, character_data, **kwargs)
+
+    monkeypatch.setattr(
+        font_generation_module, "load_character_data", load_character_data_stub
+    )
+    monkeypatch.setattr(font_generation_module, "run_sample", run_sample_with_seed)
+
+    await font_generation_application.generate_text(
+        job_input=JobInput(input_text="中文", seed=job_seed),
+        job_info=create_running_job(),
+        on_new_state=lambda state: None,
+        on_new_word_result=lambda generated_word: None,
+    )
+
+    # Without a job seed, the seed of the application is used
+    assert seeds == [expected_seed]
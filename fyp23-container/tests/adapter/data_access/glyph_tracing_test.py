@@ -0,0 +1,91 @@
+import re
+import xml.etree.ElementTree as ElementTree
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from adapter.data_access.glyph_tracing import trace_glyph, trace_glyph_masks
+
+SVG_NAMESPACE = "{http://www.w3.org/2000/svg}"
+
+### Helper Functions ###
+
+
+def create_mock_glyph(size: int = 96) -> Image.Image:
+    """Create a glyph with a square stroke that has a square hole."""
+    image = Image.new("RGB", (size, size), color="white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((20, 20, 75, 75), fill="black")
+    draw.rectangle((40, 40, 55, 55), fill="white")
+    return image
+
+
+def get_subpaths(document: bytes) -> list[list[tuple[float, float]]]:
+    svg = ElementTree.fromstring(document)
+    path = svg.find(f"{SVG_NAMESPACE}path")
+    assert path is not None
+    return [
+        [tuple(float(value) for value in point.split(",")) for point in subpath.split()]
+        for subpath in re.findall(r"M([^Z]*)Z", path.get("d"))
+    ]
+
+
+### Tests ###
+
+
+def test_svg_is_sized_to_the_glyph():
+    document = trace_glyph(create_mock_glyph(size=80))
+
+    svg = ElementTree.fromstring(document)
+    assert svg.tag == f"{SVG_NAMESPACE}svg"
+    assert svg.get("viewBox") == "0 0 80 80"
+    assert svg.get("width") == "80"
+
+
+def test_strokes_and_holes_are_traced():
+    document = trace_glyph(create_mock_glyph())
+
+    subpaths = get_subpaths(document)
+    assert len(subpaths) == 2
+    # Both squares are traced to a few corners within a pixel of the drawn edges
+    subpaths.sort(key=lambda subpath: np.ptp(np.array(subpath)), reverse=True)
+    for subpath, (low, high) in zip(subpaths, [(20, 75), (40, 55)]):
+        points = np.array(subpath)
+        assert len(points) <= 8
+        assert np.all(np.abs(points.min(axis=0) - low) <= 1)
+        assert np.all(np.abs(points.max(axis=0) - high) <= 1)
+
+
+def test_blank_glyph_has_empty_path():
+    document = trace_glyph(Image.new("RGB", (96, 96), color="white"))
+
+    assert get_subpaths(document) == []
+
+
+def test_transparent_glyph_is_traced_from_alpha():
+    glyph = create_mock_glyph()
+    transparent_glyph = Image.new("RGBA", glyph.size, color=(0, 0, 0, 0))
+    transparent_glyph.putalpha(Image.eval(glyph.convert("L"), lambda v: 255 - v))
+
+    assert trace_glyph(transparent_glyph) == trace_glyph(glyph)
+
+
+def test_masks_are_scaled_to_the_glyph():
+    masks = np.zeros((1, 40, 40), dtype=np.uint8)
+    masks[0, 8:32, 8:32] = 1
+
+    [document] = trace_glyph_masks(masks, scale=4)
+
+    [subpath] = get_subpaths(document)
+    assert ElementTree.fromstring(document).get("viewBox") == "0 0 10 10"
+    assert np.array(subpath).min() == 2
+    assert np.array(subpath).max() == 7.75
+
+
+def test_batch_of_masks_is_traced_one_document_each():
+    masks = np.zeros((2, 40, 40), dtype=np.uint8)
+    masks[0, 8:32, 8:32] = 1
+
+    documents = trace_glyph_masks(masks)
+
+    assert [len(get_subpaths(document)) for document in documents] == [1, 0]
@@ -0,0 +1,212 @@
+import io
+
+import pytest
+from PIL import Image
+
+from adapter.data_access.image_encoding_pipeline import ImageEncodingPipeline
+from domain.value.generated_word import GeneratedWord
+from domain.value.image_encoding import ColorMode, ImageEncoding, ImageFormat
+
+### Helper Functions ###
+
+
+def create_mock_image(color: int) -> Image.Image:
+    return Image.new("RGB", (96, 96), color=(color, color, color))
+
+
+def create_mock_gradient_image() -> Image.Image:
+    return Image.linear_gradient("L").resize((96, 96)).convert("RGB")
+
+
+def decode(image_bytes: bytes) -> Image.Image:
+    return Image.open(io.BytesIO(image_bytes))
+
+
+### Tests ###
+
+
+def test_results_are_published_in_submission_order():
+    result_list: list[GeneratedWord] = []
+
+    with ImageEncodingPipeline(
+        image_encoding=ImageEncoding(),
+        on_new_word_result=result_list.append,
+        max_workers=4,
+    ) as pipeline:
+        for idx, word in enumerate("中文 字"):
+            image = None if word.isspace() else create_mock_image(color=idx * 50)
+            pipeline.submit(word=word, image=image)
+        pipeline.flush()
+
+    assert [result.word for result in result_list] == list("中文 字")
+    assert [result.success for result in result_list] == [True, True, False, True]
+
+
+@pytest.mark.parametrize(
+    "color_mode, pillow_mode",
+    [
+        (ColorMode.RGB, "RGBA"),
+        (ColorMode.GRAYSCALE, "LA"),
+        (ColorMode.BILEVEL, "1"),
+    ],
+)
+def test_transparent_results_keep_transparency(color_mode, pillow_mode):
+    result_list: list[GeneratedWord] = []
+
+    with ImageEncodingPipeline(
+        image_encoding=ImageEncoding(color_mode=color_mode),
+        on_new_word_result=result_list.append,
+        transparent=True,
+    ) as pipeline:
+        pipeline.submit(word="中", image=create_mock_image(color=255))
+        pipeline.flush()
+
+    decoded_image = decode(result_list[0].image)
+    assert decoded_image.mode == pillow_mode
+    # White paper is fully transparent
+    assert decoded_image.convert("RGBA").getextrema()[3] == (0, 0)
+
+
+def test_vectorized_results_have_svg():
+    result_list: list[GeneratedWord] = []
+
+    with ImageEncodingPipeline(
+        image_encoding=ImageEncoding(),
+        on_new_word_result=result_list.append,
+        vectorize=True,
+    ) as pipeline:
+        pipeline.submit(word="中", image=create_mock_image(color=0))
+        pipeline.submit(word=" ", image=None)
+        pipeline.flush()
+
+    assert result_list[0].vector_image.startswith(b"<svg")
+    assert result_list[1].vector_image is None
+
+
+def test_results_match_synchronous_encoding():
+    result_list: list[GeneratedWord] = []
+    image = create_mock_image(color=0)
+
+    with ImageEncodingPipeline(
+        image_encoding=ImageEncoding(),
+        on_new_word_result=result_list.append,
+    ) as pipeline:
+        pipeline.submit(word="中", image=image)
+        pipeline.flush()
+
+    assert result_list == [GeneratedWord.from_image(word="中", image=image)]
+
+
+@pytest.mark.parametrize(
+    "image_format, pillow_format",
+    [
+        (ImageFormat.PNG, "PNG"),
+        (ImageFormat.WEBP, "WEBP"),
+        (ImageFormat.RAW_GRAYSCALE, "PPM"),
+    ],
+)
+def test_encoded_images_can_be_decoded(image_format, pillow_format):
+    image = create_mock_image(color=0)
+
+    image_bytes = ImageEncoding(image_format=image_format).encode(image)
+
+    decoded_image = Image.open(io.BytesIO(image_bytes))
+    assert decoded_image.format == pillow_format
+    assert decoded_image.size == image.size
+
+
+def test_raw_grayscale_has_a_single_channel():
+    image_bytes = ImageEncoding(image_format=ImageFormat.RAW_GRAYSCALE).encode(
+        create_mock_image(color=0)
+    )
+
+    assert Image.open(io.BytesIO(image_bytes)).mode == "L"
+
+
+def test_invalid_compress_level_is_rejected():
+    with pytest.raises(ValueError):
+        ImageEncoding(compress_level=10)
+
+
+@pytest.mark.parametrize(
+    "color_mode, pillow_mode",
+    [
+        (ColorMode.RGB, "RGB"),
+        (ColorMode.GRAYSCALE, "L"),
+        (ColorMode.BILEVEL, "1"),
+    ],
+)
+def test_images_are_stored_in_color_mode(color_mode, pillow_mode):
+    image_bytes = ImageEncoding(color_mode=color_mode).encode(create_mock_image(0))
+
+    assert decode(image_bytes).mode == pillow_mode
+
+
+def test_grayscale_preserves_gray_levels():
+    image = create_mock_gradient_image()
+
+    image_bytes = ImageEncoding(color_mode=ColorMode.GRAYSCALE).encode(image)
+
+    assert decode(image_bytes).convert("RGB").tobytes() == image.tobytes()
+
+
+def test_compact_color_modes_are_smaller():
+    image = create_mock_gradient_image()
+
+    sizes = [
+        len(ImageEncoding(color_mode=color_mode).encode(image))
+        for color_mode in (ColorMode.RGB, ColorMode.GRAYSCALE, ColorMode.BILEVEL)
+    ]
+
+    assert sizes == sorted(sizes, reverse=True)
+
+
+@pytest.mark.parametrize("threshold", [1, 128, 255])
+def test_bilevel_threshold(threshold):
+    image = create_mock_gradient_image()
+    image_encoding = ImageEncoding(
+        color_mode=ColorMode.BILEVEL, bilevel_threshold=threshold
+    )
+
+    decoded_image = decode(image_encoding.encode(image))
+
+    expected_image = image.convert("L").point(
+        lambda level: 0 if level < threshold else 255
+    )
+    assert decoded_image.convert("L").tobytes() == expected_image.tobytes()
+
+
+def test_bilevel_dither_keeps_mid_tones():
+    image = create_mock_image(color=128)
+
+    thresholded_image = decode(
+        ImageEncoding(color_mode=ColorMode.BILEVEL).encode(image)
+    )
+    dithered_image = decode(
+        ImageEncoding(color_mode=ColorMode.BILEVEL, dither=True).encode(image)
+    )
+
+    # A mid-gray image is all paper after thresholding but half ink after dithering
+    assert thresholded_image.convert("L").getextrema() == (255, 255)
+    assert dithered_image.convert("L").getextrema() == (0, 255)
+
+
+def test_raw_bilevel_is_stored_as_pbm():
+    image_encoding = ImageEncoding(
+        image_format=ImageFormat.RAW_GRAYSCALE, color_mode=ColorMode.BILEVEL
+    )
+
+    decoded_image = decode(image_encoding.encode(create_mock_image(color=0)))
+
+    assert decoded_image.format == "PPM"
+    assert decoded_image.mode == "1"
+
+
+def test_invalid_bilevel_threshold_is_rejected():
+    with pytest.raises(ValueError):
+        ImageEncoding(color_mode=ColorMode.BILEVEL, bilevel_threshold=256)
+
+
+def test_qoi_with_compact_color_mode_is_rejected():
+    with pytest.raises(ValueError):
+        ImageEncoding(image_format=ImageFormat.QOI, color_mode=ColorMode.GRAYSCALE)
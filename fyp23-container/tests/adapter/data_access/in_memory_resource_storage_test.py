@@ -81,3 +81,33 @@ def test_can_delete_image(in_memory_resource_storage):
     assert (
         retrieved_image_after_delete is None
     ), "Expected image to be None after delete"
+
+
+def test_can_save_and_get_vector_image(in_memory_resource_storage):
+    mock_word_image = b"mock_word_image"
+    mock_vector_image = b"<svg/>"
+
+    mock_image_id = in_memory_resource_storage.save_image(mock_word_image)
+    in_memory_resource_storage.save_vector_image_to_id(
+        vector_image=mock_vector_image, image_id=mock_image_id
+    )
+
+    assert (
+        in_memory_resource_storage.get_image(mock_image_id) == mock_word_image
+    ), "Expected the image to be unchanged by saving its vector image"
+    assert (
+        in_memory_resource_storage.get_vector_image(mock_image_id) == mock_vector_image
+    ), "Expected retrieved vector image to match saved data"
+
+
+def test_deleting_image_deletes_its_vector_image(in_memory_resource_storage):
+    mock_image_id = in_memory_resource_storage.save_image(b"mock_word_image")
+    in_memory_resource_storage.save_vector_image_to_id(
+        vector_image=b"<svg/>", image_id=mock_image_id
+    )
+
+    in_memory_resource_storage.delete_image(mock_image_id)
+
+    assert (
+        in_memory_resource_storage.get_vector_image(mock_image_id) is None
+    ), "Expected no vector image to be found after deletion"
@@ -0,0 +1,114 @@
+import io
+
+import torch
+from PIL import Image
+
+from adapter.data_access.sampling_progress_publisher import (
+    PREVIEW_SIZE,
+    SamplingProgressPublisher,
+    to_preview_image,
+)
+from domain.value.running_state import RunningState
+
+### Tests ###
+
+
+def test_to_preview_image_downsamples_to_grayscale():
+    x0_pred = torch.ones(2, 3, 96, 96)
+    x0_pred[:, :, :48] = -1  # black ink in the top half
+
+    image = to_preview_image(x0_pred)
+
+    assert image.mode == "L"
+    assert image.size == (PREVIEW_SIZE, PREVIEW_SIZE)
+    assert image.getpixel((0, 0)) == 0
+    assert image.getpixel((0, PREVIEW_SIZE - 1)) == 255
+
+
+def test_publisher_publishes_each_step():
+    states: list[RunningState] = []
+    publisher = SamplingProgressPublisher(
+        preview_interval=3, on_new_state=states.append
+    )
+
+    for step in range(1, 4):
+        publisher.publish_step(step=step, total_steps=3, current=1, total=2)
+
+    assert states == [
+        RunningState.sampling(current=1, total=2, step=step, total_steps=3)
+        for step in range(1, 4)
+    ]
+    assert states[0].message == "Generating: 1/2 (step 1/3)"
+
+
+def test_publisher_publishes_preview_every_interval_steps():
+    states: list[RunningState] = []
+    publisher = SamplingProgressPublisher(
+        preview_interval=3, on_new_state=states.append
+    )
+
+    for step in range(10):
+        publisher.publish_x0_pred(
+            word="字",
+            step=step,
+            total_steps=10,
+            x0_pred=torch.zeros(1, 3, 96, 96),
+            current=1,
+            total=3,
+        )
+
+    assert [state.preview.step for state in states] == [3, 6, 9]
+    for state in states:
+        assert state.name == "generating"
+        assert state.step == state.preview.step
+        assert state.preview.word == "字"
+        assert state.preview.total_steps == 10
+        image = Image.open(io.BytesIO(state.preview.image))
+        assert image.format == "PNG"
+        assert image.size == (PREVIEW_SIZE, PREVIEW_SIZE)
+
+
+def test_publisher_publishes_preview_once_per_interval_of_skipped_steps():
+    states: list[RunningState] = []
+    publisher = SamplingProgressPublisher(
+        preview_interval=5, on_new_state=states.append
+    )
+
+    # The model evaluations of the adaptive steps, for two glyphs
+    for current, steps in enumerate([[0, 2, 4, 6, 8, 11, 12], [0, 3, 6]]):
+        for step in steps:
+            publisher.publish_x0_pred(
+                word="字",
+                step=step,
+                total_steps=20,
+                x0_pred=torch.zeros(1, 3, 96, 96),
+                current=current,
+                total=2,
+            )
+
+    assert [(state.preview.step, state.step) for state in states] == [
+        (6, 6),
+        (11, 11),
+        (6, 6),
+    ]
+
+
+def test_publisher_keeps_preview_until_next_glyph():
+    states: list[RunningState] = []
+    publisher = SamplingProgressPublisher(
+        preview_interval=1, on_new_state=states.append
+    )
+
+    publisher.publish_x0_pred(
+        word="字",
+        step=1,
+        total_steps=2,
+        x0_pred=torch.zeros(1, 3, 96, 96),
+        current=0,
+        total=2,
+    )
+    publisher.publish_step(step=2, total_steps=2, current=0, total=2)
+    publisher.publish_step(step=1, total_steps=2, current=1, total=2)
+
+    assert states[1].preview == states[0].preview
+    assert states[2].preview is None
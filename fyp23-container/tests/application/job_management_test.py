@@ -14,6 +14,7 @@ from domain.value.font_gen_service_config import FontGenServiceConfig
 from domain.value.job_info import FailedJob, RunningJob, WaitingJob
 from domain.value.job_input import JobInput
 from domain.value.job_status import JobStatus
+from domain.value.model_readiness import ModelReadiness
 from tests.application.image_repository_stub import ImageRepositoryStub
 from tests.application.text_generator_stub import TextGeneratorStub
 from tests.application.text_generator_with_progress_stub import (
@@ -244,6 +245,16 @@ def test_started_job_can_complete_with_results_for_all_input_words(
     ), "Number of word results should match the input text length"
 
 
+def test_completed_job_reports_model_evaluations_of_the_words(job_management_port):
+    job_id, job = add_and_complete_job(job_management_port)
+
+    assert all(
+        word_location.nfe == 1
+        for word_location in job.job_result.generated_word_locations
+    ), "Each word result should report the model evaluations of the word"
+    assert job.job_result.mean_nfe() == 1.0
+
+
 def test_images_can_be_retrieved(job_management_port, image_accessor_port):
     job_id, job = add_and_complete_job(job_management_port)
 
@@ -414,6 +425,36 @@ def test_job_queue_shifts_correctly(job_management_port):
     assert job_2.job_info.place_in_queue == 1, "Second job should be first in the queue"
 
 
+def test_job_queue_estimates_cost_ahead(job_management_port):
+    job_id_1 = add_job(job_management_port)
+    job_id_2 = add_job(job_management_port)
+    job_id_3 = add_job(job_management_port)
+
+    # The stub costs one model call per character
+    job_3 = retrieve_existing_job(job_management_port, job_id_3)
+    assert isinstance(
+        job_3.job_info, WaitingJob
+    ), "Job info should be of type WaitingJob"
+    assert job_3.job_info.cost_ahead in (3, 6), "Third job should wait for the others"
+
+    # Wait for the first job to be running
+    time.sleep(JOB_PROCESSING_TIME / 2)
+
+    job_1 = retrieve_existing_job(job_management_port, job_id_1)
+    assert job_1.job_status == JobStatus.Running, "First job should be running"
+
+    job_2 = retrieve_existing_job(job_management_port, job_id_2)
+    job_3 = retrieve_existing_job(job_management_port, job_id_3)
+    assert isinstance(
+        job_2.job_info, WaitingJob
+    ), "Job info should be of type WaitingJob"
+    assert isinstance(
+        job_3.job_info, WaitingJob
+    ), "Job info should be of type WaitingJob"
+    assert job_2.job_info.cost_ahead == 0, "Second job should be next to run"
+    assert job_3.job_info.cost_ahead == 3, "Third job should wait for the second job"
+
+
 def test_can_retrieve_job_and_resources_at_or_before_retain_time(
     job_management_port, image_accessor_port
 ):
@@ -483,3 +524,26 @@ def test_cannot_retrieve_job_and_resources_after_twice_the_retain_time(
             assert (
                 image is None
             ), f"Image data should not be retrievable for word '{word_location.word}'"
+
+
+def test_readiness_follows_text_generator(image_repository_port):
+    config = FontGenServiceConfig(
+        operate_queue_interval=OPERATE_QUEUE_INTERVAL,
+        max_retain_time=MAX_RETAIN_TIME,
+    )
+    font_application = TextGeneratorStub(
+        job_processing_time=JOB_PROCESSING_TIME,
+        simulate_success=True,
+        readiness=ModelReadiness.not_loaded(),
+    )
+    job_management_port: JobManagementPort = JobManagementService(
+        text_generator_port=font_application,
+        image_repository_port=image_repository_port,
+        font_gen_service_config=config,
+    )
+
+    assert not job_management_port.get_readiness().is_ready
+
+    job_management_port.prepare_text_generator()
+
+    assert job_management_port.get_readiness() == ModelReadiness.ready()
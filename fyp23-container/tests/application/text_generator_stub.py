@@ -8,17 +8,25 @@ from application.port_out.text_generator_port import TextGeneratorPort
 from domain.value.generated_word import GeneratedWord
 from domain.value.job_info import RunningJob
 from domain.value.job_input import JobInput
+from domain.value.model_readiness import ModelReadiness
 from domain.value.running_state import RunningState
 
 
 class TextGeneratorStub(TextGeneratorPort):
     __job_processing_time: float  # Simulated job processing time
     __simulate_success: bool  # Whether to simulate a successful job or not
+    __readiness: ModelReadiness  # Readiness reported before prepare() is called
 
-    def __init__(self, job_processing_time: float, simulate_success: bool):
+    def __init__(
+        self,
+        job_processing_time: float,
+        simulate_success: bool,
+        readiness: ModelReadiness = ModelReadiness.ready(),
+    ):
         super().__init__()
         self.__job_processing_time = job_processing_time
         self.__simulate_success = simulate_success
+        self.__readiness = readiness
 
     async def __generation(
         self,
@@ -42,6 +50,7 @@ class TextGeneratorStub(TextGeneratorPort):
                 GeneratedWord.from_image(
                     word=char,
                     image=mock_image,
+                    nfe=1,  # Simulate one model call per character
                 )
             )
 
@@ -62,3 +71,14 @@ class TextGeneratorStub(TextGeneratorPort):
                 on_new_word_result=on_new_word_result,
             )
         )
+
+    def estimate_job_cost(self, job_input: JobInput) -> float:
+        # Simulate a cost of one model call per character
+        return len(job_input.input_text)
+
+    def prepare(self) -> None:
+        # Simulate a model that loads instantly
+        self.__readiness = ModelReadiness.ready()
+
+    def get_readiness(self) -> ModelReadiness:
+        return self.__readiness
@@ -8,6 +8,7 @@ from application.port_out.text_generator_port import TextGeneratorPort
 from domain.value.generated_word import GeneratedWord
 from domain.value.job_info import RunningJob
 from domain.value.job_input import JobInput
+from domain.value.model_readiness import ModelReadiness
 from domain.value.running_state import RunningState
 
 
@@ -64,3 +65,13 @@ class TextGeneratorWithProgressStub(TextGeneratorPort):
                 on_new_word_result=on_new_word_result,
             )
         )
+
+    def estimate_job_cost(self, job_input: JobInput) -> float:
+        # Simulate a cost of one model call per character
+        return len(job_input.input_text)
+
+    def prepare(self) -> None:
+        pass
+
+    def get_readiness(self) -> ModelReadiness:
+        return ModelReadiness.ready()
@@ -0,0 +1,66 @@
+import pytest
+import torch
+
+from fyp23_model.utils.unet import (
+    AttentionBlock,
+    QKVAttention,
+    QKVAttentionLegacy,
+    is_sdpa_available,
+    set_attention_backend,
+)
+
+requires_sdpa = pytest.mark.skipif(
+    not is_sdpa_available(), reason="scaled_dot_product_attention is not available"
+)
+
+### Helper Functions ###
+
+
+def forward_with_backend(layer, backend: str, *args) -> torch.Tensor:
+    set_attention_backend(layer, backend)
+    with torch.no_grad():
+        return layer(*args)
+
+
+### Tests ###
+
+
+@requires_sdpa
+@pytest.mark.parametrize("attention_class", [QKVAttention, QKVAttentionLegacy])
+@pytest.mark.parametrize("n_heads", [1, 4])
+def test_sdpa_matches_math_attention(attention_class, n_heads):
+    torch.manual_seed(0)
+    layer = attention_class(n_heads)
+    # The attention resolutions of the UNet are 40, 20 and 10
+    qkv = torch.randn(2, 3 * 64, 20 * 20)
+
+    expected = forward_with_backend(layer, "math", qkv)
+    actual = forward_with_backend(layer, "sdpa", qkv)
+
+    torch.testing.assert_close(actual, expected, rtol=1e-4, atol=1e-5)
+
+
+@requires_sdpa
+def test_sdpa_matches_math_attention_in_attention_block():
+    torch.manual_seed(0)
+    block = AttentionBlock(channels=64, num_heads=4).eval()
+    torch.nn.init.normal_(block.proj_out.weight)  # zero-initialized otherwise
+    x = torch.randn(2, 64, 10, 10)
+
+    expected = forward_with_backend(block, "math", x)
+    actual = forward_with_backend(block, "sdpa", x)
+
+    torch.testing.assert_close(actual, expected, rtol=1e-4, atol=1e-5)
+
+
+def test_set_attention_backend_of_all_layers():
+    blocks = torch.nn.Sequential(
+        AttentionBlock(channels=64), AttentionBlock(channels=64)
+    )
+
+    assert set_attention_backend(blocks, "sdpa") == 2
+
+
+def test_unknown_attention_backend_is_rejected():
+    with pytest.raises(ValueError):
+        set_attention_backend(QKVAttention(1), "flash")
@@ -0,0 +1,68 @@
+import pytest
+import torch
+
+from fyp23_model.utils import dist_util
+from fyp23_model.utils.checkpoint import convert_checkpoint, find_checkpoint
+from fyp23_model.utils.script_util import (
+    create_model_and_diffusion,
+    model_and_diffusion_defaults,
+)
+
+pytest.importorskip("safetensors")
+
+### Fixtures ###
+
+
+@pytest.fixture
+def model():
+    torch.manual_seed(0)
+    options = model_and_diffusion_defaults()
+    options.update(
+        image_size=80,
+        num_channels=32,
+        num_res_blocks=1,
+        channel_mult="1,2",
+        attention_resolutions="2",
+    )
+    model, _ = create_model_and_diffusion(**options)
+    return model.eval()
+
+
+@pytest.fixture
+def model_path(tmp_path, model) -> str:
+    path = str(tmp_path / "model.pt")
+    torch.save(model.state_dict(), path)
+    return path
+
+
+### Helper Functions ###
+
+
+def assert_same_state_dict(actual: dict, expected: dict):
+    assert actual.keys() == expected.keys()
+    for key, tensor in expected.items():
+        assert torch.equal(actual[key], tensor)
+
+
+### Tests ###
+
+
+def test_load_state_dict_from_checkpoint(model, model_path):
+    state_dict = dist_util.load_state_dict(model_path, map_location="cpu")
+
+    assert_same_state_dict(state_dict, model.state_dict())
+
+
+def test_load_state_dict_from_safetensors(model, model_path):
+    safetensors_path = convert_checkpoint(model_path)
+    state_dict = dist_util.load_state_dict(safetensors_path, map_location="cpu")
+
+    assert safetensors_path.endswith("model.safetensors")
+    assert_same_state_dict(state_dict, model.state_dict())
+
+
+def test_find_checkpoint_prefers_safetensors(model_path):
+    assert find_checkpoint(model_path) == model_path
+
+    safetensors_path = convert_checkpoint(model_path)
+    assert find_checkpoint(model_path) == safetensors_path
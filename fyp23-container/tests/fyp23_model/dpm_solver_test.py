@@ -0,0 +1,144 @@
+import numpy as np
+import pytest
+import torch
+
+from fyp23_model.utils import gaussian_diffusion as gd
+from fyp23_model.utils.dpm_solver_sampling import (
+    dpm_solver_sample_loop,
+    get_noise_schedule,
+)
+from fyp23_model.utils.script_util import create_gaussian_diffusion
+
+### Fixtures ###
+
+
+class PointMassModelStub:
+    """The exact noise prediction of data that is always the same image."""
+
+    def __init__(self, betas: np.ndarray, x_0: torch.Tensor, learn_sigma=False):
+        self.log_alphas_cumprod = np.log(np.cumprod(1.0 - betas))
+        self.x_0 = x_0
+        self.learn_sigma = learn_sigma
+        self.timesteps = []
+
+    def __call__(self, x_t, t, scale=1.0):
+        self.timesteps.append(t[0].item())
+        # Interpolate the schedule at the continuous timesteps of the solver,
+        # linearly in log space as NoiseScheduleVP does
+        log_alpha_cumprod = np.interp(
+            t.numpy(),
+            np.arange(len(self.log_alphas_cumprod)),
+            self.log_alphas_cumprod,
+        )
+        alpha_cumprod = torch.tensor(np.exp(log_alpha_cumprod), dtype=torch.float32)[
+            :, None, None, None
+        ]
+        noise = (x_t - alpha_cumprod.sqrt() * self.x_0 * scale) / (
+            1 - alpha_cumprod
+        ).sqrt()
+        if self.learn_sigma:
+            return torch.cat([noise, torch.zeros_like(noise)], dim=1)
+        return noise
+
+
+@pytest.fixture
+def betas() -> np.ndarray:
+    return gd.get_named_beta_schedule("linear", 1000)
+
+
+@pytest.fixture
+def x_0() -> torch.Tensor:
+    torch.manual_seed(0)
+    return torch.rand(2, 3, 8, 8) * 2 - 1
+
+
+### Helper Functions ###
+
+
+def assert_close_up_to_final_noise(actual, expected, betas):
+    # The solver stops at the first timestep, which keeps noise of std sqrt(betas[0])
+    assert (actual - expected).abs().max() < 5 * np.sqrt(betas[0])
+
+
+### Tests ###
+
+
+@pytest.mark.parametrize("order", [1, 2, 3])
+@pytest.mark.parametrize("learn_sigma", [False, True])
+def test_dpm_solver_recovers_data_in_few_steps(betas, x_0, order, learn_sigma):
+    model = PointMassModelStub(betas, x_0, learn_sigma=learn_sigma)
+
+    sample = dpm_solver_sample_loop(model, x_0.shape, betas=betas, steps=5, order=order)
+
+    assert_close_up_to_final_noise(sample, x_0, betas)
+
+
+def test_dpm_solver_evaluates_model_once_per_step(betas, x_0):
+    model = PointMassModelStub(betas, x_0)
+
+    dpm_solver_sample_loop(model, x_0.shape, betas=betas, steps=8)
+
+    assert len(model.timesteps) == 8
+    # The model is called with the timesteps it was trained on, from noise to data
+    assert model.timesteps[0] == pytest.approx(999)
+    assert model.timesteps == sorted(model.timesteps, reverse=True)
+    assert model.timesteps[-1] >= 0
+
+
+def test_dpm_solver_passes_model_kwargs_and_clips(betas, x_0):
+    model = PointMassModelStub(betas, x_0)
+
+    sample = dpm_solver_sample_loop(
+        model, x_0.shape, betas=betas, steps=5, model_kwargs={"scale": 3.0}
+    )
+
+    assert_close_up_to_final_noise(sample, (x_0 * 3.0).clamp(-1, 1), betas)
+
+
+def test_dpm_solver_matches_ddim_in_fewer_steps(betas, x_0):
+    torch.manual_seed(0)
+    noise = torch.randn(x_0.shape)
+    model = PointMassModelStub(betas, x_0)
+    diffusion = create_gaussian_diffusion(steps=1000, timestep_respacing="ddim25")
+
+    ddim_sample = diffusion.ddim_sample_loop(
+        lambda x_t, t: model(x_t, t.float()), x_0.shape, noise=noise, device="cpu"
+    )
+    dpm_solver_sample = dpm_solver_sample_loop(
+        model, x_0.shape, betas=betas, steps=5, noise=noise
+    )
+
+    assert_close_up_to_final_noise(dpm_solver_sample, ddim_sample, betas)
+
+
+def test_dpm_solver_reports_x0_pred_at_each_step(betas, x_0):
+    model = PointMassModelStub(betas, x_0)
+    x0_preds = {}
+
+    def x0_pred_callback(step, x0_pred):
+        x0_preds[step] = x0_pred.clone()
+
+    dpm_solver_sample_loop(
+        model, x_0.shape, betas=betas, steps=5, x0_pred_callback=x0_pred_callback
+    )
+
+    assert list(x0_preds.keys()) == list(range(5))
+    # The exact model predicts the data at every step
+    for x0_pred in x0_preds.values():
+        torch.testing.assert_close(x0_pred, x_0, rtol=1e-3, atol=1e-3)
+
+
+def test_dpm_solver_reuses_the_plan_of_the_steps(x_0):
+    # Betas of no other test, whose samples would add plans
+    betas = gd.get_named_beta_schedule("cosine", 500)
+    model = PointMassModelStub(betas, x_0)
+
+    first = dpm_solver_sample_loop(model, x_0.shape, betas=betas, steps=5, noise=x_0)
+    second = dpm_solver_sample_loop(model, x_0.shape, betas=betas, steps=5, noise=x_0)
+    dpm_solver_sample_loop(model, x_0.shape, betas=betas, steps=8, noise=x_0)
+
+    noise_schedule = get_noise_schedule(betas)
+    assert get_noise_schedule(betas.copy()) is noise_schedule
+    # One plan for each number of steps
+    assert len(noise_schedule.multistep_plans) == 2
+    assert torch.equal(first, second)
@@ -0,0 +1,77 @@
+import pytest
+import torch
+
+from fyp23_model.utils.inference_optimization import optimize_for_inference
+from fyp23_model.utils.script_util import (
+    create_model_and_diffusion,
+    model_and_diffusion_defaults,
+)
+from fyp23_model.utils.unet import AttentionBlock
+
+### Fixtures ###
+
+
+@pytest.fixture
+def model():
+    torch.manual_seed(0)
+    options = model_and_diffusion_defaults()
+    options.update(
+        image_size=80,
+        num_channels=32,
+        num_res_blocks=1,
+        channel_mult="1,2",
+        attention_resolutions="2",
+    )
+    model, _ = create_model_and_diffusion(**options)
+    # The output layer is zero-initialized, as in the UNet before training
+    torch.nn.init.normal_(model.out[-1].weight, std=0.05)
+    # Give the normalizations non-trivial affine parameters to fold
+    for module in model.modules():
+        if isinstance(module, AttentionBlock):
+            torch.nn.init.normal_(module.norm.weight, mean=1.0, std=0.2)
+            torch.nn.init.normal_(module.norm.bias, std=0.2)
+    return model.eval()
+
+
+### Helper Functions ###
+
+
+def relative_error(actual: torch.Tensor, expected: torch.Tensor) -> float:
+    return ((actual - expected).abs().max() / expected.abs().max()).item()
+
+
+def run_model(model) -> torch.Tensor:
+    generator = torch.Generator().manual_seed(0)
+    x_t = torch.randn(2, 3, 80, 80, generator=generator)
+    content_images = torch.rand(2, 3, 80, 80, generator=generator) * 2 - 1
+    style_images = torch.rand(2, 3, 80, 80, generator=generator) * 2 - 1
+    with torch.no_grad():
+        sty_feat = model.sty_encoder(style_images)
+        return model(x_t, torch.tensor([100, 900]), sty=sty_feat, cont=content_images)
+
+
+### Tests ###
+
+
+@pytest.mark.parametrize("optimizations", [["fuse"], ["channels_last", "fuse"]])
+def test_optimized_model_matches_original(model, optimizations):
+    expected = run_model(model)
+
+    num_folded = optimize_for_inference(model, optimizations)
+    actual = run_model(model)
+
+    assert num_folded == sum(isinstance(m, AttentionBlock) for m in model.modules())
+    assert num_folded > 0
+    assert relative_error(actual, expected) < 1e-4
+
+
+def test_channels_last_converts_convolutions(model):
+    optimize_for_inference(model, ["channels_last"])
+
+    weight = model.input_blocks[0][0].weight
+    assert weight.is_contiguous(memory_format=torch.channels_last)
+
+
+def test_unknown_optimization_is_rejected(model):
+    with pytest.raises(ValueError):
+        optimize_for_inference(model, ["prune"])
@@ -0,0 +1,70 @@
+import pytest
+import torch
+
+from fyp23_model.utils.precision import precision_autocast, set_precision
+from fyp23_model.utils.script_util import (
+    create_model_and_diffusion,
+    model_and_diffusion_defaults,
+)
+
+### Fixtures ###
+
+
+@pytest.fixture
+def model():
+    torch.manual_seed(0)
+    options = model_and_diffusion_defaults()
+    options.update(
+        image_size=80,
+        num_channels=32,
+        num_res_blocks=1,
+        channel_mult="1,2",
+        attention_resolutions="2",
+    )
+    model, _ = create_model_and_diffusion(**options)
+    # The output layer is zero-initialized, as in the UNet before training
+    torch.nn.init.normal_(model.out[-1].weight, std=0.05)
+    return model.eval()
+
+
+### Helper Functions ###
+
+
+def relative_error(actual: torch.Tensor, expected: torch.Tensor) -> float:
+    return ((actual - expected).abs().mean() / expected.abs().mean()).item()
+
+
+def run_model(model, precision: str) -> torch.Tensor:
+    generator = torch.Generator().manual_seed(0)
+    x_t = torch.randn(2, 3, 80, 80, generator=generator)
+    content_images = torch.rand(2, 3, 80, 80, generator=generator) * 2 - 1
+    style_images = torch.rand(2, 3, 80, 80, generator=generator) * 2 - 1
+    with torch.no_grad(), precision_autocast(precision, "cpu"):
+        sty_feat = model.sty_encoder(style_images)
+        return model(x_t, torch.tensor([100, 900]), sty=sty_feat, cont=content_images)
+
+
+### Tests ###
+
+
+@pytest.mark.parametrize("precision", ["bf16", "fp16"])
+def test_reduced_precision_matches_fp32(model, precision):
+    expected = run_model(model, "fp32")
+
+    set_precision(model, precision)
+    actual = run_model(model, precision)
+
+    assert relative_error(actual.float(), expected) < 0.02
+
+
+def test_fp16_keeps_normalizations_in_fp32(model):
+    set_precision(model, "fp16")
+
+    assert model.input_blocks[0][0].weight.dtype == torch.float16
+    assert model.out[0].weight.dtype == torch.float32
+    assert model.time_embed[0].weight.dtype == torch.float32
+
+
+def test_unknown_precision_is_rejected(model):
+    with pytest.raises(ValueError):
+        set_precision(model, "fp8")
@@ -0,0 +1,105 @@
+import pytest
+import torch
+from torch.ao.nn import quantized
+
+from fyp23_model.utils.quantization import (
+    QuantizedConv,
+    calibrate_unet,
+    quantize_model,
+)
+from fyp23_model.utils.script_util import (
+    create_model_and_diffusion,
+    model_and_diffusion_defaults,
+)
+from fyp23_model.utils.unet import AttentionBlock, ResBlock
+
+### Fixtures ###
+
+
+@pytest.fixture
+def res_block() -> ResBlock:
+    torch.manual_seed(0)
+    block = ResBlock(channels=64, emb_channels=32, dropout=0.0).eval()
+    # The output convolution is zero-initialized, as in the UNet before training
+    torch.nn.init.normal_(block.out_layers[-1].weight, std=0.05)
+    return block
+
+
+### Helper Functions ###
+
+
+def relative_error(actual: torch.Tensor, expected: torch.Tensor) -> float:
+    return ((actual - expected).abs().mean() / expected.abs().mean()).item()
+
+
+def create_small_model_and_diffusion():
+    options = model_and_diffusion_defaults()
+    options.update(
+        image_size=80,
+        num_channels=32,
+        num_res_blocks=1,
+        channel_mult="1,2",
+        attention_resolutions="2",
+        timestep_respacing="ddim4",
+    )
+    return create_model_and_diffusion(**options)
+
+
+### Tests ###
+
+
+def test_static_quantization_quantizes_convolutions(res_block):
+    calibration_x = torch.randn(8, 64, 20, 20)
+    calibration_emb = torch.randn(8, 32)
+    x, emb = torch.randn(2, 64, 20, 20), torch.randn(2, 32)
+    with torch.no_grad():
+        expected = res_block(x, emb)
+
+    quantize_model(
+        res_block,
+        mode="static",
+        calibrate=lambda block: block(calibration_x, calibration_emb),
+    )
+    with torch.no_grad():
+        actual = res_block(x, emb)
+
+    assert isinstance(res_block.in_layers[-1], QuantizedConv)
+    assert isinstance(res_block.in_layers[-1].conv, quantized.Conv2d)
+    assert relative_error(actual, expected) < 0.05
+
+
+def test_static_quantization_quantizes_attention_projections():
+    torch.manual_seed(0)
+    block = AttentionBlock(channels=64, num_heads=4).eval()
+    x = torch.randn(2, 64, 10, 10)
+
+    quantize_model(block, mode="static", calibrate=lambda block: block(x))
+
+    assert isinstance(block.qkv.conv, quantized.Conv1d)
+
+
+def test_dynamic_quantization_quantizes_linear_layers(res_block):
+    quantize_model(res_block, mode="dynamic")
+
+    assert isinstance(res_block.emb_layers[-1], quantized.dynamic.Linear)
+
+
+def test_unknown_quantization_mode_is_rejected(res_block):
+    with pytest.raises(ValueError):
+        quantize_model(res_block, mode="int4")
+
+
+def test_calibration_runs_at_original_timesteps():
+    model, diffusion = create_small_model_and_diffusion()
+    model.eval()
+    timesteps = []
+    model.register_forward_pre_hook(
+        lambda _, inputs: timesteps.append(inputs[1][0].item())
+    )
+    content_images = torch.rand(2, 3, 80, 80) * 2 - 1
+    style_images = torch.rand(2, 3, 80, 80) * 2 - 1
+
+    calibrate_unet(model, diffusion, content_images, style_images, num_timesteps=4)
+
+    # The spaced diffusion samples at 4 of the 1000 original timesteps
+    assert timesteps == list(diffusion.timestep_map)
@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+import torch
+
+from fyp23_model.utils import gaussian_diffusion as gd
+from fyp23_model.utils.dpm_solver_pytorch import SamplingCancelled
+from fyp23_model.utils.dpm_solver_sampling import dpm_solver_sample_loop
+from fyp23_model.utils.script_util import create_gaussian_diffusion
+
+### Fixtures ###
+
+
+class CountingModelStub:
+    """Predicts zero noise, and counts its calls."""
+
+    def __init__(self):
+        self.num_calls = 0
+
+    def __call__(self, x_t, t, **kwargs):
+        self.num_calls += 1
+        return torch.zeros_like(x_t)
+
+
+@pytest.fixture
+def noise() -> torch.Tensor:
+    torch.manual_seed(0)
+    return torch.randn(1, 3, 8, 8)
+
+
+### Helper Functions ###
+
+
+def sample_ddim(model, noise, **kwargs):
+    diffusion = create_gaussian_diffusion(steps=1000, timestep_respacing="ddim10")
+    return diffusion.ddim_sample_loop(
+        model, noise.shape, noise=noise, device="cpu", **kwargs
+    )
+
+
+def sample_dpm_solver(model, noise, **kwargs):
+    return dpm_solver_sample_loop(
+        model,
+        noise.shape,
+        betas=gd.get_named_beta_schedule("linear", 1000),
+        steps=10,
+        noise=noise,
+        **kwargs,
+    )
+
+
+def cancel_at_step(cancel_step: int):
+    cancel_event = threading.Event()
+
+    def callback(step, num_steps):
+        if step == cancel_step:
+            cancel_event.set()
+
+    return callback, cancel_event
+
+
+### Tests ###
+
+
+@pytest.mark.parametrize("sample", [sample_ddim, sample_dpm_solver])
+def test_callback_reports_each_step(noise, sample):
+    steps = []
+
+    sample(
+        CountingModelStub(),
+        noise,
+        callback=lambda step, num_steps: steps.append((step, num_steps)),
+    )
+
+    assert steps == [(step, 10) for step in range(1, 11)]
+
+
+@pytest.mark.parametrize("sample", [sample_ddim, sample_dpm_solver])
+def test_unset_cancel_event_keeps_output(noise, sample):
+    expected = sample(CountingModelStub(), noise)
+
+    actual = sample(CountingModelStub(), noise, cancel_event=threading.Event())
+
+    assert torch.equal(actual, expected)
+
+
+def test_cancel_event_stops_ddim_after_current_step(noise):
+    model = CountingModelStub()
+    callback, cancel_event = cancel_at_step(3)
+
+    with pytest.raises(SamplingCancelled):
+        sample_ddim(model, noise, callback=callback, cancel_event=cancel_event)
+
+    assert model.num_calls == 3
+
+
+def test_cancel_event_stops_dpm_solver_after_current_step(noise):
+    model = CountingModelStub()
+    callback, cancel_event = cancel_at_step(3)
+
+    with pytest.raises(SamplingCancelled):
+        sample_dpm_solver(model, noise, callback=callback, cancel_event=cancel_event)
+
+    # The solver evaluates the model once before the first step
+    assert model.num_calls == 4
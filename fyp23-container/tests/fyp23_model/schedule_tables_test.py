@@ -0,0 +1,70 @@
+import pytest
+import torch
+
+from fyp23_model.utils import gaussian_diffusion as gd
+from fyp23_model.utils.script_util import create_gaussian_diffusion
+
+### Fixtures ###
+
+
+class TimestepRecordingModelStub:
+    """Predicts zero noise, and records the timesteps it is called with."""
+
+    def __init__(self):
+        self.timesteps = []
+
+    def __call__(self, x_t, t, **kwargs):
+        self.timesteps.append(t[0].item())
+        return torch.zeros_like(x_t)
+
+
+### Tests ###
+
+
+@pytest.mark.parametrize("name", gd.SCHEDULE_TABLES)
+def test_schedule_tables_match_schedule_arrays(name):
+    diffusion = create_gaussian_diffusion(steps=1000, timestep_respacing="ddim25")
+    t = torch.tensor([0, 7, 24])
+
+    table_values = diffusion._extract(name, t, (3, 1, 2, 2))
+
+    # As gathered from the NumPy array at every step before
+    array_values = gd._extract_into_tensor(getattr(diffusion, name), t, (3, 1, 2, 2))
+    assert table_values.dtype == torch.float32
+    torch.testing.assert_close(table_values, array_values, rtol=0, atol=0)
+
+
+def test_schedule_tables_are_copied_to_device_once():
+    diffusion = create_gaussian_diffusion(steps=1000, timestep_respacing="ddim10")
+    model = TimestepRecordingModelStub()
+
+    diffusion.ddim_sample_loop(model, (1, 3, 8, 8), device="cpu")
+    tables = diffusion._device_tables[torch.device("cpu")]
+    map_tensors = dict(diffusion._timestep_map_tensors)
+    diffusion.ddim_sample_loop(model, (1, 3, 8, 8), device="cpu")
+
+    assert list(diffusion._device_tables) == [torch.device("cpu")]
+    assert diffusion._device_tables[torch.device("cpu")] is tables
+    assert len(map_tensors) == 1
+    assert diffusion._timestep_map_tensors == map_tensors
+    # The model is still called with the timesteps it was trained on
+    assert model.timesteps == list(reversed(diffusion.timestep_map)) * 2
+
+
+@pytest.mark.parametrize("learn_sigma, sigma_small", [(True, False), (False, False)])
+def test_ancestral_sampling_with_each_variance_type(learn_sigma, sigma_small):
+    diffusion = create_gaussian_diffusion(
+        steps=1000,
+        learn_sigma=learn_sigma,
+        sigma_small=sigma_small,
+        timestep_respacing="10",
+    )
+
+    def model(x_t, t, **kwargs):
+        channels = 6 if learn_sigma else 3
+        return torch.zeros(x_t.shape[0], channels, *x_t.shape[2:])
+
+    torch.manual_seed(0)
+    sample = diffusion.p_sample_loop(model, (1, 3, 8, 8), device="cpu")
+
+    assert torch.isfinite(sample).all()
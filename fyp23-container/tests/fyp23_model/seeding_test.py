@@ -0,0 +1,18 @@
+import torch
+
+from fyp23_model.utils.seeding import create_sample_generator
+
+### Tests ###
+
+
+def test_sample_generator_depends_on_seed_and_index():
+    def noise(seed, index):
+        return torch.randn(8, generator=create_sample_generator(seed, index))
+
+    assert torch.equal(noise(0, 1), noise(0, 1))
+    assert not torch.equal(noise(0, 1), noise(0, 2))
+    assert not torch.equal(noise(0, 1), noise(1, 1))
+    # The first character is seeded with the seed of the job
+    assert torch.equal(
+        noise(42, 0), torch.randn(8, generator=torch.Generator().manual_seed(42))
+    )
@@ -0,0 +1,51 @@
+import numpy as np
+from PIL import Image
+
+# Gray levels at or above the paper level become fully transparent,
+# and those at or below the ink level stay fully opaque
+PAPER_LEVEL = 200
+INK_LEVEL = 50
+
+# ITU-R 601-2 luma weights, the same as Pillow's conversion to "L"
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def remove_background_batch(
+    glyphs: np.ndarray, paper_level: int = PAPER_LEVEL, ink_level: int = INK_LEVEL
+) -> np.ndarray:
+    """Turn the white paper of a batch of glyphs transparent.
+
+    :param glyphs: uint8 array of shape (N, H, W, 3) with black ink on white paper.
+    :return: uint8 array of shape (N, H, W, 4). The alpha channel ramps from the
+        ink level to the paper level, so the anti-aliased edges of strokes stay soft.
+        The colors are un-composited from white, so the strokes keep their darkness
+        and have no white fringe on other backgrounds.
+    """
+    if glyphs.ndim != 4 or glyphs.shape[-1] != 3:
+        raise ValueError(f"Expected an array of shape (N, H, W, 3), got {glyphs.shape}")
+    if not 0 <= ink_level < paper_level <= 255:
+        raise ValueError("Expected 0 <= ink_level < paper_level <= 255")
+
+    colors = glyphs.astype(np.float32)
+    alpha = paper_level - colors @ LUMA_WEIGHTS
+    alpha *= 1.0 / (paper_level - ink_level)
+    np.clip(alpha, 0.0, 1.0, out=alpha)
+
+    # Solve color = ink * alpha + white * (1 - alpha) for the ink, in place;
+    # fully transparent pixels come out non-positive and are clipped to black
+    ink = colors
+    ink -= 255.0
+    ink /= np.maximum(alpha, 1e-6)[..., np.newaxis]
+    ink += 255.0 + 0.5  # round when truncating to uint8
+    np.clip(ink, 0.0, 255.0, out=ink)
+
+    matted = np.empty(glyphs.shape[:-1] + (4,), dtype=np.uint8)
+    matted[..., :3] = ink
+    matted[..., 3] = alpha * 255.0 + 0.5
+    return matted
+
+
+def remove_background(image: Image.Image) -> Image.Image:
+    """Turn the white paper of a glyph image transparent."""
+    glyphs = np.asarray(image.convert("RGB"))[np.newaxis]
+    return Image.fromarray(remove_background_batch(glyphs)[0])
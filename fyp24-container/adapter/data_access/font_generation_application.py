@@ -1,18 +1,48 @@
 import asyncio
+import contextlib
 import os
+import random
+import threading
 from asyncio import Task
 from typing import Callable, Optional, Union
 
 import torch
 from PIL import Image
 
+from adapter.data_access.image_encoding_pipeline import ImageEncodingPipeline
+from adapter.data_access.sampling_progress_publisher import SamplingProgressPublisher
 from application.port_out.text_generator_port import TextGeneratorPort
 from domain.value.generated_word import GeneratedWord
+from domain.value.image_encoding import ImageEncoding
 from domain.value.job_info import RunningJob
 from domain.value.job_input import JobInput
+from domain.value.model_readiness import ModelReadiness
+from domain.value.quality_tier import QualityTier
 from domain.value.running_state import RunningState
-from fyp24_model.sample import arg_parse, load_fontdiffuser_pipeline, sampling
+from fyp24_model.sample import (
+    arg_parse,
+    load_fontdiffuser_pipeline,
+    prewarm_content_feature_cache,
+    sampling,
+)
+from fyp24_model.src.dpm_solver.dpm_solver_pytorch import SamplingCancelled
 from fyp24_model.src.dpm_solver.pipeline_dpm_solver import FontDiffuserDPMPipeline
+from fyp24_model.src.modules.attention import is_sdpa_available
+from fyp24_model.utils import create_sample_generator
+
+WARM_UP_CHARACTER = "永"  # generated once when the model is preloaded
+ATTENTION_BACKEND = "sdpa" if is_sdpa_available() else "math"
+
+# The size of the content features of the glyphs cached on disk, of about 1.2 MB
+# per glyph
+CONTENT_FEATURE_CACHE_DISK_MB = 1024
+
+# The DPM-Solver++ (steps, order) of each quality tier
+QUALITY_TIER_SOLVER_SETTINGS: dict[QualityTier, tuple[int, int]] = {
+    QualityTier.Draft: (6, 2),
+    QualityTier.Standard: (20, 2),
+    QualityTier.High: (40, 3),
+}
 
 
 def get_file_path(filename: str):
@@ -27,7 +57,29 @@ def get_file_path(filename: str):
     return os.path.join(fyp24_model_directory, filename)
 
 
-def initialize_args():
+def get_content_feature_cache_dir() -> str:
+    """Get the directory of the content feature cache, which is kept outside of the
+    source tree, under CONTENT_FEATURE_CACHE_DIR if it is set."""
+    return os.environ.get(
+        "CONTENT_FEATURE_CACHE_DIR",
+        os.path.join(
+            os.path.expanduser("~"), ".cache", "fyp24", "content_feature_cache"
+        ),
+    )
+
+
+def initialize_args(
+    precision: str = "fp32",
+    quality_tier: QualityTier = QualityTier.Standard,
+    adaptive_steps: bool = False,
+):
+    num_inference_steps, order = QUALITY_TIER_SOLVER_SETTINGS[quality_tier]
+    # The adaptive steps spend at most the model evaluations of the fixed steps
+    method_args = (
+        ["--method", "adaptive", "--max_nfe", str(num_inference_steps)]
+        if adaptive_steps
+        else ["--method", "multistep"]
+    )
     args = arg_parse(
         args_to_parse=[
             "--ckpt_dir",
@@ -43,11 +95,24 @@ def initialize_args():
             "--guidance_scale",
             "7.5",
             "--num_inference_step",
-            "20",
-            "--method",
-            "multistep",
+            str(num_inference_steps),
+            "--order",
+            str(order),
+            *method_args,
             "--ttf_path",
             get_file_path("ttf/SourceHanSerifTC-VF.ttf"),
+            "--freeze_for_inference",
+            "--attention_backend",
+            ATTENTION_BACKEND,
+            "--precision",
+            precision,
+            "--content_feature_cache_dir",
+            get_content_feature_cache_dir(),
+            "--content_feature_cache_disk_mb",
+            str(CONTENT_FEATURE_CACHE_DISK_MB),
+            # The most frequent characters, cached once the model is warmed up
+            "--content_feature_prewarm_path",
+            get_file_path("frequent_characters.txt"),
         ]
     )
 
@@ -60,7 +125,13 @@ def run_fontdiffuser(
     character: str,
     save_path: Optional[str],
     seed: Optional[int],
-):
+    x0_pred_callback: Optional[Callable[[int, torch.Tensor], None]] = None,
+    callback: Optional[Callable[[int, int], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    generator: Optional[torch.Generator] = None,
+) -> tuple[Optional[Image.Image], int]:
+    """Generate the glyph of the character. Return the glyph, or None if the
+    character is not in the font, and the number of model evaluations."""
     assert len(character) == 1, "Length of character must be 1"
 
     args.character_input = True
@@ -75,72 +146,204 @@ def run_fontdiffuser(
         args.save_image = False
         args.save_image_dir = None
 
-    out_image = sampling(
+    out_image, nfe = sampling(
         args=args,
         pipe=pipe,
         content_image=None,
         style_image=None,
+        x0_pred_callback=x0_pred_callback,
+        callback=callback,
+        cancel_event=cancel_event,
+        generator=generator,
+        return_nfe=True,
     )
 
-    return out_image
+    return out_image, nfe
 
 
 class FontGenerationApplication(TextGeneratorPort):
     __seed: Optional[int]
     __image_save_path: Optional[str] = None
+    __image_encoding: ImageEncoding
+    __vectorize: bool
+    __precision: str
+    __preview_interval: int  # solver steps between the glyph previews
     __fontdiffuser_pipeline: Optional[FontDiffuserDPMPipeline] = None
+    __pipeline_lock: threading.Lock  # held while the pipeline is being loaded
+    __readiness: ModelReadiness
+    __preload_thread: Optional[threading.Thread] = None
 
-    def __init__(self, seed: Optional[int], image_save_path: Optional[str]):
+    def __init__(
+        self,
+        seed: Optional[int],
+        image_save_path: Optional[str],
+        image_encoding: ImageEncoding = ImageEncoding(),
+        vectorize: bool = False,
+        precision: str = "fp32",
+        preview_interval: int = 5,
+    ):
         self.__seed = seed
         self.__image_save_path = image_save_path
+        self.__image_encoding = image_encoding
+        self.__vectorize = vectorize
+        self.__precision = precision
+        self.__preview_interval = preview_interval
+        self.__pipeline_lock = threading.Lock()
+        self.__readiness = ModelReadiness.not_loaded()
 
-    async def __generation(
+    def __load_pipeline(self, warm_up: bool) -> FontDiffuserDPMPipeline:
+        """Load the pipeline unless it is loaded, or wait for it to be loaded."""
+        with self.__pipeline_lock:
+            if self.__fontdiffuser_pipeline is not None:
+                return self.__fontdiffuser_pipeline
+
+            try:
+                self.__readiness = ModelReadiness.loading()
+                args = initialize_args(precision=self.__precision)
+                pipeline = load_fontdiffuser_pipeline(args)
+                if warm_up:
+                    # The first run allocates the buffers and selects the kernels
+                    self.__readiness = ModelReadiness.warming_up()
+                    run_fontdiffuser(
+                        args=args,
+                        pipe=pipeline,
+                        character=WARM_UP_CHARACTER,
+                        save_path=None,
+                        seed=None,
+                    )
+            except Exception as e:
+                self.__readiness = ModelReadiness.failed(str(e))
+                raise
+
+            self.__fontdiffuser_pipeline = pipeline
+            self.__readiness = ModelReadiness.ready()
+            return pipeline
+
+    def __preload(self):
+        try:
+            pipeline = self.__load_pipeline(warm_up=True)
+        except Exception as e:
+            # The readiness reports the error, and the first job loads the model again
+            print(f"Failed to preload the model: {e}")
+            return
+
+        try:
+            # The jobs can run meanwhile, the cache is shared with them
+            num_encoded = prewarm_content_feature_cache(
+                args=initialize_args(precision=self.__precision), pipe=pipeline
+            )
+            print(f"Prewarmed the content features of {num_encoded} characters!")
+        except Exception as e:
+            print(f"Failed to prewarm the content feature cache: {e}")
+
+    def __generate_words(
         self,
         job_input: JobInput,
-        job_info: RunningJob,
         on_new_state: Callable[[RunningState], None],
         on_new_word_result: Callable[[GeneratedWord], None],
+        cancel_event: threading.Event,
     ) -> Union[bool, str]:
-        def on_new_result(
-            word: str, image: Optional[Image.Image], current: int, total: int
-        ):
-            on_new_state(RunningState.generating(current=current, total=total))
-            on_new_word_result(
-                GeneratedWord.from_image(
-                    word=word,
-                    image=(image if image is not None else None),
-                )
-            )
+        args = initialize_args(
+            precision=self.__precision,
+            quality_tier=job_input.quality_tier,
+            adaptive_steps=job_input.adaptive_steps,
+        )
+        # The adaptive steps are counted in model evaluations
+        total_steps = (
+            args.max_nfe if job_input.adaptive_steps else args.num_inference_steps
+        )
+        pipeline = self.__load_pipeline(warm_up=False)
+        # The noise of each glyph only depends on the seed and the index of the glyph
+        seed = job_input.seed if job_input.seed is not None else self.__seed
+        if seed is None:
+            seed = random.randint(0, 2**32 - 1)
+        progress_publisher = SamplingProgressPublisher(
+            preview_interval=self.__preview_interval, on_new_state=on_new_state
+        )
 
-        if job_input.input_text == "":
-            return True
+        # Encode each image while the next character is being generated
+        with ImageEncodingPipeline(
+            image_encoding=self.__image_encoding,
+            on_new_word_result=on_new_word_result,
+            transparent=job_input.transparent,
+            vectorize=self.__vectorize,
+        ) as encoding_pipeline:
+            for idx, character in enumerate(job_input.input_text):
+                if character.isspace():
+                    out_image, nfe = None, None
+                else:
+
+                    def on_step(step: int, total_steps: int):
+                        progress_publisher.publish_step(
+                            step=step,
+                            total_steps=total_steps,
+                            current=idx,
+                            total=len(job_input.input_text),
+                        )
+
+                    def on_x0_pred(step: int, x0_pred: torch.Tensor):
+                        progress_publisher.publish_x0_pred(
+                            word=character,
+                            step=step,
+                            total_steps=total_steps,
+                            x0_pred=x0_pred,
+                            current=idx,
+                            total=len(job_input.input_text),
+                        )
 
-        args = initialize_args()
-
-        if self.__fontdiffuser_pipeline is None:
-            self.__fontdiffuser_pipeline = load_fontdiffuser_pipeline(args)
-
-        for idx, character in enumerate(job_input.input_text):
-            if character.isspace():
-                out_image = None
-            else:
-                out_image = run_fontdiffuser(
-                    args=args,
-                    pipe=self.__fontdiffuser_pipeline,
-                    character=character,
-                    save_path=self.__image_save_path,
-                    seed=self.__seed,
+                    out_image, nfe = run_fontdiffuser(
+                        args=args,
+                        pipe=pipeline,
+                        character=character,
+                        save_path=self.__image_save_path,
+                        seed=None,
+                        x0_pred_callback=on_x0_pred if job_input.preview else None,
+                        callback=on_step,
+                        cancel_event=cancel_event,
+                        generator=create_sample_generator(seed, idx),
+                    )
+
+                on_new_state(
+                    RunningState.generating(
+                        current=idx + 1, total=len(job_input.input_text)
+                    )
                 )
+                encoding_pipeline.submit(word=character, image=out_image, nfe=nfe)
 
-            on_new_result(
-                word=character,
-                image=out_image,
-                current=idx + 1,
-                total=len(job_input.input_text),
-            )
+            encoding_pipeline.flush()
 
         return True
 
+    async def __generation(
+        self,
+        job_input: JobInput,
+        job_info: RunningJob,
+        on_new_state: Callable[[RunningState], None],
+        on_new_word_result: Callable[[GeneratedWord], None],
+    ) -> Union[bool, str]:
+        if job_input.input_text == "":
+            return True
+
+        # Sample in a worker thread, so that the job can be cancelled while sampling
+        cancel_event = threading.Event()
+        generation = asyncio.ensure_future(
+            asyncio.to_thread(
+                self.__generate_words,
+                job_input=job_input,
+                on_new_state=on_new_state,
+                on_new_word_result=on_new_word_result,
+                cancel_event=cancel_event,
+            )
+        )
+        try:
+            return await asyncio.shield(generation)
+        except asyncio.CancelledError:
+            # Stop sampling after the current step, and free the model for the next job
+            cancel_event.set()
+            with contextlib.suppress(SamplingCancelled):
+                await generation
+            raise
+
     def generate_text(
         self,
         job_input: JobInput,
@@ -156,3 +359,17 @@ class FontGenerationApplication(TextGeneratorPort):
                 on_new_word_result=on_new_word_result,
             )
         )
+
+    def estimate_job_cost(self, job_input: JobInput) -> float:
+        num_inference_steps, _ = QUALITY_TIER_SOLVER_SETTINGS[job_input.quality_tier]
+        # The spaces are not generated
+        num_characters = sum(not char.isspace() for char in job_input.input_text)
+        return num_characters * num_inference_steps
+
+    def prepare(self) -> None:
+        if self.__preload_thread is None:
+            self.__preload_thread = threading.Thread(target=self.__preload, daemon=True)
+            self.__preload_thread.start()
+
+    def get_readiness(self) -> ModelReadiness:
+        return self.__readiness
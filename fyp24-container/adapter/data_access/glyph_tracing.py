@@ -0,0 +1,77 @@
+from typing import Sequence
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Glyphs are upsampled before tracing, so the contours follow
+# the anti-aliased edges of strokes instead of the pixel grid
+TRACE_SCALE = 4
+
+# Ink coverage (0-255) above which a pixel is part of a stroke
+INK_THRESHOLD = 128
+
+# Maximum distance in pixels between a contour and its simplified path
+SIMPLIFY_TOLERANCE = 0.25
+
+
+def get_ink_coverage(image: Image.Image) -> np.ndarray:
+    """Get the ink coverage of a glyph: its alpha channel if it has one,
+    otherwise how dark it is on white paper.
+    """
+    if "A" in image.getbands():
+        return np.asarray(image.getchannel("A"))
+    return 255 - np.asarray(image.convert("L"))
+
+
+def get_svg_path(contours: Sequence[np.ndarray], scale: float) -> str:
+    commands = []
+    for contour in contours:
+        points = contour.reshape(-1, 2) / scale
+        if len(points) < 3:
+            continue
+        coordinates = " ".join(f"{x:.2f},{y:.2f}" for x, y in points)
+        commands.append(f"M{coordinates}Z")
+    return "".join(commands)
+
+
+def trace_glyph_masks(masks: np.ndarray, scale: float = 1) -> list[bytes]:
+    """Trace a batch of binary ink masks to SVG documents.
+
+    :param masks: uint8 array of shape (N, H, W) where non-zero pixels are ink.
+    :param scale: How much the masks are upsampled from the glyphs.
+    :return: One SVG document per mask, sized to the original glyph.
+    """
+    height, width = masks.shape[1:]
+    view_box = f"0 0 {width / scale:g} {height / scale:g}"
+
+    documents = []
+    for mask in masks:
+        # Strokes and their holes are traced alike and filled with the even-odd rule
+        contours, _ = cv2.findContours(mask, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        contours = [
+            cv2.approxPolyDP(contour, SIMPLIFY_TOLERANCE * scale, closed=True)
+            for contour in contours
+        ]
+        documents.append(
+            (
+                '<svg xmlns="http://www.w3.org/2000/svg" '
+                f'viewBox="{view_box}" width="{width / scale:g}" height="{height / scale:g}">'
+                f'<path fill="black" fill-rule="evenodd" d="{get_svg_path(contours, scale)}"/>'
+                "</svg>"
+            ).encode()
+        )
+    return documents
+
+
+def trace_glyph(image: Image.Image) -> bytes:
+    """Trace a glyph image to an SVG document."""
+    width, height = image.size
+    upsampled = cv2.resize(
+        get_ink_coverage(image),
+        (width * TRACE_SCALE, height * TRACE_SCALE),
+        interpolation=cv2.INTER_CUBIC,
+    )
+    masks = (upsampled > INK_THRESHOLD).view(np.uint8)[np.newaxis]
+    [document] = trace_glyph_masks(masks, TRACE_SCALE)
+    return document
@@ -0,0 +1,111 @@
+import mimetypes
+import zipfile
+from typing import Annotated, Iterable, Iterator
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from adapter.presentation.dependencies import (
+    get_image_accessor_port,
+    get_job_management_port,
+)
+from adapter.presentation.get_image_router import get_media_type
+from application.port_in.image_accessor_port import ImageAccessorPort
+from application.port_in.job_management_port import JobManagementPort
+from domain.value.generated_word_location import GeneratedWordLocation
+from domain.value.job_status import JobStatus
+
+download_job_router = APIRouter()
+
+
+class ZipStreamBuffer:
+    """A write-only file object for `zipfile.ZipFile` that hands out written bytes in chunks.
+
+    It supports `tell` but not `seek`, so `zipfile` writes the archive sequentially
+    (using data descriptors) and never needs the whole archive in memory.
+    """
+
+    __chunks: list[bytes]
+    __position: int
+
+    def __init__(self):
+        self.__chunks = []
+        self.__position = 0
+
+    def write(self, data: bytes) -> int:
+        self.__chunks.append(bytes(data))
+        self.__position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.__position
+
+    def flush(self) -> None:
+        pass
+
+    def pop(self) -> bytes:
+        """Return the bytes written since the last call and release them."""
+        chunk = b"".join(self.__chunks)
+        self.__chunks = []
+        return chunk
+
+
+def get_archive_name(index: int, word: str, image_bytes: bytes) -> str:
+    media_type = get_media_type(image_bytes)
+    extension = mimetypes.guess_extension(media_type) if media_type else None
+    # Only keep the word in the file name if it is safe to use in a path
+    label = f"_{word}" if word.isalnum() else ""
+    return f"{index:04d}{label}{extension or ''}"
+
+
+def iterate_zip_chunks(entries: Iterable[tuple[str, bytes]]) -> Iterator[bytes]:
+    """Build a ZIP archive incrementally, yielding its bytes after each entry is written."""
+    buffer = ZipStreamBuffer()
+    # Generated images are already compressed, so the entries are stored as-is
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+            yield buffer.pop()
+    # Yield the central directory written when the archive is closed
+    yield buffer.pop()
+
+
+@download_job_router.get("/download_job")
+async def download_job(
+    job_id: str,
+    job_management_port: Annotated[JobManagementPort, Depends(get_job_management_port)],
+    image_accessor_port: Annotated[ImageAccessorPort, Depends(get_image_accessor_port)],
+):
+    try:
+        job_id_uuid = UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Invalid ID format")
+
+    job = job_management_port.retrieve_job(job_id=job_id_uuid)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job.job_status != JobStatus.Completed:
+        raise HTTPException(status_code=409, detail="Job is not completed")
+
+    word_locations: list[GeneratedWordLocation] = (
+        job.job_result.generated_word_locations
+    )
+
+    def iterate_entries() -> Iterator[tuple[str, bytes]]:
+        # Images are fetched one at a time as the archive is streamed
+        for index, location in enumerate(word_locations):
+            if location.image_id is None:
+                continue
+            image_bytes = image_accessor_port.get_image(image_id=location.image_id)
+            if image_bytes is None:
+                # The image has been cleaned up; skip it
+                continue
+            yield get_archive_name(index, location.word, image_bytes), image_bytes
+
+    return StreamingResponse(
+        content=iterate_zip_chunks(iterate_entries()),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{job_id_uuid}.zip"'},
+    )
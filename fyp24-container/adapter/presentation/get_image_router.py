@@ -1,8 +1,9 @@
 import io
+from enum import Enum
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from PIL import Image
 from pydantic import BaseModel
 
@@ -11,10 +12,20 @@ from application.port_in.image_accessor_port import ImageAccessorPort
 
 get_image_router = APIRouter()
 
+# Media types of image formats that Pillow does not register a MIME type for
+EXTRA_MEDIA_TYPES = {"QOI": "image/qoi"}
+
+SVG_MEDIA_TYPE = "image/svg+xml"
+
+
+class ImageResponseFormat(Enum):
+    RASTER = "raster"  # the stored raster image, in whichever format it was encoded
+    SVG = "svg"  # the vector image traced from the raster image
+
 
 def get_media_type(image_bytes):
     image = Image.open(io.BytesIO(image_bytes))
-    return Image.MIME[image.format]
+    return Image.MIME.get(image.format, EXTRA_MEDIA_TYPES.get(image.format))
 
 
 class GetImageResponse(BaseModel):
@@ -25,6 +36,9 @@ class GetImageResponse(BaseModel):
 async def get_image(
     image_id: str,
     image_accessor_port: Annotated[ImageAccessorPort, Depends(get_image_accessor_port)],
+    image_format: Annotated[
+        ImageResponseFormat, Query(alias="format")
+    ] = ImageResponseFormat.RASTER,
 ):
 
     try:
@@ -35,6 +49,17 @@ async def get_image(
             detail="Invalid ID format",
         )
 
+    if image_format == ImageResponseFormat.SVG:
+        vector_image_bytes = image_accessor_port.get_vector_image(image_id=image_uuid)
+
+        if vector_image_bytes is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Image not found",
+            )
+
+        return Response(content=vector_image_bytes, media_type=SVG_MEDIA_TYPE)
+
     image_bytes = image_accessor_port.get_image(image_id=image_uuid)
 
     if image_bytes is None:
@@ -0,0 +1,39 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Response
+from pydantic import BaseModel
+
+from adapter.presentation.dependencies import get_job_management_port
+from application.port_in.job_management_port import JobManagementPort
+
+health_router = APIRouter()
+
+
+class HealthResponse(BaseModel):
+    status: str
+
+
+class ReadinessResponse(BaseModel):
+    ready: bool
+    status: str
+    message: str
+
+
+@health_router.get("/healthz", response_model=HealthResponse)
+async def healthz():
+    """Liveness probe: the server is up, whether or not the model is loaded."""
+    return HealthResponse(status="ok")
+
+
+@health_router.get("/readyz", response_model=ReadinessResponse)
+async def readyz(
+    response: Response,
+    job_management_port: Annotated[JobManagementPort, Depends(get_job_management_port)],
+):
+    """Readiness probe: 200 once the model is loaded and warmed up, 503 before."""
+    readiness = job_management_port.get_readiness()
+    if not readiness.is_ready:
+        response.status_code = 503
+    return ReadinessResponse(
+        ready=readiness.is_ready, status=readiness.name, message=readiness.message
+    )
@@ -1,3 +1,4 @@
+import base64
 from typing import Annotated, Optional, Union
 from uuid import UUID
 
@@ -6,6 +7,7 @@ from pydantic import BaseModel
 
 from adapter.presentation.dependencies import get_job_management_port
 from application.port_in.job_management_port import JobManagementPort
+from domain.value.glyph_preview import GlyphPreview
 from domain.value.job_info import (
     CancelledJob,
     CompletedJob,
@@ -19,16 +21,31 @@ retrieve_job_router = APIRouter()
 
 class RetrieveJobResponse_JobInput(BaseModel):
     input_text: str
+    quality_tier: str
+    preview: bool
+    seed: Optional[int]
+    adaptive_steps: bool
 
 
 class RetrieveJobResponse_WaitingJob(BaseModel):
     time_start_to_queue: str
     place_in_queue: int
+    cost_ahead: float
+
+
+class RetrieveJobResponse_GlyphPreview(BaseModel):
+    word: str
+    step: int
+    total_steps: int
+    image: str  # base64-encoded PNG
 
 
 class RetrieveJobResponse_RunningState(BaseModel):
     name: str
     message: str
+    step: Optional[int]
+    total_steps: Optional[int]
+    preview: Optional[RetrieveJobResponse_GlyphPreview]
 
 
 class RetrieveJobResponse_RunningJob(BaseModel):
@@ -60,10 +77,12 @@ class RetrieveJobResponse_GeneratedWordLocation(BaseModel):
     word: str
     success: bool
     image_id: Optional[str]
+    nfe: Optional[int]  # model evaluations spent on the word
 
 
 class RetrieveJobResponse_JobResult(BaseModel):
     generated_word_locations: list[RetrieveJobResponse_GeneratedWordLocation]
+    mean_nfe: Optional[float]
 
 
 class RetrieveJobResponse(BaseModel):
@@ -80,6 +99,19 @@ class RetrieveJobResponse(BaseModel):
     job_result: RetrieveJobResponse_JobResult
 
 
+def get_glyph_preview_response(
+    preview: Optional[GlyphPreview],
+) -> Optional[RetrieveJobResponse_GlyphPreview]:
+    if preview is None:
+        return None
+    return RetrieveJobResponse_GlyphPreview(
+        word=preview.word,
+        step=preview.step,
+        total_steps=preview.total_steps,
+        image=base64.b64encode(preview.image).decode("ascii"),
+    )
+
+
 @retrieve_job_router.get("/retrieve_job", response_model=RetrieveJobResponse)
 async def retrieve_job(
     job_id: str,
@@ -95,7 +127,11 @@ async def retrieve_job(
         raise HTTPException(status_code=404, detail="Job not found")
 
     job_input_response = RetrieveJobResponse_JobInput(
-        input_text=job.job_input.input_text
+        input_text=job.job_input.input_text,
+        quality_tier=job.job_input.quality_tier.value,
+        preview=job.job_input.preview,
+        seed=job.job_input.seed,
+        adaptive_steps=job.job_input.adaptive_steps,
     )
 
     job_info_response: Union[
@@ -110,6 +146,7 @@ async def retrieve_job(
         job_info_response = RetrieveJobResponse_WaitingJob(
             time_start_to_queue=job.job_info.time_start_to_queue.isoformat(),
             place_in_queue=job.job_info.place_in_queue,
+            cost_ahead=job.job_info.cost_ahead,
         )
 
     elif isinstance(job.job_info, RunningJob):
@@ -119,6 +156,9 @@ async def retrieve_job(
             running_state=RetrieveJobResponse_RunningState(
                 name=job.job_info.running_state.name,
                 message=job.job_info.running_state.message,
+                step=job.job_info.running_state.step,
+                total_steps=job.job_info.running_state.total_steps,
+                preview=get_glyph_preview_response(job.job_info.running_state.preview),
             ),
         )
 
@@ -157,9 +197,11 @@ async def retrieve_job(
                 word=location.word,
                 success=location.success,
                 image_id=str(location.image_id) if location.image_id else None,
+                nfe=location.nfe,
             )
             for location in job.job_result.generated_word_locations
-        ]
+        ],
+        mean_nfe=job.job_result.mean_nfe(),
     )
 
     return RetrieveJobResponse(
@@ -1,13 +1,29 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html
 
+from adapter.presentation.dependencies import preload_model
+from adapter.presentation.download_job_router import download_job_router
 from adapter.presentation.get_image_router import get_image_router
+from adapter.presentation.health_router import health_router
 from adapter.presentation.interrupt_job_router import interrupt_job_router
 from adapter.presentation.retrieve_job_router import retrieve_job_router
 from adapter.presentation.start_job_router import start_job_router
 
-app = FastAPI()
+### Lifespan ###
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The model loads in the background, so the server starts serving right away
+    # and /readyz reports when it can run jobs without loading the model first
+    preload_model()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 ### CORS Configuration ###
@@ -28,6 +44,8 @@ app.include_router(start_job_router)
 app.include_router(interrupt_job_router)
 app.include_router(retrieve_job_router)
 app.include_router(get_image_router)
+app.include_router(download_job_router)
+app.include_router(health_router)
 
 
 ### Docs ###
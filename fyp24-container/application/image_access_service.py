@@ -13,3 +13,6 @@ class ImageAccessService(ImageAccessorPort):
 
     def get_image(self, image_id: UUID) -> Optional[bytes]:
         return self.__image_repository_port.get_image(image_id)
+
+    def get_vector_image(self, image_id: UUID) -> Optional[bytes]:
+        return self.__image_repository_port.get_vector_image(image_id)
@@ -4,6 +4,7 @@ from uuid import UUID
 
 from domain.entity.job import Job
 from domain.value.job_input import JobInput
+from domain.value.model_readiness import ModelReadiness
 
 
 class JobManagementPort(ABC):
@@ -39,3 +40,20 @@ class JobManagementPort(ABC):
         :param job_id: The ID of the job to interrupt.
         """
         pass
+
+    @abstractmethod
+    def prepare_text_generator(self) -> None:
+        """
+        Start loading and warming up the text generator in the background,
+        so that the first job does not wait for it.
+        """
+        pass
+
+    @abstractmethod
+    def get_readiness(self) -> ModelReadiness:
+        """
+        Get the readiness of the text generator to run jobs.
+
+        :return: The readiness of the model of the text generator.
+        """
+        pass
@@ -19,6 +19,16 @@ class ImageRepositoryPort(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_vector_image(self, image_id: UUID) -> Optional[bytes]:
+        """
+        Retrieve the vector (SVG) version of an image by the ID of the image.
+
+        :param image_id: The ID of the image.
+        :return: The SVG data if found, otherwise None.
+        """
+        pass
+
     @abstractmethod
     def save_image(self, image: bytes) -> UUID:
         """
@@ -40,10 +50,21 @@ class ImageRepositoryPort(ABC):
         """
         pass
 
+    @abstractmethod
+    def save_vector_image_to_id(self, vector_image: bytes, image_id: UUID) -> None:
+        """
+        Save the vector (SVG) version of an image alongside the image.
+        This will overwrite any existing vector image of the same image.
+
+        :param vector_image: The SVG data to save.
+        :param image_id: The ID of the image.
+        """
+        pass
+
     @abstractmethod
     def delete_image(self, image_id: UUID) -> None:
         """
-        Delete an image by its ID.
+        Delete an image, along with its vector version, by its ID.
 
         :param image_id: The ID of the image to delete.
         """
@@ -5,6 +5,7 @@ from typing import Callable, Optional, Union
 from domain.value.generated_word import GeneratedWord
 from domain.value.job_info import RunningJob
 from domain.value.job_input import JobInput
+from domain.value.model_readiness import ModelReadiness
 from domain.value.running_state import RunningState
 
 
@@ -32,3 +33,32 @@ class TextGeneratorPort(ABC):
         :return: A task that resolves to a boolean indicating success or an error message.
         """
         pass
+
+    @abstractmethod
+    def estimate_job_cost(self, job_input: JobInput) -> float:
+        """
+        Estimate the cost of a job, in calls of the model, from its text and quality tier.
+        The queue adds up the costs of the jobs to estimate the wait of each job.
+
+        :param job_input: The input for the job.
+        :return: The estimated cost of the job.
+        """
+        pass
+
+    @abstractmethod
+    def prepare(self) -> None:
+        """
+        Start loading and warming up the model in the background,
+        so that the first job does not wait for it.
+        Does nothing if the model is already loaded or being loaded.
+        """
+        pass
+
+    @abstractmethod
+    def get_readiness(self) -> ModelReadiness:
+        """
+        Get the readiness of the model.
+
+        :return: The readiness of the model.
+        """
+        pass
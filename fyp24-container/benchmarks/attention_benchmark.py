@@ -0,0 +1,87 @@
+"""Benchmark the attention backends of CrossAttention at the attention
+resolutions of the FontDiffuser UNet (96x96 images).
+
+Run from the container root:
+    python -m benchmarks.attention_benchmark
+"""
+
+import argparse
+import time
+
+import torch
+
+from fyp24_model.src.modules.attention import (
+    ATTENTION_BACKENDS,
+    CrossAttention,
+    is_sdpa_available,
+    set_attention_backend,
+)
+
+# (name, query tokens, query channels, context tokens, context channels, inner channels)
+# of the attention layers in the UNet; a context of None is self-attention
+ATTENTION_LAYERS = [
+    ("48x48 self", 48 * 48, 128, None, None, 128),
+    ("48x48 style", 48 * 48, 128, 9, 1024, 128),
+    ("48x48 offset", 48 * 48, 64, 48 * 48, 128, 128),
+    ("24x24 self", 24 * 24, 256, None, None, 256),
+    ("24x24 style", 24 * 24, 256, 9, 1024, 256),
+    ("24x24 offset", 24 * 24, 128, 24 * 24, 256, 256),
+]
+
+
+def time_forward(layer, hidden_states, context, repeat: int) -> float:
+    with torch.no_grad():
+        layer(hidden_states, context=context)  # warm up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            layer(hidden_states, context=context)
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    # Classifier-free guidance runs the conditional and unconditional inputs together
+    parser.add_argument("--batch-size", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--device", type=str, default="cpu")
+    args = parser.parse_args()
+
+    backends = [
+        backend
+        for backend in ATTENTION_BACKENDS
+        if backend != "sdpa" or is_sdpa_available()
+    ]
+
+    print(
+        f"{'layer':<16}" + "".join(f"{backend + ' (ms)':>14}" for backend in backends)
+    )
+    for (
+        name,
+        tokens,
+        channels,
+        context_tokens,
+        context_channels,
+        inner,
+    ) in ATTENTION_LAYERS:
+        layer = CrossAttention(
+            query_dim=channels, context_dim=context_channels, heads=1, dim_head=inner
+        )
+        layer = layer.to(args.device).eval()
+        hidden_states = torch.randn(
+            args.batch_size, tokens, channels, device=args.device
+        )
+        context = None
+        if context_tokens is not None:
+            context = torch.randn(
+                args.batch_size, context_tokens, context_channels, device=args.device
+            )
+
+        times = []
+        for backend in backends:
+            set_attention_backend(layer, backend)
+            times.append(time_forward(layer, hidden_states, context, args.repeat))
+        print(f"{name:<16}" + "".join(f"{time:>14.2f}" for time in times))
+
+
+if __name__ == "__main__":
+    main()
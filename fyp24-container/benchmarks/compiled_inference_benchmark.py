@@ -0,0 +1,89 @@
+"""Benchmark the per-step latency of the FontDiffuser model (one call of the
+model in the DPM-Solver loop) in eager mode against the compiled modes.
+
+Run from the container root:
+    python -m benchmarks.compiled_inference_benchmark
+"""
+
+import argparse
+import time
+
+import torch
+
+from fyp24_model.sample import arg_parse
+from fyp24_model.src import (
+    FontDiffuserModelDPM,
+    build_content_encoder,
+    build_style_encoder,
+    build_unet,
+)
+from fyp24_model.src.dpm_solver.compiled_model import (
+    COMPILE_MODES,
+    CompiledModel,
+    is_torch_compile_available,
+)
+
+
+def time_step(model, inputs, repeat: int) -> float:
+    with torch.no_grad():
+        model(*inputs)  # warm up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            model(*inputs)
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    # Classifier-free guidance runs the conditional and unconditional inputs together
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[2])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--device", type=str, default="cpu")
+    args = parser.parse_args()
+
+    model_args = arg_parse(args_to_parse=[])
+    model = FontDiffuserModelDPM(
+        unet=build_unet(args=model_args),
+        style_encoder=build_style_encoder(args=model_args),
+        content_encoder=build_content_encoder(args=model_args),
+    )
+    model.to(args.device)
+    model.freeze_for_inference()
+
+    modes = [
+        mode
+        for mode in COMPILE_MODES
+        if mode != "compile" or is_torch_compile_available()
+    ]
+
+    print(f"{'batch size':<12}" + "".join(f"{mode + ' (ms)':>16}" for mode in modes))
+    for batch_size in args.batch_sizes:
+        content_shape = (batch_size, 3, *model_args.content_image_size)
+        style_shape = (batch_size, 3, *model_args.style_image_size)
+        inputs = (
+            torch.randn(content_shape, device=args.device),
+            torch.full((batch_size,), 500.0, device=args.device),
+            [
+                torch.rand(content_shape, device=args.device),
+                torch.rand(style_shape, device=args.device),
+            ],
+            model_args.content_encoder_downsample_size,
+            "V3",
+        )
+
+        times = []
+        for mode in modes:
+            compiled_model = CompiledModel(
+                model=model,
+                batch_sizes=[batch_size],
+                content_image_size=model_args.content_image_size,
+                style_image_size=model_args.style_image_size,
+                content_encoder_downsample_size=model_args.content_encoder_downsample_size,
+                mode=mode,
+            )
+            times.append(time_step(compiled_model, inputs, args.repeat))
+        print(f"{batch_size:<12}" + "".join(f"{time:>16.1f}" for time in times))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark the content features of a glyph encoded by the content encoder at
+every solver step, as the model does without a cache, against the features
+looked up in the content feature cache, from memory and from the memory-mapped
+files on disk.
+
+Run from the container root:
+    python -m benchmarks.content_feature_cache_benchmark
+"""
+
+import argparse
+import tempfile
+import time
+
+import torch
+
+from fyp24_model.sample import arg_parse
+from fyp24_model.src import build_content_encoder
+from fyp24_model.src.content_feature_cache import (
+    ContentFeatureCache,
+    features_nbytes,
+    hash_module,
+)
+from fyp24_model.src.model import freeze_spectral_norm
+
+
+def time_call(call, repeat: int) -> float:
+    call()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--device", type=str, default="cpu")
+    args = parser.parse_args()
+
+    model_args = arg_parse(args_to_parse=[])
+    content_encoder = build_content_encoder(args=model_args).to(args.device).eval()
+    freeze_spectral_norm(content_encoder)
+    content_images = torch.randn(
+        1, 3, *model_args.content_image_size, device=args.device
+    )
+
+    def encode():
+        feature, residual_features = content_encoder(content_images)
+        return [*residual_features, feature]
+
+    with torch.no_grad(), tempfile.TemporaryDirectory() as cache_dir:
+        features = encode()
+        encoder_hash = hash_module(content_encoder)
+        cache = ContentFeatureCache(encoder_hash=encoder_hash, cache_dir=cache_dir)
+        cache.put("font", "永", features)
+        # No memory, so that every lookup loads the file
+        disk_cache = ContentFeatureCache(
+            encoder_hash=encoder_hash, cache_dir=cache_dir, max_memory_bytes=0
+        )
+
+        encode_time = time_call(encode, args.repeat)
+        memory_time = time_call(lambda: cache.get("font", "永"), args.repeat)
+        disk_time = time_call(lambda: disk_cache.get("font", "永"), args.repeat)
+
+    print(f"features per glyph: {features_nbytes(features) / 2**20:.2f} MiB")
+    print(f"{'content features':<22}{'lookup (ms)':>12}{'per glyph (ms)':>16}")
+    print(
+        f"{'encoded every step':<22}{encode_time:>12.2f}{encode_time * args.steps:>16.2f}"
+    )
+    print(f"{'cached in memory':<22}{memory_time:>12.3f}{memory_time:>16.3f}")
+    print(f"{'cached on disk':<22}{disk_time:>12.3f}{disk_time:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
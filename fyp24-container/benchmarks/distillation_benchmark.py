@@ -0,0 +1,132 @@
+"""Benchmark a student distilled by distill.py against its teacher: the model calls
+per glyph, the speedup of sampling a glyph, and the quality drop of the glyphs
+against the glyphs of the teacher sampled as it is served, with guidance at every
+step, in FontMetrics (SSIM, LPIPS, L1 and FID). The teacher sampled in as many
+steps as the student, with guidance, is the baseline the student should beat.
+Each call of the guided teacher runs the model on twice the batch.
+
+Run from the container root:
+    python -m benchmarks.distillation_benchmark --ckpt-dir fyp24_model/ckpt \\
+        --student-ckpt-dir fyp24_model/student_ckpt --student-steps 4
+
+Without the checkpoints, the models have random weights, so only the speed is
+meaningful.
+"""
+
+import argparse
+import copy
+import time
+
+from benchmarks.precision_benchmark import load_model
+from benchmarks.quantization_benchmark import to_tensor
+from fyp24_model.sample import arg_parse, sampling
+from fyp24_model.src import FontDiffuserDPMPipeline, build_ddpm_scheduler
+from fyp24_model.src.metrics.font_metrics import FontMetrics
+
+
+def sample_glyphs(model_args, pipe, characters: str):
+    """Sample the glyphs of the characters, and return them with the mean model
+    calls and time per glyph."""
+    glyphs = []
+    total_nfe = 0
+    start = time.perf_counter()
+    for char in characters:
+        model_args.content_character = char
+        glyph, nfe = sampling(args=model_args, pipe=pipe, return_nfe=True)
+        glyphs.append(glyph)
+        total_nfe += nfe
+    glyph_time = (time.perf_counter() - start) / len(characters)
+    return glyphs, total_nfe / len(characters), glyph_time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ckpt-dir", type=str, default=None)
+    parser.add_argument("--student-ckpt-dir", type=str, default=None)
+    parser.add_argument("--student-steps", type=int, default=4)
+    parser.add_argument(
+        "--ttf-path", type=str, default="fyp24_model/ttf/SourceHanSerifTC-VF.ttf"
+    )
+    parser.add_argument("--style-image-path", type=str, default="fyp24_model/lan.png")
+    parser.add_argument("--characters", type=str, default="天地玄黃宇宙洪荒")
+    parser.add_argument("--num-inference-steps", type=int, default=20)
+    parser.add_argument("--skip-metrics", action="store_true")
+    args = parser.parse_args()
+
+    model_args_to_parse = [
+        "--ttf_path",
+        args.ttf_path,
+        "--style_image_path",
+        args.style_image_path,
+        "--num_inference_steps",
+        str(args.num_inference_steps),
+        "--device",
+        "cpu",
+        "--freeze_for_inference",
+        "--attention_backend",
+        "sdpa",
+        "--seed",
+        "0",
+    ]
+    if args.ckpt_dir is not None:
+        model_args_to_parse += ["--ckpt_dir", args.ckpt_dir]
+    model_args = arg_parse(args_to_parse=model_args_to_parse)
+    model_args.character_input = True
+    student_args = copy.copy(model_args)
+    student_args.ckpt_dir = args.student_ckpt_dir
+
+    train_scheduler = build_ddpm_scheduler(args=model_args)
+    teacher_pipe = FontDiffuserDPMPipeline(
+        model=load_model(model_args, args.ckpt_dir),
+        ddpm_train_scheduler=train_scheduler,
+        model_type=model_args.model_type,
+        guidance_type=model_args.guidance_type,
+        guidance_scale=model_args.guidance_scale,
+    )
+    student_pipe = FontDiffuserDPMPipeline(
+        model=load_model(student_args, args.student_ckpt_dir),
+        ddpm_train_scheduler=train_scheduler,
+        model_type=model_args.model_type,
+        guidance_type=model_args.guidance_type,
+        distilled_steps=args.student_steps,
+    )
+
+    teacher_name = f"teacher {args.num_inference_steps} steps"
+    few_step_args = copy.copy(model_args)
+    few_step_args.num_inference_steps = args.student_steps
+    runs = {
+        teacher_name: (model_args, teacher_pipe),
+        f"teacher {args.student_steps} steps": (few_step_args, teacher_pipe),
+        f"student {args.student_steps} steps": (model_args, student_pipe),
+    }
+    glyphs = {}
+    nfes = {}
+    glyph_times = {}
+    for name, (run_args, pipe) in runs.items():
+        glyphs[name], nfes[name], glyph_times[name] = sample_glyphs(
+            run_args, pipe, args.characters
+        )
+
+    reference = to_tensor(glyphs[teacher_name])
+    header = f"{'model':<20}{'calls':>7}{'glyph (s)':>11}{'speedup':>9}"
+    if not args.skip_metrics:
+        header += f"{'ssim':>8}{'lpips':>8}{'l1':>8}{'fid':>9}"
+    print(header)
+    for name in glyphs:
+        row = (
+            f"{name:<20}{nfes[name]:>7.0f}{glyph_times[name]:>11.2f}"
+            f"{glyph_times[teacher_name] / glyph_times[name]:>9.2f}"
+        )
+        if not args.skip_metrics:
+            metrics = FontMetrics(device="cpu")
+            metrics.update(to_tensor(glyphs[name]), reference)
+            results = metrics.compute()
+            row += (
+                f"{results['ssim']:>8.3f}{results['lpips']:>8.3f}"
+                f"{results['l1']:>8.3f}{results['fid']:>9.2f}"
+            )
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Sweep the classifier-free guidance schedules of the FontDiffuser model: the model
+calls per glyph that run without guidance, the speedup of sampling a glyph, and the
+quality drop of the glyphs against the glyphs guided at every step in FontMetrics
+(SSIM, LPIPS, L1 and FID).
+
+A schedule is "full" (guidance at every step), "interval=MIN,MAX" (guidance only at
+the timesteps in [MIN, MAX]) or "final=K" (no guidance in the final K steps).
+
+Run from the container root:
+    python -m benchmarks.guidance_schedule_benchmark --ckpt-dir fyp24_model/ckpt
+
+Without --ckpt-dir, the model has random weights, so only the speed is meaningful.
+"""
+
+import argparse
+import time
+
+from benchmarks.precision_benchmark import load_model
+from benchmarks.quantization_benchmark import to_tensor
+from fyp24_model.sample import arg_parse, sampling
+from fyp24_model.src import FontDiffuserDPMPipeline, build_ddpm_scheduler
+from fyp24_model.src.metrics.font_metrics import FontMetrics
+
+
+def apply_schedule(model_args, schedule: str):
+    model_args.guidance_interval = None
+    model_args.unguided_final_steps = 0
+    if schedule.startswith("interval="):
+        low, high = schedule.removeprefix("interval=").split(",")
+        model_args.guidance_interval = [float(low), float(high)]
+    elif schedule.startswith("final="):
+        model_args.unguided_final_steps = int(schedule.removeprefix("final="))
+    elif schedule != "full":
+        raise ValueError(f"Unknown guidance schedule: {schedule}")
+
+
+class CallCounter:
+    """Counts the calls of the model that run without guidance."""
+
+    def __init__(self, model):
+        self.model = model
+        self.num_calls = 0
+        self.num_unguided_calls = 0
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def __call__(self, x, *args, **kwargs):
+        self.num_calls += 1
+        # Classifier-free guidance runs the model on twice the batch size
+        if x.shape[0] == 1:
+            self.num_unguided_calls += 1
+        return self.model(x, *args, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ckpt-dir", type=str, default=None)
+    parser.add_argument(
+        "--ttf-path", type=str, default="fyp24_model/ttf/SourceHanSerifTC-VF.ttf"
+    )
+    parser.add_argument("--style-image-path", type=str, default="fyp24_model/lan.png")
+    parser.add_argument("--characters", type=str, default="天地玄黃宇宙洪荒")
+    parser.add_argument("--num-inference-steps", type=int, default=20)
+    parser.add_argument(
+        "--schedules",
+        type=str,
+        nargs="+",
+        default=[
+            "interval=0,800",
+            "interval=200,999",
+            "final=2",
+            "final=5",
+            "final=10",
+        ],
+    )
+    parser.add_argument("--skip-metrics", action="store_true")
+    args = parser.parse_args()
+
+    model_args_to_parse = [
+        "--ttf_path",
+        args.ttf_path,
+        "--style_image_path",
+        args.style_image_path,
+        "--num_inference_steps",
+        str(args.num_inference_steps),
+        "--device",
+        "cpu",
+        "--freeze_for_inference",
+        "--attention_backend",
+        "sdpa",
+        "--seed",
+        "0",
+    ]
+    if args.ckpt_dir is not None:
+        model_args_to_parse += ["--ckpt_dir", args.ckpt_dir]
+    model_args = arg_parse(args_to_parse=model_args_to_parse)
+    model_args.character_input = True
+
+    model = CallCounter(load_model(model_args, args.ckpt_dir))
+    pipe = FontDiffuserDPMPipeline(
+        model=model,
+        ddpm_train_scheduler=build_ddpm_scheduler(args=model_args),
+        model_type=model_args.model_type,
+        guidance_type=model_args.guidance_type,
+        guidance_scale=model_args.guidance_scale,
+    )
+
+    glyphs = {}
+    glyph_times = {}
+    unguided_calls = {}
+    for schedule in ["full"] + [s for s in args.schedules if s != "full"]:
+        apply_schedule(model_args, schedule)
+        model.num_calls = model.num_unguided_calls = 0
+        glyphs[schedule] = []
+        start = time.perf_counter()
+        for char in args.characters:
+            model_args.content_character = char
+            glyphs[schedule].append(sampling(args=model_args, pipe=pipe))
+        glyph_times[schedule] = (time.perf_counter() - start) / len(args.characters)
+        unguided_calls[schedule] = f"{model.num_unguided_calls}/{model.num_calls}"
+
+    reference = to_tensor(glyphs["full"])
+    header = f"{'schedule':<18}{'unguided':>10}{'glyph (s)':>11}{'speedup':>9}"
+    if not args.skip_metrics:
+        header += f"{'ssim':>8}{'lpips':>8}{'l1':>8}{'fid':>9}"
+    print(header)
+    for schedule in glyphs:
+        row = (
+            f"{schedule:<18}{unguided_calls[schedule]:>10}"
+            f"{glyph_times[schedule]:>11.1f}"
+            f"{glyph_times['full'] / glyph_times[schedule]:>9.2f}"
+        )
+        if not args.skip_metrics:
+            metrics = FontMetrics(device="cpu")
+            metrics.update(to_tensor(glyphs[schedule]), reference)
+            results = metrics.compute()
+            row += (
+                f"{results['ssim']:>8.3f}{results['lpips']:>8.3f}"
+                f"{results['l1']:>8.3f}{results['fid']:>9.2f}"
+            )
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Profile the FontDiffuser model layer by layer with and without the inference
+optimizations: the time spent in each top-level block for one call of the model in
+the DPM-Solver loop, and how far the output drifts from the unoptimized model.
+
+Run from the container root:
+    python -m benchmarks.inference_optimization_benchmark --ckpt-dir fyp24_model/ckpt
+
+Without --ckpt-dir, the model has random weights.
+"""
+
+import argparse
+import copy
+import time
+from collections import defaultdict
+
+import torch
+import torch.nn as nn
+
+from benchmarks.precision_benchmark import load_model
+from fyp24_model.sample import arg_parse
+from fyp24_model.src.inference_optimization import optimize_for_inference
+
+
+def profiled_blocks(model) -> dict[str, nn.Module]:
+    blocks = {
+        "content_encoder": model.content_encoder,
+        "style_encoder": model.style_encoder,
+        "unet.conv_in": model.unet.conv_in,
+        "unet.mid_block": model.unet.mid_block,
+        "unet.conv_out": model.unet.conv_out,
+    }
+    for i, block in enumerate(model.unet.down_blocks):
+        blocks[f"unet.down_blocks.{i}"] = block
+    for i, block in enumerate(model.unet.up_blocks):
+        blocks[f"unet.up_blocks.{i}"] = block
+    return blocks
+
+
+def profile_step(model, inputs, repeat: int) -> tuple[dict[str, float], torch.Tensor]:
+    """Return the milliseconds spent in each block per call, and the output."""
+    times = defaultdict(float)
+    starts = {}
+    handles = []
+    for name, block in profiled_blocks(model).items():
+
+        def pre_hook(module, args, name=name):
+            starts[name] = time.perf_counter()
+
+        def hook(module, args, output, name=name):
+            times[name] += time.perf_counter() - starts[name]
+
+        handles.append(block.register_forward_pre_hook(pre_hook))
+        handles.append(block.register_forward_hook(hook))
+
+    with torch.no_grad():
+        model(*inputs)  # warm up
+        times.clear()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            output = model(*inputs)
+        times["total"] = time.perf_counter() - start
+    for handle in handles:
+        handle.remove()
+    return {name: t / repeat * 1e3 for name, t in times.items()}, output
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ckpt-dir", type=str, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--optimizations",
+        type=str,
+        nargs="+",
+        default=["channels_last", "fuse", "channels_last,fuse"],
+        help="The sets of optimizations to profile, comma-separated",
+    )
+    args = parser.parse_args()
+
+    model_args_to_parse = [
+        "--device",
+        "cpu",
+        "--freeze_for_inference",
+        "--attention_backend",
+        "sdpa",
+    ]
+    if args.ckpt_dir is not None:
+        model_args_to_parse += ["--ckpt_dir", args.ckpt_dir]
+    model_args = arg_parse(args_to_parse=model_args_to_parse)
+    model = load_model(model_args, args.ckpt_dir)
+
+    # Classifier-free guidance runs the conditional and unconditional inputs together
+    content_shape = (2, 3, *model_args.content_image_size)
+    style_shape = (2, 3, *model_args.style_image_size)
+    inputs = (
+        torch.randn(content_shape),
+        torch.full((2,), 500.0),
+        [torch.rand(content_shape), torch.rand(style_shape)],
+        model_args.content_encoder_downsample_size,
+        "V3",
+    )
+
+    profiles = {}
+    drifts = {}
+    for optimizations in ["baseline"] + args.optimizations:
+        optimized_model = copy.deepcopy(model)
+        if optimizations != "baseline":
+            optimize_for_inference(optimized_model, optimizations.split(","))
+        profiles[optimizations], output = profile_step(
+            optimized_model, inputs, args.repeat
+        )
+        if optimizations == "baseline":
+            reference = output
+        drifts[optimizations] = (
+            (output - reference).abs().max() / reference.abs().max()
+        ).item()
+
+    print(f"{'block (ms)':<22}" + "".join(f"{name:>20}" for name in profiles))
+    for block in profiles["baseline"]:
+        print(
+            f"{block:<22}"
+            + "".join(f"{profile[block]:>20.1f}" for profile in profiles.values())
+        )
+    print(f"{'drift':<22}" + "".join(f"{drift:>20.1e}" for drift in drifts.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark the throughput of the FontDiffuser model (one call of the model in
+the DPM-Solver loop) in eager PyTorch against ONNX Runtime on the CPU.
+
+Run from the container root:
+    python -m benchmarks.onnx_benchmark
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import torch
+
+from fyp24_model.sample import arg_parse
+from fyp24_model.src import (
+    FontDiffuserModelDPM,
+    build_content_encoder,
+    build_style_encoder,
+    build_unet,
+)
+from fyp24_model.src.dpm_solver.onnx_model import OnnxModel, export_onnx
+
+
+def time_step(model, inputs, repeat: int) -> float:
+    with torch.no_grad():
+        model(*inputs)  # warm up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            model(*inputs)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    # Classifier-free guidance runs the conditional and unconditional inputs together
+    parser.add_argument("--batch-size", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--num-threads", type=int, nargs="+", default=[1])
+    args = parser.parse_args()
+
+    model_args = arg_parse(args_to_parse=[])
+    model = FontDiffuserModelDPM(
+        unet=build_unet(args=model_args),
+        style_encoder=build_style_encoder(args=model_args),
+        content_encoder=build_content_encoder(args=model_args),
+    )
+    model.freeze_for_inference()
+
+    content_shape = (args.batch_size, 3, *model_args.content_image_size)
+    style_shape = (args.batch_size, 3, *model_args.style_image_size)
+    inputs = (
+        torch.randn(content_shape),
+        torch.full((args.batch_size,), 500.0),
+        [torch.rand(content_shape), torch.rand(style_shape)],
+        model_args.content_encoder_downsample_size,
+        "V3",
+    )
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        onnx_path = os.path.join(temp_dir, "fontdiffuser.onnx")
+        export_onnx(
+            model=model,
+            path=onnx_path,
+            content_image_size=model_args.content_image_size,
+            style_image_size=model_args.style_image_size,
+            content_encoder_downsample_size=model_args.content_encoder_downsample_size,
+        )
+
+        print(f"{'backend':<12}{'threads':>8}{'step (ms)':>12}{'samples/s':>12}")
+        for num_threads in args.num_threads:
+            backends = [
+                ("pytorch", model),
+                ("onnxruntime", OnnxModel(onnx_path, num_threads)),
+            ]
+            torch.set_num_threads(num_threads)
+            for name, backend_model in backends:
+                step_time = time_step(backend_model, inputs, args.repeat)
+                print(
+                    f"{name:<12}{num_threads:>8}{step_time * 1e3:>12.1f}"
+                    f"{args.batch_size / step_time:>12.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Evaluate the precisions of the FontDiffuser model: the latency of one call of the
+model in the DPM-Solver loop, the speedup of sampling a glyph, and the quality drop
+of the glyphs against the fp32 glyphs in FontMetrics (SSIM, LPIPS, L1 and FID).
+
+Run from the container root:
+    python -m benchmarks.precision_benchmark --ckpt-dir fyp24_model/ckpt
+
+Without --ckpt-dir, the model has random weights, so only the speed is meaningful.
+"""
+
+import argparse
+import time
+
+import torch
+
+from benchmarks.quantization_benchmark import to_tensor
+from fyp24_model.sample import arg_parse, load_fontdiffuser_model, sampling
+from fyp24_model.src import (
+    FontDiffuserDPMPipeline,
+    FontDiffuserModelDPM,
+    build_content_encoder,
+    build_ddpm_scheduler,
+    build_style_encoder,
+    build_unet,
+)
+from fyp24_model.src.metrics.font_metrics import FontMetrics
+from fyp24_model.src.precision import PRECISIONS, PrecisionModel
+
+
+def load_model(args, ckpt_dir):
+    if ckpt_dir is not None:
+        return load_fontdiffuser_model(args=args)
+
+    torch.manual_seed(0)
+    model = FontDiffuserModelDPM(
+        unet=build_unet(args=args),
+        style_encoder=build_style_encoder(args=args),
+        content_encoder=build_content_encoder(args=args),
+    )
+    model.freeze_for_inference()
+    return model
+
+
+def time_step(model, args, repeat: int) -> float:
+    # Classifier-free guidance runs the conditional and unconditional inputs together
+    content_shape = (2, 3, *args.content_image_size)
+    style_shape = (2, 3, *args.style_image_size)
+    inputs = (
+        torch.randn(content_shape),
+        torch.full((2,), 500.0),
+        [torch.rand(content_shape), torch.rand(style_shape)],
+        args.content_encoder_downsample_size,
+        "V3",
+    )
+    with torch.no_grad():
+        model(*inputs)  # warm up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            model(*inputs)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ckpt-dir", type=str, default=None)
+    parser.add_argument(
+        "--ttf-path", type=str, default="fyp24_model/ttf/SourceHanSerifTC-VF.ttf"
+    )
+    parser.add_argument("--style-image-path", type=str, default="fyp24_model/lan.png")
+    parser.add_argument("--characters", type=str, default="天地玄黃宇宙洪荒")
+    parser.add_argument("--num-inference-steps", type=int, default=20)
+    parser.add_argument("--precisions", type=str, nargs="+", default=PRECISIONS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-metrics", action="store_true")
+    args = parser.parse_args()
+
+    model_args_to_parse = [
+        "--ttf_path",
+        args.ttf_path,
+        "--style_image_path",
+        args.style_image_path,
+        "--num_inference_steps",
+        str(args.num_inference_steps),
+        "--device",
+        "cpu",
+        "--freeze_for_inference",
+        "--attention_backend",
+        "sdpa",
+    ]
+    if args.ckpt_dir is not None:
+        model_args_to_parse += ["--ckpt_dir", args.ckpt_dir]
+    model_args = arg_parse(args_to_parse=model_args_to_parse)
+    model_args.character_input = True
+
+    glyphs = {}
+    step_times = {}
+    glyph_times = {}
+    for precision in ["fp32"] + [p for p in args.precisions if p != "fp32"]:
+        model = PrecisionModel(
+            load_model(model_args, args.ckpt_dir), precision=precision
+        )
+        step_times[precision] = time_step(model, model_args, args.repeat)
+        pipe = FontDiffuserDPMPipeline(
+            model=model,
+            ddpm_train_scheduler=build_ddpm_scheduler(args=model_args),
+            model_type=model_args.model_type,
+            guidance_type=model_args.guidance_type,
+            guidance_scale=model_args.guidance_scale,
+        )
+
+        glyphs[precision] = []
+        start = time.perf_counter()
+        for char in args.characters:
+            model_args.content_character = char
+            glyphs[precision].append(sampling(args=model_args, pipe=pipe))
+        glyph_times[precision] = (time.perf_counter() - start) / len(args.characters)
+
+    reference = to_tensor(glyphs["fp32"])
+    header = f"{'precision':<10}{'step (ms)':>11}{'glyph (s)':>11}{'speedup':>9}"
+    if not args.skip_metrics:
+        header += f"{'ssim':>8}{'lpips':>8}{'l1':>8}{'fid':>9}"
+    print(header)
+    for precision in glyphs:
+        row = (
+            f"{precision:<10}{step_times[precision] * 1e3:>11.1f}"
+            f"{glyph_times[precision]:>11.1f}"
+            f"{glyph_times['fp32'] / glyph_times[precision]:>9.2f}"
+        )
+        if not args.skip_metrics:
+            metrics = FontMetrics(device="cpu")
+            metrics.update(to_tensor(glyphs[precision]), reference)
+            results = metrics.compute()
+            row += (
+                f"{results['ssim']:>8.3f}{results['lpips']:>8.3f}"
+                f"{results['l1']:>8.3f}{results['fid']:>9.2f}"
+            )
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
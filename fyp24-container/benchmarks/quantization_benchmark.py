@@ -0,0 +1,127 @@
+"""Evaluate the INT8 quantization modes of the FontDiffuser UNet on the CPU:
+the speedup of sampling a glyph, and the quality drop of the glyphs against
+the fp32 glyphs in FontMetrics (SSIM, LPIPS, L1 and FID).
+
+Run from the container root:
+    python -m benchmarks.quantization_benchmark --ckpt-dir fyp24_model/ckpt
+
+Without --ckpt-dir, the model has random weights, so only the speed is meaningful.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from fyp24_model.sample import (
+    arg_parse,
+    load_fontdiffuser_model,
+    quantize_fontdiffuser_model,
+    sampling,
+)
+from fyp24_model.src import (
+    FontDiffuserDPMPipeline,
+    FontDiffuserModelDPM,
+    build_content_encoder,
+    build_ddpm_scheduler,
+    build_style_encoder,
+    build_unet,
+)
+from fyp24_model.src.metrics.font_metrics import FontMetrics
+from fyp24_model.src.quantization import QUANTIZATION_MODES
+
+
+def load_model(args, ckpt_dir):
+    if ckpt_dir is not None:
+        return load_fontdiffuser_model(args=args)
+
+    torch.manual_seed(0)
+    model = FontDiffuserModelDPM(
+        unet=build_unet(args=args),
+        style_encoder=build_style_encoder(args=args),
+        content_encoder=build_content_encoder(args=args),
+    )
+    model.freeze_for_inference()
+    if args.quantization != "none":
+        quantize_fontdiffuser_model(args=args, model=model)
+    return model
+
+
+def to_tensor(images) -> torch.Tensor:
+    """Convert PIL images to a batch of shape (N, 3, H, W) in [0, 1]."""
+    array = np.stack([np.asarray(image.convert("RGB")) for image in images])
+    return torch.from_numpy(array).permute(0, 3, 1, 2).float() / 255
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ckpt-dir", type=str, default=None)
+    parser.add_argument(
+        "--ttf-path", type=str, default="fyp24_model/ttf/SourceHanSerifTC-VF.ttf"
+    )
+    parser.add_argument("--style-image-path", type=str, default="fyp24_model/lan.png")
+    parser.add_argument("--characters", type=str, default="天地玄黃宇宙洪荒")
+    parser.add_argument(
+        "--calibration-characters", type=str, default="永和九年歲在癸丑"
+    )
+    parser.add_argument("--num-inference-steps", type=int, default=20)
+    args = parser.parse_args()
+
+    model_args_to_parse = [
+        "--ttf_path",
+        args.ttf_path,
+        "--style_image_path",
+        args.style_image_path,
+        "--quantization_calibration_characters",
+        args.calibration_characters,
+        "--num_inference_steps",
+        str(args.num_inference_steps),
+        "--device",
+        "cpu",
+        "--freeze_for_inference",
+    ]
+    if args.ckpt_dir is not None:
+        model_args_to_parse += ["--ckpt_dir", args.ckpt_dir]
+
+    glyphs = {}
+    glyph_times = {}
+    for mode in QUANTIZATION_MODES:
+        model_args = arg_parse(
+            args_to_parse=model_args_to_parse + ["--quantization", mode]
+        )
+        model_args.character_input = True
+        pipe = FontDiffuserDPMPipeline(
+            model=load_model(model_args, args.ckpt_dir),
+            ddpm_train_scheduler=build_ddpm_scheduler(args=model_args),
+            model_type=model_args.model_type,
+            guidance_type=model_args.guidance_type,
+            guidance_scale=model_args.guidance_scale,
+        )
+
+        glyphs[mode] = []
+        start = time.perf_counter()
+        for char in args.characters:
+            model_args.content_character = char
+            glyphs[mode].append(sampling(args=model_args, pipe=pipe))
+        glyph_times[mode] = (time.perf_counter() - start) / len(args.characters)
+
+    reference = to_tensor(glyphs["none"])
+    print(
+        f"{'mode':<10}{'glyph (s)':>11}{'speedup':>9}"
+        f"{'ssim':>8}{'lpips':>8}{'l1':>8}{'fid':>9}"
+    )
+    for mode in QUANTIZATION_MODES:
+        metrics = FontMetrics(device="cpu")
+        metrics.update(to_tensor(glyphs[mode]), reference)
+        results = metrics.compute()
+        print(
+            f"{mode:<10}{glyph_times[mode]:>11.1f}"
+            f"{glyph_times['none'] / glyph_times[mode]:>9.2f}"
+            f"{results['ssim']:>8.3f}{results['lpips']:>8.3f}"
+            f"{results['l1']:>8.3f}{results['fid']:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark the overhead of multistep DPM-Solver++ around the model, per glyph at
+batch size 1: the solver computes the noise schedule and the update coefficients
+at each step without a plan, once per setting with a plan that is computed for
+every glyph, and not at all with the plan memoized by the noise schedule.
+
+The model costs nothing, so the times are the solver alone.
+
+Run from the container root:
+    python -m benchmarks.solver_plan_benchmark
+"""
+
+import argparse
+import time
+
+import torch
+
+from fyp24_model.src.dpm_solver.dpm_solver_pytorch import DPM_Solver, NoiseScheduleVP
+
+
+def zero_model_fn(x, t_continuous):
+    return torch.zeros_like(x)
+
+
+def sample_without_plan(dpm_solver: DPM_Solver, x, steps: int, order: int):
+    """The multistep loop of DPM_Solver.sample, with the updates computed from the
+    noise schedule at each step.
+    """
+    ns = dpm_solver.noise_schedule
+    timesteps = dpm_solver.get_time_steps(
+        skip_type="time_uniform", t_T=ns.T, t_0=1.0 / ns.total_N, N=steps, device="cpu"
+    )
+    t_prev_list = [timesteps[0]]
+    model_prev_list = [dpm_solver.model_fn(x, timesteps[0])]
+    for step in range(1, steps + 1):
+        t = timesteps[step]
+        if step < order:
+            step_order = step
+        elif steps < 10:
+            # The lower orders at the final steps
+            step_order = min(order, steps + 1 - step)
+        else:
+            step_order = order
+        x = dpm_solver.multistep_dpm_solver_update(
+            x, model_prev_list[-step_order:], t_prev_list[-step_order:], t, step_order
+        )
+        t_prev_list = (t_prev_list + [t])[-order:]
+        if step < steps:
+            model_prev_list = (model_prev_list + [dpm_solver.model_fn(x, t)])[-order:]
+    return x
+
+
+def time_sample(sample, repeat: int) -> float:
+    sample()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        sample()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, nargs="+", default=[10, 15, 20, 25])
+    parser.add_argument("--order", type=int, default=2)
+    parser.add_argument("--resolution", type=int, default=96)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    noise_schedule = NoiseScheduleVP(
+        schedule="discrete", betas=torch.linspace(1e-4, 0.02, 1000)
+    )
+    dpm_solver = DPM_Solver(zero_model_fn, noise_schedule, correcting_x0_fn=None)
+    x = torch.randn(1, 3, args.resolution, args.resolution)
+
+    def sample(steps):
+        return dpm_solver.sample(x, steps=steps, order=args.order)
+
+    def sample_with_new_plan(steps):
+        noise_schedule.multistep_plans.clear()
+        return sample(steps)
+
+    print(f"{'steps':<8}{'no plan (ms)':>14}{'new plan (ms)':>15}{'memoized (ms)':>15}")
+    with torch.no_grad():
+        for steps in args.steps:
+            times = [
+                time_sample(
+                    lambda: sample_without_plan(dpm_solver, x, steps, args.order),
+                    args.repeat,
+                ),
+                time_sample(lambda: sample_with_new_plan(steps), args.repeat),
+                time_sample(lambda: sample(steps), args.repeat),
+            ]
+            print(f"{steps:<8}{times[0]:>14.2f}{times[1]:>15.2f}{times[2]:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
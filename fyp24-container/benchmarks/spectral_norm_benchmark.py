@@ -0,0 +1,53 @@
+"""Benchmark the encoders of FontDiffuser with spectral norm computed at every
+forward pass against spectral norm frozen into static weights.
+
+Run from the container root:
+    python -m benchmarks.spectral_norm_benchmark
+"""
+
+import argparse
+import time
+
+import torch
+
+from fyp24_model.sample import arg_parse
+from fyp24_model.src import build_content_encoder, build_style_encoder
+from fyp24_model.src.model import freeze_spectral_norm
+
+
+def time_forward(encoder: torch.nn.Module, images: torch.Tensor, repeat: int) -> float:
+    with torch.no_grad():
+        encoder(images)  # warm up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            encoder(images)
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--device", type=str, default="cpu")
+    args = parser.parse_args()
+
+    model_args = arg_parse(args_to_parse=[])
+    encoders = [
+        ("style encoder", build_style_encoder(args=model_args)),
+        ("content encoder", build_content_encoder(args=model_args)),
+    ]
+
+    print(f"{'encoder':<18}{'layers':>8}{'per-step SN (ms)':>20}{'frozen (ms)':>14}")
+    for name, encoder in encoders:
+        encoder = encoder.to(args.device).eval()
+        images = torch.randn(
+            args.batch_size, 3, *model_args.style_image_size, device=args.device
+        )
+        sn_time = time_forward(encoder, images, args.repeat)
+        num_frozen = freeze_spectral_norm(encoder)
+        frozen_time = time_forward(encoder, images, args.repeat)
+        print(f"{name:<18}{num_frozen:>8}{sn_time:>20.1f}{frozen_time:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
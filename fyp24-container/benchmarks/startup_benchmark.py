@@ -0,0 +1,145 @@
+"""Benchmark the startup of the FontDiffuser model: the time to load the checkpoints
+into the model and the peak memory of the process, for the .pth checkpoints loaded
+as before (copied into randomly initialized modules), the .pth checkpoints
+memory-mapped, and the safetensors checkpoints memory-mapped.
+
+Run from the container root:
+    python -m benchmarks.startup_benchmark --ckpt-dir fyp24_model/ckpt
+
+Without --ckpt-dir, checkpoints with random weights are saved to a temporary
+directory. Each loader runs in a fresh process, after a first run to warm up the
+page cache. The peak memory is the growth of the resident memory while loading,
+which is read from /proc, so the benchmark runs on Linux only.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import torch
+
+from fyp24_model.sample import arg_parse, load_fontdiffuser_model
+from fyp24_model.src import (
+    FontDiffuserModelDPM,
+    build_content_encoder,
+    build_style_encoder,
+    build_unet,
+)
+from fyp24_model.src.checkpoint import CHECKPOINT_NAMES, convert_checkpoint
+
+LOADERS = ("pth_copy", "pth_mmap", "safetensors_mmap")
+
+
+def load_by_copy(args):
+    """The loader before memory-mapping."""
+    unet = build_unet(args=args)
+    unet.load_state_dict(torch.load(f"{args.ckpt_dir}/unet.pth"))
+    style_encoder = build_style_encoder(args=args)
+    style_encoder.load_state_dict(torch.load(f"{args.ckpt_dir}/style_encoder.pth"))
+    content_encoder = build_content_encoder(args=args)
+    content_encoder.load_state_dict(torch.load(f"{args.ckpt_dir}/content_encoder.pth"))
+    return FontDiffuserModelDPM(
+        unet=unet, style_encoder=style_encoder, content_encoder=content_encoder
+    )
+
+
+def read_memory(field: str) -> float:
+    """Read a memory field of this process in MB (Linux only)."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1]) / 1024
+    raise KeyError(field)
+
+
+def measure(loader: str, ckpt_dir: str):
+    """Load the model in this process and print the load time and peak memory."""
+    ckpt_dirs = {"safetensors_mmap": f"{ckpt_dir}/safetensors"}
+    args = arg_parse(
+        args_to_parse=[
+            "--ckpt_dir",
+            ckpt_dirs.get(loader, f"{ckpt_dir}/pth"),
+            "--device",
+            "cpu",
+        ]
+    )
+    # Reset the peak resident memory, so that the memory of the imports is left out
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    start_rss = read_memory("VmRSS")
+    start = time.perf_counter()
+    if loader == "pth_copy":
+        model = load_by_copy(args)
+    else:
+        model = load_fontdiffuser_model(args=args)
+    load_time = time.perf_counter() - start
+    # Touch every weight, as the first sampling step does
+    sum(parameter.sum() for parameter in model.parameters())
+    first_use_time = time.perf_counter() - start
+    peak_rss = read_memory("VmHWM")
+    print(f"RESULT {load_time} {first_use_time} {peak_rss - start_rss}")
+
+
+def run(loader: str, ckpt_dir: str) -> list[float]:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup_benchmark"]
+        + ["--measure", loader, "--ckpt-dir", ckpt_dir],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    result = next(line for line in output.splitlines() if line.startswith("RESULT"))
+    return [float(value) for value in result.split()[1:]]
+
+
+def prepare_checkpoints(ckpt_dir, output_dir: str):
+    """Copy the .pth checkpoints and their safetensors conversions to output_dir."""
+    os.makedirs(f"{output_dir}/pth")
+    os.makedirs(f"{output_dir}/safetensors")
+    if ckpt_dir is None:
+        torch.manual_seed(0)
+        args = arg_parse(args_to_parse=[])
+        modules = {
+            "unet": build_unet(args=args),
+            "style_encoder": build_style_encoder(args=args),
+            "content_encoder": build_content_encoder(args=args),
+        }
+    for name in CHECKPOINT_NAMES:
+        if ckpt_dir is None:
+            torch.save(modules[name].state_dict(), f"{output_dir}/pth/{name}.pth")
+        else:
+            shutil.copy(f"{ckpt_dir}/{name}.pth", f"{output_dir}/pth/{name}.pth")
+        shutil.copy(f"{output_dir}/pth/{name}.pth", f"{output_dir}/safetensors")
+        convert_checkpoint(f"{output_dir}/safetensors/{name}.pth")
+        os.remove(f"{output_dir}/safetensors/{name}.pth")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ckpt-dir", type=str, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--measure", type=str, choices=LOADERS, default=None)
+    args = parser.parse_args()
+
+    if args.measure is not None:
+        measure(args.measure, args.ckpt_dir)
+        return
+
+    with tempfile.TemporaryDirectory() as ckpt_dir:
+        prepare_checkpoints(args.ckpt_dir, ckpt_dir)
+        print(
+            f"{'loader':<18}{'load (s)':>10}{'first use (s)':>15}{'peak memory (MB)':>18}"
+        )
+        for loader in LOADERS:
+            run(loader, ckpt_dir)  # warm up the page cache
+            results = [run(loader, ckpt_dir) for _ in range(args.repeat)]
+            load_time, first_use_time, peak = [min(r) for r in zip(*results)]
+            print(f"{loader:<18}{load_time:>10.2f}{first_use_time:>15.2f}{peak:>18.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,21 +7,30 @@ from domain.exception.retrieval_from_empty_job_queue import RetrievalFromEmptyJo
 
 class JobQueue:
     __job_queue: Queue[UUID]
+    __job_costs: dict[UUID, float]  # estimated cost of each job in the queue
 
     def __init__(self):
         self.__job_queue = Queue()
+        self.__job_costs = {}
 
-    def add_job(self, job_id: UUID) -> None:
+    def add_job(self, job_id: UUID, cost: float = 0.0) -> None:
         if job_id in self.__job_queue.queue:
             # Job is already in the queue, no need to add it again
             return
+        self.__job_costs[job_id] = cost
         self.__job_queue.put(job_id)
 
-    def dequeue_job(self, shift_queue: Callable[[], None]) -> UUID:
+    def dequeue_job(self, shift_queue: Callable[[float], None]) -> UUID:
         if self.__job_queue.empty():
             raise RetrievalFromEmptyJobQueue("Dequeue a job from an empty queue.")
-        shift_queue()
-        return self.__job_queue.get()
+        # The jobs behind move up by the cost of the dequeued job
+        shift_queue(self.__job_costs[self.__job_queue.queue[0]])
+        job_id = self.__job_queue.get()
+        self.__job_costs.pop(job_id)
+        return job_id
+
+    def total_cost(self) -> float:
+        return sum(self.__job_costs.values())
 
     def is_empty(self) -> bool:
         return self.__job_queue.empty()
@@ -46,19 +46,20 @@ class JobTable:
             return
 
         coroutine = self.__get_coroutine(job_id)
-        if coroutine is not None and not coroutine.cancelled():
-            # Cancel the executing coroutine if it exists
-            coroutine.cancel()
+        if coroutine is not None and not coroutine.done():
+            # Cancel the executing coroutine if it exists. It runs in the event loop
+            # of the queue thread, which may not be the calling thread.
+            coroutine.get_loop().call_soon_threadsafe(coroutine.cancel)
 
         job.update(
             job_status=JobStatus.Cancelled,
             job_info=CancelledJob.of(job.job_info),
         )
 
-    def shift_job_queue(self) -> None:
+    def shift_job_queue(self, dequeued_job_cost: float = 0.0) -> None:
         for job in self.__jobs.values():
             if isinstance(job.job_info, WaitingJob):
-                new_job_info = job.job_info.move_up_queue()
+                new_job_info = job.job_info.move_up_queue(dequeued_job_cost)
                 job.update(job_status=JobStatus.Waiting, job_info=new_job_info)
 
     def add_coroutine(self, job_id: UUID, coroutine: Task) -> None:
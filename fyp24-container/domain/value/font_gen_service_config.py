@@ -1,11 +1,20 @@
+from enum import Enum
+
 from pydantic import BaseModel
 
 
+class Precision(Enum):
+    FP32 = "fp32"
+    BF16 = "bf16"  # bfloat16 autocast; fast on CPUs with AVX-512 BF16 or AMX
+    FP16 = "fp16"  # float16 weights; meant for GPUs
+
+
 class FontGenServiceConfig(BaseModel):
     model_config = {"frozen": True, "extra": "forbid"}
 
     operate_queue_interval: float  # seconds to wait if the queue is empty
     max_retain_time: float  # seconds to retain stopped jobs
+    precision: Precision = Precision.FP32  # precision of the font generation model
 
     def __init__(self, **data):
         super().__init__(**data)
@@ -32,18 +32,21 @@ class WaitingJob(JobInfo):
     model_config = ConfigDict(frozen=True, extra="forbid")
 
     place_in_queue: int
+    cost_ahead: float = 0.0  # estimated cost of the jobs ahead in the queue
 
     @staticmethod
-    def create(place_in_queue: int) -> "WaitingJob":
+    def create(place_in_queue: int, cost_ahead: float = 0.0) -> "WaitingJob":
         return WaitingJob(
             time_start_to_queue=datetime.now(),
             place_in_queue=place_in_queue,
+            cost_ahead=cost_ahead,
         )
 
-    def move_up_queue(self) -> "WaitingJob":
+    def move_up_queue(self, dequeued_job_cost: float = 0.0) -> "WaitingJob":
         return WaitingJob(
             time_start_to_queue=self.time_start_to_queue,
             place_in_queue=self.place_in_queue - 1,
+            cost_ahead=max(self.cost_ahead - dequeued_job_cost, 0.0),
         )
 
 
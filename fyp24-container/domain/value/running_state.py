@@ -1,13 +1,19 @@
 from enum import Enum
+from typing import Optional
 
 from pydantic import BaseModel, ConfigDict
 
+from .glyph_preview import GlyphPreview
+
 
 class RunningState(BaseModel):
     model_config = ConfigDict(frozen=True, extra="forbid")
 
     name: str
     message: str
+    step: Optional[int] = None  # solver steps done on the glyph being generated
+    total_steps: Optional[int] = None
+    preview: Optional[GlyphPreview] = None  # the glyph being generated, if previewed
 
     @staticmethod
     def not_started() -> "RunningState":
@@ -17,6 +23,22 @@ class RunningState(BaseModel):
     def generating(current: int, total: int) -> "RunningState":
         return RunningState(name="generating", message=f"Generating: {current}/{total}")
 
+    @staticmethod
+    def sampling(
+        current: int,
+        total: int,
+        step: int,
+        total_steps: int,
+        preview: Optional[GlyphPreview] = None,
+    ) -> "RunningState":
+        return RunningState(
+            name="generating",
+            message=f"Generating: {current}/{total} (step {step}/{total_steps})",
+            step=step,
+            total_steps=total_steps,
+            preview=preview,
+        )
+
     @staticmethod
     def cleaning_up() -> "RunningState":
         return RunningState(name="cleaning up", message="Cleaning up resources")
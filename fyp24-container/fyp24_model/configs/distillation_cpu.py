@@ -0,0 +1,29 @@
+# This script is provided by the FYP24 project group.
+# This script is the configuration of a small model and a short distillation that
+# run on the CPU, e.g. in the tests of the distillation.
+
+# The content encoder and the UNet are only built for 96x96 glyphs and 64 content
+# channels, so the model is made smaller through the UNet and the style encoder
+DISTILLATION_CPU_ARGS = [
+    "--unet_channels",
+    "32",
+    "32",
+    "32",
+    "32",
+    "--style_start_channel",
+    "8",
+    "--train_batch_size",
+    "2",
+    "--max_train_steps",
+    "4",
+    "--ckpt_interval",
+    "4",
+    "--log_interval",
+    "1",
+    "--lr_warmup_steps",
+    "0",
+    "--learning_rate",
+    "1e-4",
+    "--student_steps",
+    "2",
+]
@@ -45,7 +45,8 @@ def get_parser():
     )
     parser.add_argument(
         "--unet_channels",
-        type=tuple,
+        type=int,
+        nargs=4,
         default=(64, 128, 256, 512),
         help="The channels of the UNet.",
     )
@@ -244,6 +245,26 @@ def get_parser():
         help="The directory of the ckpt to resume training (requires the `whole_model.pth` file).",
     )
 
+    ## distillation
+    parser.add_argument(
+        "--teacher_ckpt_dir",
+        type=str,
+        default=None,
+        help="The ckpt directory of the teacher to distill, e.g. of the last training phase or the last student.",
+    )
+    parser.add_argument(
+        "--student_steps",
+        type=int,
+        default=4,
+        help="The sampling steps of the student, half of those of the teacher.",
+    )
+    parser.add_argument(
+        "--teacher_guidance_scale",
+        type=float,
+        default=7.5,
+        help="The guidance scale of the teacher baked into the student; 1 if the teacher is a student.",
+    )
+
     # Sampling
     parser.add_argument(
         "--algorithm_type",
@@ -263,9 +284,28 @@ def get_parser():
         default=7.5,
         help="Guidance scale of the classifier-free mode.",
     )
+    parser.add_argument(
+        "--guidance_interval",
+        type=float,
+        nargs=2,
+        default=None,
+        help="The (min, max) timesteps to apply the classifier-free guidance in, e.g. 0 600.",
+    )
+    parser.add_argument(
+        "--unguided_final_steps",
+        type=int,
+        default=0,
+        help="The number of final steps that skip the classifier-free guidance.",
+    )
     parser.add_argument(
         "--num_inference_steps", type=int, default=20, help="Sampling step."
     )
+    parser.add_argument(
+        "--distilled_steps",
+        type=int,
+        default=None,
+        help="Sample the ckpt as a student distilled for this number of steps, without guidance.",
+    )
     parser.add_argument(
         "--model_type", type=str, default="noise", help="model_type for sampling."
     )
@@ -278,6 +318,24 @@ def get_parser():
     parser.add_argument(
         "--method", type=str, default="multistep", help="Multistep of dpmsolver."
     )
+    parser.add_argument(
+        "--atol",
+        type=float,
+        default=0.0078,
+        help="The absolute tolerance of the adaptive method of dpmsolver.",
+    )
+    parser.add_argument(
+        "--rtol",
+        type=float,
+        default=0.05,
+        help="The relative tolerance of the adaptive method of dpmsolver.",
+    )
+    parser.add_argument(
+        "--max_nfe",
+        type=int,
+        default=None,
+        help="The budget of model evaluations of the adaptive method of dpmsolver.",
+    )
     parser.add_argument(
         "--correcting_x0_fn",
         type=str,
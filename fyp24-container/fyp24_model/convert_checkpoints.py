@@ -0,0 +1,25 @@
+# This script converts the FontDiffuser checkpoints to safetensors, which sample.py
+# then loads memory-mapped in place of the .pth checkpoints.
+# Usage (from the container root):
+#   python -m fyp24_model.convert_checkpoints --ckpt_dir <checkpoint dir>
+# Requires the safetensors package.
+
+import argparse
+
+from .src.checkpoint import CHECKPOINT_NAMES, convert_checkpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert the .pth checkpoints in a directory to safetensors."
+    )
+    parser.add_argument("--ckpt_dir", type=str, required=True)
+    args = parser.parse_args()
+
+    for name in CHECKPOINT_NAMES:
+        output_path = convert_checkpoint(f"{args.ckpt_dir}/{name}.pth")
+        print(f"Converted {name}.pth to {output_path} successfully!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+# This script is provided by the FYP24 project group.
+# This script distills a trained FontDiffuser model into a student that samples a
+# glyph in a few steps, with the classifier-free guidance baked in.
+# Each run halves the steps of the teacher, e.g. 8 guided steps to a student of 4
+# steps with --teacher_ckpt_dir of the last training phase, then 4 to 2 with
+# --teacher_ckpt_dir of that student and --teacher_guidance_scale 1.
+# Sample the student with --distilled_steps set to its --student_steps.
+# For a small run on the CPU, pass the arguments of configs/distillation_cpu.py.
+
+import os
+import math
+import time
+import logging
+from tqdm.auto import tqdm
+
+import torch
+import torch.utils.data
+
+from accelerate import Accelerator, DistributedDataParallelKwargs
+from accelerate.logging import get_logger
+from accelerate.utils import set_seed
+from diffusers.optimization import get_scheduler
+
+from dataset.font_dataset import FontDataset
+from dataset.collate_fn import CollateFN
+from configs.fontdiffuser import get_parser
+from src import (
+    FontDiffuserModel,
+    build_unet,
+    build_style_encoder,
+    build_content_encoder,
+    build_ddpm_scheduler,
+)
+from src.distillation import ProgressiveDistillation
+from utils import save_args_to_yaml, get_transform_function
+
+logger = get_logger(__name__)
+
+
+def get_local_time():
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time()))
+
+
+def get_args():
+    parser = get_parser()
+    args = parser.parse_args()
+    env_local_rank = int(os.environ.get("LOCAL_RANK", -1))
+    if env_local_rank != -1 and env_local_rank != args.local_rank:
+        args.local_rank = env_local_rank
+    style_image_size = args.style_image_size
+    content_image_size = args.content_image_size
+    args.style_image_size = (style_image_size, style_image_size)
+    args.content_image_size = (content_image_size, content_image_size)
+
+    return args
+
+
+def load_model(args, ckpt_dir):
+    unet = build_unet(args=args)
+    style_encoder = build_style_encoder(args=args)
+    content_encoder = build_content_encoder(args=args)
+    unet.load_state_dict(torch.load(f"{ckpt_dir}/unet.pth"))
+    style_encoder.load_state_dict(torch.load(f"{ckpt_dir}/style_encoder.pth"))
+    content_encoder.load_state_dict(torch.load(f"{ckpt_dir}/content_encoder.pth"))
+    return FontDiffuserModel(
+        unet=unet,
+        style_encoder=style_encoder,
+        content_encoder=content_encoder,
+    )
+
+
+def main():
+    args = get_args()
+
+    assert isinstance(args.teacher_ckpt_dir, str) and os.path.exists(
+        args.teacher_ckpt_dir
+    ), f"Expect the teacher checkpoint directory exists, but got {args.teacher_ckpt_dir}"
+
+    logging_dir = f"{args.output_dir}/{args.logging_dir}"
+
+    # Prepare accelerator
+    accelerator_kwargs = DistributedDataParallelKwargs(find_unused_parameters=True)
+    accelerator = Accelerator(
+        gradient_accumulation_steps=args.gradient_accumulation_steps,
+        mixed_precision=args.mixed_precision,
+        log_with=args.report_to,
+        project_dir=logging_dir,
+        kwargs_handlers=[accelerator_kwargs],
+    )
+
+    # Prepare logging
+    if accelerator.is_main_process:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    accelerator.wait_for_everyone()
+
+    logging.basicConfig(
+        filename=f"{args.output_dir}/fontdiffuser_distillation.log",
+        datefmt="%m/%d/%Y %H:%M:%S",
+        level=logging.INFO,
+    )
+
+    if args.seed is not None:
+        set_seed(args.seed)
+
+    # Load the teacher, and the student from the weights of the teacher
+    teacher = load_model(args, args.teacher_ckpt_dir)
+    teacher.requires_grad_(False)
+    teacher.eval()
+    model = load_model(args, args.teacher_ckpt_dir)
+    noise_scheduler = build_ddpm_scheduler(args)
+
+    # Load transform functions
+    content_transforms = get_transform_function(
+        target_size=args.content_image_size, normalize=True
+    )
+    style_transforms = get_transform_function(
+        target_size=args.style_image_size, normalize=True
+    )
+    target_transforms = get_transform_function(
+        target_size=(args.resolution, args.resolution), normalize=True
+    )
+
+    # Load training dataset
+    train_dataset = FontDataset(
+        args=args,
+        phase="train",
+        transforms=[
+            content_transforms,
+            style_transforms,
+            target_transforms,
+        ],
+        is_validation_mode=False,
+    )
+    train_dataloader = torch.utils.data.DataLoader(
+        train_dataset,
+        shuffle=True,
+        batch_size=args.train_batch_size,
+        collate_fn=CollateFN(),
+    )
+
+    # Build optimizer and learning rate
+    if args.scale_lr:
+        args.learning_rate = (
+            args.learning_rate
+            * args.gradient_accumulation_steps
+            * args.train_batch_size
+            * accelerator.num_processes
+        )
+    optimizer = torch.optim.AdamW(
+        model.parameters(),
+        lr=args.learning_rate,
+        betas=(args.adam_beta1, args.adam_beta2),
+        weight_decay=args.adam_weight_decay,
+        eps=args.adam_epsilon,
+    )
+    lr_scheduler = get_scheduler(
+        args.lr_scheduler,
+        optimizer=optimizer,
+        num_warmup_steps=args.lr_warmup_steps * args.gradient_accumulation_steps,
+        num_training_steps=args.max_train_steps * args.gradient_accumulation_steps,
+    )
+
+    # Initialize global step
+    global_step = 0
+
+    # Load the student for resume training
+    if args.resume_training:
+        assert isinstance(args.resume_ckpt_dir, str) and os.path.exists(
+            args.resume_ckpt_dir
+        ), f"Expect the resume checkpoint directory exists, but got {args.resume_ckpt_dir}"
+        print(f"Resuming distillation from {args.resume_ckpt_dir}")
+        whole_model = torch.load(f"{args.resume_ckpt_dir}/whole_model.pth")
+        model.load_state_dict(whole_model["model"])
+        optimizer.load_state_dict(whole_model["optimizer"])
+        lr_scheduler.load_state_dict(whole_model["lr_scheduler"])
+        global_step = whole_model["global_step"]
+        logging.info(
+            f"[{get_local_time()}] Resume distillation from global step {global_step}"
+        )
+    else:
+        print("Starting new distillation")
+
+    # Accelerate preparation
+    model, optimizer, train_dataloader, lr_scheduler = accelerator.prepare(
+        model, optimizer, train_dataloader, lr_scheduler
+    )
+    teacher = teacher.to(accelerator.device)
+
+    distillation = ProgressiveDistillation(
+        teacher=teacher,
+        train_scheduler=noise_scheduler,
+        student_steps=args.student_steps,
+        guidance_scale=args.teacher_guidance_scale,
+        content_encoder_downsample_size=args.content_encoder_downsample_size,
+    )
+
+    # Initialize trackers automatically on the main process
+    if accelerator.is_main_process:
+        accelerator.init_trackers(args.experience_name)
+        save_args_to_yaml(
+            args=args,
+            output_file=f"{args.output_dir}/{args.experience_name}_config.yaml",
+        )
+
+    # Only show the progress bar once on each machine
+    progress_bar = tqdm(
+        initial=global_step,
+        total=args.max_train_steps,
+        disable=not accelerator.is_local_main_process,
+        desc="Steps",
+        position=0,
+    )
+
+    num_update_steps_per_epoch = math.ceil(
+        len(train_dataloader) / args.gradient_accumulation_steps
+    )
+    num_train_epochs = math.ceil(args.max_train_steps / num_update_steps_per_epoch)
+
+    def compute_loss(samples):
+        distillation_loss, offset_out_sum = distillation.compute_loss(
+            student=model,
+            target_images=samples["target_image"],
+            style_images=samples["style_image"],
+            content_images=samples["content_image"],
+        )
+        return distillation_loss + args.offset_coefficient * offset_out_sum / 2
+
+    def get_model(model):
+        # If the model is wrapped with DDP, we need to access the model with model.module
+        if hasattr(model, "module"):
+            return model.module
+        return model
+
+    def get_submodel(model, submodule_name):
+        unwrapped = get_model(model)
+        return getattr(unwrapped.config, submodule_name)
+
+    # Distillation loop
+    for epoch in range(num_train_epochs):
+        acc_train_loss = []
+
+        for step, samples in enumerate(train_dataloader):
+            model.train()
+            with accelerator.accumulate(model):
+                ## Forward pass
+                loss = compute_loss(samples)
+
+                ## Gather the losses across all processes
+                distributed_losses = accelerator.gather(
+                    loss.repeat(args.train_batch_size)
+                )
+                assert isinstance(distributed_losses, torch.Tensor)
+                distributed_loss = distributed_losses.mean()
+                acc_train_loss.append(distributed_loss.item())
+
+                ## Backpropagate
+                accelerator.backward(loss)
+                if accelerator.sync_gradients:
+                    accelerator.clip_grad_norm_(model.parameters(), args.max_grad_norm)
+                optimizer.step()
+                lr_scheduler.step()
+                optimizer.zero_grad()
+
+            is_on_global_step = accelerator.sync_gradients
+            is_on_main_process = accelerator.is_main_process
+
+            # Log to progress bar
+            if is_on_main_process:
+                last_lr = lr_scheduler.get_last_lr()[0]
+                logs = {"step_loss": distributed_loss.detach().item(), "lr": last_lr}
+                progress_bar.set_postfix(**logs)
+
+            # Update progress bar and global step states
+            if is_on_global_step:
+                progress_bar.update(1)
+                global_step += 1
+
+            is_last_step = global_step >= args.max_train_steps
+            is_logging_step = is_on_global_step and (
+                is_last_step or global_step % args.log_interval == 0
+            )
+            is_checkpoint_step = is_on_global_step and (
+                is_last_step or global_step % args.ckpt_interval == 0
+            )
+
+            # Compute and log loss values
+            if is_on_global_step:
+                avg_train_loss = sum(acc_train_loss) / len(acc_train_loss)
+                accelerator.log({"train_loss": avg_train_loss}, step=global_step)
+                if is_logging_step and is_on_main_process:
+                    logging.info(
+                        f"[{get_local_time()}] Global Step {global_step} => avg_train_loss = {avg_train_loss}"
+                    )
+                acc_train_loss = []
+
+            # Wait for everyone
+            accelerator.wait_for_everyone()
+
+            # Save checkpoint, in the format sample.py loads with --distilled_steps
+            if is_checkpoint_step and is_on_main_process:
+                save_dir = f"{args.output_dir}/global_step_{global_step}"
+                os.makedirs(save_dir, exist_ok=True)
+                torch.save(
+                    get_submodel(model, "unet").state_dict(), f"{save_dir}/unet.pth"
+                )
+                torch.save(
+                    get_submodel(model, "style_encoder").state_dict(),
+                    f"{save_dir}/style_encoder.pth",
+                )
+                torch.save(
+                    get_submodel(model, "content_encoder").state_dict(),
+                    f"{save_dir}/content_encoder.pth",
+                )
+                torch.save(
+                    {
+                        "model": get_model(model).state_dict(),
+                        "optimizer": optimizer.state_dict(),
+                        "lr_scheduler": lr_scheduler.state_dict(),
+                        "global_step": global_step,
+                    },
+                    f"{save_dir}/whole_model.pth",
+                )
+                logging.info(
+                    f"[{get_local_time()}] Save the {args.student_steps}-step student on global step {global_step}"
+                )
+                progress_bar.write(
+                    "Save the checkpoint on global step {}".format(global_step)
+                )
+
+            # Quit
+            if global_step >= args.max_train_steps:
+                break
+
+    accelerator.end_training()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# This script exports FontDiffuser to ONNX, to be run with ONNX Runtime by sample.py.
+# Usage (from the container root):
+#   python -m fyp24_model.export_onnx --ckpt_dir <checkpoint dir> --onnx_output_path <path>
+# Then sample with --onnx_model_path <path>.
+# Requires the onnx package to export and the onnxruntime package to sample.
+
+import argparse
+
+from .sample import arg_parse, load_fontdiffuser_model
+from .src.dpm_solver.onnx_model import DEFAULT_OPSET_VERSION, export_onnx
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export FontDiffuser to ONNX. "
+        "Other arguments are the model arguments of sample.py."
+    )
+    parser.add_argument("--onnx_output_path", type=str, required=True)
+    parser.add_argument("--opset_version", type=int, default=DEFAULT_OPSET_VERSION)
+    export_args, model_args_to_parse = parser.parse_known_args()
+
+    args = arg_parse(model_args_to_parse)
+    # The exported graph runs on the CPU, with static weights and plain operators
+    args.device = "cpu"
+    args.freeze_for_inference = True
+    args.attention_backend = "math"
+    model = load_fontdiffuser_model(args=args)
+
+    export_onnx(
+        model=model,
+        path=export_args.onnx_output_path,
+        content_image_size=args.content_image_size,
+        style_image_size=args.style_image_size,
+        content_encoder_downsample_size=args.content_encoder_downsample_size,
+        opset_version=export_args.opset_version,
+    )
+    print(f"Exported the ONNX model to {export_args.onnx_output_path} successfully!")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,18 @@ from .src import (
     build_style_encoder,
     build_unet,
 )
+from .src.checkpoint import find_checkpoint, load_module
+from .src.content_feature_cache import ContentFeatureCache, hash_module
+from .src.dpm_solver.compiled_model import COMPILE_MODES
+from .src.dpm_solver.onnx_model import OnnxModel
+from .src.inference_optimization import INFERENCE_OPTIMIZATIONS, optimize_for_inference
+from .src.modules.attention import ATTENTION_BACKENDS, set_attention_backend
+from .src.precision import PRECISIONS, PrecisionModel
+from .src.quantization import (
+    QUANTIZATION_MODES,
+    calibrate_fontdiffuser,
+    quantize_model,
+)
 from .utils import (
     get_transform_function,
     is_char_in_font,
@@ -56,6 +68,102 @@ def arg_parse(args_to_parse: Optional[list[str]] = None):
         "--device", type=str, default="cuda:0" if torch.cuda.is_available() else "cpu"
     )
     parser.add_argument("--ttf_path", type=str, default="ttf/KaiXinSongA.ttf")
+    parser.add_argument(
+        "--freeze_for_inference",
+        action="store_true",
+        help="Fold the spectral norm of the encoders into static weights.",
+    )
+    parser.add_argument(
+        "--attention_backend",
+        type=str,
+        default="math",
+        choices=ATTENTION_BACKENDS,
+        help="The attention backend of the UNet.",
+    )
+    parser.add_argument(
+        "--compile_mode",
+        type=str,
+        default="eager",
+        choices=COMPILE_MODES,
+        help="Compile the model for static shapes at startup.",
+    )
+    parser.add_argument(
+        "--compile_batch_sizes",
+        type=int,
+        nargs="+",
+        default=[1],
+        help="The batch size buckets to compile the model for.",
+    )
+    parser.add_argument(
+        "--onnx_model_path",
+        type=str,
+        default=None,
+        help="Run an ONNX model exported by export_onnx.py with ONNX Runtime instead.",
+    )
+    parser.add_argument(
+        "--onnx_num_threads",
+        type=int,
+        default=0,
+        help="The number of ONNX Runtime threads; 0 uses one thread per physical core.",
+    )
+    parser.add_argument(
+        "--quantization",
+        type=str,
+        default="none",
+        choices=QUANTIZATION_MODES,
+        help="Quantize the UNet to INT8 for inference on the CPU.",
+    )
+    parser.add_argument(
+        "--quantization_calibration_characters",
+        type=str,
+        default="永和九年歲在癸丑",
+        help="The characters rendered from the TTF to calibrate static quantization.",
+    )
+    parser.add_argument(
+        "--inference_optimizations",
+        type=str,
+        nargs="*",
+        default=[],
+        choices=INFERENCE_OPTIMIZATIONS,
+        help="The optimization passes applied to the model at load.",
+    )
+    parser.add_argument(
+        "--precision",
+        type=str,
+        default="fp32",
+        choices=PRECISIONS,
+        help="The precision of the model; bf16 is fast on CPUs with AVX-512 BF16 or AMX, fp16 is meant for GPUs.",
+    )
+    parser.add_argument(
+        "--content_feature_cache_dir",
+        type=str,
+        default=None,
+        help="Cache the content encoder features of the glyphs in this directory.",
+    )
+    parser.add_argument(
+        "--content_feature_cache_memory_mb",
+        type=int,
+        default=256,
+        help="The size of the content features cached in memory.",
+    )
+    parser.add_argument(
+        "--content_feature_cache_disk_mb",
+        type=int,
+        default=4096,
+        help="The size of the content features cached on disk.",
+    )
+    parser.add_argument(
+        "--content_feature_prewarm_path",
+        type=str,
+        default=None,
+        help="A text file of the most frequent characters, cached when the pipeline is loaded.",
+    )
+    parser.add_argument(
+        "--content_feature_prewarm_limit",
+        type=int,
+        default=256,
+        help="The number of characters of the prewarm file to cache, from its start.",
+    )
     args = parser.parse_args(args_to_parse)
     style_image_size = args.style_image_size
     content_image_size = args.content_image_size
@@ -159,20 +267,155 @@ def image_process(
     return content_image, style_image, content_image_pil, style_images_pil
 
 
-def load_fontdiffuser_pipeline(args):
-    # Load the model state_dict
-    unet = build_unet(args=args)
-    unet.load_state_dict(torch.load(f"{args.ckpt_dir}/unet.pth"))
-    style_encoder = build_style_encoder(args=args)
-    style_encoder.load_state_dict(torch.load(f"{args.ckpt_dir}/style_encoder.pth"))
-    content_encoder = build_content_encoder(args=args)
-    content_encoder.load_state_dict(torch.load(f"{args.ckpt_dir}/content_encoder.pth"))
+def load_fontdiffuser_model(args):
+    # Load the model state_dict, memory-mapped into the modules
+    unet = load_module(
+        lambda: build_unet(args=args), find_checkpoint(args.ckpt_dir, "unet")
+    )
+    style_encoder = load_module(
+        lambda: build_style_encoder(args=args),
+        find_checkpoint(args.ckpt_dir, "style_encoder"),
+    )
+    content_encoder = load_module(
+        lambda: build_content_encoder(args=args),
+        find_checkpoint(args.ckpt_dir, "content_encoder"),
+    )
     model = FontDiffuserModelDPM(
         unet=unet, style_encoder=style_encoder, content_encoder=content_encoder
     )
     model.to(args.device)
     print("Loaded the model state_dict successfully!")
 
+    num_attention_layers = set_attention_backend(unet, args.attention_backend)
+    print(
+        f"Set the attention backend of {num_attention_layers} layers to {args.attention_backend}!"
+    )
+
+    if args.freeze_for_inference:
+        num_frozen = model.freeze_for_inference()
+        print(f"Froze {num_frozen} spectral norm layers for inference!")
+
+    if args.inference_optimizations:
+        num_folded = optimize_for_inference(model, args.inference_optimizations)
+        print(
+            f"Optimized the model with {', '.join(args.inference_optimizations)}, "
+            f"folding {num_folded} normalizations!"
+        )
+
+    if args.quantization != "none":
+        quantize_fontdiffuser_model(args=args, model=model)
+        print(f"Quantized the UNet in {args.quantization} mode!")
+
+    return model
+
+
+def quantize_fontdiffuser_model(args, model):
+    """Quantize the UNet of the model. Static quantization is calibrated on
+    the calibration characters rendered from the TTF, in the style image.
+    """
+    if torch.device(args.device).type != "cpu":
+        raise ValueError("Quantized models can only run on the CPU")
+
+    def calibrate(_):
+        font = load_ttf(ttf_path=args.ttf_path)
+        content_transforms = get_transform_function(
+            target_size=args.content_image_size, normalize=True
+        )
+        style_transforms = get_transform_function(
+            target_size=args.style_image_size, normalize=True
+        )
+        content_images = []
+        for char in args.quantization_calibration_characters:
+            content_image = ttf2im(font=font, char=char)
+            if content_image is not None:
+                content_images.append(content_transforms(content_image))
+        style_image = style_transforms(Image.open(args.style_image_path).convert("RGB"))
+        calibrate_fontdiffuser(
+            model=model,
+            content_images=torch.stack(content_images),
+            style_images=style_image.expand(len(content_images), -1, -1, -1),
+            train_scheduler=build_ddpm_scheduler(args=args),
+            content_encoder_downsample_size=args.content_encoder_downsample_size,
+        )
+
+    quantize_model(model.unet, mode=args.quantization, calibrate=calibrate)
+
+
+def get_content_font_key(args) -> str:
+    """The font of the content features of the characters rendered from the TTF."""
+    height, width = args.content_image_size
+    return f"{os.path.basename(args.ttf_path)}@{height}x{width}"
+
+
+def load_content_feature_cache(args, model) -> ContentFeatureCache:
+    # The features depend on the weights and the precision of the content encoder
+    encoder_hash = f"{hash_module(model.content_encoder)}:{args.precision}"
+    return ContentFeatureCache(
+        encoder_hash=encoder_hash,
+        cache_dir=args.content_feature_cache_dir,
+        max_memory_bytes=args.content_feature_cache_memory_mb * 2**20,
+        max_disk_bytes=args.content_feature_cache_disk_mb * 2**20,
+    )
+
+
+def prewarm_content_feature_cache(args, pipe) -> int:
+    """Cache the content features of the characters of the prewarm file, rendered
+    from the TTF. Return the number of encoded glyphs."""
+    if pipe.content_feature_cache is None or args.content_feature_prewarm_path is None:
+        return 0
+
+    with open(args.content_feature_prewarm_path, encoding="utf-8") as f:
+        characters = "".join(f.read().split())[: args.content_feature_prewarm_limit]
+    font = load_ttf(ttf_path=args.ttf_path)
+    content_transforms = get_transform_function(
+        target_size=args.content_image_size, normalize=True
+    )
+
+    def encode(batch: list[str]):
+        content_images = {}
+        for char in batch:
+            content_image = ttf2im(font=font, char=char)
+            if content_image is not None:
+                content_images[char] = content_transforms(content_image)
+        if not content_images:
+            return [None] * len(batch)
+        with torch.no_grad():
+            features = pipe.model.encode_content(
+                torch.stack(list(content_images.values())).to(args.device)
+            )
+        batch_features = {
+            char: [feature[i : i + 1].clone() for feature in features]
+            for i, char in enumerate(content_images)
+        }
+        return [batch_features.get(char) for char in batch]
+
+    return pipe.content_feature_cache.prewarm(
+        font=get_content_font_key(args), characters=characters, encode=encode
+    )
+
+
+def load_fontdiffuser_pipeline(args):
+    if args.precision != "fp32" and (
+        args.onnx_model_path is not None or args.quantization != "none"
+    ):
+        raise ValueError("ONNX and quantized models can only run in fp32 precision")
+    if args.onnx_model_path is not None and args.inference_optimizations:
+        raise ValueError("Inference optimizations cannot be applied to ONNX models")
+
+    if args.onnx_model_path is not None:
+        model = OnnxModel(args.onnx_model_path, num_threads=args.onnx_num_threads)
+        print("Loaded the ONNX model successfully!")
+    else:
+        model = load_fontdiffuser_model(args=args)
+
+    content_feature_cache = None
+    if args.content_feature_cache_dir is not None and args.onnx_model_path is None:
+        content_feature_cache = load_content_feature_cache(args=args, model=model)
+
+    if args.precision != "fp32":
+        model = PrecisionModel(model, precision=args.precision)
+        print(f"Set the precision of the model to {args.precision}!")
+
     # Load the training ddpm_scheduler.
     train_scheduler = build_ddpm_scheduler(args=args)
     print("Loaded training DDPM scheduler sucessfully!")
@@ -184,13 +427,46 @@ def load_fontdiffuser_pipeline(args):
         model_type=args.model_type,
         guidance_type=args.guidance_type,
         guidance_scale=args.guidance_scale,
+        distilled_steps=args.distilled_steps,
     )
     print("Loaded dpm_solver pipeline sucessfully!")
+    if args.distilled_steps is not None:
+        print(f"Sample a student distilled for {args.distilled_steps} steps!")
+
+    if args.compile_mode != "eager" and args.onnx_model_path is None:
+        compiled_batch_sizes = pipe.compile(
+            batch_sizes=args.compile_batch_sizes,
+            content_image_size=args.content_image_size,
+            style_image_size=args.style_image_size,
+            content_encoder_downsample_size=args.content_encoder_downsample_size,
+            mode=args.compile_mode,
+            unguided_steps=args.guidance_interval is not None
+            or args.unguided_final_steps > 0,
+        )
+        print(
+            f"Compiled the model in {args.compile_mode} mode for model batch sizes {compiled_batch_sizes}!"
+        )
+
+    if content_feature_cache is not None and pipe.can_cache_content_features():
+        pipe.content_feature_cache = content_feature_cache
+        print(f"Cache the content features in {args.content_feature_cache_dir}!")
 
     return pipe
 
 
-def sampling(args, pipe, content_image=None, style_image=None):
+def sampling(
+    args,
+    pipe,
+    content_image=None,
+    style_image=None,
+    x0_pred_callback=None,
+    callback=None,
+    cancel_event=None,
+    generator=None,
+    return_nfe=False,
+):
+    """Sample the glyph of the content character or image in the style image. If
+    return_nfe is set, also return the number of model evaluations."""
     if args.save_image:
         os.makedirs(args.save_image_dir, exist_ok=True)
         os.chmod(args.save_image_dir, 0o777)
@@ -212,7 +488,7 @@ def sampling(args, pipe, content_image=None, style_image=None):
             f"The content_character you provided is not in the ttf. \
                 Please change the content_character or you can change the ttf."
         )
-        return None
+        return (None, 0) if return_nfe else None
 
     content_image, style_image, content_image_pil, _ = image_process_output
 
@@ -221,7 +497,7 @@ def sampling(args, pipe, content_image=None, style_image=None):
         style_image = style_image.to(args.device)
         print(f"Sampling by DPM-Solver++ ......")
         start = time.time()
-        images = pipe.generate(
+        images, nfe = pipe.generate(
             content_images=content_image,
             style_images=style_image,
             batch_size=1,
@@ -235,6 +511,21 @@ def sampling(args, pipe, content_image=None, style_image=None):
             skip_type=args.skip_type,
             method=args.method,
             correcting_x0_fn=args.correcting_x0_fn,
+            generator=generator,
+            guidance_interval=args.guidance_interval,
+            unguided_final_steps=args.unguided_final_steps,
+            x0_pred_callback=x0_pred_callback,
+            callback=callback,
+            cancel_event=cancel_event,
+            content_keys=(
+                [(get_content_font_key(args), args.content_character)]
+                if args.character_input
+                else None
+            ),
+            atol=args.atol,
+            rtol=args.rtol,
+            max_nfe=args.max_nfe,
+            return_nfe=True,
         )
         end = time.time()
 
@@ -254,7 +545,11 @@ def sampling(args, pipe, content_image=None, style_image=None):
                 style_image_path=args.style_image_path,
                 resolution=args.resolution,
             )
-            print(f"Finish the sampling process, costing time {end - start}s")
+            print(
+                f"Finish the sampling process, costing time {end - start}s and {nfe} model evaluations"
+            )
+        if return_nfe:
+            return images[0], nfe
         return images[0]
 
 
@@ -0,0 +1,97 @@
+# This script is provided by the FYP24 project group.
+# This script converts the FontDiffuser checkpoints to safetensors and loads them
+# memory-mapped, so that the weights are not copied when the model is built.
+# Before torch 2.1, which cannot memory-map a checkpoint nor assign its tensors to a
+# module, the checkpoints are loaded into a module built on the CPU instead.
+
+import inspect
+import os
+import zipfile
+from typing import Callable, Dict, TypeVar
+
+import torch
+import torch.nn as nn
+
+# The checkpoints in the checkpoint directory, each saved as <name>.pth and
+# optionally converted to <name>.safetensors
+CHECKPOINT_NAMES = ("unet", "style_encoder", "content_encoder")
+
+ModuleT = TypeVar("ModuleT", bound=nn.Module)
+
+
+def find_checkpoint(ckpt_dir: str, name: str) -> str:
+    """Return the path of a checkpoint in the directory, preferring safetensors."""
+    safetensors_path = os.path.join(ckpt_dir, f"{name}.safetensors")
+    if os.path.exists(safetensors_path):
+        return safetensors_path
+    return os.path.join(ckpt_dir, f"{name}.pth")
+
+
+def supports_mmap() -> bool:
+    """Whether torch.load can memory-map a checkpoint (torch 2.1 and later)."""
+    return "mmap" in inspect.signature(torch.load).parameters
+
+
+def supports_assign() -> bool:
+    """Whether a module can be built on the meta device and assigned the tensors
+    of a state dict (torch 2.1 and later)."""
+    return (
+        hasattr(torch.device, "__enter__")
+        and "assign" in inspect.signature(nn.Module.load_state_dict).parameters
+    )
+
+
+def load_state_dict(path: str) -> Dict[str, torch.Tensor]:
+    """Load a state dict on the CPU, memory-mapping the file where the format
+    and torch allow it, so that the tensors are only read when they are used.
+    """
+    if path.endswith(".safetensors"):
+        from safetensors.torch import load_file
+
+        return load_file(path, device="cpu")
+    if not supports_mmap():
+        return torch.load(path, map_location="cpu")
+    # Only the zip format of torch.save can be memory-mapped
+    return torch.load(
+        path, map_location="cpu", mmap=zipfile.is_zipfile(path), weights_only=True
+    )
+
+
+def load_module(build_module: Callable[[], ModuleT], path: str) -> ModuleT:
+    """Build a module without initializing its weights, and assign the weights of
+    the checkpoint to it instead of copying them. Before torch 2.1, build the
+    module on the CPU and copy the weights into it.
+    """
+    if not supports_assign():
+        module = build_module()
+        module.load_state_dict(load_state_dict(path))
+        return module
+
+    with torch.device("meta"):
+        module = build_module()
+    module.load_state_dict(load_state_dict(path), assign=True)
+    uninitialized = [
+        name
+        for name, tensor in [*module.named_parameters(), *module.named_buffers()]
+        if tensor.is_meta
+    ]
+    if uninitialized:
+        raise ValueError(f"{path} does not contain {', '.join(uninitialized)}")
+    return module
+
+
+def convert_checkpoint(path: str) -> str:
+    """Convert a .pth checkpoint to a .safetensors checkpoint next to it.
+
+    :return: The path of the converted checkpoint.
+    """
+    from safetensors.torch import save_file
+
+    state_dict = load_state_dict(path)
+    output_path = os.path.splitext(path)[0] + ".safetensors"
+    # safetensors stores each tensor contiguously, without shared storage
+    save_file(
+        {key: tensor.contiguous().clone() for key, tensor in state_dict.items()},
+        output_path,
+    )
+    return output_path
@@ -0,0 +1,216 @@
+# This script is provided by the FYP24 project group.
+# This script caches the features of the content encoder of the rendered glyphs.
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+import torch
+import torch.nn as nn
+
+from .checkpoint import supports_mmap
+
+# The residual features of the content encoder followed by its content feature,
+# each with a batch of 1, as FontDiffuserModelDPM.encode_content gives them
+ContentFeatures = list[torch.Tensor]
+
+
+def hash_module(module: nn.Module) -> str:
+    """Hash the state dict of a module, e.g. to tell the checkpoints of an encoder
+    apart."""
+    digest = hashlib.sha256()
+    for name, tensor in module.state_dict().items():
+        digest.update(name.encode())
+        digest.update(str(tensor.dtype).encode())
+        digest.update(tensor.detach().cpu().contiguous().view(torch.uint8).numpy())
+    return digest.hexdigest()
+
+
+def features_nbytes(features: ContentFeatures) -> int:
+    return sum(feature.numel() * feature.element_size() for feature in features)
+
+
+class ContentFeatureCache:
+    """A size-bounded cache of the content encoder features of the glyphs rendered
+    from a font, by font, character and encoder checkpoint.
+
+    The features are kept in memory, least recently used first out, and in a store
+    of one file per glyph on disk, which is memory-mapped when the glyph is loaded
+    back. The store outlives the process, so the common glyphs are only encoded
+    once per encoder checkpoint.
+    """
+
+    __encoder_hash: str
+    __cache_dir: Optional[str]
+    __max_memory_bytes: int
+    __max_disk_bytes: int
+    __memory: OrderedDict[str, ContentFeatures]
+    __memory_bytes: int = 0
+    __disk_bytes: int = 0
+    __lock: threading.Lock
+
+    def __init__(
+        self,
+        encoder_hash: str,
+        cache_dir: Optional[str] = None,
+        max_memory_bytes: int = 256 * 2**20,
+        max_disk_bytes: int = 4 * 2**30,
+    ):
+        self.__encoder_hash = encoder_hash
+        self.__cache_dir = cache_dir
+        self.__max_memory_bytes = max_memory_bytes
+        self.__max_disk_bytes = max_disk_bytes
+        self.__memory = OrderedDict()
+        self.__lock = threading.Lock()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            self.__disk_bytes = sum(
+                os.path.getsize(path) for path in self.__disk_paths()
+            )
+
+    def __key(self, font: str, character: str) -> str:
+        key = "\0".join([font, character, self.__encoder_hash])
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def __disk_path(self, key: str) -> str:
+        assert self.__cache_dir is not None
+        return os.path.join(self.__cache_dir, f"{key}.pt")
+
+    def __disk_paths(self) -> list[str]:
+        assert self.__cache_dir is not None
+        return [
+            os.path.join(self.__cache_dir, filename)
+            for filename in os.listdir(self.__cache_dir)
+            if filename.endswith(".pt")
+        ]
+
+    def __remember(self, key: str, features: ContentFeatures):
+        """Keep the features in memory, and forget the least recently used."""
+        if key in self.__memory:
+            self.__memory.move_to_end(key)
+            return
+        self.__memory[key] = features
+        self.__memory_bytes += features_nbytes(features)
+        while self.__memory_bytes > self.__max_memory_bytes and self.__memory:
+            _, evicted = self.__memory.popitem(last=False)
+            self.__memory_bytes -= features_nbytes(evicted)
+
+    def __evict_from_disk(self):
+        """Delete the least recently used files until the store fits in its size,
+        with some room so that the next files do not evict again."""
+        paths = sorted(self.__disk_paths(), key=os.path.getmtime)
+        target_bytes = self.__max_disk_bytes * 0.9
+        for path in paths:
+            if self.__disk_bytes <= target_bytes:
+                break
+            size = os.path.getsize(path)
+            os.remove(path)
+            self.__disk_bytes -= size
+
+    def __remove_from_disk(self, path: str):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        with self.__lock:
+            self.__disk_bytes -= size
+
+    def contains(self, font: str, character: str) -> bool:
+        key = self.__key(font, character)
+        with self.__lock:
+            if key in self.__memory:
+                return True
+        return self.__cache_dir is not None and os.path.exists(self.__disk_path(key))
+
+    def get(self, font: str, character: str) -> Optional[ContentFeatures]:
+        """Get the features of a glyph, or None if they are not cached. The features
+        loaded from disk are on the CPU."""
+        key = self.__key(font, character)
+        with self.__lock:
+            features = self.__memory.get(key)
+            if features is not None:
+                self.__memory.move_to_end(key)
+                return features
+        if self.__cache_dir is None:
+            return None
+
+        path = self.__disk_path(key)
+        try:
+            if supports_mmap():
+                features = torch.load(
+                    path, map_location="cpu", mmap=True, weights_only=True
+                )
+            else:
+                features = torch.load(path, map_location="cpu")
+            # Recently used files are the last to be evicted
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # A corrupt file is a miss, and is encoded and cached again
+            self.__remove_from_disk(path)
+            return None
+        with self.__lock:
+            self.__remember(key, features)
+        return features
+
+    def put(self, font: str, character: str, features: ContentFeatures):
+        """Cache the features of a glyph, in memory and on disk."""
+        key = self.__key(font, character)
+        with self.__lock:
+            self.__remember(key, features)
+        if self.__cache_dir is None:
+            return
+
+        path = self.__disk_path(key)
+        if os.path.exists(path):
+            return
+        # Write to a temporary file first, so that no one loads a partial file
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        torch.save(
+            [feature.detach().cpu().contiguous() for feature in features], temp_path
+        )
+        os.replace(temp_path, path)
+        with self.__lock:
+            self.__disk_bytes += os.path.getsize(path)
+            if self.__disk_bytes > self.__max_disk_bytes:
+                self.__evict_from_disk()
+
+    def prewarm(
+        self,
+        font: str,
+        characters: Iterable[str],
+        encode: Callable[[list[str]], list[Optional[ContentFeatures]]],
+        batch_size: int = 16,
+    ) -> int:
+        """Encode the glyphs of the characters that are not cached yet, e.g. the
+        most frequent characters, in batches.
+
+        :param encode: Encode the glyphs of a list of characters to their features,
+            or None for the characters that are not in the font.
+        :return: The number of encoded glyphs.
+        """
+        characters = [
+            character
+            for character in dict.fromkeys(characters)
+            if not character.isspace() and not self.contains(font, character)
+        ]
+        num_encoded = 0
+        for start in range(0, len(characters), batch_size):
+            batch = characters[start : start + batch_size]
+            for character, features in zip(batch, encode(batch)):
+                if features is not None:
+                    self.put(font, character, features)
+                    num_encoded += 1
+        return num_encoded
+
+    @property
+    def memory_bytes(self) -> int:
+        return self.__memory_bytes
+
+    @property
+    def disk_bytes(self) -> int:
+        return self.__disk_bytes
@@ -0,0 +1,175 @@
+# This script is provided by the FYP24 project group.
+# This script distills a FontDiffuser model sampled with classifier-free guidance
+# into a student that samples a glyph in a few steps without guidance.
+
+import torch
+import torch.nn as nn
+
+from .dpm_solver.dpm_solver_pytorch import DPM_Solver, NoiseScheduleVP
+
+
+class ProgressiveDistillation:
+    """Progressive distillation of a teacher sampled with classifier-free guidance
+    into a student that takes half of its steps, with the guidance baked in.
+
+    One step of the student is trained to land where two first-order DPM-Solver++
+    (i.e. DDIM) steps of the guided teacher land, on the time steps that
+    FontDiffuserDPMPipeline samples the student on. The student is sampled without
+    guidance, so each of its steps evaluates the model once instead of twice.
+    Distilling a student from the last student halves the steps again, with a
+    guidance scale of 1 since the guidance is already baked into the teacher.
+
+    The teacher and the student are called as FontDiffuserModel, and predict the
+    noise like the model they are distilled from.
+    """
+
+    __teacher: nn.Module
+    __noise_schedule: NoiseScheduleVP
+    __student_steps: int
+    __guidance_scale: float
+    __content_encoder_downsample_size: int
+    __teacher_time_steps: torch.Tensor
+
+    def __init__(
+        self,
+        teacher: nn.Module,
+        train_scheduler,
+        student_steps: int,
+        guidance_scale: float = 7.5,
+        content_encoder_downsample_size: int = 3,
+    ):
+        """:param train_scheduler: The DDPM scheduler the teacher was trained with.
+        :param student_steps: The number of steps of the student, half of those of
+            the teacher.
+        :param guidance_scale: The classifier-free guidance scale of the teacher,
+            which is baked into the student.
+        """
+        if student_steps < 1:
+            raise ValueError("The student takes at least one step")
+        self.__teacher = teacher
+        self.__noise_schedule = NoiseScheduleVP(
+            schedule="discrete", betas=train_scheduler.betas, dtype=torch.float32
+        )
+        self.__student_steps = student_steps
+        self.__guidance_scale = guidance_scale
+        self.__content_encoder_downsample_size = content_encoder_downsample_size
+        # The solver is only used for its time steps, as the pipeline samples them
+        self.__teacher_time_steps = DPM_Solver(
+            model_fn=None, noise_schedule=self.__noise_schedule
+        ).get_time_steps(
+            skip_type="time_uniform",
+            t_T=self.__noise_schedule.T,
+            t_0=1.0 / self.__noise_schedule.total_N,
+            N=2 * student_steps,
+            device="cpu",
+        )
+
+    @property
+    def student_steps(self) -> int:
+        return self.__student_steps
+
+    @property
+    def student_time_steps(self) -> torch.Tensor:
+        """The continuous times the student steps between, from T to the end."""
+        return self.__teacher_time_steps[::2]
+
+    def __marginal(self, t: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+        """The alpha and sigma of the times, shaped to broadcast over images."""
+        alpha_t = self.__noise_schedule.marginal_alpha(t)[:, None, None, None]
+        sigma_t = self.__noise_schedule.marginal_std(t)[:, None, None, None]
+        return alpha_t, sigma_t
+
+    def __model_timesteps(self, t: torch.Tensor) -> torch.Tensor:
+        """The inverse of the conversion to the continuous time in model_wrapper."""
+        return (t - 1.0 / self.__noise_schedule.total_N) * 1000.0
+
+    def __predict_noise(self, model, x, t, style_images, content_images):
+        noise_pred, offset_out_sum = model(
+            x_t=x,
+            timesteps=self.__model_timesteps(t),
+            style_images=style_images,
+            content_images=content_images,
+            content_encoder_downsample_size=self.__content_encoder_downsample_size,
+        )
+        return noise_pred, offset_out_sum
+
+    def teacher_x0(self, x, t, style_images, content_images) -> torch.Tensor:
+        """Predict x_0 with the teacher, guided as the pipeline guides it, i.e. with
+        the blank images as the unconditional condition."""
+        if self.__guidance_scale == 1.0:
+            noise_pred, _ = self.__predict_noise(
+                self.__teacher, x, t, style_images, content_images
+            )
+        else:
+            noise_pred, _ = self.__predict_noise(
+                self.__teacher,
+                torch.cat([x, x]),
+                torch.cat([t, t]),
+                torch.cat([torch.ones_like(style_images), style_images]),
+                torch.cat([torch.ones_like(content_images), content_images]),
+            )
+            noise_uncond, noise_cond = noise_pred.chunk(2)
+            noise_pred = noise_uncond + self.__guidance_scale * (
+                noise_cond - noise_uncond
+            )
+        alpha_t, sigma_t = self.__marginal(t)
+        return (x - sigma_t * noise_pred) / alpha_t
+
+    def ddim_step(self, x_s, s, t, x0) -> torch.Tensor:
+        """The first-order DPM-Solver++ step from time s to time t."""
+        alpha_s, sigma_s = self.__marginal(s)
+        alpha_t, sigma_t = self.__marginal(t)
+        return sigma_t / sigma_s * x_s + (alpha_t - sigma_t * alpha_s / sigma_s) * x0
+
+    def student_target(
+        self, x_s, student_step, style_images, content_images
+    ) -> torch.Tensor:
+        """The x_0 the student predicts at x_s, so that its step lands where two
+        steps of the teacher land.
+
+        :param student_step: The index of the step of the student of each sample.
+        """
+        time_steps = self.__teacher_time_steps.to(x_s.device)
+        s = time_steps[2 * student_step]
+        m = time_steps[2 * student_step + 1]
+        t = time_steps[2 * student_step + 2]
+        with torch.no_grad():
+            x0_s = self.teacher_x0(x_s, s, style_images, content_images)
+            x_m = self.ddim_step(x_s, s, m, x0_s)
+            x0_m = self.teacher_x0(x_m, m, style_images, content_images)
+            x_t = self.ddim_step(x_m, m, t, x0_m)
+        # Solve the step of the student from s to t for its x_0
+        alpha_s, sigma_s = self.__marginal(s)
+        alpha_t, sigma_t = self.__marginal(t)
+        return (x_t - sigma_t / sigma_s * x_s) / (alpha_t - sigma_t * alpha_s / sigma_s)
+
+    def compute_loss(
+        self, student, target_images, style_images, content_images
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        """Noise the target images to the start of a random step of the student,
+        and compute the loss of the x_0 the student predicts against the x_0 that
+        takes its step to where the teacher lands.
+
+        The loss is weighted by the signal-to-noise ratio, truncated to at least
+        1, so that the noisy steps are not ignored.
+
+        :return: The loss and the offset sum of the student.
+        """
+        batch_size = target_images.shape[0]
+        student_step = torch.randint(
+            0, self.__student_steps, (batch_size,), device=target_images.device
+        )
+        s = self.__teacher_time_steps.to(target_images.device)[2 * student_step]
+        alpha_s, sigma_s = self.__marginal(s)
+        noise = torch.randn_like(target_images)
+        x_s = alpha_s * target_images + sigma_s * noise
+
+        x0_target = self.student_target(x_s, student_step, style_images, content_images)
+        noise_pred, offset_out_sum = self.__predict_noise(
+            student, x_s, s, style_images, content_images
+        )
+        x0_pred = (x_s - sigma_s * noise_pred.float()) / alpha_s
+
+        weight = (alpha_s**2 / sigma_s**2).clamp(min=1.0)
+        loss = (weight * (x0_pred - x0_target.float()) ** 2).mean()
+        return loss, offset_out_sum
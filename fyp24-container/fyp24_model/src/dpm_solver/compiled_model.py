@@ -0,0 +1,207 @@
+import bisect
+import warnings
+from typing import Callable, Optional, Sequence
+
+import torch
+import torch.nn as nn
+
+# "eager" runs the model as it is, "trace" records a TorchScript graph,
+# and "compile" uses torch.compile (PyTorch 2 only)
+COMPILE_MODES = ("eager", "trace", "compile")
+
+
+def is_torch_compile_available() -> bool:
+    return hasattr(torch, "compile")
+
+
+class TensorOnlyModel(nn.Module):
+    """FontDiffuserModelDPM with the non-tensor arguments bound, so that
+    its forward pass only takes tensors and can be traced, compiled or exported.
+    """
+
+    def __init__(self, model, content_encoder_downsample_size: int, version: str):
+        super().__init__()
+        self.model = model
+        self.content_encoder_downsample_size = content_encoder_downsample_size
+        self.version = version
+
+    def forward(self, x, t, content_images, style_images):
+        return self.model(
+            x,
+            t,
+            [content_images, style_images],
+            content_encoder_downsample_size=self.content_encoder_downsample_size,
+            version=self.version,
+        )
+
+
+class CompiledModel:
+    """Runs FontDiffuserModelDPM through a graph compiled for static shapes.
+
+    One graph is compiled for each batch size bucket at construction, and
+    checked against the eager model as a warm-up, on the dummy inputs it is
+    compiled with and on dummy inputs of another timestep. A batch is
+    padded up to the smallest bucket that fits it. The eager model is used
+    for batches larger than every bucket, for inputs of other shapes, and
+    for buckets whose compilation failed.
+
+    Call it like FontDiffuserModelDPM, e.g. as the model of `model_wrapper`.
+    """
+
+    __model: nn.Module
+    __mode: str
+    __content_encoder_downsample_size: int
+    __version: str
+    __input_shapes: tuple[torch.Size, torch.Size, torch.Size]
+    __bucket_sizes: list[int]
+    __graphs: dict[int, Callable]
+
+    def __init__(
+        self,
+        model,
+        batch_sizes: Sequence[int],
+        content_image_size: tuple[int, int],
+        style_image_size: tuple[int, int],
+        content_encoder_downsample_size: int,
+        version: str = "V3",
+        mode: str = "trace",
+        tolerance: float = 1e-3,
+    ):
+        if mode not in COMPILE_MODES:
+            raise ValueError(
+                f"Unknown compile mode {mode}, expected one of {COMPILE_MODES}"
+            )
+        if not batch_sizes or min(batch_sizes) < 1:
+            raise ValueError("batch_sizes must be a non-empty list of positive sizes")
+
+        self.__model = model
+        self.__mode = mode
+        self.__content_encoder_downsample_size = content_encoder_downsample_size
+        self.__version = version
+        self.__input_shapes = (
+            torch.Size((3, *content_image_size)),  # noisy images
+            torch.Size((3, *content_image_size)),
+            torch.Size((3, *style_image_size)),
+        )
+        self.__bucket_sizes = sorted(set(batch_sizes))
+        self.__graphs = {}
+
+        if mode == "compile" and not is_torch_compile_available():
+            warnings.warn(
+                f"torch.compile is not available in PyTorch {torch.__version__}, "
+                "falling back to eager mode"
+            )
+            self.__mode = "eager"
+        if self.__mode == "eager":
+            return
+
+        for batch_size in self.__bucket_sizes:
+            try:
+                self.__graphs[batch_size] = self.__compile(batch_size, tolerance)
+            except Exception as e:
+                warnings.warn(
+                    f"Failed to {self.__mode} the model for batch size {batch_size}, "
+                    f"falling back to eager mode: {e}"
+                )
+
+    @property
+    def device(self) -> torch.device:
+        return self.__model.device
+
+    @property
+    def mode(self) -> str:
+        return self.__mode
+
+    @property
+    def compiled_batch_sizes(self) -> list[int]:
+        return sorted(self.__graphs)
+
+    def __call__(
+        self, x, timesteps, cond, content_encoder_downsample_size, version
+    ) -> torch.Tensor:
+        content_images, style_images = cond
+        batch_size = x.shape[0]
+        bucket_size = self.__find_bucket(batch_size)
+        if (
+            bucket_size is None
+            or content_encoder_downsample_size != self.__content_encoder_downsample_size
+            or version != self.__version
+            or (x.shape[1:], content_images.shape[1:], style_images.shape[1:])
+            != self.__input_shapes
+        ):
+            return self.__model(
+                x, timesteps, cond, content_encoder_downsample_size, version
+            )
+
+        timesteps = timesteps.expand(batch_size)
+        inputs = [
+            pad_batch(tensor, bucket_size)
+            for tensor in (x, timesteps, content_images, style_images)
+        ]
+        return self.__graphs[bucket_size](*inputs)[:batch_size]
+
+    def __find_bucket(self, batch_size: int) -> Optional[int]:
+        """Get the smallest compiled bucket that fits a batch, if any."""
+        idx = bisect.bisect_left(self.__bucket_sizes, batch_size)
+        if idx == len(self.__bucket_sizes):
+            return None
+        bucket_size = self.__bucket_sizes[idx]
+        return bucket_size if bucket_size in self.__graphs else None
+
+    def __compile(self, batch_size: int, tolerance: float) -> Callable:
+        forward = TensorOnlyModel(
+            self.__model, self.__content_encoder_downsample_size, self.__version
+        ).eval()
+        dummy_inputs = self.__create_dummy_inputs(batch_size, seed=0, timestep=500.0)
+        # A graph that bakes in control flow on the inputs it was traced with
+        # still matches on those inputs, so it is also checked on other inputs
+        check_inputs = self.__create_dummy_inputs(batch_size, seed=1, timestep=50.0)
+
+        with torch.no_grad(), warnings.catch_warnings():
+            # The outputs are checked below instead; TorchScript is also
+            # deprecated in favor of torch.compile in recent PyTorch versions
+            warnings.simplefilter("ignore", torch.jit.TracerWarning)
+            warnings.simplefilter("ignore", FutureWarning)
+            if self.__mode == "trace":
+                graph = torch.jit.freeze(
+                    torch.jit.trace(forward, dummy_inputs, check_trace=False)
+                )
+            else:
+                graph = torch.compile(forward, dynamic=False)
+
+            # Warm up: the first runs optimize (or compile) the graph
+            for inputs in (dummy_inputs, check_inputs):
+                expected = forward(*inputs)
+                for _ in range(2):
+                    actual = graph(*inputs)
+                error = (actual - expected).abs().max().item()
+                if not error <= tolerance:
+                    raise RuntimeError(
+                        f"the outputs differ from eager mode by {error:g}"
+                    )
+        return graph
+
+    def __create_dummy_inputs(
+        self, batch_size: int, seed: int, timestep: float
+    ) -> tuple[torch.Tensor, ...]:
+        generator = torch.Generator().manual_seed(seed)
+        x_shape, content_shape, style_shape = self.__input_shapes
+        dummy_inputs = (
+            torch.randn(batch_size, *x_shape, generator=generator),
+            torch.full((batch_size,), timestep),
+            torch.rand(batch_size, *content_shape, generator=generator),
+            torch.rand(batch_size, *style_shape, generator=generator),
+        )
+        return tuple(
+            tensor.to(device=self.__model.device, dtype=self.__model.dtype)
+            for tensor in dummy_inputs
+        )
+
+
+def pad_batch(tensor: torch.Tensor, batch_size: int) -> torch.Tensor:
+    """Pad a batch up to a batch size by repeating its last sample."""
+    num_padding = batch_size - tensor.shape[0]
+    if num_padding == 0:
+        return tensor
+    padding = tensor[-1:].expand(num_padding, *tensor.shape[1:])
+    return torch.cat([tensor, padding])
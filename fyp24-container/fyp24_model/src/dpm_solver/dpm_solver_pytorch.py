@@ -4,6 +4,10 @@ import torch
 import math
 
 
+class SamplingCancelled(Exception):
+    """Raised by `DPM_Solver.sample` when its `cancel_event` is set."""
+
+
 class NoiseScheduleVP:
     def __init__(
         self,
@@ -14,7 +18,7 @@ class NoiseScheduleVP:
         continuous_beta_1=20.0,
         dtype=torch.float32,
     ):
-        """Create a wrapper class for the forward SDE (VP type).
+        r"""Create a wrapper class for the forward SDE (VP type).
 
         ***
         Update: We support discrete-time diffusion models by implementing a picewise linear interpolation for log_alpha_t.
@@ -102,6 +106,8 @@ class NoiseScheduleVP:
             )
 
         self.schedule = schedule
+        # The plans of the multistep DPM-Solver, see `DPM_Solver.get_multistep_plan`
+        self.multistep_plans = {}
         if schedule == "discrete":
             if betas is not None:
                 log_alphas = 0.5 * torch.log(1 - betas).cumsum(dim=0)
@@ -237,6 +243,7 @@ def model_wrapper(
     guidance_scale=1.0,
     classifier_fn=None,
     classifier_kwargs={},
+    guidance_interval=None,
 ):
     """Create a wrapper function for the noise prediction model.
 
@@ -323,6 +330,10 @@ def model_wrapper(
         guidance_scale: A `float`. The scale for the guided sampling.
         classifier_fn: A classifier function. Only used for the classifier guidance.
         classifier_kwargs: A `dict`. A dict for the other inputs of the classifier function.
+        guidance_interval: A tuple `(t_min, t_max)` of continuous times, or None to guide at every time.
+                    Only used for "classifier-free" guidance type. The guidance is only applied at the times
+                    in [t_min, t_max], and the conditional output is used alone at the other times, which
+                    halves the batch of the model.
     Returns:
         A noise prediction model that accepts the noised data and the continuous time as the inputs.
     """
@@ -371,6 +382,48 @@ def model_wrapper(
             log_prob = classifier_fn(x_in, t_input, condition, **classifier_kwargs)
             return torch.autograd.grad(log_prob.sum(), x_in)[0]
 
+    # Buffers reused across the steps: the guidance batch of the noised inputs,
+    # and the guidance batch of the conditions, which are the same at every step
+    step_buffers = {}
+
+    def repeat_into_buffer(name, tensor, repeats):
+        """
+        Repeat `tensor` along the batch axis into the step buffer `name`.
+        """
+        shape = (tensor.shape[0] * repeats, *tensor.shape[1:])
+        buffer = step_buffers.get(name)
+        if (
+            buffer is None
+            or buffer.shape != shape
+            or buffer.dtype != tensor.dtype
+            or buffer.device != tensor.device
+        ):
+            buffer = torch.empty(shape, dtype=tensor.dtype, device=tensor.device)
+            step_buffers[name] = buffer
+        for chunk in buffer.chunk(repeats):
+            chunk.copy_(tensor)
+        return buffer
+
+    def cat_condition(conditions):
+        """Concatenate the conditions, each a tensor or a list of tensors, e.g. the
+        content features of a content image."""
+        if isinstance(conditions[0], torch.Tensor):
+            return torch.cat(conditions, dim=0)
+        return [torch.cat(features, dim=0) for features in zip(*conditions)]
+
+    def get_guidance_condition(build_condition):
+        if "condition" not in step_buffers:
+            step_buffers["condition"] = build_condition()
+        return step_buffers["condition"]
+
+    def is_guided(t_continuous):
+        if guidance_interval is None:
+            return True
+        t_min, t_max = guidance_interval
+        # All the samples of the batch are at the same time
+        t = t_continuous.reshape(-1)[0].item()
+        return t_min <= t <= t_max
+
     def model_fn(x, t_continuous):
         """
         The noise predicition model function that is used for DPM-Solver.
@@ -385,49 +438,64 @@ def model_wrapper(
             noise = noise_pred_fn(x, t_continuous)
             return noise - guidance_scale * sigma_t * cond_grad
         elif guidance_type == "classifier-free":
-            if guidance_scale == 1.0 or unconditional_condition is None:
+            if (
+                guidance_scale == 1.0
+                or unconditional_condition is None
+                or not is_guided(t_continuous)
+            ):
                 return noise_pred_fn(x, t_continuous, cond=condition)
             elif (
                 model_kwargs["version"] == "V1"
                 or model_kwargs["version"] == "V2_ConStyle"
                 or model_kwargs["version"] == "V3"
             ):  # add this
-                x_in = torch.cat([x] * 2)
-                t_in = torch.cat([t_continuous] * 2)
-                c_in = []
+                x_in = repeat_into_buffer("x", x, 2)
+                t_in = repeat_into_buffer("t", t_continuous, 2)
                 assert condition is not None
-                c_in.append(
-                    torch.cat([unconditional_condition[0], condition[0]], dim=0)
-                )
-                c_in.append(
-                    torch.cat([unconditional_condition[1], condition[1]], dim=0)
+                c_in = get_guidance_condition(
+                    lambda: [
+                        torch.cat([unconditional_condition[0], condition[0]], dim=0),
+                        torch.cat([unconditional_condition[1], condition[1]], dim=0),
+                        # The content features follow the content images
+                        *[
+                            cat_condition([unconditional, conditional])
+                            for unconditional, conditional in zip(
+                                unconditional_condition[2:], condition[2:]
+                            )
+                        ],
+                    ]
                 )
                 noise_uncond, noise = noise_pred_fn(x_in, t_in, cond=c_in).chunk(2)
                 return noise_uncond + guidance_scale * (noise - noise_uncond)
             elif model_kwargs["version"] == "FG_Sep":
-                x_in = torch.cat([x] * 3)
-                t_in = torch.cat([t_continuous] * 3)
-                c_in = []
+                x_in = repeat_into_buffer("x", x, 3)
+                t_in = repeat_into_buffer("t", t_continuous, 3)
                 assert condition is not None
-                c_in.append(
-                    torch.cat(
-                        [
-                            unconditional_condition[0],
-                            unconditional_condition[0],
-                            condition[0],
+                c_in = get_guidance_condition(
+                    lambda: [
+                        torch.cat(
+                            [
+                                unconditional_condition[0],
+                                unconditional_condition[0],
+                                condition[0],
+                            ],
+                            dim=0,
+                        ),
+                        torch.cat(
+                            [
+                                unconditional_condition[1],
+                                condition[1],
+                                unconditional_condition[1],
+                            ],
+                            dim=0,
+                        ),
+                        *[
+                            cat_condition([unconditional, unconditional, conditional])
+                            for unconditional, conditional in zip(
+                                unconditional_condition[2:], condition[2:]
+                            )
                         ],
-                        dim=0,
-                    )
-                )
-                c_in.append(
-                    torch.cat(
-                        [
-                            unconditional_condition[1],
-                            condition[1],
-                            unconditional_condition[1],
-                        ],
-                        dim=0,
-                    )
+                    ]
                 )
                 noise_uncond, noise_cond_style, noise_cond_content = noise_pred_fn(
                     x_in, t_in, cond=c_in
@@ -453,6 +521,160 @@ def model_wrapper(
     return model_fn
 
 
+class MultistepPlan:
+    def __init__(
+        self,
+        dpm_solver,
+        steps,
+        order,
+        skip_type,
+        t_T,
+        t_0,
+        lower_order_final,
+        solver_type,
+        device,
+    ):
+        """The time steps of the multistep DPM-Solver, and the noise schedule and the update coefficients at each
+        step. They only depend on the noise schedule and the settings of the sampling, not on the samples, so they
+        are computed once by `DPM_Solver.get_multistep_plan` and reused by every sample of every batch.
+
+        The update of each step is computed as in `multistep_dpm_solver_update`, in the same order of operations,
+        so the samples are the same as without the plan.
+
+        Args:
+            dpm_solver: A `DPM_Solver`.
+            steps, order, skip_type, t_T, t_0, lower_order_final, solver_type: The settings of the sampling
+                (see `DPM_Solver.sample`).
+            device: A torch device.
+        """
+        if solver_type not in ["dpmsolver", "taylor"]:
+            raise ValueError(
+                "'solver_type' must be either 'dpmsolver' or 'taylor', got {}".format(
+                    solver_type
+                )
+            )
+        ns = dpm_solver.noise_schedule
+        self.timesteps = dpm_solver.get_time_steps(
+            skip_type=skip_type, t_T=t_T, t_0=t_0, N=steps, device=device
+        )
+        # The noise schedule at each time step, each with the shape (1,)
+        self.lambdas = ns.marginal_lambda(self.timesteps).reshape((-1, 1))
+        self.log_alphas = ns.marginal_log_mean_coeff(self.timesteps).reshape((-1, 1))
+        self.alphas = torch.exp(self.log_alphas)
+        self.sigmas = ns.marginal_std(self.timesteps).reshape((-1, 1))
+
+        # The order and the update coefficients of each step, none for the initial time step
+        self.orders = [None]
+        self.coefficients = [None]
+        for step in range(1, steps + 1):
+            if step < order:
+                # Init the first `order` values by lower order multistep DPM-Solver.
+                step_order = step
+            elif lower_order_final and steps < 10:
+                # We only use lower order for steps < 10
+                step_order = min(order, steps + 1 - step)
+            else:
+                step_order = order
+            self.orders.append(step_order)
+            self.coefficients.append(
+                self.get_coefficients(
+                    dpm_solver.algorithm_type, step, step_order, solver_type
+                )
+            )
+
+    def get_coefficients(self, algorithm_type, step, order, solver_type):
+        """
+        Compute the coefficients of the update to the time step `step` with the order `order`, such that
+            x_t = coef_x * x + coef_model * model_prev_0 + coef_D1 * D1 + coef_D2 * D2
+        where D1 and D2 are the differences of the previous model values (see `update`).
+        """
+        lambda_t, log_alpha_t, alpha_t, sigma_t = (
+            self.lambdas[step],
+            self.log_alphas[step],
+            self.alphas[step],
+            self.sigmas[step],
+        )
+        lambda_prev_0, log_alpha_prev_0, sigma_prev_0 = (
+            self.lambdas[step - 1],
+            self.log_alphas[step - 1],
+            self.sigmas[step - 1],
+        )
+        h = lambda_t - lambda_prev_0
+        coefficients = {}
+        if algorithm_type == "dpmsolver++":
+            phi_1 = torch.expm1(-h)
+            coefficients["x"] = sigma_t / sigma_prev_0
+            coefficients["model"] = -(alpha_t * phi_1)
+        else:
+            phi_1 = torch.expm1(h)
+            coefficients["x"] = torch.exp(log_alpha_t - log_alpha_prev_0)
+            coefficients["model"] = -(sigma_t * phi_1)
+
+        if order == 2:
+            h_0 = lambda_prev_0 - self.lambdas[step - 2]
+            r0 = h_0 / h
+            coefficients["inv_r0"] = 1.0 / r0
+            if algorithm_type == "dpmsolver++":
+                if solver_type == "dpmsolver":
+                    coefficients["D1"] = -(0.5 * (alpha_t * phi_1))
+                else:
+                    coefficients["D1"] = alpha_t * (phi_1 / h + 1.0)
+            else:
+                if solver_type == "dpmsolver":
+                    coefficients["D1"] = -(0.5 * (sigma_t * phi_1))
+                else:
+                    coefficients["D1"] = -(sigma_t * (phi_1 / h - 1.0))
+        elif order == 3:
+            h_1 = self.lambdas[step - 2] - self.lambdas[step - 3]
+            h_0 = lambda_prev_0 - self.lambdas[step - 2]
+            r0, r1 = h_0 / h, h_1 / h
+            coefficients["inv_r0"] = 1.0 / r0
+            coefficients["inv_r1"] = 1.0 / r1
+            coefficients["D1_weight"] = r0 / (r0 + r1)
+            coefficients["D2_weight"] = 1.0 / (r0 + r1)
+            if algorithm_type == "dpmsolver++":
+                phi_2 = phi_1 / h + 1.0
+                phi_3 = phi_2 / h - 0.5
+                coefficients["D1"] = alpha_t * phi_2
+                coefficients["D2"] = -(alpha_t * phi_3)
+            else:
+                phi_2 = phi_1 / h - 1.0
+                phi_3 = phi_2 / h - 0.5
+                coefficients["D1"] = -(sigma_t * phi_2)
+                coefficients["D2"] = -(sigma_t * phi_3)
+        elif order != 1:
+            raise ValueError("Solver order must be 1 or 2 or 3, got {}".format(order))
+        return coefficients
+
+    def update(self, x, model_prev_list, step):
+        """
+        Multistep DPM-Solver from the time step `step - 1` to the time step `step`.
+
+        Args:
+            x: A pytorch tensor. The value at the time step `step - 1`.
+            model_prev_list: A list of pytorch tensor. The previous computed model values.
+            step: A `int`. The time step to update to.
+        Returns:
+            x_t: A pytorch tensor. The approximated solution at the time step `step`.
+        """
+        order = self.orders[step]
+        coefficients = self.coefficients[step]
+        model_prev_0 = model_prev_list[-1]
+        x_t = coefficients["x"] * x + coefficients["model"] * model_prev_0
+        if order == 2:
+            model_prev_1 = model_prev_list[-2]
+            D1_0 = coefficients["inv_r0"] * (model_prev_0 - model_prev_1)
+            x_t = x_t + coefficients["D1"] * D1_0
+        elif order == 3:
+            model_prev_2, model_prev_1 = model_prev_list[-3], model_prev_list[-2]
+            D1_0 = coefficients["inv_r0"] * (model_prev_0 - model_prev_1)
+            D1_1 = coefficients["inv_r1"] * (model_prev_1 - model_prev_2)
+            D1 = D1_0 + coefficients["D1_weight"] * (D1_0 - D1_1)
+            D2 = coefficients["D2_weight"] * (D1_0 - D1_1)
+            x_t = x_t + coefficients["D1"] * D1 + coefficients["D2"] * D2
+        return x_t
+
+
 class DPM_Solver:
     def __init__(
         self,
@@ -531,6 +753,8 @@ class DPM_Solver:
         self.correcting_xt_fn = correcting_xt_fn
         self.dynamic_thresholding_ratio = dynamic_thresholding_ratio
         self.thresholding_max_val = thresholding_max_val
+        # The number of function evaluations (NFE) of the model in the last sample
+        self.nfe = 0
 
     def dynamic_thresholding_fn(self, x0):
         """
@@ -552,30 +776,44 @@ class DPM_Solver:
         """
         Return the noise prediction model.
         """
+        self.nfe += 1
         return self.model(x, t)
 
-    def data_prediction_fn(self, x, t):
+    def data_prediction_fn(self, x, t, alpha_t=None, sigma_t=None):
         """
-        Return the data prediction model (with corrector).
+        Return the data prediction model (with corrector). `alpha_t` and `sigma_t` are computed from the noise
+        schedule if they are not given.
         """
         noise = self.noise_prediction_fn(x, t)
-        alpha_t, sigma_t = self.noise_schedule.marginal_alpha(
-            t
-        ), self.noise_schedule.marginal_std(t)
+        if alpha_t is None or sigma_t is None:
+            alpha_t, sigma_t = self.noise_schedule.marginal_alpha(
+                t
+            ), self.noise_schedule.marginal_std(t)
         x0 = (x - sigma_t * noise) / alpha_t
         if self.correcting_x0_fn is not None:
             x0 = self.correcting_x0_fn(x0)
         return x0
 
-    def model_fn(self, x, t):
+    def model_fn(self, x, t, alpha_t=None, sigma_t=None):
         """
         Convert the model to the noise prediction model or the data prediction model.
         """
         if self.algorithm_type == "dpmsolver++":
-            return self.data_prediction_fn(x, t)
+            return self.data_prediction_fn(x, t, alpha_t=alpha_t, sigma_t=sigma_t)
         else:
             return self.noise_prediction_fn(x, t)
 
+    def model_output_to_x0(self, x, t, model_output):
+        """
+        Convert the output of `model_fn` at time `t` to the predicted x0.
+        """
+        if self.algorithm_type == "dpmsolver++":
+            return model_output
+        alpha_t, sigma_t = self.noise_schedule.marginal_alpha(
+            t
+        ), self.noise_schedule.marginal_std(t)
+        return (x - sigma_t * model_output) / alpha_t
+
     def get_time_steps(self, skip_type, t_T, t_0, N, device):
         """Compute the intermediate time steps for sampling.
 
@@ -615,6 +853,52 @@ class DPM_Solver:
                 )
             )
 
+    def get_multistep_plan(
+        self,
+        steps,
+        order,
+        skip_type,
+        t_T,
+        t_0,
+        device,
+        lower_order_final=True,
+        solver_type="dpmsolver",
+    ):
+        """Get the `MultistepPlan` of the multistep DPM-Solver for the settings of the sampling.
+
+        The plans are memoized by the noise schedule, so they are shared by the DPM-Solvers of the same noise
+        schedule and only computed for the first sample with the settings.
+
+        Returns:
+            A `MultistepPlan`.
+        """
+        key = (
+            self.algorithm_type,
+            steps,
+            order,
+            skip_type,
+            float(t_T),
+            float(t_0),
+            lower_order_final,
+            solver_type,
+            str(device),
+        )
+        plan = self.noise_schedule.multistep_plans.get(key)
+        if plan is None:
+            plan = MultistepPlan(
+                self,
+                steps=steps,
+                order=order,
+                skip_type=skip_type,
+                t_T=t_T,
+                t_0=t_0,
+                lower_order_final=lower_order_final,
+                solver_type=solver_type,
+                device=device,
+            )
+            self.noise_schedule.multistep_plans[key] = plan
+        return plan
+
     def get_orders_and_timesteps_for_singlestep_solver(
         self, steps, order, skip_type, t_T, t_0, device
     ):
@@ -1237,6 +1521,10 @@ class DPM_Solver:
         theta=0.9,
         t_err=1e-5,
         solver_type="dpmsolver",
+        max_nfe=None,
+        x0_pred_callback=None,
+        callback=None,
+        cancel_event=None,
     ):
         """
         The adaptive step size solver based on singlestep DPM-Solver.
@@ -1254,6 +1542,13 @@ class DPM_Solver:
                 current time and `t_0` is less than `t_err`. The default setting is 1e-5.
             solver_type: either 'dpmsolver' or 'taylor'. The type for the high-order solvers.
                 The type slightly impacts the performance. We recommend to use 'dpmsolver' type.
+            max_nfe: A `int`. The budget of function evaluations. Once the next step would leave no room for
+                another one, the solver takes the last step to `t_0` whatever its error. None for no budget.
+            x0_pred_callback: A function called as `x0_pred_callback(nfe, x0_pred)` with the predicted x0 at
+                each time the step is accepted, e.g. to preview the sample.
+            callback: A function called as `callback(nfe, max_nfe)` after each step, accepted or not.
+            cancel_event: A `threading.Event`. Once it is set, the solver raises `SamplingCancelled` after the
+                current step.
         Returns:
             x_0: A pytorch tensor. The approximated solution at time `t_0`.
 
@@ -1265,11 +1560,10 @@ class DPM_Solver:
         lambda_0 = ns.marginal_lambda(t_0 * torch.ones_like(s).to(x))
         h = h_init * torch.ones_like(s).to(x)
         x_prev = x
-        nfe = 0
         if order == 2:
             r1 = 0.5
-            lower_update = lambda x, s, t: self.dpm_solver_first_update(
-                x, s, t, return_intermediate=True
+            lower_update = lambda x, s, t, model_s: self.dpm_solver_first_update(
+                x, s, t, model_s=model_s, return_intermediate=True
             )
             higher_update = (
                 lambda x, s, t, **kwargs: self.singlestep_dpm_solver_second_update(
@@ -1278,8 +1572,16 @@ class DPM_Solver:
             )
         elif order == 3:
             r1, r2 = 1.0 / 3.0, 2.0 / 3.0
-            lower_update = lambda x, s, t: self.singlestep_dpm_solver_second_update(
-                x, s, t, r1=r1, return_intermediate=True, solver_type=solver_type
+            lower_update = (
+                lambda x, s, t, model_s: self.singlestep_dpm_solver_second_update(
+                    x,
+                    s,
+                    t,
+                    r1=r1,
+                    model_s=model_s,
+                    return_intermediate=True,
+                    solver_type=solver_type,
+                )
             )
             higher_update = (
                 lambda x, s, t, **kwargs: self.singlestep_dpm_solver_third_update(
@@ -1292,9 +1594,29 @@ class DPM_Solver:
                     order
                 )
             )
+        if max_nfe is not None and max_nfe < order:
+            raise ValueError(
+                "The budget of the adaptive solver must be at least {} function evaluations, got {}".format(
+                    order, max_nfe
+                )
+            )
+        nfe_start = self.nfe
+        # The model at `s` is the same for the steps after a rejected step
+        model_s = None
         while torch.abs((s - t_0)).mean() > t_err:
-            t = ns.inverse_lambda(lambda_s + h)
-            x_lower, lower_noise_kwargs = lower_update(x, s, t)
+            step_nfe = order if model_s is None else order - 1
+            # Take the last step to `t_0` if the budget does not allow another step after it
+            nfe = self.nfe - nfe_start
+            is_last_step = max_nfe is not None and nfe + step_nfe + order > max_nfe
+            if is_last_step:
+                t = t_0 * torch.ones_like(s)
+            else:
+                t = ns.inverse_lambda(lambda_s + h)
+            is_new_s = model_s is None
+            x_lower, lower_noise_kwargs = lower_update(x, s, t, model_s=model_s)
+            model_s = lower_noise_kwargs["model_s"]
+            if is_new_s and x0_pred_callback is not None:
+                x0_pred_callback(nfe, self.model_output_to_x0(x, s, model_s))
             x_higher = higher_update(x, s, t, **lower_noise_kwargs)
             assert isinstance(x, torch.Tensor)
             delta = torch.max(
@@ -1305,17 +1627,20 @@ class DPM_Solver:
                 torch.square(v.reshape((v.shape[0], -1))).mean(dim=-1, keepdim=True)
             )
             E = norm_fn((x_higher - x_lower) / delta).max()
-            if torch.all(E <= 1.0):
+            if torch.all(E <= 1.0) or is_last_step:
                 x = x_higher
                 s = t
                 x_prev = x_lower
                 lambda_s = ns.marginal_lambda(s)
+                model_s = None
             h = torch.min(
                 theta * h * torch.float_power(E, -1.0 / order).float(),
                 lambda_0 - lambda_s,
             )
-            nfe += order
-        print("adaptive solver nfe", nfe)
+            if callback is not None:
+                callback(self.nfe - nfe_start, max_nfe)
+            if cancel_event is not None and cancel_event.is_set():
+                raise SamplingCancelled()
         return x
 
     def add_noise(self, x, t, noise=None):
@@ -1396,6 +1721,10 @@ class DPM_Solver:
         atol=0.0078,
         rtol=0.05,
         return_intermediate=False,
+        x0_pred_callback=None,
+        callback=None,
+        cancel_event=None,
+        max_nfe=None,
     ):
         """
         Compute the sample at time `t_end` by DPM-Solver, given the initial `x` at time `t_start`.
@@ -1437,7 +1766,7 @@ class DPM_Solver:
                 Adaptive step size DPM-Solver (i.e. "DPM-Solver-12" and "DPM-Solver-23" in the paper).
                 We ignore `steps` and use adaptive step size DPM-Solver with a higher order of `order`.
                 You can adjust the absolute tolerance `atol` and the relative tolerance `rtol` to balance the computatation costs
-                (NFE) and the sample quality.
+                (NFE) and the sample quality, under the budget of `max_nfe` function evaluations.
                     - If `order` == 2, we use DPM-Solver-12 which combines DPM-Solver-1 and singlestep DPM-Solver-2.
                     - If `order` == 3, we use DPM-Solver-23 which combines singlestep DPM-Solver-2 and singlestep DPM-Solver-3.
 
@@ -1501,6 +1830,16 @@ class DPM_Solver:
             rtol: A `float`. The relative tolerance of the adaptive step size solver. Valid when `method` == 'adaptive'.
             return_intermediate: A `bool`. Whether to save the xt at each step.
                 When set to `True`, method returns a tuple (x0, intermediates); when set to False, method returns only x0.
+            x0_pred_callback: A function called as `x0_pred_callback(step, x0_pred)` with the predicted x0 at each
+                step that evaluates the model, e.g. to preview the sample. Only valid for `method=multistep` or
+                `method=adaptive`, for which the step is the NFE so far.
+            callback: A function called as `callback(step, steps)` after each step, e.g. to report the progress.
+                Only valid for `method=multistep` or `method=adaptive`, for which it is called as
+                `callback(nfe, max_nfe)`.
+            cancel_event: A `threading.Event`. Once it is set, the sampling raises `SamplingCancelled` after the
+                current step. Only valid for `method=multistep` or `method=adaptive`.
+            max_nfe: A `int`. The budget of function evaluations of the adaptive step size solver. Valid when
+                `method` == 'adaptive'. The NFE of the sample is `self.nfe` afterwards, whatever the method.
         Returns:
             x_end: A pytorch tensor. The approximated solution at time `t_end`.
 
@@ -1516,6 +1855,16 @@ class DPM_Solver:
                 "singlestep",
                 "singlestep_fixed",
             ], "Cannot use adaptive solver when saving intermediate values"
+        if x0_pred_callback is not None:
+            assert method in [
+                "multistep",
+                "adaptive",
+            ], "Can only predict x0 at each step with multistep or adaptive solver"
+        if callback is not None or cancel_event is not None:
+            assert method in [
+                "multistep",
+                "adaptive",
+            ], "Can only report or cancel each step with multistep or adaptive solver"
         if self.correcting_xt_fn is not None:
             assert method in [
                 "multistep",
@@ -1525,6 +1874,7 @@ class DPM_Solver:
         device = x.device
         intermediates = []
         step = None
+        self.nfe = 0
         with torch.no_grad():
             if method == "adaptive":
                 x = self.dpm_solver_adaptive(
@@ -1535,18 +1885,48 @@ class DPM_Solver:
                     atol=atol,
                     rtol=rtol,
                     solver_type=solver_type,
+                    max_nfe=max_nfe,
+                    x0_pred_callback=x0_pred_callback,
+                    callback=callback,
+                    cancel_event=cancel_event,
                 )
             elif method == "multistep":
                 assert steps >= order
-                timesteps = self.get_time_steps(
-                    skip_type=skip_type, t_T=t_T, t_0=t_0, N=steps, device=device
+                plan = self.get_multistep_plan(
+                    steps=steps,
+                    order=order,
+                    skip_type=skip_type,
+                    t_T=t_T,
+                    t_0=t_0,
+                    device=device,
+                    lower_order_final=lower_order_final,
+                    solver_type=solver_type,
                 )
+                timesteps = plan.timesteps
                 assert timesteps.shape[0] - 1 == steps
+
+                def plan_model_fn(x, step):
+                    return self.model_fn(
+                        x,
+                        timesteps[step],
+                        alpha_t=plan.alphas[step],
+                        sigma_t=plan.sigmas[step],
+                    )
+
+                def on_step_done(step):
+                    if callback is not None:
+                        callback(step, steps)
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise SamplingCancelled()
+
                 # Init the initial values.
                 step = 0
                 t = timesteps[step]
-                t_prev_list = [t]
-                model_prev_list = [self.model_fn(x, t)]
+                model_prev_list = [plan_model_fn(x, step)]
+                if x0_pred_callback is not None:
+                    x0_pred_callback(
+                        step, self.model_output_to_x0(x, t, model_prev_list[-1])
+                    )
                 if self.correcting_xt_fn is not None:
                     x = self.correcting_xt_fn(x, t, step)
                 if return_intermediate:
@@ -1554,47 +1934,36 @@ class DPM_Solver:
                 # Init the first `order` values by lower order multistep DPM-Solver.
                 for step in range(1, order):
                     t = timesteps[step]
-                    x = self.multistep_dpm_solver_update(
-                        x,
-                        model_prev_list,
-                        t_prev_list,
-                        t,
-                        step,
-                        solver_type=solver_type,
-                    )
+                    x = plan.update(x, model_prev_list, step)
                     if self.correcting_xt_fn is not None:
                         x = self.correcting_xt_fn(x, t, step)
                     if return_intermediate:
                         intermediates.append(x)
-                    t_prev_list.append(t)
-                    model_prev_list.append(self.model_fn(x, t))
+                    model_prev_list.append(plan_model_fn(x, step))
+                    if x0_pred_callback is not None:
+                        x0_pred_callback(
+                            step, self.model_output_to_x0(x, t, model_prev_list[-1])
+                        )
+                    on_step_done(step)
                 # Compute the remaining values by `order`-th order multistep DPM-Solver.
                 for step in range(order, steps + 1):
                     t = timesteps[step]
-                    # We only use lower order for steps < 10
-                    if lower_order_final and steps < 10:
-                        step_order = min(order, steps + 1 - step)
-                    else:
-                        step_order = order
-                    x = self.multistep_dpm_solver_update(
-                        x,
-                        model_prev_list,
-                        t_prev_list,
-                        t,
-                        step_order,
-                        solver_type=solver_type,
-                    )
+                    x = plan.update(x, model_prev_list, step)
                     if self.correcting_xt_fn is not None:
                         x = self.correcting_xt_fn(x, t, step)
                     if return_intermediate:
                         intermediates.append(x)
                     for i in range(order - 1):
-                        t_prev_list[i] = t_prev_list[i + 1]
                         model_prev_list[i] = model_prev_list[i + 1]
-                    t_prev_list[-1] = t
                     # We do not need to evaluate the final model value.
                     if step < steps:
-                        model_prev_list[-1] = self.model_fn(x, t)
+                        model_prev_list[-1] = plan_model_fn(x, step)
+                        if x0_pred_callback is not None:
+                            x0_pred_callback(
+                                step,
+                                self.model_output_to_x0(x, t, model_prev_list[-1]),
+                            )
+                    on_step_done(step)
             elif method in ["singlestep", "singlestep_fixed"]:
                 orders = None
                 timesteps_outer = None
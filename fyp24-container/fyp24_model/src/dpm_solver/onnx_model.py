@@ -0,0 +1,172 @@
+import inspect
+import os
+from typing import Union
+
+import torch
+from torch.onnx import register_custom_op_symbolic, symbolic_helper
+
+from .compiled_model import TensorOnlyModel
+
+ONNX_INPUT_NAMES = ("x", "timesteps", "content_images", "style_images")
+ONNX_OUTPUT_NAMES = ("noise_pred",)
+
+# The non-tensor arguments are bound at export and stored in the metadata of the ONNX model
+CONTENT_ENCODER_DOWNSAMPLE_SIZE_KEY = "content_encoder_downsample_size"
+VERSION_KEY = "version"
+
+# DeformConv, used by OffsetRefStrucInter, is an ONNX operator since opset 19
+DEFAULT_OPSET_VERSION = 19
+
+
+@symbolic_helper.parse_args(
+    "v", "v", "v", "v", "v", "i", "i", "i", "i", "i", "i", "i", "i", "b"
+)
+def deform_conv2d_symbolic(
+    g,
+    input,
+    weight,
+    offset,
+    mask,
+    bias,
+    stride_h,
+    stride_w,
+    pad_h,
+    pad_w,
+    dilation_h,
+    dilation_w,
+    n_weight_groups,
+    n_offset_groups,
+    use_mask,
+):
+    """Export torchvision's deform_conv2d as the DeformConv operator of ONNX."""
+    inputs = [input, weight, offset, bias]
+    if use_mask:
+        inputs.append(mask)
+    return g.op(
+        "DeformConv",
+        *inputs,
+        strides_i=[stride_h, stride_w],
+        pads_i=[pad_h, pad_w, pad_h, pad_w],
+        dilations_i=[dilation_h, dilation_w],
+        group_i=n_weight_groups,
+        offset_group_i=n_offset_groups,
+    )
+
+
+def export_onnx(
+    model,
+    path: Union[str, os.PathLike],
+    content_image_size: tuple[int, int],
+    style_image_size: tuple[int, int],
+    content_encoder_downsample_size: int,
+    version: str = "V3",
+    opset_version: int = DEFAULT_OPSET_VERSION,
+) -> None:
+    """Export FontDiffuserModelDPM (the encoders and the UNet) to one ONNX model
+    with a dynamic batch size. Freeze the model for inference before exporting.
+    """
+    import onnx
+
+    forward = TensorOnlyModel(model, content_encoder_downsample_size, version).eval()
+    dummy_inputs = (
+        torch.randn(2, 3, *content_image_size),
+        torch.full((2,), 500.0),
+        torch.rand(2, 3, *content_image_size),
+        torch.rand(2, 3, *style_image_size),
+    )
+    dummy_inputs = tuple(tensor.to(model.device) for tensor in dummy_inputs)
+
+    register_custom_op_symbolic(
+        "torchvision::deform_conv2d", deform_conv2d_symbolic, opset_version
+    )
+    export_kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        # The TorchScript-based exporter (the only one in PyTorch 1.x) uses the symbolic above
+        export_kwargs["dynamo"] = False
+    with torch.no_grad():
+        torch.onnx.export(
+            forward,
+            dummy_inputs,
+            str(path),
+            input_names=ONNX_INPUT_NAMES,
+            output_names=ONNX_OUTPUT_NAMES,
+            dynamic_axes={
+                name: {0: "batch_size"} for name in ONNX_INPUT_NAMES + ONNX_OUTPUT_NAMES
+            },
+            opset_version=opset_version,
+            **export_kwargs,
+        )
+
+    onnx_model = onnx.load(str(path))
+    onnx.helper.set_model_props(
+        onnx_model,
+        {
+            CONTENT_ENCODER_DOWNSAMPLE_SIZE_KEY: str(content_encoder_downsample_size),
+            VERSION_KEY: version,
+        },
+    )
+    onnx.save(onnx_model, str(path))
+
+
+class OnnxModel:
+    """Runs an exported FontDiffuserModelDPM with ONNX Runtime on the CPU.
+
+    Call it like FontDiffuserModelDPM, e.g. as the model of FontDiffuserDPMPipeline.
+    """
+
+    __session: "onnxruntime.InferenceSession"
+    __content_encoder_downsample_size: int
+    __version: str
+
+    def __init__(self, path: Union[str, os.PathLike], num_threads: int = 0):
+        """
+        :param num_threads: The number of intra-op threads, or 0 to let
+            ONNX Runtime use one thread per physical core.
+        """
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = (
+            onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        options.intra_op_num_threads = num_threads
+        self.__session = onnxruntime.InferenceSession(
+            str(path), options, providers=["CPUExecutionProvider"]
+        )
+
+        metadata = self.__session.get_modelmeta().custom_metadata_map
+        self.__content_encoder_downsample_size = int(
+            metadata[CONTENT_ENCODER_DOWNSAMPLE_SIZE_KEY]
+        )
+        self.__version = metadata[VERSION_KEY]
+
+    @property
+    def device(self) -> torch.device:
+        return torch.device("cpu")
+
+    @property
+    def dtype(self) -> torch.dtype:
+        return torch.float32
+
+    def __call__(
+        self, x, timesteps, cond, content_encoder_downsample_size, version
+    ) -> torch.Tensor:
+        if (
+            content_encoder_downsample_size != self.__content_encoder_downsample_size
+            or version != self.__version
+        ):
+            raise ValueError(
+                "The ONNX model was exported with content_encoder_downsample_size="
+                f"{self.__content_encoder_downsample_size} and version={self.__version}"
+            )
+
+        content_images, style_images = cond
+        timesteps = timesteps.expand(x.shape[0])
+        inputs = {
+            name: tensor.detach().to(device="cpu", dtype=torch.float32).numpy()
+            for name, tensor in zip(
+                ONNX_INPUT_NAMES, (x, timesteps, content_images, style_images)
+            )
+        }
+        [noise_pred] = self.__session.run(None, inputs)
+        return torch.from_numpy(noise_pred)
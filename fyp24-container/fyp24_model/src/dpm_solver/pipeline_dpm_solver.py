@@ -8,6 +8,7 @@ from .dpm_solver_pytorch import (
     model_wrapper,
     DPM_Solver,
 )
+from .compiled_model import CompiledModel
 
 
 class FontDiffuserDPMPipeline:
@@ -21,19 +22,62 @@ class FontDiffuserDPMPipeline:
         model_type="noise",
         guidance_type="classifier-free",
         guidance_scale=7.5,
+        distilled_steps=None,
     ):
+        """Set distilled_steps to serve a student distilled by distill.py for that
+        number of steps. The guidance is baked into the student, so it is sampled
+        without guidance."""
         super().__init__()
         self.model = model
         self.train_scheduler_betas = ddpm_train_scheduler.betas
-        # Define the noise schedule
+        # Define the noise schedule, in fp32 whatever the precision of the model
         self.noise_schedule = NoiseScheduleVP(
-            schedule="discrete", betas=self.train_scheduler_betas
+            schedule="discrete", betas=self.train_scheduler_betas, dtype=torch.float32
         )
 
         self.version = version
         self.model_type = model_type
         self.guidance_type = guidance_type
-        self.guidance_scale = guidance_scale
+        self.guidance_scale = 1.0 if distilled_steps is not None else guidance_scale
+        self.distilled_steps = distilled_steps
+        # Runs in place of the model in the solver loop if set, e.g. a compiled model
+        self.inference_model = None
+        # Caches the content features of the glyphs if set, by their content keys
+        self.content_feature_cache = None
+        self.__blank_content_features = {}
+
+    def compile(
+        self,
+        batch_sizes,
+        content_image_size,
+        style_image_size,
+        content_encoder_downsample_size,
+        mode="trace",
+        unguided_steps=False,
+    ):
+        """Compile the model for static shapes, one graph per batch size bucket.
+        Classifier-free guidance runs the model on twice the batch size. Set
+        unguided_steps to also compile the batch sizes of the steps without
+        guidance, when sampling with a guidance schedule.
+        """
+        num_model_inputs = 1
+        if self.guidance_type == "classifier-free" and self.guidance_scale != 1.0:
+            num_model_inputs = 3 if self.version == "FG_Sep" else 2
+        model_batch_sizes = [
+            batch_size * num_model_inputs for batch_size in batch_sizes
+        ]
+        if unguided_steps:
+            model_batch_sizes += batch_sizes
+        self.inference_model = CompiledModel(
+            model=self.model,
+            batch_sizes=model_batch_sizes,
+            content_image_size=content_image_size,
+            style_image_size=style_image_size,
+            content_encoder_downsample_size=content_encoder_downsample_size,
+            version=self.version,
+            mode=mode,
+        )
+        return self.inference_model.compiled_batch_sizes
 
     def numpy_to_pil(self, images):
         """Convert a numpy image or a batch of images to a PIL image."""
@@ -44,6 +88,89 @@ class FontDiffuserDPMPipeline:
 
         return pil_images
 
+    def can_cache_content_features(self):
+        """Whether the content features can be encoded apart from the model. The
+        compiled and ONNX models take the content images alone."""
+        return self.inference_model is None and hasattr(self.model, "encode_content")
+
+    def get_content_features(self, content_images, content_keys):
+        """Get the content features of the content images from the cache, and
+        encode and cache those that are not cached yet in one batch.
+
+        content_keys are the (font, character) of each content image.
+        """
+        cache = self.content_feature_cache
+        assert len(content_keys) == len(content_images)
+        features = [cache.get(font, character) for font, character in content_keys]
+        missing = [i for i, feature in enumerate(features) if feature is None]
+        if missing:
+            with torch.no_grad():
+                encoded = self.model.encode_content(content_images[missing])
+            for batch_index, i in enumerate(missing):
+                # Clone so that the cache does not keep the whole batch alive
+                features[i] = [
+                    feature[batch_index : batch_index + 1].clone()
+                    for feature in encoded
+                ]
+                cache.put(*content_keys[i], features[i])
+        return [
+            torch.cat(level, dim=0).to(self.model.device) for level in zip(*features)
+        ]
+
+    def get_blank_content_features(self, uncond_content_images):
+        """Encode the blank content images of classifier-free guidance once per
+        shape."""
+        key = (
+            tuple(uncond_content_images.shape),
+            uncond_content_images.device,
+            uncond_content_images.dtype,
+        )
+        features = self.__blank_content_features.get(key)
+        if features is None:
+            with torch.no_grad():
+                features = self.model.encode_content(uncond_content_images)
+            self.__blank_content_features[key] = features
+        return features
+
+    def get_guidance_interval(
+        self, guidance_interval, unguided_final_steps, num_inference_step, skip_type
+    ):
+        """Convert a guidance schedule to the interval of continuous times in which
+        model_wrapper applies classifier-free guidance, or None to guide at every step.
+
+        guidance_interval is a (min, max) interval of the timesteps of the model
+        (0 to 999), and unguided_final_steps is the number of final steps that run
+        the conditional model alone.
+        """
+        if guidance_interval is None and unguided_final_steps == 0:
+            return None
+
+        total_N = self.noise_schedule.total_N
+        t_min, t_max = 0.0, float(self.noise_schedule.T)
+        if guidance_interval is not None:
+            # The inverse of the conversion to the model input time in model_wrapper
+            t_min = guidance_interval[0] / 1000.0 + 1.0 / total_N
+            t_max = guidance_interval[1] / 1000.0 + 1.0 / total_N
+        if unguided_final_steps >= num_inference_step:
+            t_min = float("inf")
+        elif unguided_final_steps > 0:
+            # The solver is only used for its time steps. The model is called at
+            # each time step but the last, which the final steps start from.
+            time_steps = DPM_Solver(
+                model_fn=None, noise_schedule=self.noise_schedule
+            ).get_time_steps(
+                skip_type=skip_type,
+                t_T=self.noise_schedule.T,
+                t_0=1.0 / total_N,
+                N=num_inference_step,
+                device="cpu",
+            )
+            # Between the last guided and the first unguided time step
+            first_unguided = num_inference_step - unguided_final_steps
+            t_between = time_steps[first_unguided - 1 : first_unguided + 1].mean()
+            t_min = max(t_min, t_between.item())
+        return (t_min, t_max)
+
     def generate(
         self,
         content_images,
@@ -60,7 +187,51 @@ class FontDiffuserDPMPipeline:
         method="multistep",
         correcting_x0_fn=None,
         generator=None,
+        guidance_interval=None,
+        unguided_final_steps=0,
+        x0_pred_callback=None,
+        callback=None,
+        cancel_event=None,
+        content_keys=None,
+        atol=0.0078,
+        rtol=0.05,
+        max_nfe=None,
+        return_nfe=False,
     ):
+        """Sample glyphs with DPM-Solver. x0_pred_callback is called as
+        x0_pred_callback(step, x0_pred) with the predicted glyphs in [-1, 1] at each
+        step that evaluates the model, e.g. to preview the glyphs.
+
+        generator is a torch.Generator of the noise, or a list of one generator per
+        sample, so that the noise of each sample does not depend on the batch.
+
+        callback is called as callback(step, num_inference_step) after each step.
+        Once the threading.Event cancel_event is set, the sampling raises
+        SamplingCancelled after the current step.
+
+        content_keys are the (font, character) of each content image. If they are
+        given and the pipeline has a content feature cache, the content features
+        are looked up in the cache instead of being encoded at every step.
+
+        method="adaptive" takes the solver steps that keep the error of each step
+        within atol and rtol, and ignores num_inference_step, under the budget of
+        max_nfe function evaluations. The steps of the callbacks are then the
+        function evaluations so far. If return_nfe is set, also return the number
+        of function evaluations of the model.
+
+        A distilled student is sampled on the steps it was trained for, whatever
+        the number of steps, solver and guidance schedule given.
+        """
+        if self.distilled_steps is not None:
+            # The first-order DPM-Solver++ steps of ProgressiveDistillation
+            num_inference_step = self.distilled_steps
+            order = 1
+            algorithm_type = "dpmsolver++"
+            skip_type = "time_uniform"
+            method = "multistep"
+            guidance_interval = None
+            unguided_final_steps = 0
+
         model_kwargs = {}
         model_kwargs["version"] = self.version
         model_kwargs["content_encoder_downsample_size"] = (
@@ -77,9 +248,17 @@ class FontDiffuserDPMPipeline:
         uncond.append(uncond_content_images)
         uncond.append(uncond_style_images)
 
+        if (
+            self.content_feature_cache is not None
+            and content_keys is not None
+            and self.can_cache_content_features()
+        ):
+            cond.append(self.get_content_features(content_images, content_keys))
+            uncond.append(self.get_blank_content_features(uncond_content_images))
+
         # 2.Convert the discrete-time model to the continuous-time
         model_fn = model_wrapper(
-            model=self.model,
+            model=self.inference_model or self.model,
             noise_schedule=self.noise_schedule,
             model_type=self.model_type,
             model_kwargs=model_kwargs,
@@ -87,6 +266,13 @@ class FontDiffuserDPMPipeline:
             condition=cond,
             unconditional_condition=uncond,
             guidance_scale=self.guidance_scale,
+            # Guiding only part of the steps halves the batch of the other steps
+            guidance_interval=self.get_guidance_interval(
+                guidance_interval=guidance_interval,
+                unguided_final_steps=unguided_final_steps,
+                num_inference_step=num_inference_step,
+                skip_type=skip_type,
+            ),
         )
 
         # 3. Define dpm-solver and sample by multistep DPM-Solver.
@@ -102,10 +288,21 @@ class FontDiffuserDPMPipeline:
 
         # 4. Generate
         # Sample gaussian noise to begin loop => [batch, 3, height, width]
-        x_T = torch.randn(
-            (batch_size, 3, dm_size[0], dm_size[1]),
-            generator=generator,
-        )
+        if isinstance(generator, list):
+            assert (
+                len(generator) == batch_size
+            ), "Need one generator for each sample in the batch"
+            x_T = torch.cat(
+                [
+                    torch.randn((1, 3, dm_size[0], dm_size[1]), generator=g)
+                    for g in generator
+                ]
+            )
+        else:
+            x_T = torch.randn(
+                (batch_size, 3, dm_size[0], dm_size[1]),
+                generator=generator,
+            )
         x_T = x_T.to(self.model.device)
 
         x_sample = dpm_solver.sample(
@@ -114,6 +311,12 @@ class FontDiffuserDPMPipeline:
             order=order,
             skip_type=skip_type,
             method=method,
+            x0_pred_callback=x0_pred_callback,
+            callback=callback,
+            cancel_event=cancel_event,
+            atol=atol,
+            rtol=rtol,
+            max_nfe=max_nfe,
         )
 
         x_sample = (x_sample / 2 + 0.5).clamp(0, 1)
@@ -121,4 +324,6 @@ class FontDiffuserDPMPipeline:
 
         x_images = self.numpy_to_pil(x_sample)
 
+        if return_nfe:
+            return x_images, dpm_solver.nfe
         return x_images
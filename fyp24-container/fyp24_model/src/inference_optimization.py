@@ -0,0 +1,100 @@
+# This script is provided by the FYP24 project group.
+# This script rewrites the FontDiffuser model for faster inference.
+
+from typing import Iterable, Sequence, Union
+
+import torch
+import torch.nn as nn
+
+from .modules.attention import (
+    BasicTransformerBlock,
+    OffsetRefStrucInter,
+    SpatialTransformer,
+)
+
+# "channels_last" stores the convolution weights and activations in NHWC, which
+# the oneDNN convolutions prefer and which makes the NCHW <-> (N, HW, C) reshapes
+# around the attention layers free. "fuse" folds the affine parameters of the
+# normalizations into the projections that follow them.
+INFERENCE_OPTIMIZATIONS = ("channels_last", "fuse")
+
+Projection = Union[nn.Linear, nn.Conv2d]
+
+
+def fold_norm_affine(
+    norm: Union[nn.GroupNorm, nn.LayerNorm], projections: Sequence[Projection]
+) -> bool:
+    """Fold the affine parameters of a normalization into the linear projections
+    (Linear or 1x1 Conv2d) that consume its output, and remove them from the
+    normalization. Return False if the normalization has no affine parameters.
+    """
+    if norm.weight is None:
+        return False
+    with torch.no_grad():
+        for projection in projections:
+            weight = projection.weight.flatten(1)  # (out, in) for both layer types
+            shift = weight @ norm.bias
+            if projection.bias is None:
+                projection.bias = nn.Parameter(shift)
+            else:
+                projection.bias += shift
+            projection.weight *= norm.weight.view(
+                1, -1, *[1] * (projection.weight.dim() - 2)
+            )
+    norm.register_parameter("weight", None)
+    norm.register_parameter("bias", None)
+    if isinstance(norm, nn.GroupNorm):
+        norm.affine = False
+    else:
+        norm.elementwise_affine = False
+    return True
+
+
+def fold_normalizations(model: nn.Module) -> int:
+    """Fold the normalizations into the projections that follow them, in place.
+    Only the normalizations whose output is consumed by linear projections alone
+    are folded, e.g. not the ones followed by an activation.
+
+    :return: The number of folded normalizations.
+    """
+    num_folded = 0
+    for module in model.modules():
+        if isinstance(module, SpatialTransformer):
+            num_folded += fold_norm_affine(module.norm, [module.proj_in])
+        elif isinstance(module, BasicTransformerBlock):
+            # attn1 is always a self-attention, while attn2 takes the context
+            attn1 = module.attn1
+            num_folded += fold_norm_affine(
+                module.norm1, [attn1.to_q, attn1.to_k, attn1.to_v]
+            )
+            num_folded += fold_norm_affine(module.norm3, [module.ff.net[0].proj])
+        elif isinstance(module, OffsetRefStrucInter):
+            attention = module.cross_attention
+            num_folded += fold_norm_affine(module.gnorm_s, [module.style_proj_in])
+            num_folded += fold_norm_affine(module.gnorm_c, [module.content_proj_in])
+            num_folded += fold_norm_affine(module.gnorm_out, [module.proj_out])
+            num_folded += fold_norm_affine(module.ln_s, [attention.to_q])
+            num_folded += fold_norm_affine(
+                module.ln_c, [attention.to_k, attention.to_v]
+            )
+            num_folded += fold_norm_affine(module.ln_ff, [module.ff.net[0].proj])
+    return num_folded
+
+
+def optimize_for_inference(model: nn.Module, optimizations: Iterable[str]) -> int:
+    """Apply the given INFERENCE_OPTIMIZATIONS to the model, in place.
+
+    :return: The number of folded normalizations.
+    """
+    num_folded = 0
+    for optimization in optimizations:
+        if optimization not in INFERENCE_OPTIMIZATIONS:
+            raise ValueError(
+                f"Unknown inference optimization {optimization}, "
+                f"expected one of {INFERENCE_OPTIMIZATIONS}"
+            )
+        if optimization == "fuse":
+            num_folded += fold_normalizations(model)
+        elif optimization == "channels_last":
+            model.to(memory_format=torch.channels_last)
+    return num_folded
@@ -2,8 +2,8 @@
 # This script calculates all of the metrics for a given batch of images.
 
 from torcheval.metrics import StructuralSimilarity, FrechetInceptionDistance
-from src.metrics.mean_absolute_error import MeanAbsoluteError
-from src.metrics.perceptual_similarity import PerceptualSimilarity
+from .mean_absolute_error import MeanAbsoluteError
+from .perceptual_similarity import PerceptualSimilarity
 
 
 class FontMetrics:
@@ -1,11 +1,30 @@
 # This script is provided by authors of FontDiffuser.
 
+import torch.nn as nn
 from diffusers.models.modeling_utils import ModelMixin
 from diffusers.configuration_utils import (
     ConfigMixin,
     register_to_config,
 )
 
+from .modules import content_encoder, style_encoder
+
+
+def freeze_spectral_norm(module: nn.Module) -> int:
+    """Replace the spectrally normalized layers in an eval-mode module with
+    plain layers whose weights are already normalized.
+
+    :return: The number of replaced layers.
+    """
+    num_frozen = 0
+    for name, child in module.named_children():
+        if isinstance(child, (style_encoder.SN, content_encoder.SN)):
+            setattr(module, name, child.to_frozen())
+            num_frozen += 1
+        else:
+            num_frozen += freeze_spectral_norm(child)
+    return num_frozen
+
 
 class FontDiffuserModel(ModelMixin, ConfigMixin):
     """Forward function for FontDiffuser with content encoder \
@@ -106,11 +125,11 @@ class FontDiffuserModelDPM(ModelMixin, ConfigMixin):
             batch_size, height * width, channel
         )
 
-        # Get content feature
-        content_img_feture, content_residual_features = self.config["content_encoder"](
-            content_images
-        )
-        content_residual_features.append(content_img_feture)
+        # Get content feature, unless it is given as cond[2], e.g. from a cache
+        if len(cond) > 2 and cond[2] is not None:
+            content_residual_features = list(cond[2])
+        else:
+            content_residual_features = self.encode_content(content_images)
         # Get the content feature from reference image
         style_content_feature, style_content_res_features = self.config[
             "content_encoder"
@@ -133,3 +152,25 @@ class FontDiffuserModelDPM(ModelMixin, ConfigMixin):
         noise_pred = out[0]
 
         return noise_pred
+
+    def encode_content(self, content_images):
+        """Encode the content images to the content features that `forward` takes
+        as cond[2]: the residual features of the content encoder followed by its
+        content feature.
+        """
+        content_img_feture, content_residual_features = self.config["content_encoder"](
+            content_images
+        )
+        content_residual_features.append(content_img_feture)
+        return content_residual_features
+
+    def freeze_for_inference(self):
+        """Put the model in eval mode and fold the spectral norm of the encoders
+        into static weights, so that the power iteration is not repeated at every
+        denoising step. Load the checkpoints before freezing, because the frozen
+        encoders no longer have the spectral norm buffers in their state dicts.
+        """
+        self.eval()
+        num_frozen = freeze_spectral_norm(self.style_encoder)
+        num_frozen += freeze_spectral_norm(self.content_encoder)
+        return num_frozen
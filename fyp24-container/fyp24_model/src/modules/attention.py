@@ -1,11 +1,44 @@
 # This script is provided by authors of FontDiffuser.
 
+import warnings
 from typing import Optional
 
 import torch
 from torch import nn
 import torch.nn.functional as F
 
+# "math" computes the attention scores explicitly with matmul and softmax.
+# "sdpa" uses the fused scaled_dot_product_attention of PyTorch 2.0+,
+# which picks a flash or memory-efficient kernel when the inputs allow it.
+ATTENTION_BACKENDS = ("math", "sdpa")
+
+
+def is_sdpa_available():
+    return hasattr(F, "scaled_dot_product_attention")
+
+
+def set_attention_backend(module: nn.Module, backend: str) -> int:
+    """Set the attention backend of all CrossAttention layers in a module.
+    Falls back to "math" if "sdpa" is not supported by the installed PyTorch.
+
+    :return: The number of layers updated.
+    """
+    if backend not in ATTENTION_BACKENDS:
+        raise ValueError(f"Unknown attention backend: {backend}")
+    if backend == "sdpa" and not is_sdpa_available():
+        warnings.warn(
+            "scaled_dot_product_attention requires PyTorch 2.0 or above, "
+            "falling back to the math attention backend"
+        )
+        backend = "math"
+
+    num_layers = 0
+    for layer in module.modules():
+        if isinstance(layer, CrossAttention):
+            layer._attention_backend = backend
+            num_layers += 1
+    return num_layers
+
 
 class SpatialTransformer(nn.Module):
     """
@@ -226,6 +259,8 @@ class CrossAttention(nn.Module):
         # is split across the batch axis to save memory
         # You can set slice_size with `set_attention_slice`
         self._slice_size = None
+        # You can set the backend with `set_attention_backend`
+        self._attention_backend = "math"
 
         self.to_q = nn.Linear(query_dim, inner_dim, bias=False)
         self.to_k = nn.Linear(context_dim, inner_dim, bias=False)
@@ -271,7 +306,9 @@ class CrossAttention(nn.Module):
 
         # attention, what we cannot get enough of
 
-        if self._slice_size is None or query.shape[0] // self._slice_size == 1:
+        if self._attention_backend == "sdpa":
+            hidden_states = self._sdpa_attention(query, key, value)
+        elif self._slice_size is None or query.shape[0] // self._slice_size == 1:
             hidden_states = self._attention(query, key, value)
         else:
             hidden_states = self._sliced_attention(
@@ -290,6 +327,12 @@ class CrossAttention(nn.Module):
         hidden_states = self.reshape_batch_dim_to_heads(hidden_states)
         return hidden_states
 
+    def _sdpa_attention(self, query, key, value):
+        # The default scale of scaled_dot_product_attention is also dim_head**-0.5
+        hidden_states = F.scaled_dot_product_attention(query, key, value)
+        hidden_states = self.reshape_batch_dim_to_heads(hidden_states)
+        return hidden_states
+
     def _sliced_attention(self, query, key, value, sequence_length, dim):
         batch_size_attention = query.shape[0]
         hidden_states = torch.zeros(
@@ -130,6 +130,14 @@ class SN(object):
                     self.sv[i][:] = sv
         return self.weight / svs[0]
 
+    def W_frozen(self):
+        """The normalized weight of an eval-mode module, which does not change
+        between forward passes, so it can be computed once for inference."""
+        if self.training:
+            raise RuntimeError("Spectral norm can only be frozen in eval mode")
+        with torch.no_grad():
+            return self.W_()
+
 
 class SNConv2d(nn.Conv2d, SN):
     def __init__(
@@ -170,6 +178,27 @@ class SNConv2d(nn.Conv2d, SN):
             self.groups,
         )
 
+    def to_frozen(self):
+        """Get a plain Conv2d with the spectral norm folded into its weight."""
+        conv = nn.Conv2d(
+            self.in_channels,
+            self.out_channels,
+            self.kernel_size,
+            self.stride,
+            self.padding,
+            self.dilation,
+            self.groups,
+            self.bias is not None,
+            self.padding_mode,
+            device=self.weight.device,
+            dtype=self.weight.dtype,
+        )
+        with torch.no_grad():
+            conv.weight.copy_(self.W_frozen())
+            if self.bias is not None:
+                conv.bias.copy_(self.bias)
+        return conv.train(False)
+
     def forward_wo_sn(self, x):
         return F.conv2d(
             x,
@@ -192,6 +221,21 @@ class SNLinear(nn.Linear, SN):
     def forward(self, x):
         return F.linear(x, self.W_(), self.bias)
 
+    def to_frozen(self):
+        """Get a plain Linear with the spectral norm folded into its weight."""
+        linear = nn.Linear(
+            self.in_features,
+            self.out_features,
+            self.bias is not None,
+            device=self.weight.device,
+            dtype=self.weight.dtype,
+        )
+        with torch.no_grad():
+            linear.weight.copy_(self.W_frozen())
+            if self.bias is not None:
+                linear.bias.copy_(self.bias)
+        return linear.train(False)
+
 
 class DBlock(nn.Module):
     def __init__(
@@ -0,0 +1,103 @@
+# This script is provided by the FYP24 project group.
+
+import torch
+import torch.nn as nn
+from torchvision.ops import DeformConv2d
+
+# "fp32" keeps full precision, "bf16" runs the model under bfloat16 autocast,
+# and "fp16" converts the model weights to float16
+PRECISIONS = ("fp32", "bf16", "fp16")
+
+
+class Float32Module(nn.Module):
+    """Runs a module in fp32 inside a reduced precision model, for the operators
+    without reduced precision kernels (e.g. deformable convolution on the CPU).
+    The output is cast back to the dtype of the input.
+    """
+
+    def __init__(self, module):
+        super().__init__()
+        self.module = module.float()
+
+    def forward(self, *args):
+        dtype = args[0].dtype
+        with torch.autocast(device_type=args[0].device.type, enabled=False):
+            output = self.module(*[arg.float() for arg in args])
+        return output.to(dtype)
+
+
+def keep_in_float32(module, module_types=(DeformConv2d,)) -> int:
+    """Wrap the submodules of the given types in Float32Module.
+    Return the number of wrapped submodules.
+    """
+    num_wrapped = 0
+    for name, child in module.named_children():
+        if isinstance(child, module_types):
+            setattr(module, name, Float32Module(child))
+            num_wrapped += 1
+        elif not isinstance(child, Float32Module):
+            num_wrapped += keep_in_float32(child, module_types)
+    return num_wrapped
+
+
+class PrecisionModel(nn.Module):
+    """Runs FontDiffuserModelDPM in one of PRECISIONS inside the DPM-Solver loop.
+
+    The solver loop stays in fp32: the model takes fp32 inputs and returns the
+    predicted noise in fp32, so the noise schedule (NoiseScheduleVP) and the
+    updates of the sample never run in reduced precision. The timesteps are
+    embedded in fp32 by the UNet.
+    """
+
+    def __init__(self, model, precision="fp32"):
+        super().__init__()
+        if precision not in PRECISIONS:
+            raise ValueError(
+                f"Unknown precision {precision}, expected one of {PRECISIONS}"
+            )
+        self.model = model
+        self.precision = precision
+        if precision == "fp16":
+            self.model.half()
+        if precision != "fp32":
+            keep_in_float32(self.model)
+
+    @property
+    def device(self) -> torch.device:
+        return self.model.device
+
+    @property
+    def dtype(self) -> torch.dtype:
+        # The dtype of the inputs and the outputs
+        return torch.float32
+
+    def encode_content(self, content_images):
+        if self.precision == "fp16":
+            content_images = content_images.half()
+        with torch.autocast(
+            device_type=self.device.type,
+            dtype=torch.bfloat16,
+            enabled=self.precision == "bf16",
+        ):
+            return self.model.encode_content(content_images)
+
+    def forward(self, x, timesteps, cond, content_encoder_downsample_size, version):
+        if self.precision == "fp16":
+            x = x.half()
+            cond = [
+                (
+                    cond_images.half()
+                    if isinstance(cond_images, torch.Tensor)
+                    else [feature.half() for feature in cond_images]
+                )
+                for cond_images in cond
+            ]
+        with torch.autocast(
+            device_type=self.device.type,
+            dtype=torch.bfloat16,
+            enabled=self.precision == "bf16",
+        ):
+            noise_pred = self.model(
+                x, timesteps, cond, content_encoder_downsample_size, version
+            )
+        return noise_pred.float()
@@ -0,0 +1,132 @@
+# This script is provided by the FYP24 project group.
+# This script quantizes the UNet to INT8 for inference on the CPU.
+
+from typing import Callable
+
+import torch
+import torch.nn as nn
+from torch.ao import quantization
+
+# "none" keeps fp32, "dynamic" quantizes the Linear layers with activation ranges
+# computed on the fly, and "static" quantizes the convolutions with activation
+# ranges recorded in a calibration pass
+QUANTIZATION_MODES = ("none", "dynamic", "static")
+
+
+class QuantizedConv(nn.Module):
+    """A convolution that runs in INT8 between float layers.
+
+    Eager mode static quantization needs the quantization boundaries to be
+    explicit, so each convolution quantizes its input and dequantizes its
+    output, and the surrounding normalizations and activations stay in float.
+    """
+
+    def __init__(self, conv: nn.Conv2d):
+        super().__init__()
+        self.quant = quantization.QuantStub()
+        self.conv = conv
+        self.dequant = quantization.DeQuantStub()
+
+    def forward(self, x):
+        return self.dequant(self.conv(self.quant(x)))
+
+
+def wrap_convolutions(module: nn.Module) -> int:
+    """Wrap the 2D convolutions of a module in QuantizedConv.
+
+    :return: The number of wrapped convolutions.
+    """
+    num_wrapped = 0
+    for name, child in module.named_children():
+        if type(child) is nn.Conv2d:
+            setattr(module, name, QuantizedConv(child))
+            num_wrapped += 1
+        elif not isinstance(child, QuantizedConv):
+            num_wrapped += wrap_convolutions(child)
+    return num_wrapped
+
+
+def quantize_dynamic(module: nn.Module) -> nn.Module:
+    """Quantize the weights of the Linear layers to INT8, in place.
+    Their activations are quantized on the fly at every forward pass.
+    """
+    return quantization.quantize_dynamic(
+        module, {nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+
+
+def quantize_static(
+    module: nn.Module, calibrate: Callable[[nn.Module], None]
+) -> nn.Module:
+    """Quantize the convolutions to INT8 with static activation ranges, in place.
+
+    :param calibrate: Runs the module on representative inputs, so that the
+        observers can record the activation ranges of the convolutions.
+    """
+    module.eval()
+    wrap_convolutions(module)
+    for child in module.modules():
+        if isinstance(child, QuantizedConv):
+            child.qconfig = quantization.get_default_qconfig(
+                torch.backends.quantized.engine
+            )
+    quantization.prepare(module, inplace=True)
+    with torch.no_grad():
+        calibrate(module)
+    quantization.convert(module, inplace=True)
+    return module
+
+
+def quantize_model(
+    module: nn.Module,
+    mode: str,
+    calibrate: Callable[[nn.Module], None] = lambda _: None,
+) -> nn.Module:
+    """Quantize a module for inference in one of QUANTIZATION_MODES, in place."""
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(
+            f"Unknown quantization mode {mode}, expected one of {QUANTIZATION_MODES}"
+        )
+    if mode == "dynamic":
+        return quantize_dynamic(module.eval())
+    if mode == "static":
+        return quantize_static(module, calibrate)
+    return module
+
+
+def calibrate_fontdiffuser(
+    model,
+    content_images: torch.Tensor,
+    style_images: torch.Tensor,
+    train_scheduler,
+    content_encoder_downsample_size: int,
+    num_timesteps: int = 4,
+    version: str = "V3",
+) -> None:
+    """Run FontDiffuserModelDPM on noised content glyphs at timesteps spread over
+    the whole schedule, together with the unconditional inputs of classifier-free
+    guidance, as the inputs of the denoising steps would be.
+
+    :param content_images: Normalized content glyphs of shape (N, 3, H, W).
+    :param style_images: Normalized style images of shape (N, 3, H, W).
+    """
+    generator = torch.Generator().manual_seed(0)
+    batch_size = content_images.shape[0]
+    cond = [
+        torch.cat([torch.ones_like(content_images), content_images]),
+        torch.cat([torch.ones_like(style_images), style_images]),
+    ]
+    num_train_timesteps = train_scheduler.config.num_train_timesteps
+    with torch.no_grad():
+        for t in torch.linspace(0, num_train_timesteps - 1, num_timesteps).long():
+            noise = torch.randn(content_images.shape, generator=generator)
+            x_t = train_scheduler.add_noise(
+                content_images, noise.to(content_images.device), t.expand(batch_size)
+            )
+            model(
+                torch.cat([x_t, x_t]),
+                t.to(content_images.device, torch.float32).expand(batch_size * 2),
+                cond,
+                content_encoder_downsample_size=content_encoder_downsample_size,
+                version=version,
+            )
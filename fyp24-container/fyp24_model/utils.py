@@ -196,3 +196,13 @@ def get_transform_function(target_size: tuple[int, int], normalize: bool):
         return transformed_image
 
     return apply_transform
+
+
+def create_sample_generator(seed: int, index: int) -> torch.Generator:
+    """Create the random number generator of the sample at an index of a job, such as
+    a character of the input text. The noise of the sample then only depends on the
+    seed of the job and the index, not on the other samples in its batch.
+    The sample at index 0 is seeded with the seed of the job.
+    """
+    # Spread the seeds of the samples with the golden ratio increment of SplitMix64
+    return torch.Generator().manual_seed((seed + index * 0x9E3779B97F4A7C15) % 2**64)
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from adapter.data_access.background_removal import (
+    INK_LEVEL,
+    PAPER_LEVEL,
+    remove_background,
+    remove_background_batch,
+)
+
+### Helper Functions ###
+
+
+def create_mock_glyphs(levels: list[int]) -> np.ndarray:
+    """Create a batch of 8x8 glyphs, each filled with one gray level."""
+    return np.stack(
+        [np.full((8, 8, 3), level, dtype=np.uint8) for level in levels], axis=0
+    )
+
+
+### Tests ###
+
+
+def test_paper_becomes_transparent():
+    matted = remove_background_batch(create_mock_glyphs([255, PAPER_LEVEL]))
+
+    assert matted.shape == (2, 8, 8, 4)
+    assert np.all(matted[..., 3] == 0)
+
+
+def test_ink_stays_opaque():
+    matted = remove_background_batch(create_mock_glyphs([0, INK_LEVEL]))
+
+    assert np.all(matted[..., 3] == 255)
+    assert np.all(matted[0, ..., :3] == 0)
+
+
+def test_stroke_edges_are_soft():
+    levels = list(range(INK_LEVEL, PAPER_LEVEL, 10))
+
+    matted = remove_background_batch(create_mock_glyphs(levels))
+
+    alpha = matted[:, 0, 0, 3]
+    assert np.all(np.diff(alpha.astype(int)) < 0)
+
+
+def test_strokes_look_the_same_on_white():
+    levels = list(range(0, 110, 10))
+    glyphs = create_mock_glyphs(levels)
+
+    matted = remove_background_batch(glyphs)
+
+    # Compositing back onto white recovers the original glyphs
+    coverage = matted[..., 3:].astype(np.float32) / 255
+    composited = matted[..., :3] * coverage + 255 * (1 - coverage)
+    assert np.abs(composited - glyphs).max() <= 2
+
+
+def test_batch_matches_single_glyphs():
+    glyphs = np.random.default_rng(0).integers(0, 256, (4, 16, 16, 3), np.uint8)
+
+    matted = remove_background_batch(glyphs)
+
+    for glyph, matted_glyph in zip(glyphs, matted):
+        assert np.array_equal(
+            remove_background_batch(glyph[np.newaxis])[0], matted_glyph
+        )
+
+
+@pytest.mark.parametrize("mode", ["RGB", "L", "RGBA"])
+def test_image_is_matted_like_its_array(mode):
+    image = Image.linear_gradient("L").resize((96, 80)).convert(mode)
+
+    result = remove_background(image)
+
+    glyphs = np.asarray(image.convert("RGB"))[np.newaxis]
+    assert result.mode == "RGBA"
+    assert result.size == image.size
+    np.testing.assert_array_equal(
+        np.asarray(result), remove_background_batch(glyphs)[0]
+    )
+
+
+def test_invalid_glyph_shape_is_rejected():
+    with pytest.raises(ValueError):
+        remove_background_batch(np.zeros((8, 8, 3), dtype=np.uint8))
@@ -1,15 +1,29 @@
+import asyncio
+import os
+import threading
+import time
 from datetime import datetime
+from typing import Callable, Optional
 from uuid import UUID
 
 import pytest
 import pytest_asyncio  # pytest-asyncio is needed for async tests
+import torch
 from PIL import Image
 
-from adapter.data_access.font_generation_application import FontGenerationApplication
+from adapter.data_access import font_generation_application as font_generation_module
+from adapter.data_access.font_generation_application import (
+    WARM_UP_CHARACTER,
+    FontGenerationApplication,
+    initialize_args,
+)
 from domain.value.generated_word import GeneratedWord
 from domain.value.job_info import RunningJob
 from domain.value.job_input import JobInput
+from domain.value.model_readiness import ModelReadiness
+from domain.value.quality_tier import QualityTier
 from domain.value.running_state import RunningState
+from fyp24_model.src.dpm_solver.dpm_solver_pytorch import SamplingCancelled
 
 ### Fixtures ###
 
@@ -29,6 +43,13 @@ def font_generation_application():
 ### Helper Function ###
 
 
+def wait_until(condition: Callable[[], bool], timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out waiting for the condition"
+        time.sleep(0.01)
+
+
 async def generate_text(
     font_generation_application: FontGenerationApplication, input_text: str
 ):
@@ -59,6 +80,45 @@ async def generate_text(
     return result_list
 
 
+def create_running_job() -> RunningJob:
+    return RunningJob(
+        time_start_to_queue=datetime.now(),
+        time_start_to_run=datetime.now(),
+        running_state=RunningState.not_started(),
+    )
+
+
+def create_run_fontdiffuser_stub(
+    step_time: float = 0.0, steps_run: Optional[list[int]] = None
+):
+    """Create a stub of run_fontdiffuser that runs the steps of the solver."""
+
+    def run_fontdiffuser(
+        args,
+        pipe,
+        character,
+        save_path,
+        seed,
+        x0_pred_callback,
+        callback,
+        cancel_event,
+        generator,
+    ):
+        num_steps = args.num_inference_steps
+        for step in range(num_steps):
+            if x0_pred_callback is not None:
+                x0_pred_callback(step, torch.zeros(1, 3, 96, 96))
+            time.sleep(step_time)
+            if steps_run is not None:
+                steps_run.append(step)
+            callback(step + 1, num_steps)
+            if cancel_event.is_set():
+                raise SamplingCancelled()
+        return Image.new("RGB", (96, 96), color=255), num_steps
+
+    return run_fontdiffuser
+
+
 ### Tests ###
 
 
@@ -159,3 +219,249 @@ async def test_generate_mixed_text(font_generation_application):
         GeneratedWord.from_image("A", expected_image_3),
         GeneratedWord.from_image("1", expected_image_4),
     ]
+
+
+def test_prepare_loads_and_warms_up_model(monkeypatch, font_generation_application):
+    can_finish_loading = threading.Event()
+    warm_up_characters = []
+    prewarmed_pipelines = []
+
+    def load_fontdiffuser_pipeline(args):
+        can_finish_loading.wait(timeout=5)
+        return "pipeline"
+
+    def run_fontdiffuser(args, pipe, character, save_path, seed):
+        warm_up_characters.append(character)
+
+    def prewarm_content_feature_cache(args, pipe):
+        prewarmed_pipelines.append(pipe)
+        return 0
+
+    monkeypatch.setattr(
+        font_generation_module, "load_fontdiffuser_pipeline", load_fontdiffuser_pipeline
+    )
+    monkeypatch.setattr(font_generation_module, "run_fontdiffuser", run_fontdiffuser)
+    monkeypatch.setattr(
+        font_generation_module,
+        "prewarm_content_feature_cache",
+        prewarm_content_feature_cache,
+    )
+
+    assert font_generation_application.get_readiness() == ModelReadiness.not_loaded()
+
+    font_generation_application.prepare()
+    wait_until(
+        lambda: font_generation_application.get_readiness() == ModelReadiness.loading()
+    )
+
+    can_finish_loading.set()
+    wait_until(lambda: font_generation_application.get_readiness().is_ready)
+    assert warm_up_characters == [WARM_UP_CHARACTER]
+    # The content features of the frequent characters are cached after the warm-up
+    wait_until(lambda: prewarmed_pipelines == ["pipeline"])
+
+
+def test_prepare_reports_failure(monkeypatch, font_generation_application):
+    def load_fontdiffuser_pipeline(args):
+        raise FileNotFoundError("unet.pth")
+
+    monkeypatch.setattr(
+        font_generation_module, "load_fontdiffuser_pipeline", load_fontdiffuser_pipeline
+    )
+
+    font_generation_application.prepare()
+    wait_until(
+        lambda: font_generation_application.get_readiness().name
+        == ModelReadiness.failed("").name
+    )
+
+    assert "unet.pth" in font_generation_application.get_readiness().message
+
+
+def test_quality_tier_sets_solver_steps():
+    draft_args = initialize_args(quality_tier=QualityTier.Draft)
+    standard_args = initialize_args(quality_tier=QualityTier.Standard)
+    high_args = initialize_args(quality_tier=QualityTier.High)
+
+    assert (
+        draft_args.num_inference_steps
+        < standard_args.num_inference_steps
+        < high_args.num_inference_steps
+    )
+    # The standard tier keeps the sampling settings of the model
+    assert standard_args.num_inference_steps == 20
+    assert standard_args.order == 2
+
+
+def test_content_feature_cache_is_kept_outside_of_the_source_tree(monkeypatch):
+    source_directory = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    monkeypatch.delenv("CONTENT_FEATURE_CACHE_DIR", raising=False)
+    args = initialize_args()
+
+    cache_dir = os.path.abspath(args.content_feature_cache_dir)
+    assert os.path.commonpath([cache_dir, source_directory]) != source_directory
+
+    monkeypatch.setenv("CONTENT_FEATURE_CACHE_DIR", "/data/content_feature_cache")
+    assert initialize_args().content_feature_cache_dir == "/data/content_feature_cache"
+
+
+def test_prewarm_characters_are_few():
+    args = initialize_args()
+
+    with open(args.content_feature_prewarm_path, encoding="utf-8") as f:
+        num_characters = len("".join(f.read().split()))
+    assert num_characters <= args.content_feature_prewarm_limit
+    # Each glyph takes about 1.2 MB on disk
+    assert num_characters * 1.3 < args.content_feature_cache_disk_mb / 2
+
+
+def test_estimate_job_cost_follows_quality_tier(font_generation_application):
+    def estimate_job_cost(input_text: str, quality_tier: QualityTier) -> float:
+        return font_generation_application.estimate_job_cost(
+            JobInput(input_text=input_text, quality_tier=quality_tier)
+        )
+
+    assert estimate_job_cost("中文字", QualityTier.Standard) == 3 * 20
+    # The spaces are not generated
+    assert estimate_job_cost("中 文", QualityTier.Standard) == 2 * 20
+    assert estimate_job_cost("中文字", QualityTier.Draft) < estimate_job_cost(
+        "中文字", QualityTier.Standard
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("preview", [False, True])
+async def test_generate_publishes_steps_and_previews(
+    monkeypatch, font_generation_application, preview
+):
+    monkeypatch.setattr(
+        font_generation_module, "load_fontdiffuser_pipeline", lambda args: "pipeline"
+    )
+    monkeypatch.setattr(
+        font_generation_module, "run_fontdiffuser", create_run_fontdiffuser_stub()
+    )
+
+    states: list[RunningState] = []
+    await font_generation_application.generate_text(
+        job_input=JobInput(input_text="中文", preview=preview),
+        job_info=create_running_job(),
+        on_new_state=states.append,
+        on_new_word_result=lambda generated_word: None,
+    )
+
+    # The standard tier runs 20 steps
+    first_glyph_done = states.index(RunningState.generating(current=1, total=2))
+    steps = [state.step for state in states[:first_glyph_done]]
+    assert list(dict.fromkeys(steps)) == list(range(1, 21))
+    assert states[first_glyph_done - 1].message == "Generating: 0/2 (step 20/20)"
+    previews = [state.preview for state in states if state.preview is not None]
+    if not preview:
+        assert previews == []
+        return
+    # Previewed every 5 steps but the first
+    assert [(p.word, p.step) for p in dict.fromkeys(previews)] == [
+        ("中", 5),
+        ("中", 10),
+        ("中", 15),
+        ("文", 5),
+        ("文", 10),
+        ("文", 15),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_cancel_stops_sampling_within_a_step(
+    monkeypatch, font_generation_application
+):
+    steps_run: list[int] = []
+    monkeypatch.setattr(
+        font_generation_module, "load_fontdiffuser_pipeline", lambda args: "pipeline"
+    )
+    monkeypatch.setattr(
+        font_generation_module,
+        "run_fontdiffuser",
+        create_run_fontdiffuser_stub(step_time=0.01, steps_run=steps_run),
+    )
+
+    task = font_generation_application.generate_text(
+        job_input=JobInput(input_text="中文字"),
+        job_info=create_running_job(),
+        on_new_state=lambda state: None,
+        on_new_word_result=lambda generated_word: None,
+    )
+    await asyncio.sleep(0.1)
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    # The sampling has stopped by the time the job is cancelled
+    num_steps_run = len(steps_run)
+    await asyncio.sleep(0.05)
+    assert len(steps_run) == num_steps_run
+    assert num_steps_run < 20
+
+
+@pytest.mark.asyncio
+async def test_glyph_noise_is_seeded_by_job_seed_and_index(
+    monkeypatch, font_generation_application
+):
+    noises: list[torch.Tensor] = []
+
+    def run_fontdiffuser(args, pipe, character, save_path, seed, generator, **kwargs):
+        noises.append(torch.randn(4, generator=generator))
+        return Image.new("RGB", (96, 96), color=255), args.num_inference_steps
+
+    monkeypatch.setattr(
+        font_generation_module, "load_fontdiffuser_pipeline", lambda args: "pipeline"
+    )
+    monkeypatch.setattr(font_generation_module, "run_fontdiffuser", run_fontdiffuser)
+
+    for input_text in ["中文", "字文"]:
+        await font_generation_application.generate_text(
+            job_input=JobInput(input_text=input_text, seed=3),
+            job_info=create_running_job(),
+            on_new_state=lambda state: None,
+            on_new_word_result=lambda generated_word: None,
+        )
+
+    # The noise depends on the index of the glyph, not on the glyph or the job
+    assert torch.equal(noises[0], noises[2])
+    assert torch.equal(noises[1], noises[3])
+    assert not torch.equal(noises[0], noises[1])
+
+
+@pytest.mark.asyncio
+async def test_adaptive_steps_report_model_evaluations_of_each_glyph(
+    monkeypatch, font_generation_application
+):
+    sampled_args = []
+
+    def run_fontdiffuser(args, pipe, character, save_path, seed, **kwargs):
+        sampled_args.append(args)
+        # The easy glyphs take fewer model evaluations
+        nfe = {"一": 2, "龘": 6}[character]
+        return Image.new("RGB", (96, 96), color=255), nfe
+
+    monkeypatch.setattr(
+        font_generation_module, "load_fontdiffuser_pipeline", lambda args: "pipeline"
+    )
+    monkeypatch.setattr(font_generation_module, "run_fontdiffuser", run_fontdiffuser)
+
+    words: list[GeneratedWord] = []
+    await font_generation_application.generate_text(
+        job_input=JobInput(
+            input_text="一 龘", quality_tier=QualityTier.Draft, adaptive_steps=True
+        ),
+        job_info=create_running_job(),
+        on_new_state=lambda state: None,
+        on_new_word_result=words.append,
+    )
+
+    # The budget is the model evaluations of the fixed steps of the tier
+    assert all(args.method == "adaptive" for args in sampled_args)
+    assert all(args.max_nfe == 6 for args in sampled_args)
+    assert [(word.word, word.nfe) for word in words] == [
+        ("一", 2),
+        (" ", None),
+        ("龘", 6),
+    ]
@@ -0,0 +1,120 @@
+import io
+import time
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from adapter.presentation.dependencies import (
+    get_font_gen_service_config,
+    get_image_repository_port,
+    get_text_generator_port,
+)
+from adapter.presentation.download_job_router import iterate_zip_chunks
+from app import app
+from tests.adapter.presentation.test_dependencies import (
+    JOB_PROCESSING_TIME,
+    OPERATE_QUEUE_INTERVAL,
+    TINY_BUFFER,
+    override_font_gen_service_config,
+    override_image_repository_port,
+    override_text_generator_port,
+    reset_all_test_dependencies,
+)
+
+### Dependency Overrides ###
+
+
+def setup_default_dependency_overrides():
+    """Set up dependency overrides for testing.
+    If dependencies are overridden in other tests using the FastAPI object,
+    this function should be called to reset them.
+    """
+
+    app.dependency_overrides = {}
+
+    app.dependency_overrides[get_text_generator_port] = override_text_generator_port
+    app.dependency_overrides[get_image_repository_port] = override_image_repository_port
+    app.dependency_overrides[get_font_gen_service_config] = (
+        override_font_gen_service_config
+    )
+
+
+### Fixtures ###
+
+
+@pytest.fixture
+def test_client():
+    client = TestClient(app)
+
+    reset_all_test_dependencies()
+
+    setup_default_dependency_overrides()
+
+    return client
+
+
+### Helper Functions ###
+
+
+def start_job(test_client, input_text: str) -> str:
+    response = test_client.post("/start_job", json={"input_text": input_text})
+    assert response.status_code == 200
+    return response.json()["job_id"]
+
+
+### Tests ###
+
+
+def test_download_non_existent_job(test_client):
+    response = test_client.get(
+        "/download_job", params={"job_id": "12345678-1234-5678-1234-567812345678"}
+    )
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Job not found"}
+
+
+def test_download_job_with_invalid_id(test_client):
+    response = test_client.get("/download_job", params={"job_id": "invalid-id"})
+    assert response.status_code == 422
+    assert response.json() == {"detail": "Invalid ID format"}
+
+
+def test_download_unfinished_job(test_client):
+    job_id = start_job(test_client, "中文字")
+
+    response = test_client.get("/download_job", params={"job_id": job_id})
+    assert response.status_code == 409
+    assert response.json() == {"detail": "Job is not completed"}
+
+
+def test_download_completed_job(test_client):
+    job_id = start_job(test_client, "中文字")
+
+    # Wait for the job to be processed
+    time.sleep(JOB_PROCESSING_TIME + OPERATE_QUEUE_INTERVAL + TINY_BUFFER)
+
+    response = test_client.get("/download_job", params={"job_id": job_id})
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/zip"
+    assert f"{job_id}.zip" in response.headers["Content-Disposition"]
+
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.namelist() == ["0000_中.png", "0001_文.png", "0002_字.png"]
+        for name in archive.namelist():
+            image = Image.open(io.BytesIO(archive.read(name)))
+            assert image.format == "PNG"
+
+
+def test_zip_chunks_are_yielded_per_entry():
+    entries = [(f"{index}.bin", bytes([index]) * 1000) for index in range(3)]
+
+    chunks = list(iterate_zip_chunks(entries))
+
+    # One chunk per entry, plus the central directory
+    assert len(chunks) == len(entries) + 1
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.testzip() is None
+        for name, data in entries:
+            assert archive.read(name) == data
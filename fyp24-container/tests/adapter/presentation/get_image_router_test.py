@@ -55,6 +55,17 @@ def store_mock_jpeg():
     return mock_image_id, mock_image_bytes
 
 
+@pytest.fixture
+def store_mock_png_with_svg(store_mock_png):
+    mock_image_id, _ = store_mock_png
+
+    mock_vector_image = b'<svg xmlns="http://www.w3.org/2000/svg"/>'
+    override_image_repository_port().save_vector_image_to_id(
+        vector_image=mock_vector_image, image_id=mock_image_id
+    )
+    return mock_image_id, mock_vector_image
+
+
 ### Helper Functions ###
 
 
@@ -99,3 +110,43 @@ def test_get_existing_jpeg_image(test_client, store_mock_png, store_mock_jpeg):
     assert response.status_code == 200
     assert response.headers["Content-Type"] == "image/jpeg"
     assert response.content == mock_image
+
+
+def test_get_existing_svg_image(test_client, store_mock_png_with_svg):
+    mock_image_id, mock_vector_image = store_mock_png_with_svg
+    response = test_client.get(
+        "/get_image", params={"image_id": str(mock_image_id), "format": "svg"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "image/svg+xml"
+    assert response.content == mock_vector_image
+
+
+def test_get_raster_image_that_has_svg(test_client, store_mock_png_with_svg):
+    mock_image_id, _ = store_mock_png_with_svg
+    response = test_client.get(
+        "/get_image", params={"image_id": str(mock_image_id), "format": "raster"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "image/png"
+
+
+def test_get_non_existent_svg_image(test_client, store_mock_png):
+    mock_image_id, _ = store_mock_png
+    response = test_client.get(
+        "/get_image", params={"image_id": str(mock_image_id), "format": "svg"}
+    )
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Image not found"}
+
+
+def test_get_image_with_invalid_format(test_client, store_mock_png):
+    mock_image_id, _ = store_mock_png
+    response = test_client.get(
+        "/get_image", params={"image_id": str(mock_image_id), "format": "pdf"}
+    )
+
+    assert response.status_code == 422
@@ -0,0 +1,94 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from adapter.presentation import dependencies
+from adapter.presentation.dependencies import (
+    get_font_gen_service_config,
+    get_image_repository_port,
+    get_text_generator_port,
+)
+from app import app
+from domain.value.model_readiness import ModelReadiness
+from tests.adapter.presentation.test_dependencies import (
+    JOB_PROCESSING_TIME,
+    override_font_gen_service_config,
+    override_image_repository_port,
+    reset_all_test_dependencies,
+)
+from tests.application.text_generator_stub import TextGeneratorStub
+
+### Fixtures ###
+
+
+@pytest.fixture
+def text_generator() -> TextGeneratorStub:
+    return TextGeneratorStub(
+        job_processing_time=JOB_PROCESSING_TIME,
+        simulate_success=True,
+        readiness=ModelReadiness.loading(),
+    )
+
+
+@pytest.fixture
+def test_client(text_generator):
+    client = TestClient(app)
+
+    reset_all_test_dependencies()
+
+    app.dependency_overrides = {}
+    app.dependency_overrides[get_text_generator_port] = lambda: text_generator
+    app.dependency_overrides[get_image_repository_port] = override_image_repository_port
+    app.dependency_overrides[get_font_gen_service_config] = (
+        override_font_gen_service_config
+    )
+
+    return client
+
+
+### Tests ###
+
+
+def test_healthz_while_loading(test_client):
+    response = test_client.get("/healthz")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+def test_readyz_while_loading(test_client):
+    response = test_client.get("/readyz")
+
+    assert response.status_code == 503
+    assert response.json() == {
+        "ready": False,
+        "status": "loading",
+        "message": "Loading the model",
+    }
+
+
+def test_readyz_after_loading(test_client, text_generator):
+    text_generator.prepare()
+
+    response = test_client.get("/readyz")
+
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
+
+
+def test_lifespan_preloads_model(monkeypatch, text_generator):
+    reset_all_test_dependencies()
+    app.dependency_overrides = {}
+    # The startup creates the dependencies itself, outside of a request
+    monkeypatch.setattr(
+        dependencies,
+        "get_text_generator_port",
+        lambda font_gen_service_config: text_generator,
+    )
+    monkeypatch.setattr(
+        dependencies, "get_font_gen_service_config", override_font_gen_service_config
+    )
+
+    with TestClient(app) as client:
+        response = client.get("/readyz")
+
+    assert response.status_code == 200
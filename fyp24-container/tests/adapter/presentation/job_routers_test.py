@@ -81,6 +81,8 @@ def assert_job_result_is_valid(job_result):
         assert word_location["image_id"] is None or is_valid_uuid(
             word_location["image_id"]
         )
+        assert word_location["nfe"] is None or type(word_location["nfe"]) is int
+    assert job_result["mean_nfe"] is None or type(job_result["mean_nfe"]) is float
 
 
 ### Tests ###
@@ -93,6 +95,76 @@ def test_start_job_with_valid_input(test_client):
     assert is_valid_uuid(response.json()["job_id"])
 
 
+def test_start_job_with_transparent_background(test_client):
+    response = test_client.post(
+        "/start_job", params={"transparent": "true"}, json={"input_text": ""}
+    )
+    assert response.status_code == 200
+    assert is_valid_uuid(response.json()["job_id"])
+
+
+def test_start_job_with_invalid_transparent_option(test_client):
+    response = test_client.post(
+        "/start_job", params={"transparent": "maybe"}, json={"input_text": ""}
+    )
+    assert response.status_code == 422
+
+
+def test_start_job_with_quality_tier(test_client):
+    start_response = test_client.post(
+        "/start_job", json={"input_text": "中文字", "quality_tier": "draft"}
+    )
+    assert start_response.status_code == 200
+    job_id = start_response.json()["job_id"]
+
+    response = test_client.get("/retrieve_job", params={"job_id": job_id})
+    assert response.status_code == 200
+    assert response.json()["job_input"]["quality_tier"] == "draft"
+
+
+def test_start_job_with_preview(test_client):
+    start_response = test_client.post(
+        "/start_job", json={"input_text": "中文字", "preview": True}
+    )
+    assert start_response.status_code == 200
+    job_id = start_response.json()["job_id"]
+
+    response = test_client.get("/retrieve_job", params={"job_id": job_id})
+    assert response.status_code == 200
+    assert response.json()["job_input"]["preview"] is True
+
+
+def test_start_job_with_seed(test_client):
+    start_response = test_client.post(
+        "/start_job", json={"input_text": "中文字", "seed": 42}
+    )
+    assert start_response.status_code == 200
+    job_id = start_response.json()["job_id"]
+
+    response = test_client.get("/retrieve_job", params={"job_id": job_id})
+    assert response.status_code == 200
+    assert response.json()["job_input"]["seed"] == 42
+
+
+def test_start_job_with_adaptive_steps(test_client):
+    start_response = test_client.post(
+        "/start_job", json={"input_text": "中文字", "adaptive_steps": True}
+    )
+    assert start_response.status_code == 200
+    job_id = start_response.json()["job_id"]
+
+    response = test_client.get("/retrieve_job", params={"job_id": job_id})
+    assert response.status_code == 200
+    assert response.json()["job_input"]["adaptive_steps"] is True
+
+
+def test_start_job_with_invalid_quality_tier(test_client):
+    response = test_client.post(
+        "/start_job", json={"input_text": "", "quality_tier": "ultra"}
+    )
+    assert response.status_code == 422
+
+
 def test_start_job_with_invalid_input(test_client):
     response = test_client.post("/start_job")
     assert response.status_code == 422
@@ -162,13 +234,20 @@ def test_retrieve_running_job(test_client):
 
     response_body = response.json()
     assert response_body["job_id"] == job_id
-    assert response_body["job_input"] == {"input_text": "中文字"}
+    assert response_body["job_input"] == {
+        "input_text": "中文字",
+        "quality_tier": "standard",
+        "preview": False,
+        "seed": None,
+        "adaptive_steps": False,
+    }
     assert response_body["job_status"] == "running"
 
     assert is_valid_datetime(response_body["job_info"]["time_start_to_queue"])
     assert is_valid_datetime(response_body["job_info"]["time_start_to_run"])
     assert type(response_body["job_info"]["running_state"]["name"]) is str
     assert type(response_body["job_info"]["running_state"]["message"]) is str
+    assert response_body["job_info"]["running_state"]["preview"] is None
 
     assert_job_result_is_valid(response_body["job_result"])
 
@@ -198,13 +277,24 @@ def test_retrieve_waiting_job(test_client):
 
     response_body = response_2.json()
     assert response_body["job_id"] == job_id_2
-    assert response_body["job_input"] == {"input_text": "中文字"}
+    assert response_body["job_input"] == {
+        "input_text": "中文字",
+        "quality_tier": "standard",
+        "preview": False,
+        "seed": None,
+        "adaptive_steps": False,
+    }
     assert response_body["job_status"] == "waiting"
 
     assert is_valid_datetime(response_body["job_info"]["time_start_to_queue"])
     assert response_body["job_info"]["place_in_queue"] == 1
+    # The first job has left the queue
+    assert response_body["job_info"]["cost_ahead"] == 0
 
-    assert response_body["job_result"] == {"generated_word_locations": []}
+    assert response_body["job_result"] == {
+        "generated_word_locations": [],
+        "mean_nfe": None,
+    }
 
 
 def test_retrieve_completed_job(test_client):
@@ -222,7 +312,13 @@ def test_retrieve_completed_job(test_client):
 
     response_body = response.json()
     assert response_body["job_id"] == job_id
-    assert response_body["job_input"] == {"input_text": "中文字"}
+    assert response_body["job_input"] == {
+        "input_text": "中文字",
+        "quality_tier": "standard",
+        "preview": False,
+        "seed": None,
+        "adaptive_steps": False,
+    }
     assert response_body["job_status"] == "completed"
 
     assert is_valid_datetime(response_body["job_info"]["time_start_to_queue"])
@@ -252,7 +348,13 @@ def test_retrieve_failed_job(test_client):
 
     response_body = response.json()
     assert response_body["job_id"] == job_id
-    assert response_body["job_input"] == {"input_text": "中文字"}
+    assert response_body["job_input"] == {
+        "input_text": "中文字",
+        "quality_tier": "standard",
+        "preview": False,
+        "seed": None,
+        "adaptive_steps": False,
+    }
     assert response_body["job_status"] == "failed"
 
     assert is_valid_datetime(response_body["job_info"]["time_start_to_queue"])
@@ -285,7 +387,13 @@ def test_retrieve_cancelled_job(test_client):
 
     response_body = response.json()
     assert response_body["job_id"] == job_id
-    assert response_body["job_input"] == {"input_text": "中文字"}
+    assert response_body["job_input"] == {
+        "input_text": "中文字",
+        "quality_tier": "standard",
+        "preview": False,
+        "seed": None,
+        "adaptive_steps": False,
+    }
     assert response_body["job_status"] == "cancelled"
 
     assert is_valid_datetime(response_body["job_info"]["time_start_to_queue"])
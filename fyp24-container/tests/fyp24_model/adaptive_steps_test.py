@@ -0,0 +1,122 @@
+import threading
+
+import pytest
+import torch
+
+from fyp24_model.src.dpm_solver.dpm_solver_pytorch import SamplingCancelled
+from fyp24_model.src.dpm_solver.pipeline_dpm_solver import FontDiffuserDPMPipeline
+from tests.fyp24_model.font_diffuser_model_stub import FontDiffuserModelStub
+
+### Fixtures ###
+
+
+class DDPMSchedulerStub:
+    betas = torch.linspace(1e-4, 0.02, 1000)
+
+
+@pytest.fixture
+def pipe() -> FontDiffuserDPMPipeline:
+    torch.manual_seed(0)
+    return FontDiffuserDPMPipeline(
+        model=FontDiffuserModelStub().eval(),
+        ddpm_train_scheduler=DDPMSchedulerStub(),
+    )
+
+
+### Helper Functions ###
+
+
+def generate(pipe: FontDiffuserDPMPipeline, order: int = 2, **kwargs) -> int:
+    """Generate a glyph and return the number of model evaluations."""
+    torch.manual_seed(0)
+    content_images = torch.rand(1, 3, 16, 16)
+    style_images = torch.rand(1, 3, 16, 16)
+    with torch.no_grad():
+        _, nfe = pipe.generate(
+            content_images=content_images,
+            style_images=style_images,
+            batch_size=1,
+            order=order,
+            num_inference_step=10,
+            content_encoder_downsample_size=3,
+            dm_size=(16, 16),
+            generator=torch.Generator().manual_seed(0),
+            return_nfe=True,
+            **kwargs,
+        )
+    return nfe
+
+
+### Tests ###
+
+
+def test_fixed_steps_evaluate_the_model_once_per_step(pipe):
+    pipe.model.num_calls = 0
+
+    nfe = generate(pipe)
+
+    assert nfe == pipe.model.num_calls == 10
+
+
+@pytest.mark.parametrize("order", [2, 3])
+def test_adaptive_steps_count_each_model_evaluation(pipe, order):
+    pipe.model.num_calls = 0
+
+    nfe = generate(pipe, method="adaptive", order=order)
+
+    # The model is not evaluated again at the start of a rejected step
+    assert nfe == pipe.model.num_calls > 0
+
+
+@pytest.mark.parametrize("max_nfe", [4, 7, 12])
+def test_adaptive_steps_keep_within_the_budget(pipe, max_nfe):
+    nfe = generate(pipe, method="adaptive")
+    budget_nfe = generate(pipe, method="adaptive", max_nfe=max_nfe)
+
+    assert nfe > 12
+    # The last step reaches the end whatever its error
+    assert max_nfe - 1 <= budget_nfe <= max_nfe
+
+
+def test_looser_tolerance_takes_fewer_model_evaluations(pipe):
+    nfe = generate(pipe, method="adaptive")
+    loose_nfe = generate(pipe, method="adaptive", atol=0.05, rtol=0.2)
+
+    assert loose_nfe < nfe
+
+
+def test_adaptive_budget_must_allow_one_step(pipe):
+    with pytest.raises(ValueError):
+        generate(pipe, method="adaptive", order=3, max_nfe=2)
+
+
+def test_adaptive_steps_report_model_evaluations_and_previews(pipe):
+    steps = []
+    previews = []
+
+    nfe = generate(
+        pipe,
+        method="adaptive",
+        max_nfe=12,
+        callback=lambda step, total_steps: steps.append((step, total_steps)),
+        x0_pred_callback=lambda step, x0_pred: previews.append(step),
+    )
+
+    assert steps[-1] == (nfe, 12)
+    assert [step for step, _ in steps] == sorted(step for step, _ in steps)
+    # A preview at the start of each accepted step
+    assert previews[0] == 0
+    assert previews == sorted(set(previews))
+
+
+def test_adaptive_steps_can_be_cancelled(pipe):
+    cancel_event = threading.Event()
+    steps = []
+
+    def callback(step, total_steps):
+        steps.append(step)
+        cancel_event.set()
+
+    with pytest.raises(SamplingCancelled):
+        generate(pipe, method="adaptive", callback=callback, cancel_event=cancel_event)
+    assert len(steps) == 1
@@ -0,0 +1,74 @@
+import pytest
+import torch
+
+from fyp24_model.src.modules.attention import (
+    CrossAttention,
+    SpatialTransformer,
+    is_sdpa_available,
+    set_attention_backend,
+)
+
+requires_sdpa = pytest.mark.skipif(
+    not is_sdpa_available(), reason="scaled_dot_product_attention is not available"
+)
+
+### Helper Functions ###
+
+
+def forward_with_backend(layer, backend: str, *args, **kwargs) -> torch.Tensor:
+    set_attention_backend(layer, backend)
+    with torch.no_grad():
+        return layer(*args, **kwargs)
+
+
+### Tests ###
+
+
+@requires_sdpa
+@pytest.mark.parametrize(
+    "query_dim, context_dim, heads, dim_head",
+    [
+        (128, None, 1, 128),  # self-attention of the UNet
+        (128, 1024, 1, 128),  # attention to the style features
+        (64, 64, 4, 16),  # multi-head attention
+    ],
+)
+def test_sdpa_matches_math_attention(query_dim, context_dim, heads, dim_head):
+    torch.manual_seed(0)
+    layer = CrossAttention(
+        query_dim=query_dim, context_dim=context_dim, heads=heads, dim_head=dim_head
+    ).eval()
+    hidden_states = torch.randn(2, 144, query_dim)
+    context = torch.randn(2, 9, context_dim) if context_dim is not None else None
+
+    expected = forward_with_backend(layer, "math", hidden_states, context=context)
+    actual = forward_with_backend(layer, "sdpa", hidden_states, context=context)
+
+    torch.testing.assert_close(actual, expected, rtol=1e-4, atol=1e-5)
+
+
+@requires_sdpa
+def test_sdpa_matches_math_attention_in_transformer():
+    torch.manual_seed(0)
+    transformer = SpatialTransformer(
+        in_channels=64, n_heads=1, d_head=64, context_dim=128
+    ).eval()
+    hidden_states = torch.randn(2, 64, 12, 12)
+    context = torch.randn(2, 9, 128)
+
+    expected = forward_with_backend(transformer, "math", hidden_states, context)
+    actual = forward_with_backend(transformer, "sdpa", hidden_states, context)
+
+    torch.testing.assert_close(actual, expected, rtol=1e-4, atol=1e-5)
+
+
+def test_set_attention_backend_of_all_layers():
+    transformer = SpatialTransformer(in_channels=64, n_heads=1, d_head=64)
+
+    # Each transformer block has a self-attention and a cross-attention layer
+    assert set_attention_backend(transformer, "sdpa") == 2
+
+
+def test_unknown_attention_backend_is_rejected():
+    with pytest.raises(ValueError):
+        set_attention_backend(CrossAttention(query_dim=64), "flash")
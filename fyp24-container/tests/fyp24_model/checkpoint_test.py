@@ -0,0 +1,120 @@
+import pytest
+import torch
+import torch.nn as nn
+
+from fyp24_model.sample import arg_parse, load_fontdiffuser_model
+from fyp24_model.src import build_content_encoder, build_style_encoder, build_unet
+from fyp24_model.src.checkpoint import (
+    CHECKPOINT_NAMES,
+    convert_checkpoint,
+    find_checkpoint,
+    load_module,
+)
+from tests.fyp24_model.font_diffuser_model_stub import FontDiffuserModelStub
+
+pytest.importorskip("safetensors")
+
+### Fixtures ###
+
+
+@pytest.fixture
+def model() -> FontDiffuserModelStub:
+    torch.manual_seed(0)
+    return FontDiffuserModelStub().eval()
+
+
+@pytest.fixture
+def torch_1_13(monkeypatch):
+    """torch.load and Module.load_state_dict without mmap and assign, as in the
+    torch 1.13 the service is pinned to."""
+    torch_load = torch.load
+    module_load_state_dict = nn.Module.load_state_dict
+
+    def load(f, map_location=None, weights_only=False):
+        return torch_load(f, map_location=map_location, weights_only=weights_only)
+
+    def load_state_dict(self, state_dict, strict=True):
+        return module_load_state_dict(self, state_dict, strict=strict)
+
+    monkeypatch.setattr(torch, "load", load)
+    monkeypatch.setattr(nn.Module, "load_state_dict", load_state_dict)
+
+
+### Helper Functions ###
+
+
+def assert_same_state_dict(actual: torch.nn.Module, expected: torch.nn.Module):
+    expected_state_dict = expected.state_dict()
+    actual_state_dict = actual.state_dict()
+    assert actual_state_dict.keys() == expected_state_dict.keys()
+    for key, tensor in expected_state_dict.items():
+        assert torch.equal(actual_state_dict[key], tensor)
+
+
+### Tests ###
+
+
+@pytest.mark.parametrize("convert", [False, True])
+def test_load_module_restores_weights(tmp_path, model, convert):
+    path = str(tmp_path / "model.pth")
+    torch.save(model.state_dict(), path)
+    if convert:
+        path = convert_checkpoint(path)
+        assert path.endswith(".safetensors")
+
+    loaded_model = load_module(FontDiffuserModelStub, path)
+
+    assert_same_state_dict(loaded_model, model)
+    inputs = model.create_inputs(batch_size=1)
+    with torch.no_grad():
+        assert torch.equal(loaded_model(*inputs, 3, "V3"), model(*inputs, 3, "V3"))
+
+
+def test_load_module_falls_back_without_mmap_and_assign(tmp_path, model, torch_1_13):
+    path = str(tmp_path / "model.pth")
+    torch.save(model.state_dict(), path)
+
+    loaded_model = load_module(FontDiffuserModelStub, path)
+
+    assert_same_state_dict(loaded_model, model)
+    assert not loaded_model.conv.weight.is_meta
+    torch.save({"conv.weight": model.conv.weight}, path)
+    with pytest.raises(RuntimeError):
+        load_module(FontDiffuserModelStub, path)
+
+
+def test_load_module_rejects_missing_weights(tmp_path, model):
+    path = str(tmp_path / "model.pth")
+    torch.save({"conv.weight": model.conv.weight}, path)
+
+    with pytest.raises(RuntimeError):
+        load_module(FontDiffuserModelStub, path)
+
+
+def test_find_checkpoint_prefers_safetensors(tmp_path, model):
+    torch.save(model.state_dict(), tmp_path / "unet.pth")
+    assert find_checkpoint(str(tmp_path), "unet") == str(tmp_path / "unet.pth")
+
+    convert_checkpoint(str(tmp_path / "unet.pth"))
+    assert find_checkpoint(str(tmp_path), "unet") == str(tmp_path / "unet.safetensors")
+
+
+@pytest.mark.slow
+def test_fontdiffuser_loads_from_either_format(tmp_path):
+    torch.manual_seed(0)
+    args = arg_parse(args_to_parse=["--ckpt_dir", str(tmp_path), "--device", "cpu"])
+    modules = {
+        "unet": build_unet(args=args),
+        "style_encoder": build_style_encoder(args=args),
+        "content_encoder": build_content_encoder(args=args),
+    }
+    for name in CHECKPOINT_NAMES:
+        torch.save(modules[name].state_dict(), tmp_path / f"{name}.pth")
+    expected = load_fontdiffuser_model(args=args)
+
+    for name in CHECKPOINT_NAMES:
+        convert_checkpoint(str(tmp_path / f"{name}.pth"))
+        (tmp_path / f"{name}.pth").unlink()
+    actual = load_fontdiffuser_model(args=args)
+
+    assert_same_state_dict(actual, expected)
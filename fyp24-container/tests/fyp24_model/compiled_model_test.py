@@ -0,0 +1,129 @@
+import pytest
+import torch
+
+from fyp24_model.src.dpm_solver.compiled_model import CompiledModel, pad_batch
+from tests.fyp24_model.font_diffuser_model_stub import FontDiffuserModelStub
+
+### Fixtures ###
+
+
+class UntraceableModelStub(FontDiffuserModelStub):
+    def forward(self, *args, **kwargs):
+        # Outputs that are not tensors cannot be traced
+        return {"noise": super().forward(*args, **kwargs)}
+
+
+class TimestepBranchingModelStub(FontDiffuserModelStub):
+    def forward(self, x, timesteps, cond, content_encoder_downsample_size, version):
+        # A trace only records the branch taken on the inputs it was traced with
+        if timesteps[0] > 250:
+            return super().forward(
+                x, timesteps, cond, content_encoder_downsample_size, version
+            )
+        return -super().forward(
+            x, timesteps, cond, content_encoder_downsample_size, version
+        )
+
+
+@pytest.fixture
+def model() -> FontDiffuserModelStub:
+    torch.manual_seed(0)
+    return FontDiffuserModelStub().eval()
+
+
+### Helper Functions ###
+
+
+def create_compiled_model(model, batch_sizes, **kwargs) -> CompiledModel:
+    return CompiledModel(
+        model=model,
+        batch_sizes=batch_sizes,
+        content_image_size=(16, 16),
+        style_image_size=(16, 16),
+        content_encoder_downsample_size=3,
+        **kwargs,
+    )
+
+
+### Tests ###
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 3, 4])
+def test_traced_model_matches_eager_model(model, batch_size):
+    compiled_model = create_compiled_model(model, batch_sizes=[2, 4], mode="trace")
+    x, timesteps, cond = model.create_inputs(batch_size)
+
+    with torch.no_grad():
+        expected = model(x, timesteps, cond, 3, "V3")
+        model.num_calls = 0
+        actual = compiled_model(x, timesteps, cond, 3, "V3")
+
+    assert compiled_model.compiled_batch_sizes == [2, 4]
+    # The traced graph is used, even when the batch is padded up to a bucket
+    assert model.num_calls == 0
+    torch.testing.assert_close(actual, expected)
+
+
+def test_batches_larger_than_every_bucket_run_eagerly(model):
+    compiled_model = create_compiled_model(model, batch_sizes=[2], mode="trace")
+    x, timesteps, cond = model.create_inputs(batch_size=3)
+
+    with torch.no_grad():
+        model.num_calls = 0
+        compiled_model(x, timesteps, cond, 3, "V3")
+
+    assert model.num_calls == 1
+
+
+def test_other_input_shapes_run_eagerly(model):
+    compiled_model = create_compiled_model(model, batch_sizes=[2], mode="trace")
+    x, timesteps, cond = model.create_inputs(batch_size=2)
+
+    with torch.no_grad():
+        model.num_calls = 0
+        compiled_model(x, timesteps, cond, 4, "V3")
+
+    assert model.num_calls == 1
+
+
+def test_failed_compilation_falls_back_to_eager_mode():
+    model = UntraceableModelStub().eval()
+
+    with pytest.warns(UserWarning, match="falling back to eager mode"):
+        compiled_model = create_compiled_model(model, batch_sizes=[2], mode="trace")
+
+    assert compiled_model.compiled_batch_sizes == []
+
+
+def test_trace_with_input_dependent_control_flow_falls_back_to_eager_mode():
+    torch.manual_seed(0)
+    model = TimestepBranchingModelStub().eval()
+
+    with pytest.warns(UserWarning, match="falling back to eager mode"):
+        compiled_model = create_compiled_model(model, batch_sizes=[2], mode="trace")
+    x, timesteps, cond = model.create_inputs(batch_size=2)
+    timesteps = torch.full((2,), 50.0)
+
+    with torch.no_grad():
+        expected = model(x, timesteps, cond, 3, "V3")
+        actual = compiled_model(x, timesteps, cond, 3, "V3")
+
+    assert compiled_model.compiled_batch_sizes == []
+    torch.testing.assert_close(actual, expected)
+
+
+def test_eager_mode_compiles_nothing(model):
+    compiled_model = create_compiled_model(model, batch_sizes=[2], mode="eager")
+
+    assert compiled_model.compiled_batch_sizes == []
+
+
+def test_unknown_compile_mode_is_rejected(model):
+    with pytest.raises(ValueError):
+        create_compiled_model(model, batch_sizes=[2], mode="jit")
+
+
+def test_pad_batch_repeats_last_sample():
+    tensor = torch.arange(2).float()
+
+    assert pad_batch(tensor, 4).tolist() == [0, 1, 1, 1]
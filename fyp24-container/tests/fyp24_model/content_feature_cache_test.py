@@ -0,0 +1,233 @@
+import os
+
+import numpy as np
+import pytest
+import torch
+import torch.nn as nn
+
+from fyp24_model.src import ContentEncoder, FontDiffuserModelDPM, StyleEncoder
+from fyp24_model.src.content_feature_cache import (
+    ContentFeatureCache,
+    features_nbytes,
+    hash_module,
+)
+from fyp24_model.src.dpm_solver.pipeline_dpm_solver import FontDiffuserDPMPipeline
+
+### Fixtures ###
+
+
+class UNetStub(nn.Module):
+    """Predicts the noise from the content features, which the cache provides."""
+
+    def forward(
+        self, x_t, timesteps, encoder_hidden_states, content_encoder_downsample_size
+    ):
+        content_features = encoder_hidden_states[1]
+        shift = sum(feature.mean(dim=(1, 2, 3)) for feature in content_features)
+        return (x_t * 0.1 + shift[:, None, None, None],)
+
+
+class DDPMSchedulerStub:
+    betas = torch.linspace(1e-4, 0.02, 1000)
+
+
+@pytest.fixture
+def pipe() -> FontDiffuserDPMPipeline:
+    torch.manual_seed(0)
+    model = FontDiffuserModelDPM(
+        unet=UNetStub(),
+        style_encoder=StyleEncoder(G_ch=16, resolution=96),
+        content_encoder=ContentEncoder(G_ch=16, resolution=96),
+    )
+    model.freeze_for_inference()
+    return FontDiffuserDPMPipeline(
+        model=model, ddpm_train_scheduler=DDPMSchedulerStub()
+    )
+
+
+### Helper Functions ###
+
+
+def create_features(value: float = 0.0) -> list[torch.Tensor]:
+    return [
+        torch.full((1, 4, 8, 8), float(value)),
+        torch.full((1, 8, 4, 4), float(value)),
+    ]
+
+
+def generate(pipe: FontDiffuserDPMPipeline, content_images, content_keys=None):
+    with torch.no_grad():
+        images = pipe.generate(
+            content_images=content_images,
+            style_images=torch.ones_like(content_images),
+            batch_size=content_images.shape[0],
+            order=2,
+            num_inference_step=4,
+            content_encoder_downsample_size=3,
+            generator=torch.Generator().manual_seed(0),
+            content_keys=content_keys,
+        )
+    return np.stack([np.array(image) for image in images])
+
+
+### Tests ###
+
+
+def test_memory_cache_is_bounded_and_least_recently_used_first_out():
+    nbytes = features_nbytes(create_features())
+    cache = ContentFeatureCache(encoder_hash="encoder", max_memory_bytes=2 * nbytes)
+
+    cache.put("font", "一", create_features(1))
+    cache.put("font", "二", create_features(2))
+    cache.get("font", "一")
+    cache.put("font", "三", create_features(3))
+
+    assert cache.memory_bytes == 2 * nbytes
+    assert cache.contains("font", "一")
+    assert not cache.contains("font", "二")
+    assert cache.contains("font", "三")
+
+
+def test_disk_cache_outlives_the_cache(tmp_path):
+    cache = ContentFeatureCache(encoder_hash="encoder", cache_dir=str(tmp_path))
+    cache.put("font", "永", create_features(1))
+
+    reloaded_cache = ContentFeatureCache(
+        encoder_hash="encoder", cache_dir=str(tmp_path)
+    )
+    features = reloaded_cache.get("font", "永")
+
+    assert reloaded_cache.disk_bytes == cache.disk_bytes > 0
+    assert features is not None
+    for feature, expected_feature in zip(features, create_features(1)):
+        torch.testing.assert_close(feature, expected_feature)
+
+
+def test_disk_cache_loads_without_mmap(tmp_path, monkeypatch):
+    cache = ContentFeatureCache(encoder_hash="encoder", cache_dir=str(tmp_path))
+    cache.put("font", "永", create_features(1))
+    torch_load = torch.load
+
+    # torch.load of torch 1.13, which the service is pinned to
+    def load(f, map_location=None, weights_only=False):
+        return torch_load(f, map_location=map_location, weights_only=weights_only)
+
+    monkeypatch.setattr(torch, "load", load)
+    features = ContentFeatureCache(encoder_hash="encoder", cache_dir=str(tmp_path)).get(
+        "font", "永"
+    )
+
+    assert features is not None
+    for feature, expected_feature in zip(features, create_features(1)):
+        torch.testing.assert_close(feature, expected_feature)
+
+
+def test_corrupt_file_is_a_miss_and_is_deleted(tmp_path):
+    cache = ContentFeatureCache(encoder_hash="encoder", cache_dir=str(tmp_path))
+    cache.put("font", "永", create_features(1))
+    (path,) = tmp_path.iterdir()
+    path.write_bytes(path.read_bytes()[:20])
+
+    reloaded_cache = ContentFeatureCache(
+        encoder_hash="encoder", cache_dir=str(tmp_path)
+    )
+
+    assert reloaded_cache.get("font", "永") is None
+    assert not reloaded_cache.contains("font", "永")
+    assert reloaded_cache.disk_bytes == 0
+
+
+def test_features_are_keyed_by_font_character_and_encoder(tmp_path):
+    cache = ContentFeatureCache(encoder_hash="encoder", cache_dir=str(tmp_path))
+    cache.put("font", "永", create_features(1))
+    other_encoder_cache = ContentFeatureCache(
+        encoder_hash="other encoder", cache_dir=str(tmp_path)
+    )
+
+    assert cache.get("other font", "永") is None
+    assert cache.get("font", "和") is None
+    assert other_encoder_cache.get("font", "永") is None
+
+
+def test_disk_cache_evicts_the_least_recently_used_files(tmp_path):
+    # The size of a file, with the overhead of the format
+    probe_cache = ContentFeatureCache(
+        encoder_hash="encoder", cache_dir=str(tmp_path / "probe")
+    )
+    probe_cache.put("font", "〇", create_features())
+    file_bytes = probe_cache.disk_bytes
+
+    cache_dir = tmp_path / "cache"
+    cache = ContentFeatureCache(
+        encoder_hash="encoder",
+        cache_dir=str(cache_dir),
+        max_memory_bytes=0,
+        max_disk_bytes=int(3.5 * file_bytes),
+    )
+    for i, character in enumerate("一二三"):
+        cache.put("font", character, create_features(i))
+        # The files are ordered by their modification times
+        for filename in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, filename)
+            os.utime(path, (os.path.getmtime(path) - 10,) * 2)
+    cache.get("font", "一")
+    cache.put("font", "四", create_features(4))
+
+    assert cache.disk_bytes <= 3.5 * file_bytes
+    assert cache.contains("font", "一")
+    assert not cache.contains("font", "二")
+    assert cache.contains("font", "四")
+
+
+def test_prewarm_encodes_the_characters_not_cached_yet():
+    cache = ContentFeatureCache(encoder_hash="encoder")
+    cache.put("font", "永", create_features(1))
+    encoded_batches = []
+
+    def encode(batch: list[str]):
+        encoded_batches.append(batch)
+        # "□" is not in the font
+        return [None if char == "□" else create_features(2) for char in batch]
+
+    num_encoded = cache.prewarm(
+        font="font", characters="永和九 年□和", encode=encode, batch_size=2
+    )
+
+    assert num_encoded == 3
+    assert encoded_batches == [["和", "九"], ["年", "□"]]
+    assert all(cache.contains("font", char) for char in "永和九年")
+
+
+def test_hash_module_depends_on_the_weights():
+    torch.manual_seed(0)
+    encoder = nn.Linear(4, 4)
+
+    encoder_hash = hash_module(encoder)
+    assert hash_module(encoder) == encoder_hash
+
+    with torch.no_grad():
+        encoder.weight[0, 0] += 1
+    assert hash_module(encoder) != encoder_hash
+
+
+def test_cached_content_features_give_the_same_glyphs(pipe, monkeypatch):
+    torch.manual_seed(0)
+    content_images = torch.rand(2, 3, 96, 96)
+    content_keys = [("font", "永"), ("font", "和")]
+    expected_images = generate(pipe, content_images)
+
+    pipe.content_feature_cache = ContentFeatureCache(encoder_hash="encoder")
+    first_images = generate(pipe, content_images, content_keys)
+    num_encoded = []
+    encode_content = pipe.model.encode_content
+    monkeypatch.setattr(
+        pipe.model,
+        "encode_content",
+        lambda images: num_encoded.append(len(images)) or encode_content(images),
+    )
+    cached_images = generate(pipe, content_images, content_keys)
+
+    assert np.abs(first_images.astype(np.int16) - expected_images).max() <= 1
+    assert np.array_equal(cached_images, first_images)
+    # Neither the cached glyphs nor the blank glyphs are encoded again
+    assert num_encoded == []
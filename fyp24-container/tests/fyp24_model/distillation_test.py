@@ -0,0 +1,270 @@
+import copy
+
+import pytest
+import torch
+import torch.nn as nn
+
+from fyp24_model.configs.distillation_cpu import DISTILLATION_CPU_ARGS
+from fyp24_model.sample import arg_parse
+from fyp24_model.src import (
+    FontDiffuserModel,
+    FontDiffuserModelDPM,
+    build_content_encoder,
+    build_ddpm_scheduler,
+    build_style_encoder,
+    build_unet,
+)
+from fyp24_model.src.distillation import ProgressiveDistillation
+from fyp24_model.src.dpm_solver.dpm_solver_pytorch import (
+    DPM_Solver,
+    NoiseScheduleVP,
+    model_wrapper,
+)
+from fyp24_model.src.dpm_solver.pipeline_dpm_solver import FontDiffuserDPMPipeline
+from tests.fyp24_model.font_diffuser_model_stub import FontDiffuserModelStub
+
+### Fixtures ###
+
+
+class TrainingModelStub(nn.Module):
+    """A small model with the forward signature of FontDiffuserModel."""
+
+    batch_sizes: list[int]  # The batch size of each forward pass
+
+    def __init__(self):
+        super().__init__()
+        self.conv = nn.Conv2d(9, 3, kernel_size=3, padding=1)
+        self.batch_sizes = []
+
+    def forward(
+        self,
+        x_t,
+        timesteps,
+        style_images,
+        content_images,
+        content_encoder_downsample_size,
+    ):
+        self.batch_sizes.append(x_t.shape[0])
+        hidden_states = torch.cat([x_t, style_images, content_images], dim=1)
+        noise_pred = self.conv(hidden_states) * (1 + timesteps[:, None, None, None])
+        return noise_pred / 1000, torch.tensor(0.0)
+
+
+class DDPMSchedulerStub:
+    betas = torch.linspace(1e-4, 0.02, 1000)
+
+
+@pytest.fixture
+def teacher() -> TrainingModelStub:
+    torch.manual_seed(0)
+    return TrainingModelStub().requires_grad_(False)
+
+
+### Helper Functions ###
+
+
+def create_images(batch_size: int = 2):
+    torch.manual_seed(1)
+    return (
+        torch.rand(batch_size, 3, 16, 16) * 2 - 1,
+        torch.rand(batch_size, 3, 16, 16) * 2 - 1,
+        torch.rand(batch_size, 3, 16, 16) * 2 - 1,
+    )
+
+
+def sample_teacher(teacher, x_T, style_images, content_images, steps):
+    """Sample the teacher with first-order DPM-Solver++ and classifier-free
+    guidance, as FontDiffuserDPMPipeline samples it."""
+    noise_schedule = NoiseScheduleVP(schedule="discrete", betas=DDPMSchedulerStub.betas)
+    model_fn = model_wrapper(
+        lambda x, t, cond, content_encoder_downsample_size, version: teacher(
+            x, t, cond[1], cond[0], content_encoder_downsample_size
+        )[0],
+        noise_schedule,
+        model_kwargs={"version": "V3", "content_encoder_downsample_size": 3},
+        guidance_type="classifier-free",
+        condition=[content_images, style_images],
+        unconditional_condition=[
+            torch.ones_like(content_images),
+            torch.ones_like(style_images),
+        ],
+        guidance_scale=7.5,
+    )
+    dpm_solver = DPM_Solver(model_fn, noise_schedule, algorithm_type="dpmsolver++")
+    return dpm_solver.sample(
+        x_T, steps=steps, order=1, skip_type="time_uniform", method="multistep"
+    )
+
+
+### Tests ###
+
+
+@pytest.mark.parametrize("student_steps", [1, 2, 4])
+def test_student_steps_land_where_the_teacher_steps_land(teacher, student_steps):
+    distillation = ProgressiveDistillation(
+        teacher=teacher,
+        train_scheduler=DDPMSchedulerStub(),
+        student_steps=student_steps,
+    )
+    x_T, style_images, content_images = create_images()
+    student_time_steps = distillation.student_time_steps
+    noise_schedule = NoiseScheduleVP(schedule="discrete", betas=DDPMSchedulerStub.betas)
+
+    def ideal_student(x, t_input):
+        # The student that predicts the noise of its target exactly
+        t = t_input / 1000 + 1 / noise_schedule.total_N
+        step = torch.argmin((student_time_steps - t[0]).abs()).repeat(len(x))
+        x0 = distillation.student_target(x, step, style_images, content_images)
+        alpha_t = noise_schedule.marginal_alpha(t)[:, None, None, None]
+        sigma_t = noise_schedule.marginal_std(t)[:, None, None, None]
+        return (x - alpha_t * x0) / sigma_t
+
+    student_sample = DPM_Solver(
+        model_wrapper(ideal_student, noise_schedule),
+        noise_schedule,
+        algorithm_type="dpmsolver++",
+    ).sample(
+        x_T, steps=student_steps, order=1, skip_type="time_uniform", method="multistep"
+    )
+    teacher_sample = sample_teacher(
+        teacher, x_T, style_images, content_images, steps=2 * student_steps
+    )
+
+    assert len(student_time_steps) == student_steps + 1
+    torch.testing.assert_close(student_sample, teacher_sample, atol=1e-4, rtol=1e-4)
+
+
+def test_teacher_with_the_guidance_baked_in_is_evaluated_once(teacher):
+    x, style_images, content_images = create_images()
+    t = torch.full((2,), 0.5)
+
+    for guidance_scale, expected_batch_size in [(7.5, 4), (1.0, 2)]:
+        teacher.batch_sizes = []
+        distillation = ProgressiveDistillation(
+            teacher=teacher,
+            train_scheduler=DDPMSchedulerStub(),
+            student_steps=2,
+            guidance_scale=guidance_scale,
+        )
+        distillation.teacher_x0(x, t, style_images, content_images)
+
+        assert teacher.batch_sizes == [expected_batch_size]
+
+
+def test_distillation_loss_decreases_and_leaves_the_teacher(teacher):
+    student = copy.deepcopy(teacher).requires_grad_(True)
+    distillation = ProgressiveDistillation(
+        teacher=teacher, train_scheduler=DDPMSchedulerStub(), student_steps=2
+    )
+    target_images, style_images, content_images = create_images(batch_size=4)
+    optimizer = torch.optim.Adam(student.parameters(), lr=0.05)
+    teacher_weight = teacher.conv.weight.clone()
+
+    losses = []
+    for _ in range(20):
+        # The same noise and steps, so that the losses are comparable
+        torch.manual_seed(0)
+        loss, _ = distillation.compute_loss(
+            student, target_images, style_images, content_images
+        )
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+        losses.append(loss.item())
+
+    assert losses[-1] < losses[0] / 2
+    assert teacher.conv.weight.grad is None
+    torch.testing.assert_close(teacher.conv.weight, teacher_weight)
+
+
+def test_student_takes_at_least_one_step(teacher):
+    with pytest.raises(ValueError):
+        ProgressiveDistillation(
+            teacher=teacher, train_scheduler=DDPMSchedulerStub(), student_steps=0
+        )
+
+
+def test_pipeline_samples_the_student_in_its_steps_without_guidance():
+    torch.manual_seed(0)
+    pipe = FontDiffuserDPMPipeline(
+        model=FontDiffuserModelStub().eval(),
+        ddpm_train_scheduler=DDPMSchedulerStub(),
+        guidance_scale=7.5,
+        distilled_steps=2,
+    )
+    steps = []
+
+    with torch.no_grad():
+        images, nfe = pipe.generate(
+            content_images=torch.rand(1, 3, 16, 16),
+            style_images=torch.rand(1, 3, 16, 16),
+            batch_size=1,
+            order=2,
+            num_inference_step=20,
+            content_encoder_downsample_size=3,
+            dm_size=(16, 16),
+            method="adaptive",
+            callback=lambda step, total_steps: steps.append((step, total_steps)),
+            generator=torch.Generator().manual_seed(0),
+            return_nfe=True,
+        )
+
+    assert len(images) == 1
+    assert pipe.guidance_scale == 1.0
+    assert nfe == pipe.model.num_calls == 2
+    assert steps == [(1, 2), (2, 2)]
+
+
+@pytest.mark.slow
+def test_distill_and_serve_the_small_cpu_model():
+    args = arg_parse(DISTILLATION_CPU_ARGS + ["--device", "cpu"])
+    torch.manual_seed(0)
+    teacher = FontDiffuserModel(
+        unet=build_unet(args=args),
+        style_encoder=build_style_encoder(args=args),
+        content_encoder=build_content_encoder(args=args),
+    ).requires_grad_(False)
+    student = copy.deepcopy(teacher).requires_grad_(True)
+    distillation = ProgressiveDistillation(
+        teacher=teacher.eval(),
+        train_scheduler=build_ddpm_scheduler(args=args),
+        student_steps=args.student_steps,
+        guidance_scale=args.teacher_guidance_scale,
+    )
+    optimizer = torch.optim.AdamW(student.parameters(), lr=args.learning_rate)
+    images = torch.rand(args.train_batch_size, 3, *args.content_image_size) * 2 - 1
+
+    for _ in range(args.max_train_steps):
+        loss, offset_out_sum = distillation.compute_loss(
+            student, images, torch.ones_like(images), images
+        )
+        loss = loss + args.offset_coefficient * offset_out_sum / 2
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+        assert torch.isfinite(loss)
+
+    model = FontDiffuserModelDPM(
+        unet=student.config["unet"],
+        style_encoder=student.config["style_encoder"],
+        content_encoder=student.config["content_encoder"],
+    ).eval()
+    pipe = FontDiffuserDPMPipeline(
+        model=model,
+        ddpm_train_scheduler=build_ddpm_scheduler(args=args),
+        distilled_steps=args.student_steps,
+    )
+    with torch.no_grad():
+        glyphs, nfe = pipe.generate(
+            content_images=images[:1],
+            style_images=torch.ones_like(images[:1]),
+            batch_size=1,
+            order=args.order,
+            num_inference_step=args.num_inference_steps,
+            content_encoder_downsample_size=args.content_encoder_downsample_size,
+            dm_size=args.content_image_size,
+            return_nfe=True,
+        )
+
+    assert nfe == args.student_steps
+    assert glyphs[0].size == args.content_image_size
@@ -0,0 +1,36 @@
+import torch
+import torch.nn as nn
+
+
+class FontDiffuserModelStub(nn.Module):
+    """A small model with the forward signature of FontDiffuserModelDPM."""
+
+    num_calls: int  # Number of eager forward passes
+
+    def __init__(self, image_size: tuple[int, int] = (16, 16)):
+        super().__init__()
+        self.image_size = image_size
+        self.conv = nn.Conv2d(9, 3, kernel_size=3, padding=1)
+        self.num_calls = 0
+
+    @property
+    def device(self) -> torch.device:
+        return self.conv.weight.device
+
+    @property
+    def dtype(self) -> torch.dtype:
+        return self.conv.weight.dtype
+
+    def forward(self, x, timesteps, cond, content_encoder_downsample_size, version):
+        self.num_calls += 1
+        hidden_states = torch.cat([x, cond[0], cond[1]], dim=1)
+        return self.conv(hidden_states) * timesteps[:, None, None, None] / 1000
+
+    def create_inputs(self, batch_size: int):
+        x = torch.randn(batch_size, 3, *self.image_size)
+        timesteps = torch.rand(batch_size) * 1000
+        cond = [
+            torch.rand(batch_size, 3, *self.image_size),
+            torch.rand(batch_size, 3, *self.image_size),
+        ]
+        return x, timesteps, cond
@@ -0,0 +1,67 @@
+import pytest
+import torch
+import torch.nn as nn
+
+from fyp24_model.src import ContentEncoder, FontDiffuserModelDPM, StyleEncoder
+from fyp24_model.src.model import freeze_spectral_norm
+from fyp24_model.src.modules import content_encoder, style_encoder
+
+### Helper Functions ###
+
+
+def flatten_outputs(outputs) -> list[torch.Tensor]:
+    if isinstance(outputs, torch.Tensor):
+        return [outputs]
+    return [tensor for output in outputs for tensor in flatten_outputs(output)]
+
+
+def count_spectral_norm_layers(module: nn.Module) -> int:
+    return sum(
+        isinstance(child, (style_encoder.SN, content_encoder.SN))
+        for child in module.modules()
+    )
+
+
+### Tests ###
+
+
+@pytest.mark.parametrize("encoder_class", [StyleEncoder, ContentEncoder])
+def test_frozen_encoder_has_the_same_outputs(encoder_class):
+    torch.manual_seed(0)
+    encoder = encoder_class(G_ch=16, resolution=96).eval()
+    images = torch.randn(2, 3, 96, 96)
+
+    with torch.no_grad():
+        expected_outputs = flatten_outputs(encoder(images))
+        num_frozen = freeze_spectral_norm(encoder)
+        outputs = flatten_outputs(encoder(images))
+
+    assert num_frozen > 0
+    assert count_spectral_norm_layers(encoder) == 0
+    assert len(outputs) == len(expected_outputs)
+    for output, expected_output in zip(outputs, expected_outputs):
+        torch.testing.assert_close(output, expected_output)
+
+
+def test_spectral_norm_cannot_be_frozen_in_training_mode():
+    encoder = ContentEncoder(G_ch=16, resolution=96).train()
+
+    with pytest.raises(RuntimeError):
+        freeze_spectral_norm(encoder)
+
+
+def test_freeze_model_for_inference():
+    model = FontDiffuserModelDPM(
+        unet=nn.Identity(),
+        style_encoder=StyleEncoder(G_ch=16, resolution=96),
+        content_encoder=ContentEncoder(G_ch=16, resolution=96),
+    )
+
+    num_frozen = model.freeze_for_inference()
+
+    assert not model.training
+    assert num_frozen > 0
+    assert count_spectral_norm_layers(model) == 0
+    # The encoders used in the forward pass are the frozen ones
+    assert count_spectral_norm_layers(model.config["style_encoder"]) == 0
+    assert count_spectral_norm_layers(model.config["content_encoder"]) == 0
@@ -0,0 +1,85 @@
+import pytest
+import torch
+
+from fyp24_model.src.dpm_solver.pipeline_dpm_solver import FontDiffuserDPMPipeline
+from tests.fyp24_model.font_diffuser_model_stub import FontDiffuserModelStub
+
+### Fixtures ###
+
+
+class DDPMSchedulerStub:
+    betas = torch.linspace(1e-4, 0.02, 1000)
+
+
+@pytest.fixture
+def pipe() -> FontDiffuserDPMPipeline:
+    torch.manual_seed(0)
+    return FontDiffuserDPMPipeline(
+        model=FontDiffuserModelStub().eval(),
+        ddpm_train_scheduler=DDPMSchedulerStub(),
+    )
+
+
+### Helper Functions ###
+
+
+def generate(pipe: FontDiffuserDPMPipeline, **kwargs):
+    torch.manual_seed(0)
+    content_images = torch.rand(1, 3, 16, 16)
+    style_images = torch.rand(1, 3, 16, 16)
+    with torch.no_grad():
+        return pipe.generate(
+            content_images=content_images,
+            style_images=style_images,
+            batch_size=1,
+            order=2,
+            num_inference_step=10,
+            content_encoder_downsample_size=3,
+            dm_size=(16, 16),
+            generator=torch.Generator().manual_seed(0),
+            **kwargs,
+        )
+
+
+### Tests ###
+
+
+def test_x0_pred_callback_is_called_at_each_model_step(pipe):
+    x0_preds = {}
+
+    def x0_pred_callback(step, x0_pred):
+        x0_preds[step] = x0_pred.clone()
+
+    generate(pipe, x0_pred_callback=x0_pred_callback)
+
+    # The model is not evaluated at the final step
+    assert list(x0_preds.keys()) == list(range(10))
+    assert all(x0_pred.shape == (1, 3, 16, 16) for x0_pred in x0_preds.values())
+
+
+def test_x0_pred_callback_keeps_output(pipe):
+    expected = generate(pipe)
+
+    actual = generate(pipe, x0_pred_callback=lambda step, x0_pred: None)
+
+    assert [image.tobytes() for image in actual] == [
+        image.tobytes() for image in expected
+    ]
+
+
+def test_x0_pred_of_noise_prediction_solver_matches_data_prediction(pipe):
+    x0_preds = {}
+
+    for algorithm_type in ["dpmsolver++", "dpmsolver"]:
+        generate(
+            pipe,
+            algorithm_type=algorithm_type,
+            x0_pred_callback=lambda step, x0_pred: x0_preds.setdefault(
+                algorithm_type, x0_pred.clone()
+            ),
+        )
+
+    # Both solvers start from the same noise, and predict x0 in different ways
+    torch.testing.assert_close(
+        x0_preds["dpmsolver"], x0_preds["dpmsolver++"], rtol=1e-4, atol=1e-4
+    )
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+import torch
+
+from fyp24_model.src.dpm_solver.pipeline_dpm_solver import FontDiffuserDPMPipeline
+from tests.fyp24_model.font_diffuser_model_stub import FontDiffuserModelStub
+
+### Fixtures ###
+
+
+class BatchRecordingModelStub(FontDiffuserModelStub):
+    """Records the batch size of each call of the model."""
+
+    def __init__(self):
+        super().__init__()
+        self.batch_sizes = []
+
+    def forward(self, x, *args, **kwargs):
+        self.batch_sizes.append(x.shape[0])
+        return super().forward(x, *args, **kwargs)
+
+
+class DDPMSchedulerStub:
+    betas = torch.linspace(1e-4, 0.02, 1000)
+
+
+@pytest.fixture
+def pipe() -> FontDiffuserDPMPipeline:
+    torch.manual_seed(0)
+    return FontDiffuserDPMPipeline(
+        model=BatchRecordingModelStub().eval(),
+        ddpm_train_scheduler=DDPMSchedulerStub(),
+    )
+
+
+### Helper Functions ###
+
+
+def generate(pipe: FontDiffuserDPMPipeline, **kwargs) -> torch.Tensor:
+    torch.manual_seed(0)
+    content_images = torch.rand(1, 3, 16, 16)
+    style_images = torch.rand(1, 3, 16, 16)
+    pipe.model.batch_sizes.clear()
+    with torch.no_grad():
+        images = pipe.generate(
+            content_images=content_images,
+            style_images=style_images,
+            batch_size=1,
+            order=2,
+            num_inference_step=10,
+            content_encoder_downsample_size=3,
+            dm_size=(16, 16),
+            generator=torch.Generator().manual_seed(0),
+            **kwargs,
+        )
+    return torch.from_numpy(np.stack([np.array(image) for image in images]))
+
+
+### Tests ###
+
+
+def test_default_guides_every_step(pipe):
+    generate(pipe)
+
+    assert pipe.model.batch_sizes == [2] * 10
+
+
+def test_full_guidance_interval_keeps_output(pipe):
+    expected = generate(pipe)
+
+    actual = generate(pipe, guidance_interval=(0, 999))
+
+    assert pipe.model.batch_sizes == [2] * 10
+    assert torch.equal(actual, expected)
+
+
+@pytest.mark.parametrize("unguided_final_steps", [1, 4, 10, 20])
+def test_unguided_final_steps_run_conditional_model(pipe, unguided_final_steps):
+    generate(pipe, unguided_final_steps=unguided_final_steps)
+
+    num_unguided = min(unguided_final_steps, 10)
+    assert pipe.model.batch_sizes == [2] * (10 - num_unguided) + [1] * num_unguided
+
+
+def test_guidance_interval_skips_steps_outside(pipe):
+    generate(pipe, guidance_interval=(500, 999))
+
+    # The time-uniform steps are evenly spread over the timesteps
+    assert pipe.model.batch_sizes == [2] * 5 + [1] * 5
+
+
+def test_unguided_steps_are_compiled(pipe):
+    compiled_batch_sizes = pipe.compile(
+        batch_sizes=[1],
+        content_image_size=(16, 16),
+        style_image_size=(16, 16),
+        content_encoder_downsample_size=3,
+        unguided_steps=True,
+    )
+
+    assert compiled_batch_sizes == [1, 2]
@@ -0,0 +1,163 @@
+import copy
+
+import pytest
+import torch
+import torch.nn as nn
+
+from fyp24_model.src.dpm_solver.dpm_solver_pytorch import NoiseScheduleVP, model_wrapper
+from fyp24_model.src.inference_optimization import (
+    fold_norm_affine,
+    fold_normalizations,
+    optimize_for_inference,
+)
+from fyp24_model.src.modules.attention import OffsetRefStrucInter, SpatialTransformer
+from tests.fyp24_model.font_diffuser_model_stub import FontDiffuserModelStub
+
+### Fixtures ###
+
+
+class AttentionNet(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.transformer = SpatialTransformer(
+            in_channels=32, n_heads=2, d_head=16, context_dim=24
+        )
+        self.offset = OffsetRefStrucInter(
+            res_in_channels=32, style_feat_in_channels=32, n_heads=2
+        )
+
+    def forward(self, x, context):
+        x = self.transformer(x, context=context)
+        return self.offset(x, x)
+
+
+@pytest.fixture
+def net() -> AttentionNet:
+    torch.manual_seed(0)
+    net = AttentionNet().eval()
+    # Give the normalizations non-trivial affine parameters to fold
+    for module in net.modules():
+        if isinstance(module, (nn.GroupNorm, nn.LayerNorm)):
+            nn.init.normal_(module.weight, mean=1.0, std=0.2)
+            nn.init.normal_(module.bias, std=0.2)
+    return net
+
+
+### Helper Functions ###
+
+
+def relative_error(actual: torch.Tensor, expected: torch.Tensor) -> float:
+    return ((actual - expected).abs().max() / expected.abs().max()).item()
+
+
+def create_model_fn(model, condition, unconditional_condition):
+    return model_wrapper(
+        model,
+        NoiseScheduleVP(schedule="discrete", betas=torch.linspace(1e-4, 0.02, 1000)),
+        model_kwargs={"content_encoder_downsample_size": 3, "version": "V3"},
+        guidance_type="classifier-free",
+        condition=condition,
+        unconditional_condition=unconditional_condition,
+        guidance_scale=7.5,
+    )
+
+
+### Tests ###
+
+
+@pytest.mark.parametrize(
+    "norm, projection",
+    [
+        (nn.LayerNorm(16), nn.Linear(16, 8, bias=False)),
+        (nn.GroupNorm(4, 16), nn.Conv2d(16, 8, kernel_size=1)),
+    ],
+)
+def test_fold_norm_affine_keeps_output(norm, projection):
+    torch.manual_seed(0)
+    nn.init.normal_(norm.weight, mean=1.0, std=0.2)
+    nn.init.normal_(norm.bias, std=0.2)
+    x = torch.randn(2, 16, 4, 4)
+    if isinstance(norm, nn.LayerNorm):
+        x = x.flatten(2).transpose(1, 2)
+    with torch.no_grad():
+        expected = projection(norm(x))
+
+        assert fold_norm_affine(norm, [projection])
+        actual = projection(norm(x))
+
+    assert norm.weight is None and norm.bias is None
+    assert relative_error(actual, expected) < 1e-5
+    # Folding twice is a no-op
+    assert not fold_norm_affine(norm, [projection])
+
+
+def test_fold_normalizations_keeps_output(net):
+    x = torch.randn(2, 32, 8, 8)
+    context = torch.randn(2, 5, 24)
+    with torch.no_grad():
+        expected = net(x, context)
+
+        # 1 in SpatialTransformer, 2 in BasicTransformerBlock, 6 in OffsetRefStrucInter
+        assert fold_normalizations(net) == 9
+        actual = net(x, context)
+
+    assert relative_error(actual, expected) < 1e-4
+
+
+def test_channels_last_converts_convolutions(net):
+    optimize_for_inference(net, ["channels_last"])
+
+    weight = net.transformer.proj_in.weight
+    assert weight.is_contiguous(memory_format=torch.channels_last)
+
+
+def test_unknown_optimization_is_rejected(net):
+    with pytest.raises(ValueError):
+        optimize_for_inference(net, ["fuse", "prune"])
+
+
+def test_guidance_reuses_step_buffers():
+    torch.manual_seed(0)
+    model = FontDiffuserModelStub().eval()
+    x, _, condition = model.create_inputs(batch_size=1)
+    unconditional_condition = [torch.ones_like(c) for c in condition]
+    model_fn = create_model_fn(model, condition, unconditional_condition)
+
+    inputs = []
+    model.forward = lambda x, t, cond, **kwargs: inputs.append((x, cond)) or x
+    with torch.no_grad():
+        model_fn(x, torch.full((1,), 0.5))
+        model_fn(x + 1, torch.full((1,), 0.25))
+
+    (first_x, first_cond), (second_x, second_cond) = inputs
+    assert first_x is second_x
+    assert first_cond is second_cond
+    assert torch.equal(second_x, torch.cat([x + 1] * 2))
+
+
+def test_guidance_with_step_buffers_matches_concatenation():
+    torch.manual_seed(0)
+    model = FontDiffuserModelStub().eval()
+    x, _, condition = model.create_inputs(batch_size=2)
+    unconditional_condition = [torch.ones_like(c) for c in condition]
+    model_fn = create_model_fn(model, condition, unconditional_condition)
+    reference = copy.deepcopy(model)
+
+    with torch.no_grad():
+        for t in (0.75, 0.5):
+            t_continuous = torch.full((2,), t)
+            actual = model_fn(x, t_continuous)
+
+            t_input = (t_continuous - 1.0 / 1000) * 1000.0
+            noise_uncond, noise = reference(
+                torch.cat([x] * 2),
+                torch.cat([t_input] * 2),
+                [
+                    torch.cat([unconditional_condition[0], condition[0]]),
+                    torch.cat([unconditional_condition[1], condition[1]]),
+                ],
+                3,
+                "V3",
+            ).chunk(2)
+            expected = noise_uncond + 7.5 * (noise - noise_uncond)
+            assert torch.allclose(actual, expected, atol=1e-5)
@@ -0,0 +1,81 @@
+import pytest
+import torch
+
+from fyp24_model.sample import arg_parse
+from fyp24_model.src import (
+    FontDiffuserModelDPM,
+    build_content_encoder,
+    build_style_encoder,
+    build_unet,
+)
+from fyp24_model.src.dpm_solver.onnx_model import OnnxModel, export_onnx
+from tests.fyp24_model.font_diffuser_model_stub import FontDiffuserModelStub
+
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+### Helper Functions ###
+
+
+def export_and_load(model, path, image_size) -> OnnxModel:
+    export_onnx(
+        model=model,
+        path=path,
+        content_image_size=image_size,
+        style_image_size=image_size,
+        content_encoder_downsample_size=3,
+    )
+    return OnnxModel(path, num_threads=1)
+
+
+### Tests ###
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 3])
+def test_onnx_model_matches_eager_model(tmp_path, batch_size):
+    torch.manual_seed(0)
+    model = FontDiffuserModelStub().eval()
+    onnx_model = export_and_load(model, tmp_path / "model.onnx", image_size=(16, 16))
+    x, timesteps, cond = model.create_inputs(batch_size)
+
+    with torch.no_grad():
+        expected = model(x, timesteps, cond, 3, "V3")
+    actual = onnx_model(x, timesteps, cond, 3, "V3")
+
+    torch.testing.assert_close(actual, expected, rtol=1e-4, atol=1e-5)
+
+
+def test_onnx_model_rejects_other_arguments(tmp_path):
+    model = FontDiffuserModelStub().eval()
+    onnx_model = export_and_load(model, tmp_path / "model.onnx", image_size=(16, 16))
+    x, timesteps, cond = model.create_inputs(batch_size=1)
+
+    with pytest.raises(ValueError):
+        onnx_model(x, timesteps, cond, 4, "V3")
+
+
+@pytest.mark.slow
+def test_exported_fontdiffuser_matches_eager_model(tmp_path):
+    torch.manual_seed(0)
+    args = arg_parse(args_to_parse=[])
+    model = FontDiffuserModelDPM(
+        unet=build_unet(args=args),
+        style_encoder=build_style_encoder(args=args),
+        content_encoder=build_content_encoder(args=args),
+    )
+    model.freeze_for_inference()
+    onnx_model = export_and_load(
+        model, tmp_path / "model.onnx", image_size=args.content_image_size
+    )
+    x = torch.randn(2, 3, *args.content_image_size)
+    timesteps = torch.full((2,), 500.0)
+    cond = [
+        torch.rand(2, 3, *args.content_image_size),
+        torch.rand(2, 3, *args.style_image_size),
+    ]
+
+    with torch.no_grad():
+        expected = model(x, timesteps, cond, 3, "V3")
+    actual = onnx_model(x, timesteps, cond, 3, "V3")
+
+    torch.testing.assert_close(actual, expected, rtol=1e-3, atol=1e-3)
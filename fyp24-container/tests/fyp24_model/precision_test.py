@@ -0,0 +1,84 @@
+import pytest
+import torch
+import torch.nn as nn
+from torchvision.ops import DeformConv2d
+
+from fyp24_model.src.precision import Float32Module, PrecisionModel, keep_in_float32
+from tests.fyp24_model.font_diffuser_model_stub import FontDiffuserModelStub
+
+### Fixtures ###
+
+
+class DeformConvNet(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.offset = nn.Conv2d(3, 18, kernel_size=3, padding=1)
+        self.deform = DeformConv2d(3, 3, kernel_size=3, padding=1)
+
+    def forward(self, x):
+        return self.deform(x, self.offset(x))
+
+
+@pytest.fixture
+def model() -> FontDiffuserModelStub:
+    torch.manual_seed(0)
+    return FontDiffuserModelStub().eval()
+
+
+### Helper Functions ###
+
+
+def relative_error(actual: torch.Tensor, expected: torch.Tensor) -> float:
+    return ((actual - expected).abs().mean() / expected.abs().mean()).item()
+
+
+### Tests ###
+
+
+@pytest.mark.parametrize("precision", ["fp32", "bf16", "fp16"])
+def test_precision_model_matches_fp32(model, precision):
+    inputs = model.create_inputs(batch_size=2)
+    with torch.no_grad():
+        expected = model(*inputs, 3, "V3")
+
+        precision_model = PrecisionModel(model, precision=precision)
+        actual = precision_model(*inputs, 3, "V3")
+
+    # The solver loop stays in fp32
+    assert actual.dtype == torch.float32
+    assert relative_error(actual, expected) < 0.02
+
+
+def test_fp16_converts_weights(model):
+    precision_model = PrecisionModel(model, precision="fp16")
+
+    assert model.conv.weight.dtype == torch.float16
+    assert precision_model.dtype == torch.float32
+
+
+def test_bf16_keeps_fp32_weights(model):
+    PrecisionModel(model, precision="bf16")
+
+    assert model.conv.weight.dtype == torch.float32
+
+
+def test_unknown_precision_is_rejected(model):
+    with pytest.raises(ValueError):
+        PrecisionModel(model, precision="fp8")
+
+
+def test_deformable_convolution_runs_in_fp32():
+    torch.manual_seed(0)
+    net = DeformConvNet().eval()
+    images = torch.rand(2, 3, 8, 8)
+    with torch.no_grad():
+        expected = net(images)
+
+    net.bfloat16()
+    assert keep_in_float32(net) == 1
+    assert isinstance(net.deform, Float32Module)
+    with torch.no_grad():
+        actual = net(images.bfloat16())
+
+    assert actual.dtype == torch.bfloat16
+    assert relative_error(actual.float(), expected) < 0.02
@@ -0,0 +1,111 @@
+import pytest
+import torch
+import torch.nn as nn
+from torch.ao.nn import quantized
+
+from fyp24_model.sample import arg_parse
+from fyp24_model.src import build_ddpm_scheduler
+from fyp24_model.src.quantization import (
+    QuantizedConv,
+    calibrate_fontdiffuser,
+    quantize_model,
+)
+from tests.fyp24_model.font_diffuser_model_stub import FontDiffuserModelStub
+
+### Fixtures ###
+
+
+class ConvNet(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.conv_in = nn.Conv2d(3, 32, kernel_size=3, padding=1)
+        self.norm = nn.GroupNorm(8, 32)
+        self.conv_out = nn.Conv2d(32, 3, kernel_size=3, padding=1)
+        self.proj = nn.Linear(16, 16)
+
+    def forward(self, x):
+        h = self.conv_out(nn.functional.silu(self.norm(self.conv_in(x))))
+        return self.proj(h)
+
+
+@pytest.fixture
+def model() -> ConvNet:
+    torch.manual_seed(0)
+    return ConvNet().eval()
+
+
+### Helper Functions ###
+
+
+def relative_error(actual: torch.Tensor, expected: torch.Tensor) -> float:
+    return ((actual - expected).abs().mean() / expected.abs().mean()).item()
+
+
+### Tests ###
+
+
+def test_static_quantization_quantizes_convolutions(model):
+    calibration_images = torch.rand(8, 3, 16, 16)
+    images = torch.rand(2, 3, 16, 16)
+    with torch.no_grad():
+        expected = model(images)
+
+    quantize_model(model, mode="static", calibrate=lambda m: m(calibration_images))
+    with torch.no_grad():
+        actual = model(images)
+
+    assert isinstance(model.conv_in, QuantizedConv)
+    assert isinstance(model.conv_in.conv, quantized.Conv2d)
+    assert isinstance(model.proj, nn.Linear)
+    assert relative_error(actual, expected) < 0.05
+
+
+def test_dynamic_quantization_quantizes_linear_layers(model):
+    images = torch.rand(2, 3, 16, 16)
+    with torch.no_grad():
+        expected = model(images)
+
+    quantize_model(model, mode="dynamic")
+    with torch.no_grad():
+        actual = model(images)
+
+    assert isinstance(model.conv_in, nn.Conv2d)
+    assert isinstance(model.proj, quantized.dynamic.Linear)
+    assert relative_error(actual, expected) < 0.05
+
+
+def test_no_quantization_keeps_model(model):
+    quantize_model(model, mode="none")
+
+    assert isinstance(model.conv_in, nn.Conv2d)
+    assert isinstance(model.proj, nn.Linear)
+
+
+def test_unknown_quantization_mode_is_rejected(model):
+    with pytest.raises(ValueError):
+        quantize_model(model, mode="int4")
+
+
+def test_calibration_covers_guidance_and_timesteps():
+    model = FontDiffuserModelStub()
+    calls = []
+    model.register_forward_hook(lambda _, inputs, output: calls.append(inputs))
+    content_images = torch.rand(3, 3, 16, 16) * 2 - 1
+    style_images = torch.rand(3, 3, 16, 16) * 2 - 1
+
+    calibrate_fontdiffuser(
+        model=model,
+        content_images=content_images,
+        style_images=style_images,
+        train_scheduler=build_ddpm_scheduler(args=arg_parse(args_to_parse=[])),
+        content_encoder_downsample_size=3,
+        num_timesteps=4,
+    )
+
+    timesteps = [inputs[1][0].item() for inputs in calls]
+    assert timesteps == [0, 333, 666, 999]
+    for x, _, cond in calls:
+        # The unconditional inputs come first, as in classifier-free guidance
+        assert x.shape[0] == 6
+        assert torch.equal(cond[0][3:], content_images)
+        assert torch.equal(cond[1][:3], torch.ones_like(style_images))
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+import torch
+
+from fyp24_model.src.dpm_solver.pipeline_dpm_solver import FontDiffuserDPMPipeline
+from fyp24_model.utils import create_sample_generator
+from tests.fyp24_model.font_diffuser_model_stub import FontDiffuserModelStub
+
+### Fixtures ###
+
+
+class DDPMSchedulerStub:
+    betas = torch.linspace(1e-4, 0.02, 1000)
+
+
+@pytest.fixture
+def pipe() -> FontDiffuserDPMPipeline:
+    torch.manual_seed(0)
+    return FontDiffuserDPMPipeline(
+        model=FontDiffuserModelStub().eval(),
+        ddpm_train_scheduler=DDPMSchedulerStub(),
+    )
+
+
+### Helper Functions ###
+
+
+def generate(pipe: FontDiffuserDPMPipeline, content_images, style_images, generator):
+    with torch.no_grad():
+        images = pipe.generate(
+            content_images=content_images,
+            style_images=style_images,
+            batch_size=content_images.shape[0],
+            order=2,
+            num_inference_step=10,
+            content_encoder_downsample_size=3,
+            dm_size=(16, 16),
+            generator=generator,
+        )
+    return np.stack([np.array(image) for image in images]).astype(np.int16)
+
+
+### Tests ###
+
+
+def test_sample_generator_depends_on_seed_and_index():
+    def noise(seed, index):
+        return torch.randn(8, generator=create_sample_generator(seed, index))
+
+    assert torch.equal(noise(0, 1), noise(0, 1))
+    assert not torch.equal(noise(0, 1), noise(0, 2))
+    assert not torch.equal(noise(0, 1), noise(1, 1))
+    # The first sample is seeded with the seed of the job
+    assert torch.equal(
+        noise(42, 0), torch.randn(8, generator=torch.Generator().manual_seed(42))
+    )
+
+
+def test_batched_samples_match_samples_generated_alone(pipe):
+    torch.manual_seed(0)
+    content_images = torch.rand(2, 3, 16, 16)
+    style_images = torch.rand(2, 3, 16, 16)
+
+    batched = generate(
+        pipe,
+        content_images,
+        style_images,
+        generator=[create_sample_generator(7, 0), create_sample_generator(7, 1)],
+    )
+    # The second sample alone, e.g. in a batch of another job
+    alone = generate(
+        pipe,
+        content_images[1:],
+        style_images[1:],
+        generator=[create_sample_generator(7, 1)],
+    )
+
+    # Up to rounding, as the model may compute batches in a different order
+    assert np.abs(batched[1:] - alone).max() <= 1
+
+
+def test_one_generator_for_each_sample_is_needed(pipe):
+    content_images = torch.rand(2, 3, 16, 16)
+    style_images = torch.rand(2, 3, 16, 16)
+
+    with pytest.raises(AssertionError):
+        generate(
+            pipe,
+            content_images,
+            style_images,
+            generator=[create_sample_generator(7, 0)],
+        )
@@ -0,0 +1,125 @@
+import pytest
+import torch
+
+from fyp24_model.src.dpm_solver.dpm_solver_pytorch import (
+    DPM_Solver,
+    MultistepPlan,
+    NoiseScheduleVP,
+)
+from fyp24_model.src.dpm_solver.pipeline_dpm_solver import FontDiffuserDPMPipeline
+from tests.fyp24_model.font_diffuser_model_stub import FontDiffuserModelStub
+
+### Fixtures ###
+
+
+class DDPMSchedulerStub:
+    betas = torch.linspace(1e-4, 0.02, 1000)
+
+
+@pytest.fixture
+def noise_schedule() -> NoiseScheduleVP:
+    return NoiseScheduleVP(schedule="discrete", betas=DDPMSchedulerStub.betas)
+
+
+@pytest.fixture
+def pipe() -> FontDiffuserDPMPipeline:
+    torch.manual_seed(0)
+    return FontDiffuserDPMPipeline(
+        model=FontDiffuserModelStub().eval(),
+        ddpm_train_scheduler=DDPMSchedulerStub(),
+    )
+
+
+### Helper Functions ###
+
+
+def generate(pipe: FontDiffuserDPMPipeline, num_inference_step: int):
+    torch.manual_seed(0)
+    with torch.no_grad():
+        return pipe.generate(
+            content_images=torch.rand(1, 3, 16, 16),
+            style_images=torch.rand(1, 3, 16, 16),
+            batch_size=1,
+            order=2,
+            num_inference_step=num_inference_step,
+            content_encoder_downsample_size=3,
+            dm_size=(16, 16),
+            generator=torch.Generator().manual_seed(0),
+        )
+
+
+### Tests ###
+
+
+@pytest.mark.parametrize("algorithm_type", ["dpmsolver++", "dpmsolver"])
+@pytest.mark.parametrize("solver_type", ["dpmsolver", "taylor"])
+@pytest.mark.parametrize("order", [1, 2, 3])
+def test_plan_update_matches_multistep_update(
+    noise_schedule, algorithm_type, solver_type, order
+):
+    dpm_solver = DPM_Solver(
+        model_fn=None, noise_schedule=noise_schedule, algorithm_type=algorithm_type
+    )
+    plan = dpm_solver.get_multistep_plan(
+        steps=8,
+        order=order,
+        skip_type="logSNR",
+        t_T=1.0,
+        t_0=1e-3,
+        device="cpu",
+        solver_type=solver_type,
+    )
+    torch.manual_seed(0)
+    x = torch.randn(2, 3, 4, 4)
+    model_prev_list = [torch.randn(2, 3, 4, 4) for _ in range(order)]
+
+    for step in range(order, 9):
+        t_prev_list = list(plan.timesteps[step - order : step])
+        expected = dpm_solver.multistep_dpm_solver_update(
+            x,
+            model_prev_list,
+            t_prev_list,
+            plan.timesteps[step],
+            plan.orders[step],
+            solver_type=solver_type,
+        )
+
+        # In the same order of operations, so the samples do not change
+        assert torch.equal(plan.update(x, model_prev_list, step), expected)
+
+
+def test_plan_orders_follow_lower_order_final(noise_schedule):
+    dpm_solver = DPM_Solver(model_fn=None, noise_schedule=noise_schedule)
+
+    def orders(steps, lower_order_final=True):
+        return dpm_solver.get_multistep_plan(
+            steps=steps,
+            order=3,
+            skip_type="time_uniform",
+            t_T=1.0,
+            t_0=1e-3,
+            device="cpu",
+            lower_order_final=lower_order_final,
+        ).orders[1:]
+
+    assert orders(6) == [1, 2, 3, 3, 2, 1]
+    assert orders(6, lower_order_final=False) == [1, 2, 3, 3, 3, 3]
+    assert orders(12) == [1, 2] + [3] * 10
+
+
+def test_plan_is_computed_once_for_each_setting(monkeypatch, pipe):
+    plans: list[MultistepPlan] = []
+    plan_init = MultistepPlan.__init__
+
+    def count_plans(self, *args, **kwargs):
+        plans.append(self)
+        plan_init(self, *args, **kwargs)
+
+    monkeypatch.setattr(MultistepPlan, "__init__", count_plans)
+
+    first = generate(pipe, num_inference_step=10)
+    second = generate(pipe, num_inference_step=10)
+    generate(pipe, num_inference_step=5)
+
+    assert len(plans) == 2
+    assert [image.tobytes() for image in first] == [image.tobytes() for image in second]
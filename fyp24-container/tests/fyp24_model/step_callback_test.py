@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+import torch
+
+from fyp24_model.src.dpm_solver.dpm_solver_pytorch import SamplingCancelled
+from fyp24_model.src.dpm_solver.pipeline_dpm_solver import FontDiffuserDPMPipeline
+from tests.fyp24_model.font_diffuser_model_stub import FontDiffuserModelStub
+
+### Fixtures ###
+
+
+class DDPMSchedulerStub:
+    betas = torch.linspace(1e-4, 0.02, 1000)
+
+
+@pytest.fixture
+def pipe() -> FontDiffuserDPMPipeline:
+    torch.manual_seed(0)
+    return FontDiffuserDPMPipeline(
+        model=FontDiffuserModelStub().eval(),
+        ddpm_train_scheduler=DDPMSchedulerStub(),
+    )
+
+
+### Helper Functions ###
+
+
+def generate(pipe: FontDiffuserDPMPipeline, **kwargs):
+    torch.manual_seed(0)
+    content_images = torch.rand(1, 3, 16, 16)
+    style_images = torch.rand(1, 3, 16, 16)
+    with torch.no_grad():
+        return pipe.generate(
+            content_images=content_images,
+            style_images=style_images,
+            batch_size=1,
+            order=2,
+            num_inference_step=10,
+            content_encoder_downsample_size=3,
+            dm_size=(16, 16),
+            generator=torch.Generator().manual_seed(0),
+            **kwargs,
+        )
+
+
+### Tests ###
+
+
+def test_callback_reports_each_step(pipe):
+    steps = []
+
+    generate(pipe, callback=lambda step, total_steps: steps.append((step, total_steps)))
+
+    assert steps == [(step, 10) for step in range(1, 11)]
+
+
+def test_unset_cancel_event_keeps_output(pipe):
+    expected = generate(pipe)
+
+    actual = generate(pipe, cancel_event=threading.Event())
+
+    assert [image.tobytes() for image in actual] == [
+        image.tobytes() for image in expected
+    ]
+
+
+def test_cancel_event_stops_sampling_after_current_step(pipe):
+    cancel_event = threading.Event()
+
+    def callback(step, total_steps):
+        if step == 3:
+            cancel_event.set()
+
+    pipe.model.num_calls = 0
+    with pytest.raises(SamplingCancelled):
+        generate(pipe, callback=callback, cancel_event=cancel_event)
+
+    # The model is evaluated once before the first step, and once in each step
+    assert pipe.model.num_calls == 4